@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Benchmark
+Sobe o app (Gunicorn) contra servidores stub locais e mede vazão, latência por etapa e memória
+
+Stubs: LLM compatível com a API da OpenAI (latência e tokens/s configuráveis), páginas de
+resultado no formato do Bing e do DuckDuckGo e um corpus de páginas estáticas.
+
+Uso:
+    python benchmark.py --analyses 8 --concurrency 4 --output bench.json
+    python benchmark.py --llm-latency 0.5 --llm-tokens-per-second 200 --workers 2
+    python benchmark.py --output atual.json --compare base.json --tolerance 10
+    python benchmark.py --url http://localhost:5000 --skip-analyses   # servidor já em execução
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import signal
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from load_test import PeakCounter, percentile
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WORDS = (
+    'mercado crescimento consumidor digital estratégia vendas produto serviço brasil '
+    'tendência oportunidade público conversão marketing investimento pesquisa dados '
+    'empresa cliente canal preço valor concorrência inovação segmento análise'
+).split()
+
+# ----------------------------------------------------------------------
+# Servidores stub
+# ----------------------------------------------------------------------
+
+def lorem(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+class StubHandler(BaseHTTPRequestHandler):
+    """LLM, busca e corpus de páginas servidos por um único servidor local"""
+    
+    config: dict = {}
+    stats = defaultdict(int)
+    stats_lock = threading.Lock()
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+    
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_HEAD(self):
+        # url_resolver verifica redirecionamentos com HEAD
+        self._count('head')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+    
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query).get('q', [''])[0]
+        
+        if parsed.path == '/bing/search':
+            self._count('search_bing')
+            self._send(200, self._bing_html(query).encode('utf-8'), 'text/html; charset=utf-8')
+        elif parsed.path == '/duckduckgo/html/':
+            self._count('search_duckduckgo')
+            self._send(200, self._duckduckgo_html(query).encode('utf-8'), 'text/html; charset=utf-8')
+        elif parsed.path.startswith('/pages/'):
+            self._count('pages')
+            self._send(200, self._page_html(parsed.path).encode('utf-8'), 'text/html; charset=utf-8')
+        else:
+            self._send(404, b'not found', 'text/plain')
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        
+        if self.path.rstrip('/').endswith('/chat/completions'):
+            self._count('llm')
+            self._send(200, json.dumps(self._completion(payload)).encode('utf-8'), 'application/json')
+        else:
+            self._send(404, b'not found', 'text/plain')
+    
+    def _results(self, query: str):
+        rng = random.Random(query)
+        base = self.config['base_url']
+        for i in range(self.config['search_results']):
+            page = rng.randrange(self.config['corpus_size'])
+            yield f"{base}/pages/{page}", f"{query} - estudo {page}", lorem(rng, 25)
+    
+    def _bing_html(self, query: str) -> str:
+        items = ''.join(
+            f'<li class="b_algo"><h2><a href="{url}">{title}</a></h2><p>{snippet}</p></li>'
+            for url, title, snippet in self._results(query)
+        )
+        return f'<html><body><ol id="b_results">{items}</ol></body></html>'
+    
+    def _duckduckgo_html(self, query: str) -> str:
+        items = ''.join(
+            f'<div class="result"><a class="result__a" href="{url}">{title}</a>'
+            f'<a class="result__snippet">{snippet}</a></div>'
+            for url, title, snippet in self._results(query)
+        )
+        return f'<html><body>{items}</body></html>'
+    
+    def _page_html(self, path: str) -> str:
+        page = path.rsplit('/', 1)[-1]
+        rng = random.Random(f"page-{page}")
+        paragraphs = ''.join(f'<p>{lorem(rng, 80)}.</p>' for _ in range(self.config['page_paragraphs']))
+        return (
+            f'<html><head><title>Relatório de mercado {page}</title></head><body>'
+            f'<nav>menu</nav><article><h1>Relatório de mercado {page}</h1>{paragraphs}</article>'
+            f'<footer>rodapé</footer></body></html>'
+        )
+    
+    def _completion(self, payload: dict) -> dict:
+        """Simula latência até o primeiro token mais o tempo de geração"""
+        max_tokens = min(payload.get('max_tokens') or 1024, self.config['llm_max_tokens'])
+        time.sleep(self.config['llm_latency'] + max_tokens / self.config['llm_tokens_per_second'])
+        
+        rng = random.Random(uuid.uuid4().hex)
+        # JSON válido: os parsers do pipeline aceitam e seguem adiante
+        content = json.dumps({
+            'resumo': lorem(rng, max_tokens // 4),
+            'insights': [lorem(rng, 12) for _ in range(5)],
+            'recomendacoes': [lorem(rng, 12) for _ in range(5)]
+        }, ensure_ascii=False)
+        
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': max_tokens, 'total_tokens': max_tokens}
+        }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_stubs(args) -> ThreadingHTTPServer:
+    port = free_port()
+    StubHandler.config = {
+        'base_url': f"http://127.0.0.1:{port}",
+        'llm_latency': args.llm_latency,
+        'llm_tokens_per_second': args.llm_tokens_per_second,
+        'llm_max_tokens': args.llm_max_tokens,
+        'search_results': 10,
+        'corpus_size': args.corpus_size,
+        'page_paragraphs': args.page_paragraphs
+    }
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='benchmark-stubs', daemon=True).start()
+    print(f"🧪 Stubs em {StubHandler.config['base_url']}")
+    return server
+
+# ----------------------------------------------------------------------
+# Servidor da aplicação
+# ----------------------------------------------------------------------
+
+def start_app(args, stub_url: str):
+    """Sobe o Gunicorn com os provedores apontando para os stubs e dados num diretório temporário
+
+    Banco, arquivos, uploads, métricas, logs e relatórios de cada execução ficam isolados: os tempos
+    não dependem de execuções anteriores e o ambiente do desenvolvedor não é alterado.
+    """
+    port = free_port()
+    run_dir = tempfile.mkdtemp(prefix='arqv30-benchmark-')
+    src_dir = os.path.join(ROOT_DIR, 'src')
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [src_dir, os.environ.get('PYTHONPATH')])),
+        SQLITE_DB_PATH=os.path.join(run_dir, 'data', 'arqv30.db'),
+        LOCAL_FILES_DIR=os.path.join(run_dir, 'analyses_data'),
+        UPLOAD_DIR=os.path.join(run_dir, 'uploads'),
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(run_dir, 'prometheus_multiproc'),
+        PORT=str(port),
+        LOG_FILE_ENABLED='false',
+        FLASK_ENV='production',
+        GUNICORN_WORKERS=str(args.workers),
+        JOB_WORKERS=str(args.job_workers),
+        OPENAI_API_KEY='benchmark',
+        OPENAI_BASE_URL=f"{stub_url}/v1",
+        BING_SEARCH_URL=f"{stub_url}/bing/search",
+        DUCKDUCKGO_SEARCH_URL=f"{stub_url}/duckduckgo/html/",
+        HEALTH_SELFTEST_URL=f"{stub_url}/pages/0",
+        JOB_TENANT_MAX_CONCURRENCY=str(args.concurrency),
+        JOB_TENANT_MAX_QUEUED=str(args.analyses)
+    )
+    # Credenciais reais nunca são usadas no benchmark (load_dotenv não sobrescreve variáveis definidas)
+    for key in (
+        'GEMINI_API_KEY', 'GROQ_API_KEY', 'HUGGINGFACE_API_KEY', 'DEEPSEEK_API_KEY', 'JINA_API_KEY',
+        'GOOGLE_SEARCH_KEY', 'GOOGLE_CSE_ID', 'SERPER_API_KEY',
+        'SUPABASE_URL', 'SUPABASE_ANON_KEY', 'SUPABASE_SERVICE_ROLE_KEY'
+    ):
+        env[key] = ''
+    
+    # Caminhos relativos ao cwd (pidfile em logs/, relatórios intermediários) também caem no temporário
+    cmd = [
+        sys.executable, '-m', 'gunicorn',
+        '--config', os.path.join(ROOT_DIR, 'gunicorn.conf.py'),
+        '--workers', str(args.workers),
+        '--bind', f"127.0.0.1:{port}",
+        '--pythonpath', src_dir,
+        '--chdir', run_dir,
+        'run:create_app()'
+    ]
+    os.makedirs(os.path.join(run_dir, 'logs'))
+    try:
+        process = subprocess.Popen(cmd, cwd=run_dir, env=env, start_new_session=True)
+    except Exception:
+        shutil.rmtree(run_dir, ignore_errors=True)
+        raise
+    url = f"http://127.0.0.1:{port}"
+    
+    deadline = time.time() + args.boot_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Gunicorn encerrou durante o boot (código {process.returncode})")
+        try:
+            if requests.get(f"{url}/api/health/live", timeout=1).ok:
+                print(f"🚀 App em {url} (pid {process.pid}, dados em {run_dir})")
+                return process, url, run_dir
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    
+    stop_app(process, run_dir)
+    raise RuntimeError(f"App não respondeu em {args.boot_timeout:.0f}s")
+
+def stop_app(process, run_dir: str):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(30)
+    except Exception:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait(30)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+# ----------------------------------------------------------------------
+# Memória
+# ----------------------------------------------------------------------
+
+def _process_tree(root_pid: int):
+    """pids do processo e descendentes (via /proc)"""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            children[ppid].append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+class MemorySampler:
+    """Pico de RSS somado da árvore do Gunicorn (master, workers e pool de jobs)"""
+    
+    def __init__(self, root_pid: int, interval: float = 0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_total_kb = 0
+        self.peak_process_kb = 0
+        self.peak_processes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        if os.path.isdir('/proc'):
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            pids = _process_tree(self.root_pid)
+            sizes = [_rss_kb(pid) for pid in pids]
+            self.peak_total_kb = max(self.peak_total_kb, sum(sizes))
+            self.peak_process_kb = max(self.peak_process_kb, max(sizes, default=0))
+            self.peak_processes = max(self.peak_processes, len(pids))
+            self._stop.wait(self.interval)
+    
+    def report(self):
+        return {
+            'peak_total_rss_mb': round(self.peak_total_kb / 1024, 1),
+            'peak_process_rss_mb': round(self.peak_process_kb / 1024, 1),
+            'peak_processes': self.peak_processes
+        }
+
+# ----------------------------------------------------------------------
+# Cargas
+# ----------------------------------------------------------------------
+
+def summarize(values):
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50), 4),
+        'p95': round(percentile(values, 95), 4),
+        'p99': round(percentile(values, 99), 4),
+        'max': round(max(values), 4)
+    }
+
+def run_endpoint_phase(url: str, path: str, concurrency: int, duration: float):
+    """Requisições por segundo em um endpoint durante um intervalo fixo"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+    session_local = threading.local()
+    
+    def worker():
+        session_local.session = requests.Session()
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                response = session_local.session.get(f"{url}{path}", timeout=30)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    (errors if response.status_code >= 500 else latencies).append(elapsed)
+            except requests.RequestException as e:
+                with lock:
+                    errors.append(str(e))
+    
+    started = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+    
+    return {
+        'path': path,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency': summarize(latencies)
+    }
+
+def run_one_analysis(url: str, index: int, args):
+    session_id = f"bench_{uuid.uuid4().hex[:12]}"
+    result = {'session_id': session_id}
+    started = time.time()
+    
+    response = requests.post(f"{url}/api/analyze", json={
+        'segmento': args.segmento,
+        'produto': f"Produto benchmark {index}",
+        'session_id': session_id
+    }, headers={'X-Tenant-ID': 'benchmark'}, timeout=30)
+    result['enqueue_latency'] = time.time() - started
+    
+    if response.status_code != 202:
+        result['error'] = f"HTTP {response.status_code}: {response.text[:200]}"
+        return result
+    
+    job_id = response.json()['job_id']
+    while time.time() - started < args.analysis_timeout:
+        job = requests.get(f"{url}/api/jobs/{job_id}", timeout=30).json()
+        if job.get('status') in ('completed', 'failed', 'cancelled'):
+            result['status'] = job['status']
+            break
+        time.sleep(args.poll_interval)
+    else:
+        result['status'] = 'timeout'
+    
+    result['total_time'] = time.time() - started
+    return result
+
+def collect_stages(url: str, session_ids):
+    """Durações por etapa a partir dos traces de cada análise"""
+    stages = defaultdict(list)
+    for session_id in session_ids:
+        try:
+            trace = requests.get(f"{url}/api/traces/{session_id}", timeout=30).json()
+        except (requests.RequestException, ValueError):
+            continue
+        for span in trace.get('spans', []):
+            stages[span['name']].append(span['duration'])
+    return {name: summarize(values) for name, values in sorted(stages.items())}
+
+def run_analysis_phase(url: str, args):
+    in_flight = PeakCounter()
+    
+    def tracked(index):
+        with in_flight:
+            return run_one_analysis(url, index, args)
+    
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(tracked, range(args.analyses)))
+    elapsed = time.time() - started
+    
+    completed = [r for r in results if r.get('status') == 'completed']
+    return {
+        'analyses': args.analyses,
+        'concurrency': args.concurrency,
+        'completed': len(completed),
+        'failed': len(results) - len(completed),
+        'errors': [r['error'] for r in results if r.get('error')][:10],
+        'wall_time': round(elapsed, 2),
+        'analyses_per_minute': round(len(completed) / elapsed * 60, 2) if elapsed else 0,
+        'enqueue_latency': summarize([r['enqueue_latency'] for r in results if 'enqueue_latency' in r]),
+        'total_time': summarize([r['total_time'] for r in completed]),
+        'stages': collect_stages(url, [r['session_id'] for r in results])
+    }
+
+# ----------------------------------------------------------------------
+# Comparação entre commits
+# ----------------------------------------------------------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+def comparable_metrics(report):
+    """Métricas onde maior é pior (latências e memória); vazão entra invertida"""
+    metrics = {}
+    for name, phase in report.get('endpoints', {}).items():
+        metrics[f"endpoint {name} p95"] = phase['latency'].get('p95')
+        metrics[f"endpoint {name} 1/rps"] = 1 / phase['requests_per_second'] if phase['requests_per_second'] else None
+    analyses = report.get('analyses') or {}
+    metrics['analysis total p95'] = analyses.get('total_time', {}).get('p95')
+    for stage, values in analyses.get('stages', {}).items():
+        metrics[f"stage {stage} p95"] = values.get('p95')
+    metrics['peak rss mb'] = report.get('memory', {}).get('peak_total_rss_mb')
+    return {k: v for k, v in metrics.items() if v}
+
+def compare(current, baseline, tolerance: float) -> bool:
+    """Imprime variações e retorna False se alguma piorou além da tolerância (%)"""
+    print(f"\n📊 Comparação com {baseline.get('commit')} (tolerância {tolerance:.0f}%)")
+    ok = True
+    base_metrics = comparable_metrics(baseline)
+    for name, value in comparable_metrics(current).items():
+        base = base_metrics.get(name)
+        if not base:
+            continue
+        delta = (value - base) / base * 100
+        regression = delta > tolerance
+        ok = ok and not regression
+        marker = '❌' if regression else ('✅' if delta < -tolerance else '  ')
+        print(f"   {marker} {name}: {base:.4f} → {value:.4f} ({delta:+.1f}%)")
+    return ok
+
+# ----------------------------------------------------------------------
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print(f"📋 Benchmark {report['commit']} - {report['timestamp']}")
+    for name, phase in report['endpoints'].items():
+        lat = phase['latency']
+        print(
+            f"   {name}: {phase['requests_per_second']} req/s, p50={lat.get('p50', 0) * 1000:.1f}ms "
+            f"p95={lat.get('p95', 0) * 1000:.1f}ms p99={lat.get('p99', 0) * 1000:.1f}ms, {phase['errors']} erros"
+        )
+    
+    analyses = report.get('analyses')
+    if analyses:
+        total = analyses['total_time']
+        print(
+            f"   Análises: {analyses['completed']}/{analyses['analyses']} concluídas, "
+            f"{analyses['analyses_per_minute']}/min, total p50={total.get('p50', 0):.1f}s p95={total.get('p95', 0):.1f}s"
+        )
+        ranked = sorted(analyses['stages'].items(), key=lambda item: item[1].get('p95', 0), reverse=True)
+        for name, values in ranked[:15]:
+            print(
+                f"      {name:40s} n={values['count']:4d} p50={values['p50']:.3f}s "
+                f"p95={values['p95']:.3f}s p99={values['p99']:.3f}s"
+            )
+    
+    memory = report['memory']
+    if memory:
+        print(
+            f"   Memória: pico {memory['peak_total_rss_mb']}MB na árvore de processos "
+            f"({memory['peak_process_rss_mb']}MB no maior, {memory['peak_processes']} processos)"
+        )
+    print(f"   Stubs: {report['stub_requests']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do ARQV30 com provedores stub')
+    parser.add_argument('--url', help='Usa um servidor já em execução em vez de subir o Gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--job-workers', type=int, default=4)
+    parser.add_argument('--analyses', type=int, default=8, help='Total de análises')
+    parser.add_argument('--concurrency', type=int, default=4, help='Análises simultâneas')
+    parser.add_argument('--skip-analyses', action='store_true')
+    parser.add_argument('--endpoints', default='/api/health/live,/api/health/ready,/api/list_analyses?limit=20',
+                        help='Endpoints medidos em req/s (separados por vírgula)')
+    parser.add_argument('--endpoint-concurrency', type=int, default=16)
+    parser.add_argument('--endpoint-duration', type=float, default=10)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='Segundos até o primeiro token')
+    parser.add_argument('--llm-tokens-per-second', type=float, default=2000)
+    parser.add_argument('--llm-max-tokens', type=int, default=2048)
+    parser.add_argument('--corpus-size', type=int, default=200)
+    parser.add_argument('--page-paragraphs', type=int, default=30)
+    parser.add_argument('--segmento', default='Marketing Digital')
+    parser.add_argument('--analysis-timeout', type=float, default=1800)
+    parser.add_argument('--poll-interval', type=float, default=1)
+    parser.add_argument('--boot-timeout', type=float, default=60)
+    parser.add_argument('--output', help='Arquivo JSON com o resultado')
+    parser.add_argument('--compare', help='JSON de um benchmark anterior para comparação')
+    parser.add_argument('--tolerance', type=float, default=10, help='Piora máxima aceita na comparação (%%)')
+    args = parser.parse_args()
+    
+    print("🚀 ARQV30 Enhanced v2.0 - Benchmark")
+    print("=" * 60)
+    
+    stubs = start_stubs(args)
+    process = None
+    run_dir = None
+    url = args.url
+    
+    try:
+        if not url:
+            process, url, run_dir = start_app(args, StubHandler.config['base_url'])
+        # Com --url o servidor não é filho deste processo: memória não é medida
+        sampler = MemorySampler(process.pid).start() if process else None
+        
+        report = {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+            'endpoints': {},
+            'analyses': None
+        }
+        
+        for path in [p.strip() for p in args.endpoints.split(',') if p.strip()]:
+            print(f"🔍 {path} por {args.endpoint_duration:.0f}s com concorrência {args.endpoint_concurrency}")
+            report['endpoints'][path] = run_endpoint_phase(
+                url, path, args.endpoint_concurrency, args.endpoint_duration
+            )
+        
+        if not args.skip_analyses:
+            print(f"🔍 {args.analyses} análises com concorrência {args.concurrency}")
+            report['analyses'] = run_analysis_phase(url, args)
+        
+        if sampler:
+            sampler.stop()
+        report['memory'] = sampler.report() if sampler else {}
+        report['stub_requests'] = dict(StubHandler.stats)
+    
+    finally:
+        if process:
+            stop_app(process, run_dir)
+        stubs.shutdown()
+    
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultado salvo em {args.output}")
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
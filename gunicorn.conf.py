@@ -6,16 +6,42 @@ Configuração robusta para produção com Gunicorn
 """
 
 import os
+import shutil
 import multiprocessing
 
+# Métricas Prometheus agregadas entre master, workers e pool de jobs: a variável
+# precisa existir antes do preload do app (o prometheus_client a lê no import) e
+# é herdada por todos os processos. Arquivos de execuções anteriores distorceriam
+# contadores e gauges, então o diretório é limpo ao iniciar o master (uma única
+# vez: o SIGHUP relê esta configuração com os workers ainda ativos).
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prometheus_multiproc')
+)
+if os.environ.get('ARQV30_METRICS_MASTER_PID') != str(os.getpid()):
+    os.environ['ARQV30_METRICS_MASTER_PID'] = str(os.getpid())
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+# Worker class: "gthread" (padrão) ou "gevent". O trabalho das rotas é quase todo
+# espera de rede (busca, extração, LLMs), então threads/greenlets por worker
+# atendem várias requisições concorrentes em vez de uma por processo.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Com preload_app o app é importado no master: o patch precisa vir antes
+    # de qualquer import de requests/ssl/socket
+    from gevent import monkey
+    monkey.patch_all()
+
 # Server socket
 bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
 backlog = 2048
 
 # Worker processes
-workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = "sync"
-worker_connections = 1000
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 32))  # gthread: requisições simultâneas por worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))  # gevent: greenlets por worker
 timeout = 60
 keepalive = 2
 
@@ -26,6 +52,16 @@ max_requests_jitter = 100
 # Preload app for better performance
 preload_app = True
 
+# Serviços de dados puros (catálogos, templates) instanciados no master para que
+# os workers compartilhem essas páginas via copy-on-write. Clientes de rede NÃO
+# entram aqui: são criados sob demanda ou recriados após o fork.
+preload_services = [
+    name.strip() for name in os.getenv(
+        'GUNICORN_PRELOAD_SERVICES',
+        'future_prediction_engine,mental_drivers_architect,complete_drivers_architect,anti_objection_system'
+    ).split(',') if name.strip()
+]
+
 # Logging
 accesslog = "logs/gunicorn_access.log" if os.getenv('LOG_FILE_ENABLED', 'true').lower() == 'true' else "-"
 errorlog = "logs/gunicorn_error.log" if os.getenv('LOG_FILE_ENABLED', 'true').lower() == 'true' else "-"
@@ -54,10 +90,27 @@ limit_request_field_size = 8190
 # Performance tuning
 worker_tmp_dir = '/dev/shm' if os.path.exists('/dev/shm') else None
 
+def on_starting(server):
+    """Called just before the master process is initialized"""
+    server.log.info("📈 Métricas Prometheus em modo multiprocess: %s", multiproc_dir)
+
 def when_ready(server):
     """Called just after the server is started"""
     server.log.info("🚀 ARQV30 Enhanced v2.0 server is ready. Listening on: %s", server.address)
 
+    from utils.lazy import preload_services as preload
+    loaded = preload(preload_services)
+    server.log.info("📦 Serviços pré-carregados no master: %s", loaded)
+
+    # Análises longas rodam no pool de jobs, fora dos workers web
+    import job_worker
+    job_worker.start_embedded()
+
+def on_exit(server):
+    """Called just before exiting Gunicorn"""
+    import job_worker
+    job_worker.stop_embedded()
+
 def worker_int(worker):
     """Called just after a worker exited on SIGINT or SIGQUIT"""
     worker.log.info("🛑 Worker received INT or QUIT signal")
@@ -68,7 +121,22 @@ def pre_fork(server, worker):
 
 def post_fork(server, worker):
     """Called just after a worker has been forked"""
-    server.log.info("✅ Worker %s forked successfully", worker.pid)
+    # Sockets, pools HTTP e locks herdados do master não podem ser compartilhados
+    from utils.lazy import reinit_after_fork
+    reset = reinit_after_fork()
+    if reset:
+        server.log.info("🔌 Worker %s descartou clientes herdados (recriados sob demanda): %s", worker.pid, ', '.join(reset))
+
+    # Self-test em background alimenta /api/health/ready (um worker executa por intervalo)
+    from services.health_monitor import health_monitor
+    health_monitor.ensure_scheduler()
+
+    server.log.info("✅ Worker %s forked successfully (%s)", worker.pid, worker_class)
+
+def child_exit(server, worker):
+    """Called just after a worker has been exited, in the master process"""
+    from utils.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
 
 def worker_abort(worker):
     """Called when a worker received the SIGABRT signal"""
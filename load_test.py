@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste de Carga
+Mede quantas requisições e análises simultâneas cada worker do Gunicorn sustenta
+
+Uso:
+    python load_test.py --mode endpoint --path /api/health --concurrency 64 --requests 640
+    python load_test.py --mode analyze --concurrency 16 --workers 2
+"""
+
+import os
+import sys
+import time
+import json
+import uuid
+import argparse
+import threading
+import statistics
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+class PeakCounter:
+    """Contador de operações simultâneas com registro do pico"""
+    
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        return self
+    
+    def __exit__(self, *args):
+        with self._lock:
+            self.current -= 1
+
+def percentile(values, pct):
+    """Percentil simples (nearest-rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def print_latencies(title, values):
+    if not values:
+        print(f"   {title}: sem amostras")
+        return
+    print(
+        f"   {title}: p50={percentile(values, 50):.3f}s p95={percentile(values, 95):.3f}s "
+        f"max={max(values):.3f}s média={statistics.mean(values):.3f}s"
+    )
+
+def run_endpoint_test(args):
+    """Dispara requisições simultâneas contra um endpoint"""
+    url = args.url.rstrip('/') + args.path
+    in_flight = PeakCounter()
+    latencies, errors = [], []
+    
+    print(f"🔍 {args.requests} requisições para {url} com concorrência {args.concurrency}")
+    
+    def hit(_):
+        started = time.time()
+        try:
+            with in_flight:
+                response = requests.get(url, timeout=args.timeout)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+            latencies.append(time.time() - started)
+        except Exception as e:
+            errors.append(str(e))
+    
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(hit, range(args.requests)))
+    elapsed = time.time() - started
+    
+    print(f"✅ {len(latencies)} respostas em {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/s), {len(errors)} erros")
+    print_latencies("Latência", latencies)
+    print(f"   Pico de requisições simultâneas: {in_flight.peak} ({in_flight.peak / args.workers:.1f} por worker)")
+    return not errors
+
+def follow_analysis(args, index, streams, results):
+    """Enfileira uma análise e acompanha o progresso pelo stream SSE"""
+    base = args.url.rstrip('/')
+    session_id = f"loadtest_{uuid.uuid4().hex[:12]}"
+    payload = {
+        'segmento': args.segmento,
+        'produto': f"Teste de carga {index}",
+        'session_id': session_id
+    }
+    result = {'session_id': session_id, 'events': 0}
+    started = time.time()
+    
+    try:
+        response = requests.post(
+            f"{base}/api/analyze", json=payload, timeout=args.timeout,
+            # Tenants distintos para não esbarrar no limite por tenant
+            headers={'X-Tenant-ID': f"loadtest-{index}"}
+        )
+        result['enqueue_latency'] = time.time() - started
+        result['enqueue_status'] = response.status_code
+        
+        if response.status_code != 202:
+            result['error'] = response.text[:200]
+            return
+        
+        job = response.json()
+        result['job_id'] = job['job_id']
+        
+        with streams:
+            stream = requests.get(
+                f"{base}/api/progress/stream/{session_id}", stream=True, timeout=(args.timeout, None)
+            )
+            event_type = None
+            for line in stream.iter_lines(decode_unicode=True):
+                if line.startswith('event:'):
+                    event_type = line.split(':', 1)[1].strip()
+                elif line.startswith('data:') and event_type == 'progress':
+                    result['events'] += 1
+                    result.setdefault('first_event', time.time() - started)
+                elif line.startswith('data:') and event_type in ('complete', 'expired'):
+                    result['stream_end'] = event_type
+                    break
+                
+                if time.time() - started > args.max_duration:
+                    result['stream_end'] = 'timeout'
+                    break
+            stream.close()
+        
+        status = requests.get(f"{base}/api/jobs/{job['job_id']}", timeout=args.timeout).json()
+        result['job_status'] = status.get('status')
+        result['total_time'] = time.time() - started
+    
+    except Exception as e:
+        result['error'] = str(e)
+    
+    finally:
+        results.append(result)
+
+def run_analysis_test(args):
+    """Dispara análises simultâneas e acompanha todas por SSE ao mesmo tempo"""
+    streams = PeakCounter()
+    results = []
+    
+    print(f"🔍 {args.concurrency} análises simultâneas contra {args.url}")
+    
+    threads = [
+        threading.Thread(target=follow_analysis, args=(args, i, streams, results))
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    accepted = [r for r in results if r.get('enqueue_status') == 202]
+    completed = [r for r in results if r.get('job_status') == 'completed']
+    
+    print(f"✅ {len(accepted)}/{len(results)} análises aceitas, {len(completed)} concluídas")
+    print_latencies("Enfileiramento", [r['enqueue_latency'] for r in results if 'enqueue_latency' in r])
+    print_latencies("Primeiro evento SSE", [r['first_event'] for r in results if 'first_event' in r])
+    print_latencies("Duração total", [r['total_time'] for r in completed])
+    print(f"   Pico de streams SSE abertos: {streams.peak} ({streams.peak / args.workers:.1f} por worker)")
+    
+    for r in results:
+        if r.get('error'):
+            print(f"   ❌ {r['session_id']}: {r['error']}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados salvos em {args.output}")
+    
+    return len(accepted) == len(results)
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do ARQV30')
+    parser.add_argument('--url', default=os.getenv('LOAD_TEST_URL', 'http://localhost:5000'))
+    parser.add_argument('--mode', choices=['endpoint', 'analyze'], default='endpoint')
+    parser.add_argument('--path', default='/api/health')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=320)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('GUNICORN_WORKERS', 1)),
+                        help='Workers do Gunicorn, para calcular a concorrência por worker')
+    parser.add_argument('--segmento', default='Marketing Digital')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--max-duration', type=float, default=2400)
+    parser.add_argument('--output', help='Arquivo JSON com o resultado de cada análise')
+    args = parser.parse_args()
+    
+    print("🚀 ARQV30 Enhanced v2.0 - Teste de Carga")
+    print("=" * 50)
+    
+    if args.mode == 'analyze':
+        ok = run_analysis_test(args)
+    else:
+        ok = run_endpoint_test(args)
+    
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
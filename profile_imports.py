@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Perfil de Tempo de Import
+Relatório baseado em `python -X importtime` para acompanhar o custo de inicialização
+
+Uso:
+    python profile_imports.py                      # importa src/run.py
+    python profile_imports.py --module job_worker --top 30
+    python profile_imports.py --module routes.analysis --json relatorio.json
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+LINE_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)')
+
+# Executado no subprocesso após o import: mostra quais serviços foram instanciados
+STATUS_SNIPPET = '''
+import json, importlib
+importlib.import_module({module!r})
+from utils.lazy import services_status
+print("__SERVICES__" + json.dumps(services_status()))
+'''
+
+def run_importtime(module: str):
+    """Importa o módulo em um processo limpo e captura a saída do -X importtime"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, LOG_FILE_ENABLED='false')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STATUS_SNIPPET.format(module=module)],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True
+    )
+    
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                'module': name,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2
+            })
+    
+    services = {}
+    for line in result.stdout.splitlines():
+        if line.startswith('__SERVICES__'):
+            services = json.loads(line[len('__SERVICES__'):])
+    
+    errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+    return entries, services, result.returncode, errors
+
+def build_report(module: str, entries, services, top: int):
+    """Agrega tempos por módulo e por pacote de nível superior"""
+    by_package = defaultdict(float)
+    for entry in entries:
+        by_package[entry['module'].split('.')[0]] += entry['self_ms']
+    
+    roots = [e for e in entries if e['depth'] == 0]
+    
+    return {
+        'module': module,
+        'total_ms': round(sum(e['cumulative_ms'] for e in roots), 1),
+        'modules_imported': len(entries),
+        'top_cumulative': sorted(entries, key=lambda e: e['cumulative_ms'], reverse=True)[:top],
+        'top_self': sorted(entries, key=lambda e: e['self_ms'], reverse=True)[:top],
+        'top_packages': sorted(
+            ({'package': name, 'self_ms': round(ms, 1)} for name, ms in by_package.items()),
+            key=lambda p: p['self_ms'], reverse=True
+        )[:top],
+        'services': services
+    }
+
+def print_report(report):
+    print(f"⏱️ Import de '{report['module']}': {report['total_ms']:.1f}ms ({report['modules_imported']} módulos)")
+    
+    print("\n📦 Pacotes (tempo próprio somado):")
+    for item in report['top_packages']:
+        print(f"   {item['self_ms']:9.1f}ms  {item['package']}")
+    
+    print("\n🌳 Módulos por tempo cumulativo:")
+    for entry in report['top_cumulative']:
+        print(f"   {entry['cumulative_ms']:9.1f}ms  {'  ' * entry['depth']}{entry['module']}")
+    
+    if report['services']:
+        loaded = {name: s for name, s in report['services'].items() if s['loaded']}
+        print(f"\n⚡ Serviços instanciados no import: {len(loaded)}/{len(report['services'])}")
+        for name, status in loaded.items():
+            print(f"   {status['init_ms']:9.1f}ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil de tempo de import do ARQV30')
+    parser.add_argument('--module', default='run', help='Módulo a importar (relativo a src/)')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--json', help='Salva o relatório completo em JSON')
+    args = parser.parse_args()
+    
+    entries, services, returncode, errors = run_importtime(args.module)
+    
+    if returncode != 0 or not entries:
+        print(f"❌ Falha ao importar '{args.module}':")
+        print('\n'.join(errors[-20:]))
+        sys.exit(1)
+    
+    report = build_report(args.module, entries, services, args.top)
+    print_report(report)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Relatório salvo em {args.json}")
+
+if __name__ == '__main__':
+    main()
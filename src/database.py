@@ -21,7 +21,10 @@ except ImportError:
 # Importa fallback
 from services.database_fallback import database_fallback
 from services.local_file_manager import local_file_manager
+from services.supabase_outbox import supabase_outbox
 import json
+from utils.lazy import lazy_service
+from utils.serialization import load_file, loads
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +44,10 @@ class DatabaseManager:
             logger.info("⚠️ Database Manager usando SQLite (fallback)")
             
         self.local_files = local_file_manager
+        self.outbox = supabase_outbox
+        
+        if not self.use_fallback:
+            self.outbox.ensure_replicator()
         
         db_type = "SQLite Fallback" if self.use_fallback else "Supabase"
         logger.info(f"✅ Database Manager inicializado com {db_type} + Local Files")
@@ -68,37 +75,60 @@ class DatabaseManager:
             analysis_data['local_files_path'] = local_result.get('base_directory')
             analysis_data['local_files_info'] = local_result.get('files', [])
             
-            # 3. Salva no Supabase
-            logger.info("☁️ Salvando análise no Supabase...")
-            supabase_result = self.supabase.create_analysis(analysis_data)
-            
-            if supabase_result:
-                # 4. Salva informações dos arquivos no Supabase
-                analysis_id = supabase_result['id']
+            # 3. SQLite local: gravação direta, já é rápida e durável
+            if self.use_fallback:
+                logger.info("💾 Salvando análise no SQLite...")
+                fallback_result = self.supabase.create_analysis(analysis_data)
                 
-                for file_info in local_result.get('files', []):
-                    self.supabase.save_analysis_file(analysis_id, {
+                if not fallback_result:
+                    logger.warning("⚠️ Falha no SQLite, mas arquivos locais salvos com sucesso")
+                    return {
+                        'id': local_result['analysis_id'],
+                        'local_only': True,
+                        'local_files': local_result
+                    }
+                
+                analysis_id = fallback_result['id']
+                files_result = self.supabase.save_analysis_files(analysis_id, [
+                    {
                         'file_type': file_info['type'],
                         'file_name': file_info['name'],
                         'file_path': file_info['path'],
                         'file_size': file_info['size'],
                         'content_preview': f"Arquivo {file_info['type']} da análise"
-                    })
+                    }
+                    for file_info in local_result.get('files', [])
+                ])
                 
-                logger.info(f"✅ Análise criada: Supabase ID {analysis_id} + {len(local_result['files'])} arquivos locais")
+                if files_result['failed_count']:
+                    logger.warning(f"⚠️ {files_result['failed_count']} registros de arquivos não foram salvos")
                 
-                # Retorna dados combinados
+                logger.info(f"✅ Análise criada: SQLite ID {analysis_id} + {len(local_result['files'])} arquivos locais")
                 return {
-                    **supabase_result,
+                    **fallback_result,
                     'local_files': local_result
                 }
-            else:
-                logger.warning("⚠️ Falha no Supabase, mas arquivos locais salvos com sucesso")
+            
+            # 4. Supabase: enfileira no outbox local e replica em background
+            analysis_id = local_result['analysis_id']
+            queued = self.outbox.enqueue_analysis(analysis_id, analysis_data, local_result)
+            
+            if not queued:
+                logger.warning("⚠️ Falha ao enfileirar no outbox, mas arquivos locais salvos com sucesso")
                 return {
-                    'id': local_result['analysis_id'],
+                    'id': analysis_id,
                     'local_only': True,
                     'local_files': local_result
                 }
+            
+            logger.info(f"✅ Análise {analysis_id} salva localmente e enfileirada para o Supabase")
+            
+            # O id local (uuid) também será o id da análise no Supabase
+            return {
+                'id': analysis_id,
+                'replication_status': 'pending',
+                'local_files': local_result
+            }
                 
         except Exception as e:
             logger.error(f"❌ Erro ao criar análise: {str(e)}")
@@ -108,13 +138,49 @@ class DatabaseManager:
         """Atualiza análise existente"""
         return self.supabase.update_analysis(str(analysis_id), update_data)
     
-    def get_analysis(self, analysis_id: int) -> Optional[Dict[str, Any]]:
-        """Busca análise por ID"""
-        return self.supabase.get_analysis(str(analysis_id))
+    def get_analysis(self, analysis_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Busca análise por ID (fields limita as colunas retornadas)"""
+        return self.supabase.get_analysis(str(analysis_id), fields)
+    
+    def get_analysis_document(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Análise completa (JSON original) para reprocessamento, como a geração de PDF em lote"""
+        row = self.get_analysis(analysis_id, ['comprehensive_analysis'])
+        document = row.get('comprehensive_analysis') if row else None
+        
+        # SQLite guarda o JSON serializado; no Supabase a coluna já vem como objeto
+        if isinstance(document, str):
+            document = loads(document)
+        if document:
+            return document
+        
+        # Sem o JSON no banco (ex.: réplica no Supabase ainda pendente): usa o arquivo completo
+        complete_files = [
+            f['file_path'] for f in self.get_analysis_files(str(analysis_id))
+            if f.get('file_type') == 'completas'
+        ] + [
+            f['path'] for f in self.local_files.get_analysis_files(str(analysis_id))
+            if f['type'] == 'completas'
+        ]
+        
+        for path in complete_files:
+            if path and os.path.exists(path):
+                return load_file(path)
+        
+        return None
+    
+    def list_analyses(
+        self, 
+        limit: int = 50, 
+        offset: int = 0, 
+        cursor: Optional[str] = None, 
+        fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Lista análises com paginação por cursor ou offset"""
+        return self.supabase.list_analyses(limit, offset, cursor=cursor, fields=fields)
     
-    def list_analyses(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Lista análises com paginação"""
-        return self.supabase.list_analyses(limit, offset)
+    def get_listing_version(self) -> Optional[Dict[str, Any]]:
+        """Total e último updated_at das análises: identifica a versão da listagem"""
+        return self.supabase.get_listing_version()
     
     def delete_analysis(self, analysis_id: int) -> bool:
         """Remove análise do banco"""
@@ -142,7 +208,8 @@ class DatabaseManager:
             'local_analyses_count': len(local_analyses),
             'local_analyses': local_analyses[:10],  # Últimas 10
             'storage_type': f'hybrid_{"sqlite" if self.use_fallback else "supabase"}_local',
-            'fallback_mode': self.use_fallback
+            'fallback_mode': self.use_fallback,
+            'replication': None if self.use_fallback else self.outbox.get_lag(error_limit=5)
         }
     
     def get_analysis_files(self, analysis_id: str) -> List[Dict[str, Any]]:
@@ -154,4 +221,4 @@ class DatabaseManager:
         return self.local_files.list_local_analyses()
 
 # Instância global do gerenciador
-db_manager = DatabaseManager()
\ No newline at end of file
+db_manager = lazy_service(DatabaseManager, 'db_manager')
\ No newline at end of file
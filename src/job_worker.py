@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Job Worker Pool
+Pool de processos locais que executa as análises enfileiradas em /api/analyze
+e as renderizações de PDF enfileiradas em /api/generate_pdf
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import importlib
+import subprocess
+import multiprocessing
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+
+logger = logging.getLogger(__name__)
+
+# Processo do pool iniciado junto com o servidor web (modo embutido)
+_embedded_process: Optional[subprocess.Popen] = None
+
+def _execute_job(job: Dict):
+    """Executa um job no processo filho e grava o resultado"""
+    from services.analysis_job_queue import analysis_job_queue
+    from routes.analysis import run_market_analysis
+    
+    job_id = job['id']
+    
+    try:
+        logger.info(f"⚙️ Executando job {job_id} (pid {os.getpid()})")
+        result, http_status = run_market_analysis(job['payload'], job['request_meta'])
+        analysis_job_queue.complete(job_id, result, http_status)
+    
+    except Exception as e:
+        logger.error(f"❌ Job {job_id} falhou: {e}", exc_info=True)
+        analysis_job_queue.finish(job_id, 'failed', str(e))
+
+def _execute_pdf_job(job: Dict):
+    """Renderiza um PDF no processo filho, reportando progresso do ReportLab"""
+    from services.pdf_render_queue import pdf_render_queue
+    from routes.pdf_generator import pdf_artifact_cache
+    
+    job_id = job['id']
+    
+    try:
+        logger.info(f"⚙️ Renderizando PDF {job_id} (pid {os.getpid()})")
+        
+        if job['analysis_id']:
+            # Jobs de lote: carrega e limpa a análise salva aqui, fora do worker web
+            from database import db_manager
+            
+            analysis = db_manager.get_analysis_document(job['analysis_id'])
+            if not analysis:
+                pdf_render_queue.finish(job_id, 'failed', 'Análise não encontrada')
+                return
+            
+            can_generate, reason, cleaned_data, key = pdf_artifact_cache.prepare(analysis)
+            if not can_generate:
+                pdf_render_queue.finish(job_id, 'failed', reason)
+                return
+            pdf_render_queue.set_artifact_key(job_id, key)
+        else:
+            cleaned_data = pdf_render_queue.load_payload(job)
+            key = job['artifact_key']
+        
+        pdf_artifact_cache.get_or_render(cleaned_data, key, pdf_render_queue.progress_reporter(job_id))
+        pdf_render_queue.complete(job_id, key)
+    
+    except Exception as e:
+        logger.error(f"❌ Renderização {job_id} falhou: {e}", exc_info=True)
+        pdf_render_queue.finish(job_id, 'failed', str(e))
+
+class _Lane:
+    """Fila atendida pelo pool com concorrência e tempo máximo próprios"""
+    
+    def __init__(self, name: str, queue, target: Callable, concurrency: int, max_runtime: float):
+        self.name = name
+        self.queue = queue
+        self.target = target
+        self.concurrency = concurrency
+        self.max_runtime = max_runtime
+        self.running: Dict[str, Dict] = {}
+
+class JobWorkerPool:
+    """Supervisor que distribui jobs para processos filhos"""
+    
+    def __init__(self):
+        """Configura concorrência, timeouts e identificação do pool"""
+        self.concurrency = int(os.getenv('JOB_WORKERS', 2))
+        self.pdf_concurrency = int(os.getenv('PDF_WORKERS', 2))
+        self.poll_interval = float(os.getenv('JOB_POLL_INTERVAL', 1))
+        self.max_runtime = float(os.getenv('JOB_MAX_RUNTIME', 2100))  # max_analysis_time + margem
+        self.pdf_max_runtime = float(os.getenv('PDF_MAX_RUNTIME', 600))
+        self.stale_seconds = float(os.getenv('JOB_STALE_SECONDS', 120))
+        self.orphan_sweep_interval = float(os.getenv('JOB_ORPHAN_SWEEP_INTERVAL', self.stale_seconds))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.lanes = []
+        self._stopping = False
+        self._last_orphan_sweep = 0.0
+    
+    def run(self):
+        """Laço principal do supervisor"""
+        from services.analysis_job_queue import analysis_job_queue
+        from services.pdf_render_queue import pdf_render_queue
+        from utils.lazy import preload_services
+        
+        # Importa o pipeline e o ReportLab antes do fork para que os filhos já iniciem prontos
+        for module_name in ('routes.analysis', 'routes.pdf_generator'):
+            importlib.import_module(module_name)
+        
+        # Catálogos de dados puros ficam compartilhados com os filhos (copy-on-write);
+        # clientes de rede são recriados no filho pelo hook de fork de utils.lazy
+        loaded = preload_services([
+            name.strip() for name in os.getenv(
+                'JOB_PRELOAD_SERVICES',
+                'future_prediction_engine,mental_drivers_architect,complete_drivers_architect,anti_objection_system'
+            ).split(',') if name.strip()
+        ])
+        logger.info(f"📦 Serviços pré-carregados no pool: {', '.join(loaded) or 'nenhum'}")
+        
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        
+        self.lanes = [
+            _Lane('analysis', analysis_job_queue, _execute_job, self.concurrency, self.max_runtime),
+            _Lane('pdf', pdf_render_queue, _execute_pdf_job, self.pdf_concurrency, self.pdf_max_runtime)
+        ]
+        
+        self._sweep_orphans()
+        logger.info(
+            f"🚀 Pool de jobs iniciado: {self.concurrency} processos de análise, "
+            f"{self.pdf_concurrency} de PDF ({self.worker_id})"
+        )
+        
+        while not self._stopping:
+            # Jobs de outros pools (hosts ou reinícios) que pararam de enviar heartbeat
+            if time.time() - self._last_orphan_sweep >= self.orphan_sweep_interval:
+                self._sweep_orphans()
+            
+            for lane in self.lanes:
+                self._reap(lane)
+                self._enforce_limits(lane)
+                lane.queue.heartbeat(list(lane.running.keys()))
+                
+                while len(lane.running) < lane.concurrency and not self._stopping:
+                    job = lane.queue.claim_next(self.worker_id)
+                    if not job:
+                        break
+                    self._spawn(lane, job)
+            
+            time.sleep(self.poll_interval)
+        
+        for lane in self.lanes:
+            self._shutdown(lane)
+    
+    def _sweep_orphans(self):
+        """Marca como falhos os jobs 'running' sem heartbeat recente em todas as filas"""
+        self._last_orphan_sweep = time.time()
+        for lane in self.lanes:
+            try:
+                lane.queue.fail_orphaned(self.stale_seconds)
+            except Exception as e:
+                logger.error(f"❌ Erro ao verificar jobs órfãos da fila {lane.name}: {e}")
+    
+    def _handle_stop(self, signum, frame):
+        logger.info(f"🛑 Pool de jobs recebeu sinal {signum}, encerrando...")
+        self._stopping = True
+    
+    def _spawn(self, lane: _Lane, job: Dict):
+        process = multiprocessing.Process(
+            target=lane.target, args=(job,), name=f"{lane.name}-{job['id']}", daemon=False
+        )
+        process.start()
+        lane.running[job['id']] = {'process': process, 'started_at': time.time()}
+    
+    def _reap(self, lane: _Lane):
+        """Remove processos encerrados; filhos que morreram sem resultado viram falha"""
+        for job_id, info in list(lane.running.items()):
+            process = info['process']
+            if process.is_alive():
+                continue
+            process.join()
+            if process.exitcode != 0:
+                lane.queue.finish(job_id, 'failed', f"Processo encerrado com código {process.exitcode}")
+            self._release(lane, job_id)
+    
+    def _enforce_limits(self, lane: _Lane):
+        """Aplica cancelamentos solicitados e o tempo máximo de execução"""
+        cancelled = set(lane.queue.cancel_requested(list(lane.running.keys())))
+        
+        for job_id, info in list(lane.running.items()):
+            if job_id in cancelled:
+                self._terminate(info['process'])
+                lane.queue.finish(job_id, 'cancelled', 'Cancelado pelo usuário')
+                self._release(lane, job_id)
+            elif time.time() - info['started_at'] > lane.max_runtime:
+                self._terminate(info['process'])
+                lane.queue.finish(job_id, 'failed', f"Tempo máximo de {lane.max_runtime:.0f}s excedido")
+                self._release(lane, job_id)
+    
+    def _release(self, lane: _Lane, job_id: str):
+        """Libera a vaga do job e descarta os gauges 'live' do processo filho"""
+        from utils.metrics import mark_process_dead
+        
+        info = lane.running.pop(job_id)
+        mark_process_dead(info['process'].pid)
+    
+    def _terminate(self, process: multiprocessing.Process):
+        process.terminate()
+        process.join(10)
+        if process.is_alive():
+            process.kill()
+            process.join()
+    
+    def _shutdown(self, lane: _Lane):
+        for job_id, info in list(lane.running.items()):
+            self._terminate(info['process'])
+            lane.queue.finish(job_id, 'failed', 'Pool de jobs encerrado durante a execução')
+        logger.info(f"✅ Fila {lane.name} do pool de jobs encerrada")
+
+def start_embedded() -> Optional[subprocess.Popen]:
+    """Inicia o pool como subprocesso do servidor web (JOB_WORKER_EMBEDDED=true)"""
+    global _embedded_process
+    
+    if os.getenv('JOB_WORKER_EMBEDDED', 'true').lower() != 'true':
+        return None
+    
+    if _embedded_process and _embedded_process.poll() is None:
+        return _embedded_process
+    
+    _embedded_process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__)],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    logger.info(f"🚀 Pool de jobs embutido iniciado (pid {_embedded_process.pid})")
+    return _embedded_process
+
+def stop_embedded():
+    """Encerra o pool embutido, aguardando os jobs serem finalizados"""
+    global _embedded_process
+    
+    if _embedded_process and _embedded_process.poll() is None:
+        _embedded_process.terminate()
+        try:
+            _embedded_process.wait(30)
+        except subprocess.TimeoutExpired:
+            _embedded_process.kill()
+    _embedded_process = None
+
+def main():
+    """Executa o pool de jobs em primeiro plano"""
+    logging.basicConfig(
+        level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper()),
+        format=os.getenv('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    )
+    JobWorkerPool().run()
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,7 @@ import time
 import json
 from datetime import datetime
 from flask import Blueprint, request, jsonify, session
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from services.enhanced_analysis_engine import enhanced_analysis_engine
 from services.ultra_detailed_analysis_engine import ultra_detailed_analysis_engine
 from services.ai_manager import ai_manager
@@ -21,8 +21,16 @@ from services.analysis_quality_controller import analysis_quality_controller
 from services.content_quality_validator import content_quality_validator
 from services.attachment_service import attachment_service
 from database import db_manager
-from routes.progress import get_progress_tracker, update_analysis_progress
+from routes.progress import get_progress_tracker, update_analysis_progress, clear_progress
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.analysis_job_queue import analysis_job_queue, TenantQueueFullError
+from utils.pagination import SUMMARY_FIELDS, encode_cursor
+from utils.tracing import start_trace
+from utils.deadline import deadline
+from utils.metrics import ANALYSES_IN_FLIGHT, ANALYSIS_DURATION
+from utils.http_cache import CACHE_REVALIDATE, is_fresh, make_etag, not_modified, with_cache_headers
+from utils.serialization import dumps
+from utils.tenant import request_tenant
 
 logger = logging.getLogger(__name__)
 
@@ -31,12 +39,9 @@ analysis_bp = Blueprint('analysis', __name__)
 
 @analysis_bp.route('/analyze', methods=['POST'])
 def analyze_market():
-    """Endpoint principal para análise de mercado"""
+    """Enfileira análise de mercado e retorna o job para acompanhamento"""
     
     try:
-        start_time = time.time()
-        logger.info("🚀 Iniciando análise de mercado ultra-detalhada")
-        
         # Coleta dados da requisição
         data = request.get_json()
         if not data:
@@ -56,6 +61,72 @@ def analyze_market():
         if not data.get('session_id'):
             data['session_id'] = f"session_{int(time.time())}_{os.urandom(4).hex()}"
         
+        # Limites de concorrência são aplicados por tenant (mesma resolução das rotas de jobs)
+        tenant_id = request_tenant()
+        
+        try:
+            job = analysis_job_queue.submit(data, tenant_id, request_meta={
+                'ip_address': request.remote_addr,
+                'user_agent': request.headers.get('User-Agent', '')
+            })
+        except TenantQueueFullError as e:
+            return jsonify({
+                'error': 'Fila de análises cheia',
+                'message': str(e),
+                'tenant_id': tenant_id
+            }), 429
+        
+        # Sessão de progresso criada já na fila para o stream SSE do cliente
+        get_progress_tracker(data['session_id']).update_progress(0, "⏳ Análise na fila de processamento...")
+        
+        logger.info(f"🚀 Análise enfileirada: job {job['job_id']} (sessão {data['session_id']})")
+        
+        return jsonify({
+            **job,
+            'status_url': f"/api/jobs/{job['job_id']}",
+            'result_url': f"/api/jobs/{job['job_id']}/result",
+            'cancel_url': f"/api/jobs/{job['job_id']}/cancel",
+            'progress_url': f"/api/get_progress/{data['session_id']}",
+            'progress_stream_url': f"/api/progress/stream/{data['session_id']}",
+            'timestamp': datetime.now().isoformat()
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao enfileirar análise: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Erro ao enfileirar análise',
+            'message': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+def run_market_analysis(data: Dict[str, Any], request_meta: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], int]:
+    """Executa a análise completa fora do contexto HTTP (usado pelos workers de jobs)"""
+    
+    started = time.time()
+    status = 500
+    ANALYSES_IN_FLIGHT.inc()
+    
+    try:
+        # Trace da sessão: spans do pipeline ficam em /api/traces/<session_id>
+        # Orçamento da análise: busca, extração e IA usam min(timeout próprio, tempo restante)
+        with start_trace(data.get('session_id'), 'analysis', segmento=data.get('segmento')) as trace, \
+                deadline(ultra_detailed_analysis_engine.max_analysis_time, 'analysis'):
+            result, status = _execute_market_analysis(data, request_meta or {})
+            if trace is not None:
+                trace.status = 'ok' if status < 500 else 'error'
+                result.setdefault('trace_url', f"/api/traces/{trace.trace_id}")
+            return result, status
+    finally:
+        ANALYSES_IN_FLIGHT.dec()
+        ANALYSIS_DURATION.labels('success' if status < 500 else 'error').observe(time.time() - started)
+
+def _execute_market_analysis(data: Dict[str, Any], request_meta: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Pipeline completo da análise de mercado"""
+    
+    try:
+        start_time = time.time()
+        logger.info("🚀 Iniciando análise de mercado ultra-detalhada")
+        
         # Inicia sessão de salvamento automático
         session_id = data['session_id']
         auto_save_manager.iniciar_sessao(session_id)
@@ -64,8 +135,8 @@ def analyze_market():
         salvar_etapa("requisicao_analise", {
             "input_data": data,
             "timestamp": datetime.now().isoformat(),
-            "ip_address": request.remote_addr,
-            "user_agent": request.headers.get('User-Agent', '')
+            "ip_address": request_meta.get('ip_address'),
+            "user_agent": request_meta.get('user_agent', '')
         }, categoria="analise_completa")
         
         # Inicia rastreamento de progresso
@@ -166,7 +237,7 @@ def analyze_market():
                 except Exception as save_error:
                     logger.error(f"❌ Erro ao salvar dados parciais: {save_error}")
                 
-                return jsonify({
+                return {
                     'error': 'Análise de baixa qualidade rejeitada',
                     'message': 'A análise gerada não atende aos critérios de qualidade',
                     'quality_report': quality_validation,
@@ -174,7 +245,7 @@ def analyze_market():
                     'timestamp': datetime.now().isoformat(),
                     'dados_parciais_salvos': True,
                     'session_id': session_id
-                }), 422
+                }, 422
             else:
                 logger.info(f"✅ Análise aceita com score {quality_validation.get('quality_score', 0):.1f}%")
             
@@ -199,7 +270,7 @@ def analyze_market():
                 emergency_analysis = ultra_detailed_analysis_engine._create_guaranteed_minimum_analysis(data, session_id)
                 if emergency_analysis:
                     logger.info("🔄 Análise de emergência criada com sucesso")
-                    return jsonify(emergency_analysis)
+                    return emergency_analysis, 200
             except Exception as emergency_error:
                 logger.error(f"❌ Falha na análise de emergência: {emergency_error}")
             
@@ -208,7 +279,7 @@ def analyze_market():
                 dados_recuperados = auto_save_manager.consolidar_sessao(session_id)
                 logger.info(f"🔄 Dados recuperados automaticamente: {dados_recuperados}")
                 
-                return jsonify({
+                return {
                     'error': 'Falha na análise principal',
                     'message': str(e),
                     'dados_recuperados': True,
@@ -216,13 +287,13 @@ def analyze_market():
                     'relatorio_parcial': dados_recuperados,
                     'timestamp': datetime.now().isoformat(),
                     'recommendation': 'Dados intermediários foram preservados e podem ser acessados'
-                }), 206  # Partial Content
+                }, 206  # Partial Content
                 
             except Exception as recovery_error:
                 logger.error(f"❌ Falha na recuperação automática: {recovery_error}")
             
             # CORREÇÃO: Sempre retorna algo útil
-            return jsonify({
+            return {
                 'error': 'Falha na análise',
                 'message': str(e),
                 'timestamp': datetime.now().isoformat(),
@@ -239,13 +310,13 @@ def analyze_market():
                     'ai_status': ai_manager.get_provider_status(),
                     'search_status': production_search_manager.get_provider_status()
                 }
-            }), 500
+            }, 500
         
         # Verifica se a análise foi bem-sucedida
         if not analysis_result or not isinstance(analysis_result, dict):
             logger.error("❌ Análise retornou resultado inválido ou vazio")
             salvar_erro("resultado_invalido", Exception("Resultado inválido"), contexto={"result_type": type(analysis_result)})
-            return jsonify({
+            return {
                 'error': 'Análise retornou resultado inválido',
                 'message': 'Sistema não conseguiu gerar análise válida',
                 'timestamp': datetime.now().isoformat(),
@@ -256,7 +327,7 @@ def analyze_market():
                     'result_length': len(str(analysis_result)) if analysis_result else 0,
                     'ai_status': ai_manager.get_provider_status()
                 }
-            }), 500
+            }, 500
         
         # Marca progresso como completo
         progress_tracker.complete()
@@ -338,24 +409,33 @@ def analyze_market():
             'simulation_free': True
         })
         
+        # Pré-renderiza o PDF em background; o download posterior só serve o arquivo
+        try:
+            from routes.pdf_generator import pdf_artifact_cache
+            pdf_key = pdf_artifact_cache.prerender_analysis(analysis_result)
+            if pdf_key:
+                analysis_result['pdf_url'] = f"/api/pdf/{pdf_key}"
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao agendar PDF: {e}")
+        
         # Salva resposta final
         salvar_etapa("resposta_final", analysis_result, categoria="analise_completa")
         
         logger.info(f"✅ Análise concluída em {processing_time:.2f} segundos")
         
-        return jsonify(analysis_result)
+        return analysis_result, 200
         
     except Exception as e:
         logger.error(f"❌ Erro crítico na análise: {str(e)}", exc_info=True)
         
         # Remove progresso em caso de erro
         try:
-            if 'session_id' in locals() and session_id in get_progress_tracker.__globals__.get('progress_sessions', {}):
-                del get_progress_tracker.__globals__['progress_sessions'][session_id]
+            if 'session_id' in locals():
+                clear_progress(session_id)
         except:
             pass  # Ignora erros de limpeza
         
-        return jsonify({
+        return {
             'error': 'Erro na análise',
             'message': str(e),
             'timestamp': datetime.now().isoformat(),
@@ -371,7 +451,7 @@ def analyze_market():
                 'ai_status': ai_manager.get_provider_status(),
                 'search_status': production_search_manager.get_provider_status()
             }
-        }), 500
+        }, 500
 
 @analysis_bp.route('/status', methods=['GET'])
 def get_analysis_status():
@@ -816,22 +896,50 @@ def upload_attachment():
 
 @analysis_bp.route('/list_analyses', methods=['GET'])
 def list_analyses():
-    """Lista análises salvas"""
+    """Lista análises salvas (resumo leve, paginação por cursor)"""
     
     try:
         limit = min(int(request.args.get('limit', 20)), 100)
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
+        fields = request.args.get('fields')
         
-        analyses = db_manager.list_analyses(limit, offset)
+        # Revalidação consulta só total e último updated_at: a página não é carregada quando não mudou
+        version = db_manager.get_listing_version()
+        etag = None
+        if version:
+            etag = make_etag(version['count'], version['updated_at'], limit, offset, cursor, fields or '')
+            if is_fresh(etag):
+                return not_modified(etag, CACHE_REVALIDATE)
         
-        return jsonify({
+        try:
+            analyses = db_manager.list_analyses(limit, offset, cursor=cursor, fields=fields)
+        except ValueError as e:
+            return jsonify({
+                'error': 'Cursor inválido',
+                'message': str(e)
+            }), 400
+        
+        # Próxima página parte da última linha retornada
+        next_cursor = encode_cursor(analyses[-1]) if len(analyses) == limit else None
+        
+        # Sem versão do banco: o hash do conteúdo evita reenviar quando nada mudou
+        if etag is None:
+            etag = make_etag(dumps(analyses, sort_keys=True), limit, offset, cursor)
+            if is_fresh(etag):
+                return not_modified(etag, CACHE_REVALIDATE)
+        
+        return with_cache_headers(jsonify({
             'success': True,
             'analyses': analyses,
             'count': len(analyses),
             'limit': limit,
-            'offset': offset,
+            'offset': offset if not cursor else None,
+            'cursor': cursor,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
             'timestamp': datetime.now().isoformat()
-        })
+        }), etag, CACHE_REVALIDATE)
         
     except Exception as e:
         logger.error(f"Erro ao listar análises: {str(e)}")
@@ -840,19 +948,33 @@ def list_analyses():
             'message': str(e)
         }), 500
 
-@analysis_bp.route('/get_analysis/<int:analysis_id>', methods=['GET'])
+def _analysis_etag(analysis_id: str, fields: Optional[str]) -> Optional[str]:
+    """ETag da análise a partir de updated_at (None quando o registro não tem versão)"""
+    version = db_manager.get_analysis(analysis_id, fields=['id', 'updated_at'])
+    if not version or not version.get('updated_at'):
+        return None
+    return make_etag(analysis_id, version['updated_at'], fields or '*')
+
+@analysis_bp.route('/get_analysis/<analysis_id>', methods=['GET'])
 def get_analysis(analysis_id):
-    """Obtém análise específica"""
+    """Obtém análise específica (JSON completo ou apenas os campos em ?fields=)"""
     
     try:
-        analysis = db_manager.get_analysis(analysis_id)
+        fields = request.args.get('fields')
+        
+        # Revalidação consulta só updated_at: o JSON completo não é carregado quando não mudou
+        etag = _analysis_etag(analysis_id, fields)
+        if etag and is_fresh(etag):
+            return not_modified(etag, CACHE_REVALIDATE)
+        
+        analysis = db_manager.get_analysis(analysis_id, fields=fields)
         
         if analysis:
-            return jsonify({
+            return with_cache_headers(jsonify({
                 'success': True,
                 'analysis': analysis,
                 'timestamp': datetime.now().isoformat()
-            })
+            }), etag or make_etag(dumps(analysis, sort_keys=True)), CACHE_REVALIDATE)
         else:
             return jsonify({
                 'success': False,
@@ -866,6 +988,37 @@ def get_analysis(analysis_id):
             'message': str(e)
         }), 500
 
+@analysis_bp.route('/get_analysis_summary/<analysis_id>', methods=['GET'])
+def get_analysis_summary(analysis_id):
+    """Obtém apenas o resumo da análise, sem o JSON completo"""
+    
+    try:
+        analysis = db_manager.get_analysis(analysis_id, fields=SUMMARY_FIELDS)
+        
+        if analysis:
+            etag = make_etag(dumps(analysis, sort_keys=True))
+            if is_fresh(etag):
+                return not_modified(etag, CACHE_REVALIDATE)
+            
+            return with_cache_headers(jsonify({
+                'success': True,
+                'analysis': analysis,
+                'full_analysis_url': f"/api/get_analysis/{analysis_id}",
+                'timestamp': datetime.now().isoformat()
+            }), etag, CACHE_REVALIDATE)
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Análise não encontrada'
+            }), 404
+            
+    except Exception as e:
+        logger.error(f"Erro ao obter resumo da análise {analysis_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter resumo da análise',
+            'message': str(e)
+        }), 500
+
 @analysis_bp.route('/stats', methods=['GET'])
 def get_stats():
     """Obtém estatísticas do sistema"""
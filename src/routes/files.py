@@ -10,10 +10,18 @@ import logging
 from datetime import datetime
 from flask import Blueprint, request, jsonify, send_file
 from services.local_file_manager import local_file_manager
+from services.supabase_outbox import supabase_outbox
 from database import db_manager
+from utils.pagination import EXPORT_FIELDS, encode_cursor
+from utils.json_stream import RawJSON, iter_file, iter_json, iter_ndjson, stream_response
+from utils.http_cache import CACHE_REVALIDATE, CACHE_SHORT, is_fresh, make_etag, not_modified, with_cache_headers
 
 logger = logging.getLogger(__name__)
 
+# Limites da exportação em lote (NDJSON)
+EXPORT_DEFAULT_LIMIT = int(os.getenv('EXPORT_DEFAULT_LIMIT', 1000))
+EXPORT_MAX_ANALYSES = int(os.getenv('EXPORT_MAX_ANALYSES', 10000))
+
 # Cria blueprint
 files_bp = Blueprint('files', __name__)
 
@@ -22,14 +30,21 @@ def list_local_analyses():
     """Lista análises salvas localmente"""
     
     try:
+        # Revalidação não relê os arquivos de metadados
+        version = local_file_manager.get_listing_version()
+        etag = make_etag('local_analyses', version) if version else None
+        if etag and is_fresh(etag):
+            return not_modified(etag, CACHE_SHORT)
+        
         analyses = local_file_manager.list_local_analyses()
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'analyses': analyses,
             'count': len(analyses),
             'timestamp': datetime.now().isoformat()
         })
+        return with_cache_headers(response, etag, CACHE_SHORT) if etag else response
         
     except Exception as e:
         logger.error(f"Erro ao listar análises locais: {str(e)}")
@@ -78,6 +93,96 @@ def get_analysis_files(analysis_id):
             'message': str(e)
         }), 500
 
+def _section_files(analysis_id: str) -> dict:
+    """Arquivos de seção pelo ID local (catálogo) ou pelo ID do banco (registros analysis_files)"""
+    sections = local_file_manager.get_section_files(analysis_id)
+    if not sections:
+        sections = local_file_manager.get_section_files_from_records(db_manager.get_analysis_files(analysis_id))
+    return sections
+
+@files_bp.route('/analysis_sections/<analysis_id>', methods=['GET'])
+def get_analysis_sections(analysis_id):
+    """Manifesto das seções da análise (tamanho, ETag e URL de cada uma) para carregamento sob demanda"""
+    
+    try:
+        sections = _section_files(analysis_id)
+        
+        if not sections:
+            return jsonify({
+                'success': False,
+                'error': 'Seções da análise não encontradas'
+            }), 404
+        
+        manifest = []
+        for section_name in local_file_manager.SECTION_SOURCES:
+            entry = sections.get(section_name)
+            if not entry:
+                continue
+            manifest.append({
+                'section': section_name,
+                'key': local_file_manager.SECTION_SOURCES[section_name],
+                'size': entry['size'],
+                'modified': datetime.fromtimestamp(entry['mtime']).isoformat(),
+                'etag': local_file_manager.file_etag(entry['size'], entry['mtime']),
+                'url': f"/api/analysis_sections/{analysis_id}/{section_name}"
+            })
+        
+        # Muda apenas quando alguma seção é regravada
+        etag = make_etag(*(f"{item['section']}:{item['etag']}" for item in manifest))
+        if is_fresh(etag):
+            return not_modified(etag, CACHE_REVALIDATE)
+        
+        return with_cache_headers(jsonify({
+            'success': True,
+            'analysis_id': analysis_id,
+            'summary_url': f"/api/get_analysis_summary/{analysis_id}",
+            'sections': manifest,
+            'total_size': sum(item['size'] for item in manifest)
+        }), etag, CACHE_REVALIDATE)
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter seções da análise {analysis_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter seções da análise',
+            'message': str(e)
+        }), 500
+
+@files_bp.route('/analysis_sections/<analysis_id>/<section>', methods=['GET'])
+def get_analysis_section(analysis_id, section):
+    """Uma seção da análise direto do arquivo em disco (ETag + 304 quando não mudou)"""
+    
+    try:
+        section_name = local_file_manager.resolve_section_name(section)
+        if not section_name:
+            return jsonify({
+                'success': False,
+                'error': f'Seção desconhecida: {section}'
+            }), 400
+        
+        entry = _section_files(analysis_id).get(section_name)
+        if not entry or not os.path.exists(entry['path']):
+            return jsonify({
+                'success': False,
+                'error': 'Seção não encontrada'
+            }), 404
+        
+        stat = os.stat(entry['path'])
+        response = send_file(
+            entry['path'],
+            mimetype='application/json',
+            etag=local_file_manager.file_etag(stat.st_size, stat.st_mtime),
+            conditional=True
+        )
+        response.headers['Cache-Control'] = CACHE_REVALIDATE
+        return response
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter seção {section} da análise {analysis_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter seção da análise',
+            'message': str(e)
+        }), 500
+
 @files_bp.route('/download_file', methods=['GET'])
 def download_file():
     """Download de arquivo local"""
@@ -102,11 +207,16 @@ def download_file():
                 'error': 'Acesso negado ao arquivo'
             }), 403
         
-        return send_file(
+        stat = os.stat(file_path)
+        response = send_file(
             file_path,
             as_attachment=True,
-            download_name=os.path.basename(file_path)
+            download_name=os.path.basename(file_path),
+            etag=local_file_manager.file_etag(stat.st_size, stat.st_mtime),
+            conditional=True
         )
+        response.headers['Cache-Control'] = CACHE_REVALIDATE
+        return response
         
     except Exception as e:
         logger.error(f"Erro no download do arquivo: {str(e)}")
@@ -170,6 +280,12 @@ def get_file_content():
                 'error': 'Acesso negado ao arquivo'
             }), 403
         
+        # Arquivo inalterado: responde 304 sem ler o conteúdo
+        stat = os.stat(file_path)
+        etag = make_etag(local_file_manager.file_etag(stat.st_size, stat.st_mtime), max_chars)
+        if is_fresh(etag):
+            return not_modified(etag, CACHE_REVALIDATE)
+        
         # Lê conteúdo do arquivo
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -178,14 +294,14 @@ def get_file_content():
         if len(content) > max_chars:
             content = content[:max_chars] + f"\n\n... [Arquivo truncado - {len(content)} caracteres totais]"
         
-        return jsonify({
+        return with_cache_headers(jsonify({
             'success': True,
             'file_path': file_path,
             'file_name': os.path.basename(file_path),
             'content': content,
-            'file_size': os.path.getsize(file_path),
+            'file_size': stat.st_size,
             'truncated': len(content) > max_chars
-        })
+        }), etag, CACHE_REVALIDATE)
         
     except Exception as e:
         logger.error(f"Erro ao ler arquivo: {str(e)}")
@@ -196,9 +312,12 @@ def get_file_content():
 
 @files_bp.route('/export_analysis/<analysis_id>', methods=['GET'])
 def export_analysis(analysis_id):
-    """Exporta análise completa como ZIP"""
+    """Exporta análise completa como ZIP ou, com ?format=json, como JSON em streaming"""
     
     try:
+        if request.args.get('format', 'zip').lower() == 'json':
+            return _export_analysis_json(analysis_id)
+        
         import zipfile
         import tempfile
         
@@ -238,55 +357,114 @@ def export_analysis(analysis_id):
             'message': str(e)
         }), 500
 
-@files_bp.route('/storage_stats', methods=['GET'])
-def get_storage_stats():
-    """Obtém estatísticas de armazenamento"""
+def _export_record(row: dict) -> dict:
+    """Registro exportável: o JSON completo da análise segue como texto já serializado"""
+    analysis = row.get('comprehensive_analysis')
+    if isinstance(analysis, str):
+        row['comprehensive_analysis'] = RawJSON(analysis)
+    return row
+
+def _export_analysis_json(analysis_id: str):
+    """Análise completa em streaming: arquivo local quando existe, senão registro do banco"""
+    filename = f"analise_{analysis_id[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    
+    path = local_file_manager.get_complete_analysis_path(analysis_id)
+    if path:
+        return stream_response(iter_file(path), filename=filename)
+    
+    row = db_manager.get_analysis(analysis_id)
+    if not row:
+        return jsonify({
+            'error': 'Análise não encontrada'
+        }), 404
+    
+    return stream_response(iter_json(_export_record(row)), filename=filename)
+
+@files_bp.route('/export_analyses', methods=['GET'])
+def export_analyses():
+    """Exporta várias análises em NDJSON (uma por linha), paginando o banco durante o envio"""
     
     try:
-        # Estatísticas do diretório local
-        total_size = 0
-        total_files = 0
-        
-        for root, dirs, files in os.walk(local_file_manager.base_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    total_size += os.path.getsize(file_path)
-                    total_files += 1
-                except:
-                    continue
-        
-        # Estatísticas por tipo
-        type_stats = {}
-        for subdir in ['avatars', 'drivers_mentais', 'provas_visuais', 'anti_objecao', 
-                      'pre_pitch', 'predicoes_futuro', 'posicionamento', 'concorrencia',
-                      'palavras_chave', 'metricas', 'funil_vendas', 'plano_acao', 
-                      'insights', 'pesquisa_web', 'completas', 'metadata']:
+        ids = [i.strip() for i in request.args.get('ids', '').split(',') if i.strip()]
+        
+        try:
+            limit = min(int(request.args.get('limit', EXPORT_DEFAULT_LIMIT)), EXPORT_MAX_ANALYSES)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Limite inválido'
+            }), 400
+        page_size = 50
+        
+        def records():
+            if ids:
+                for analysis_id in ids[:EXPORT_MAX_ANALYSES]:
+                    row = db_manager.get_analysis(analysis_id)
+                    if row:
+                        yield _export_record(row)
+                return
             
-            subdir_path = os.path.join(local_file_manager.base_dir, subdir)
-            if os.path.exists(subdir_path):
-                subdir_files = len([f for f in os.listdir(subdir_path) if os.path.isfile(os.path.join(subdir_path, f))])
-                subdir_size = sum(os.path.getsize(os.path.join(subdir_path, f)) 
-                                for f in os.listdir(subdir_path) 
-                                if os.path.isfile(os.path.join(subdir_path, f)))
+            cursor = None
+            exported = 0
+            while exported < limit:
+                page = db_manager.list_analyses(
+                    limit=min(page_size, limit - exported), cursor=cursor, fields=EXPORT_FIELDS
+                )
+                for row in page:
+                    yield _export_record(row)
                 
-                type_stats[subdir] = {
-                    'files': subdir_files,
-                    'size_bytes': subdir_size,
-                    'size_mb': round(subdir_size / (1024 * 1024), 2)
-                }
+                exported += len(page)
+                if len(page) < page_size:
+                    break
+                cursor = encode_cursor(page[-1])
+        
+        return stream_response(
+            iter_ndjson(records()),
+            mimetype='application/x-ndjson',
+            filename=f"analises_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro ao exportar análises: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao exportar análises',
+            'message': str(e)
+        }), 500
+
+@files_bp.route('/storage_stats', methods=['GET'])
+def get_storage_stats():
+    """Obtém estatísticas de armazenamento (contadores incrementais do catálogo)"""
+    
+    try:
+        # Reconstrução completa apenas sob demanda, para corrigir divergências
+        if request.args.get('rebuild', 'false').lower() == 'true':
+            local_file_manager.catalog.rebuild()
+        
+        stats = local_file_manager.get_storage_stats()
+        total_size = stats.get('total_size_bytes', 0)
+        
+        type_stats = {
+            section: {
+                'files': section_stats['files'],
+                'size_bytes': section_stats['size_bytes'],
+                'size_mb': section_stats['size_mb']
+            }
+            for section, section_stats in stats.get('sections', {}).items()
+            if section_stats['files'] > 0
+        }
         
         return jsonify({
             'success': True,
             'storage_stats': {
                 'base_directory': local_file_manager.base_dir,
-                'total_files': total_files,
+                'total_files': stats.get('total_files', 0),
                 'total_size_bytes': total_size,
                 'total_size_mb': round(total_size / (1024 * 1024), 2),
                 'total_size_gb': round(total_size / (1024 * 1024 * 1024), 3),
+                'oldest_file_mtime': stats.get('oldest_file_mtime'),
                 'type_breakdown': type_stats
             },
-            'supabase_connected': db_manager.supabase.is_connected(),
+            'supabase_connected': not db_manager.use_fallback and db_manager.supabase.is_connected(),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -309,34 +487,19 @@ def cleanup_old_files():
         from datetime import timedelta
         cutoff_date = datetime.now() - timedelta(days=days_old)
         
-        files_to_remove = []
-        total_size_to_remove = 0
-        
-        # Busca arquivos antigos
-        for root, dirs, files in os.walk(local_file_manager.base_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    
-                    if file_mtime < cutoff_date:
-                        file_size = os.path.getsize(file_path)
-                        files_to_remove.append({
-                            'path': file_path,
-                            'name': file,
-                            'size': file_size,
-                            'modified': file_mtime.isoformat()
-                        })
-                        total_size_to_remove += file_size
-                        
-                        # Remove arquivo se não for dry run
-                        if not dry_run:
-                            os.remove(file_path)
-                            logger.info(f"🗑️ Arquivo removido: {file}")
-                            
-                except Exception as e:
-                    logger.error(f"Erro ao processar arquivo {file}: {str(e)}")
-                    continue
+        # Consulta o índice por idade do catálogo em vez de percorrer o disco
+        old_files = local_file_manager.cleanup_old_files(cutoff_date.timestamp(), dry_run=dry_run)
+        
+        files_to_remove = [
+            {
+                'path': entry['path'],
+                'name': os.path.basename(entry['path']),
+                'size': entry['size'],
+                'modified': datetime.fromtimestamp(entry['mtime']).isoformat()
+            }
+            for entry in old_files
+        ]
+        total_size_to_remove = sum(entry['size'] for entry in old_files)
         
         action = "Simulação de limpeza" if dry_run else "Limpeza executada"
         
@@ -359,66 +522,50 @@ def cleanup_old_files():
 
 @files_bp.route('/backup_to_supabase', methods=['POST'])
 def backup_to_supabase():
-    """Faz backup de análises locais para Supabase"""
+    """Garante que análises locais estejam no outbox e retorna o atraso de replicação"""
     
     try:
-        if not db_manager.supabase.is_connected():
+        # Modo SQLite: não há Supabase para consumir o outbox
+        if db_manager.use_fallback:
             return jsonify({
-                'error': 'Supabase não está conectado',
-                'message': 'Configure as credenciais do Supabase'
-            }), 400
+                'success': False,
+                'error': 'Supabase não configurado',
+                'message': 'Backup indisponível no modo SQLite (fallback)'
+            }), 409
         
-        # Lista análises locais
-        local_analyses = local_file_manager.list_local_analyses()
+        data = request.get_json(silent=True) or {}
         
-        backed_up = 0
-        errors = []
+        # Análises antigas (anteriores ao outbox) entram na fila uma única vez
+        local_analyses = local_file_manager.list_local_analyses()
+        enqueued = 0
         
         for analysis in local_analyses:
-            try:
-                analysis_id = analysis['analysis_id']
-                
-                # Verifica se já existe no Supabase
-                existing = db_manager.supabase.get_analysis(analysis_id)
-                if existing:
-                    logger.info(f"⚠️ Análise {analysis_id} já existe no Supabase")
-                    continue
-                
-                # Carrega análise completa do arquivo JSON
-                json_file = None
-                for root, dirs, files in os.walk(local_file_manager.base_dir):
-                    for file in files:
-                        if analysis_id[:8] in file and file.endswith('_completa.json'):
-                            json_file = os.path.join(root, file)
-                            break
-                    if json_file:
-                        break
-                
-                if json_file:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        analysis_data = json.load(f)
-                    
-                    # Salva no Supabase
-                    result = db_manager.supabase.create_analysis(analysis_data)
-                    if result:
-                        backed_up += 1
-                        logger.info(f"✅ Backup realizado: {analysis_id}")
-                    else:
-                        errors.append(f"Falha ao fazer backup de {analysis_id}")
-                else:
-                    errors.append(f"Arquivo JSON não encontrado para {analysis_id}")
-                    
-            except Exception as e:
-                error_msg = f"Erro no backup de {analysis.get('analysis_id', 'unknown')}: {str(e)}"
-                errors.append(error_msg)
-                logger.error(error_msg)
+            analysis_id = analysis.get('analysis_id')
+            if not analysis_id or supabase_outbox.has_key(analysis_id):
+                continue
+            
+            files = [
+                {'type': f['type'], 'name': f['name'], 'path': f['path'], 'size': f['size']}
+                for f in local_file_manager.get_analysis_files(analysis_id)
+            ]
+            local_result = {'files': files, 'created_at': analysis.get('created_at')}
+            
+            if any(f['type'] == 'completas' for f in files) and \
+                    supabase_outbox.enqueue_analysis(analysis_id, {}, local_result):
+                enqueued += 1
+        
+        # Reabre operações que esgotaram as tentativas, se solicitado
+        requeued = supabase_outbox.requeue_failed() if data.get('retry_failed', True) else 0
+        supabase_outbox.ensure_replicator()
         
         return jsonify({
             'success': True,
-            'message': f'Backup concluído: {backed_up} análises',
+            'message': f'{enqueued} análises enfileiradas, {requeued} reenfileiradas',
             'total_local': len(local_analyses),
-            'backed_up': backed_up,
-            'errors': errors,
+            'enqueued': enqueued,
+            'requeued': requeued,
+            'replication': supabase_outbox.get_lag(),
+            'supabase_connected': db_manager.supabase.is_connected(),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -431,43 +578,31 @@ def backup_to_supabase():
 
 @files_bp.route('/sync_with_supabase', methods=['POST'])
 def sync_with_supabase():
-    """Sincroniza análises entre local e Supabase"""
+    """Retorna o estado de sincronização com o Supabase a partir do outbox"""
     
     try:
-        if not db_manager.supabase.is_connected():
-            return jsonify({
-                'error': 'Supabase não está conectado'
-            }), 400
-        
-        # Lista análises do Supabase
-        supabase_analyses = db_manager.supabase.list_analyses(100)
-        
-        # Lista análises locais
-        local_analyses = local_file_manager.list_local_analyses()
-        
-        # Identifica diferenças
-        supabase_ids = set(a['id'] for a in supabase_analyses)
-        local_ids = set(a['analysis_id'] for a in local_analyses)
-        
-        only_supabase = supabase_ids - local_ids
-        only_local = local_ids - supabase_ids
-        both = supabase_ids & local_ids
+        # Replicador só roda com Supabase ativo; no modo SQLite o estado é apenas informativo
+        if not db_manager.use_fallback:
+            supabase_outbox.ensure_replicator()
+        lag = supabase_outbox.get_lag()
         
         return jsonify({
             'success': True,
             'sync_status': {
-                'total_supabase': len(supabase_analyses),
-                'total_local': len(local_analyses),
-                'only_in_supabase': len(only_supabase),
-                'only_in_local': len(only_local),
-                'in_both': len(both),
-                'sync_needed': len(only_supabase) + len(only_local) > 0
+                'pending': lag['pending'],
+                'in_flight': lag['in_flight'],
+                'failed': lag['failed'],
+                'replicated': lag['replicated'],
+                'lag_seconds': lag['lag_seconds'],
+                'oldest_pending_at': lag['oldest_pending_at'],
+                'last_replicated_at': lag['last_replicated_at'],
+                'sync_needed': lag['sync_needed']
             },
             'details': {
-                'only_supabase_ids': list(only_supabase),
-                'only_local_ids': list(only_local),
-                'synced_ids': list(both)
+                'recent_errors': lag['recent_errors'],
+                'replicator_running': lag['replicator_running']
             },
+            'supabase_connected': not db_manager.use_fallback and db_manager.supabase.is_connected(),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -476,4 +611,4 @@ def sync_with_supabase():
         return jsonify({
             'error': 'Erro na sincronização',
             'message': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
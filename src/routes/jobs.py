@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Rotas de Jobs
+Endpoints para acompanhar, buscar resultado e cancelar análises enfileiradas
+"""
+
+import logging
+from datetime import datetime
+from flask import Blueprint, request, jsonify, send_file
+from services.analysis_job_queue import analysis_job_queue
+from utils.json_stream import accepts_gzip, iter_file, stream_response
+from utils.tenant import request_tenant
+
+logger = logging.getLogger(__name__)
+
+# Cria blueprint
+jobs_bp = Blueprint('jobs', __name__)
+
+def _get_owned_job(job_id: str):
+    """Job do tenant da requisição; jobs de outros tenants são tratados como inexistentes"""
+    job = analysis_job_queue.get_job(job_id)
+    if job and job['tenant_id'] != request_tenant():
+        return None
+    return job
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Lista jobs recentes do tenant da requisição"""
+    
+    try:
+        limit = min(int(request.args.get('limit', 20)), 100)
+        
+        jobs = analysis_job_queue.list_jobs(request_tenant(), limit)
+        
+        return jsonify({
+            'success': True,
+            'jobs': jobs,
+            'count': len(jobs),
+            'queue_stats': analysis_job_queue.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro ao listar jobs: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao listar jobs',
+            'message': str(e)
+        }), 500
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Retorna status do job"""
+    
+    try:
+        job = _get_owned_job(job_id)
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            **job,
+            'result_url': f"/api/jobs/{job_id}/result" if job['has_result'] else None,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro ao obter job {job_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter job',
+            'message': str(e)
+        }), 500
+
+@jobs_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Retorna o resultado da análise quando o job termina"""
+    
+    try:
+        job = _get_owned_job(job_id)
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado'
+            }), 404
+        
+        result_path = analysis_job_queue.get_result_path(job_id)
+        
+        if not result_path:
+            if job['status'] in ('queued', 'running'):
+                # Ainda em processamento: cliente deve continuar consultando o status
+                return jsonify({
+                    'success': False,
+                    **job,
+                    'message': 'Análise ainda em processamento'
+                }), 202
+            
+            return jsonify({
+                'success': False,
+                **job,
+                'message': 'Job finalizado sem resultado'
+            }), 410 if job['status'] == 'cancelled' else 500
+        
+        # O JSON já está serializado em disco: envia sem recarregar em memória
+        if accepts_gzip():
+            # Resultados de vários MB: gzip aplicado em streaming enquanto o arquivo é lido
+            return stream_response(iter_file(result_path), status=job['http_status'] or 200)
+        
+        response = send_file(result_path, mimetype='application/json')
+        response.status_code = job['http_status'] or 200
+        return response
+    
+    except Exception as e:
+        logger.error(f"Erro ao obter resultado do job {job_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter resultado do job',
+            'message': str(e)
+        }), 500
+
+@jobs_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancela job na fila ou em execução"""
+    
+    try:
+        if not _get_owned_job(job_id):
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado'
+            }), 404
+        
+        job = analysis_job_queue.cancel(job_id)
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            **job,
+            'message': 'Cancelamento solicitado' if job['status'] == 'running' else f"Job {job['status']}",
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro ao cancelar job {job_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao cancelar job',
+            'message': str(e)
+        }), 500
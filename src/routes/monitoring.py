@@ -7,12 +7,19 @@ Endpoints para monitoramento do sistema de extração
 """
 from flask import Blueprint, jsonify, request
 from services.robust_content_extractor import robust_content_extractor
+from services.health_monitor import health_monitor
+from datetime import datetime
+import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 monitoring_bp = Blueprint('monitoring', __name__)
 
+# Início do processo, para o uptime da probe de liveness
+_process_started_at = time.time()
+
 
 @monitoring_bp.route('/api/extractor_stats', methods=['GET'])
 def get_extractor_stats():
@@ -80,48 +87,30 @@ def test_extraction():
         }), 500
 
 
+@monitoring_bp.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness: o processo responde (tempo constante, sem I/O)"""
+    return jsonify({
+        'status': 'alive',
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - _process_started_at, 1),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@monitoring_bp.route('/health/ready', methods=['GET'])
 @monitoring_bp.route('/api/health', methods=['GET'])
 def health_check():
-    """Verifica saúde do sistema"""
+    """Readiness: último resultado do self-test em background (não executa extração)"""
     try:
-        # Testa extração com URL brasileira real
-        test_url = "https://g1.globo.com/"
-        content = robust_content_extractor.extract_content(test_url)
-        extraction_success = content is not None and len(content) > 100
-        
-        stats = robust_content_extractor.get_extractor_stats()
-        global_stats = stats.get('global', {})
-        available_extractors = sum(1 for name, data in stats.items() 
-                                 if name != 'global' and data.get('available', False))
-        
-        # Verifica status das APIs de IA
-        from services.ai_manager import ai_manager
-        ai_status = ai_manager.get_provider_status()
-        available_ai = sum(1 for provider in ai_status.values() if provider.get('available', False))
-        
-        # Verifica status de busca
-        from services.production_search_manager import production_search_manager
-        search_status = production_search_manager.get_provider_status()
-        available_search = sum(1 for provider in search_status.values() if provider.get('enabled', False))
-        
-        overall_health = 'healthy'
-        if available_extractors == 0 or available_ai == 0:
-            overall_health = 'critical'
-        elif available_extractors < 2 or available_search == 0:
-            overall_health = 'degraded'
+        report = health_monitor.readiness()
+        status_code = 503 if report['status'] == 'critical' else 200
         
         return jsonify({
-            'success': True,
-            'status': overall_health,
-            'available_extractors': available_extractors,
-            'available_ai_providers': available_ai,
-            'available_search_providers': available_search,
-            'test_extraction': extraction_success,
-            'extraction_stats': global_stats,
-            'ai_status': ai_status,
-            'search_status': search_status,
+            'success': report['status'] != 'critical',
+            **report,
             'timestamp': datetime.now().isoformat()
-        })
+        }), status_code
     except Exception as e:
         logger.error(f"❌ Erro no health check: {str(e)}")
         return jsonify({
@@ -129,4 +118,4 @@ def health_check():
             'status': 'critical',
             'error': str(e),
             'timestamp': datetime.now().isoformat()
-        }), 500
+        }), 503
@@ -8,6 +8,8 @@ Endpoints para geração de relatórios em PDF
 import os
 import logging
 import json
+import hashlib
+import threading
 from datetime import datetime
 from flask import Blueprint, request, jsonify, send_file
 from reportlab.lib.pagesizes import A4
@@ -17,7 +19,11 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from io import BytesIO
-import tempfile
+from xml.sax.saxutils import escape
+from typing import Optional, Tuple
+from utils.lazy import lazy_service
+from services.pdf_render_queue import pdf_render_queue
+from services.report_document import report_document_builder, PDF_SECTIONS
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +33,9 @@ pdf_bp = Blueprint('pdf', __name__)
 class PDFGenerator:
     """Gerador de relatórios PDF profissionais"""
     
+    # Incrementar quando o layout mudar: invalida os PDFs já renderizados
+    TEMPLATE_VERSION = '2'
+    
     def __init__(self):
         """Inicializa gerador de PDF"""
         self.styles = getSampleStyleSheet()
@@ -87,8 +96,8 @@ class PDFGenerator:
             bulletIndent=10
         ))
     
-    def generate_analysis_report(self, analysis_data: dict) -> BytesIO:
-        """Gera relatório completo da análise"""
+    def generate_analysis_report(self, analysis_data: dict, progress_callback=None) -> BytesIO:
+        """Gera relatório completo da análise (progress_callback recebe (tipo, valor) do ReportLab)"""
         
         # Cria buffer em memória
         buffer = BytesIO()
@@ -103,543 +112,67 @@ class PDFGenerator:
             bottomMargin=18
         )
         
-        # Constrói conteúdo
-        story = []
+        # Seções vêm do modelo intermediário memorizado por hash; flowables são recriados
+        # a cada build porque o ReportLab os altera durante o layout
+        document = report_document_builder.build(analysis_data, PDF_SECTIONS)
         
-        # Capa
-        story.extend(self._build_cover_page(analysis_data))
-        story.append(PageBreak())
-        
-        # Sumário executivo
-        story.extend(self._build_executive_summary(analysis_data))
-        story.append(PageBreak())
-        
-        # Avatar detalhado
-        if 'avatar_ultra_detalhado' in analysis_data:
-            story.extend(self._build_avatar_section(analysis_data['avatar_ultra_detalhado']))
-            story.append(PageBreak())
-        
-        # Drivers Mentais Customizados
-        if 'drivers_mentais_customizados' in analysis_data:
-            story.extend(self._build_drivers_section(analysis_data['drivers_mentais_customizados']))
-            story.append(PageBreak())
-        elif 'drivers_mentais_sistema_completo' in analysis_data:
-            drivers_data = analysis_data['drivers_mentais_sistema_completo']
-            if drivers_data.get('drivers_customizados'):
-                story.extend(self._build_drivers_section(drivers_data['drivers_customizados']))
+        story = []
+        for i, section in enumerate(document['sections']):
+            if i:
                 story.append(PageBreak())
-        
-        # Sistema Anti-Objeção
-        if 'sistema_anti_objecao' in analysis_data:
-            story.extend(self._build_anti_objection_section(analysis_data['sistema_anti_objecao']))
-            story.append(PageBreak())
-        
-        # Provas Visuais
-        if 'provas_visuais_sugeridas' in analysis_data:
-            story.extend(self._build_visual_proofs_section(analysis_data['provas_visuais_sugeridas']))
-            story.append(PageBreak())
-        
-        # Pré-Pitch Invisível
-        if 'pre_pitch_invisivel' in analysis_data:
-            story.extend(self._build_pre_pitch_section(analysis_data['pre_pitch_invisivel']))
-            story.append(PageBreak())
-        
-        # Predições do Futuro
-        if 'predicoes_futuro_completas' in analysis_data:
-            story.extend(self._build_future_predictions_section(analysis_data['predicoes_futuro_completas']))
-            story.append(PageBreak())
-        
-        # Posicionamento
-        if 'escopo' in analysis_data:
-            story.extend(self._build_positioning_section(analysis_data['escopo']))
-            story.append(PageBreak())
-        
-        # Análise de concorrência
-        if 'analise_concorrencia_detalhada' in analysis_data:
-            story.extend(self._build_competition_section(analysis_data['analise_concorrencia_detalhada']))
-            story.append(PageBreak())
-        
-        # Estratégia de marketing
-        if 'estrategia_palavras_chave' in analysis_data:
-            story.extend(self._build_marketing_section(analysis_data['estrategia_palavras_chave']))
-            story.append(PageBreak())
-        
-        # Métricas e KPIs
-        if 'metricas_performance_detalhadas' in analysis_data:
-            story.extend(self._build_metrics_section(analysis_data['metricas_performance_detalhadas']))
-            story.append(PageBreak())
-        
-        # Projeções
-        if 'projecoes_cenarios' in analysis_data:
-            story.extend(self._build_projections_section(analysis_data['projecoes_cenarios']))
-            story.append(PageBreak())
-        
-        # Plano de ação
-        if 'plano_acao_detalhado' in analysis_data:
-            story.extend(self._build_action_plan_section(analysis_data['plano_acao_detalhado']))
-            story.append(PageBreak())
-        
-        # Insights exclusivos
-        if 'insights_exclusivos' in analysis_data:
-            story.extend(self._build_insights_section(analysis_data['insights_exclusivos']))
-            story.append(PageBreak())
-        
-        # Pesquisa Web Massiva
-        if 'pesquisa_web_massiva' in analysis_data:
-            story.extend(self._build_research_section(analysis_data['pesquisa_web_massiva']))
+            story.extend(self._section_flowables(section))
         
         # Gera PDF
+        if progress_callback:
+            doc.setProgressCallBack(progress_callback)
         doc.build(story)
         buffer.seek(0)
         
         return buffer
     
-    def _build_cover_page(self, data: dict) -> list:
-        """Constrói página de capa"""
-        story = []
-        
-        # Título principal
-        story.append(Paragraph("ANÁLISE ULTRA-DETALHADA DE MERCADO", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.5*inch))
-        
-        # Subtítulo
-        segmento = data.get('segmento', 'Não informado')
-        produto = data.get('produto', 'Não informado')
-        
-        story.append(Paragraph(f"Segmento: {segmento}", self.styles['CustomSubtitle']))
-        if produto != 'Não informado':
-            story.append(Paragraph(f"Produto: {produto}", self.styles['CustomSubtitle']))
-        
-        story.append(Spacer(1, 1*inch))
-        
-        # Informações do relatório
-        metadata = data.get('metadata', {})
-        generated_at = metadata.get('generated_at', datetime.now().isoformat())
-        
-        info_data = [
-            ['Data de Geração:', generated_at[:10]],
-            ['Versão:', '2.0.0'],
-            ['Modelo IA:', metadata.get('model', 'Gemini Pro')],
-            ['Tempo de Processamento:', f"{metadata.get('processing_time', 0)} segundos"]
+    def _section_flowables(self, section: dict) -> list:
+        """Converte os blocos de uma seção em flowables do ReportLab"""
+        story = [
+            Paragraph(escape(section['title'].upper()), self.styles['CustomTitle']),
+            Spacer(1, 0.3*inch)
         ]
         
-        info_table = Table(info_data, colWidths=[2*inch, 3*inch])
-        info_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey)
-        ]))
-        
-        story.append(info_table)
-        story.append(Spacer(1, 1*inch))
-        
-        # Rodapé da capa
-        story.append(Paragraph("ARQV30 Enhanced v2.0", self.styles['CustomNormal']))
-        story.append(Paragraph("Powered by Artificial Intelligence", self.styles['CustomNormal']))
-        
-        return story
-    
-    def _build_executive_summary(self, data: dict) -> list:
-        """Constrói sumário executivo"""
-        story = []
-        
-        story.append(Paragraph("SUMÁRIO EXECUTIVO", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Resumo dos principais pontos
-        summary_points = [
-            f"Segmento analisado: {data.get('segmento', 'N/A')}",
-            f"Público-alvo: {data.get('publico', 'N/A')}",
-            f"Preço: R$ {data.get('preco', 'N/A')}",
-            f"Objetivo de receita: R$ {data.get('objetivo_receita', 'N/A')}"
-        ]
-        
-        for point in summary_points:
-            story.append(Paragraph(f"• {point}", self.styles['BulletList']))
-        
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Principais insights
-        insights = data.get('insights_exclusivos', [])
-        if insights:
-            story.append(Paragraph("Principais Insights:", self.styles['SectionHeader']))
-            for insight in insights[:5]:  # Primeiros 5 insights
-                story.append(Paragraph(f"• {insight}", self.styles['BulletList']))
-        
-        return story
-    
-    def _build_avatar_section(self, avatar_data: dict) -> list:
-        """Constrói seção do avatar"""
-        story = []
-        
-        story.append(Paragraph("AVATAR ULTRA-DETALHADO", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Perfil demográfico
-        demo = avatar_data.get('perfil_demografico', {})
-        if demo:
-            story.append(Paragraph("Perfil Demográfico", self.styles['SectionHeader']))
+        for block in section['blocks']:
+            kind = block['type']
             
-            demo_data = [
-                ['Idade:', demo.get('idade', 'N/A')],
-                ['Gênero:', demo.get('genero', 'N/A')],
-                ['Renda:', demo.get('renda', 'N/A')],
-                ['Escolaridade:', demo.get('escolaridade', 'N/A')],
-                ['Localização:', demo.get('localizacao', 'N/A')]
-            ]
+            if kind == 'heading':
+                if block['level'] <= 2:
+                    story.append(Paragraph(escape(block['text']), self.styles['SectionHeader']))
+                else:
+                    story.append(Paragraph(f"<b>{escape(block['text'])}</b>", self.styles['CustomNormal']))
             
-            demo_table = Table(demo_data, colWidths=[1.5*inch, 4*inch])
-            demo_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey)
-            ]))
+            elif kind == 'paragraph':
+                story.append(Paragraph(escape(block['text']), self.styles['CustomNormal']))
             
-            story.append(demo_table)
-            story.append(Spacer(1, 0.2*inch))
-        
-        # Perfil psicográfico
-        psico = avatar_data.get('perfil_psicografico', {})
-        if psico:
-            story.append(Paragraph("Perfil Psicográfico", self.styles['SectionHeader']))
+            elif kind == 'fields':
+                for label, value in block['items']:
+                    story.append(Paragraph(f"<b>{escape(label)}:</b> {escape(value)}", self.styles['CustomNormal']))
             
-            for key, value in psico.items():
-                if value:
-                    story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {value}", self.styles['CustomNormal']))
-        
-        # Dores específicas
-        dores = avatar_data.get('dores_especificas', [])
-        if dores:
-            story.append(Paragraph("Dores Específicas", self.styles['SectionHeader']))
-            for dor in dores:
-                story.append(Paragraph(f"• {dor}", self.styles['BulletList']))
-        
-        # Desejos profundos
-        desejos = avatar_data.get('desejos_profundos', [])
-        if desejos:
-            story.append(Paragraph("Desejos Profundos", self.styles['SectionHeader']))
-            for desejo in desejos:
-                story.append(Paragraph(f"• {desejo}", self.styles['BulletList']))
-        
-        return story
-    
-    def _build_drivers_section(self, drivers_data) -> list:
-        """Constrói seção de drivers mentais"""
-        story = []
-        
-        story.append(Paragraph("DRIVERS MENTAIS CUSTOMIZADOS", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        if isinstance(drivers_data, dict) and 'drivers_customizados' in drivers_data:
-            drivers = drivers_data['drivers_customizados']
-        elif isinstance(drivers_data, list):
-            drivers = drivers_data
-        else:
-            drivers = []
-        
-        for i, driver in enumerate(drivers, 1):
-            if isinstance(driver, dict):
-                story.append(Paragraph(f"Driver {i}: {driver.get('nome', 'Driver Mental')}", self.styles['SectionHeader']))
-                
-                story.append(Paragraph(f"<b>Gatilho Central:</b> {driver.get('gatilho_central', 'N/A')}", self.styles['CustomNormal']))
-                story.append(Paragraph(f"<b>Definição:</b> {driver.get('definicao_visceral', 'N/A')}", self.styles['CustomNormal']))
-                
-                if driver.get('roteiro_ativacao'):
-                    roteiro = driver['roteiro_ativacao']
-                    story.append(Paragraph("<b>Roteiro de Ativação:</b>", self.styles['CustomNormal']))
-                    story.append(Paragraph(f"• Pergunta: {roteiro.get('pergunta_abertura', 'N/A')}", self.styles['BulletList']))
-                    story.append(Paragraph(f"• História: {roteiro.get('historia_analogia', 'N/A')}", self.styles['BulletList']))
-                    story.append(Paragraph(f"• Comando: {roteiro.get('comando_acao', 'N/A')}", self.styles['BulletList']))
-                
-                if driver.get('frases_ancoragem'):
-                    story.append(Paragraph("<b>Frases de Ancoragem:</b>", self.styles['CustomNormal']))
-                    for frase in driver['frases_ancoragem']:
-                        story.append(Paragraph(f"• \"{frase}\"", self.styles['BulletList']))
-                
-                story.append(Spacer(1, 0.2*inch))
-        
-        return story
-    
-    def _build_anti_objection_section(self, anti_objection_data) -> list:
-        """Constrói seção do sistema anti-objeção"""
-        story = []
-        
-        story.append(Paragraph("SISTEMA ANTI-OBJEÇÃO", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Objeções universais
-        if anti_objection_data.get('objecoes_universais'):
-            story.append(Paragraph("Objeções Universais", self.styles['SectionHeader']))
-            
-            for tipo, objecao in anti_objection_data['objecoes_universais'].items():
-                if isinstance(objecao, dict):
-                    story.append(Paragraph(f"<b>{tipo.title()}:</b>", self.styles['CustomNormal']))
-                    story.append(Paragraph(f"Objeção: {objecao.get('objecao', 'N/A')}", self.styles['BulletList']))
-                    story.append(Paragraph(f"Contra-ataque: {objecao.get('contra_ataque', 'N/A')}", self.styles['BulletList']))
-                    story.append(Spacer(1, 0.1*inch))
-        
-        # Objeções ocultas
-        if anti_objection_data.get('objecoes_ocultas'):
-            story.append(Paragraph("Objeções Ocultas", self.styles['SectionHeader']))
-            
-            for tipo, objecao in anti_objection_data['objecoes_ocultas'].items():
-                if isinstance(objecao, dict):
-                    story.append(Paragraph(f"<b>{tipo.replace('_', ' ').title()}:</b>", self.styles['CustomNormal']))
-                    story.append(Paragraph(f"Perfil: {objecao.get('perfil_tipico', 'N/A')}", self.styles['BulletList']))
-                    story.append(Paragraph(f"Contra-ataque: {objecao.get('contra_ataque', 'N/A')}", self.styles['BulletList']))
-                    story.append(Spacer(1, 0.1*inch))
-        
-        return story
-    
-    def _build_visual_proofs_section(self, visual_proofs_data) -> list:
-        """Constrói seção de provas visuais"""
-        story = []
-        
-        story.append(Paragraph("PROVAS VISUAIS INSTANTÂNEAS", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        if isinstance(visual_proofs_data, list):
-            for i, prova in enumerate(visual_proofs_data, 1):
-                if isinstance(prova, dict):
-                    story.append(Paragraph(f"PROVI {i}: {prova.get('nome', 'Prova Visual')}", self.styles['SectionHeader']))
-                    
-                    story.append(Paragraph(f"<b>Conceito Alvo:</b> {prova.get('conceito_alvo', 'N/A')}", self.styles['CustomNormal']))
-                    story.append(Paragraph(f"<b>Experimento:</b> {prova.get('experimento', 'N/A')}", self.styles['CustomNormal']))
-                    
-                    if prova.get('materiais'):
-                        story.append(Paragraph("<b>Materiais:</b>", self.styles['CustomNormal']))
-                        for material in prova['materiais']:
-                            story.append(Paragraph(f"• {material}", self.styles['BulletList']))
-                    
-                    story.append(Spacer(1, 0.2*inch))
-        
-        return story
-    
-    def _build_pre_pitch_section(self, pre_pitch_data) -> list:
-        """Constrói seção do pré-pitch invisível"""
-        story = []
-        
-        story.append(Paragraph("PRÉ-PITCH INVISÍVEL", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Orquestração emocional
-        if pre_pitch_data.get('orquestracao_emocional'):
-            story.append(Paragraph("Orquestração Emocional", self.styles['SectionHeader']))
-            
-            sequencia = pre_pitch_data['orquestracao_emocional'].get('sequencia_psicologica', [])
-            for fase in sequencia:
-                if isinstance(fase, dict):
-                    story.append(Paragraph(f"<b>{fase.get('fase', 'Fase')}:</b> {fase.get('objetivo', 'N/A')}", self.styles['CustomNormal']))
-                    story.append(Paragraph(f"Tempo: {fase.get('tempo', 'N/A')}", self.styles['BulletList']))
-                    if fase.get('tecnicas'):
-                        story.append(Paragraph(f"Técnicas: {', '.join(fase['tecnicas'])}", self.styles['BulletList']))
-                    story.append(Spacer(1, 0.1*inch))
-        
-        # Roteiro completo
-        if pre_pitch_data.get('roteiro_completo'):
-            story.append(Paragraph("Roteiro Completo", self.styles['SectionHeader']))
-            roteiro = pre_pitch_data['roteiro_completo']
-            
-            if roteiro.get('abertura'):
-                abertura = roteiro['abertura']
-                story.append(Paragraph(f"<b>Abertura ({abertura.get('tempo', 'N/A')}):</b>", self.styles['CustomNormal']))
-                story.append(Paragraph(abertura.get('script', 'N/A'), self.styles['BulletList']))
-            
-            if roteiro.get('fechamento'):
-                fechamento = roteiro['fechamento']
-                story.append(Paragraph(f"<b>Fechamento ({fechamento.get('tempo', 'N/A')}):</b>", self.styles['CustomNormal']))
-                story.append(Paragraph(fechamento.get('script', 'N/A'), self.styles['BulletList']))
-        
-        return story
-    
-    def _build_research_section(self, research_data) -> list:
-        """Constrói seção da pesquisa web massiva"""
-        story = []
-        
-        story.append(Paragraph("PESQUISA WEB MASSIVA", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Estatísticas da pesquisa
-        story.append(Paragraph("Estatísticas da Pesquisa", self.styles['SectionHeader']))
-        
-        stats_data = [
-            ['Métrica', 'Valor'],
-            ['Total de Queries', str(research_data.get('total_queries', 0))],
-            ['Total de Resultados', str(research_data.get('total_resultados', 0))],
-            ['Conteúdo Extraído', f"{research_data.get('conteudo_extraido_chars', 0):,} caracteres"],
-        ]
-        
-        stats_table = Table(stats_data, colWidths=[2*inch, 2*inch])
-        stats_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(stats_table)
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Queries executadas
-        if research_data.get('queries_executadas'):
-            story.append(Paragraph("Queries Executadas", self.styles['SectionHeader']))
-            for query in research_data['queries_executadas'][:10]:  # Primeiras 10
-                story.append(Paragraph(f"• {query}", self.styles['BulletList']))
-        
-        return story
-    
-    def _build_positioning_section(self, escopo_data: dict) -> list:
-        """Constrói seção de posicionamento"""
-        story = []
-        
-        story.append(Paragraph("ESCOPO E POSICIONAMENTO", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Posicionamento no mercado
-        posicionamento = escopo_data.get('posicionamento_mercado', '')
-        if posicionamento:
-            story.append(Paragraph("Posicionamento no Mercado", self.styles['SectionHeader']))
-            story.append(Paragraph(posicionamento, self.styles['CustomNormal']))
-        
-        # Proposta de valor
-        proposta = escopo_data.get('proposta_valor', '')
-        if proposta:
-            story.append(Paragraph("Proposta de Valor", self.styles['SectionHeader']))
-            story.append(Paragraph(proposta, self.styles['CustomNormal']))
-        
-        # Diferenciais competitivos
-        diferenciais = escopo_data.get('diferenciais_competitivos', [])
-        if diferenciais:
-            story.append(Paragraph("Diferenciais Competitivos", self.styles['SectionHeader']))
-            for diferencial in diferenciais:
-                story.append(Paragraph(f"• {diferencial}", self.styles['BulletList']))
-        
-        return story
-    
-    def _build_competition_section(self, competition_data: dict) -> list:
-        """Constrói seção de análise de concorrência"""
-        story = []
-        
-        story.append(Paragraph("ANÁLISE DE CONCORRÊNCIA", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Concorrentes diretos
-        diretos = competition_data.get('concorrentes_diretos', [])
-        if diretos:
-            story.append(Paragraph("Concorrentes Diretos", self.styles['SectionHeader']))
-            
-            for i, concorrente in enumerate(diretos, 1):
-                if isinstance(concorrente, dict):
-                    nome = concorrente.get('nome', f'Concorrente {i}')
-                    story.append(Paragraph(f"<b>{nome}</b>", self.styles['CustomNormal']))
-                    
-                    pontos_fortes = concorrente.get('pontos_fortes', [])
-                    if pontos_fortes:
-                        story.append(Paragraph("Pontos Fortes:", self.styles['CustomNormal']))
-                        for ponto in pontos_fortes:
-                            story.append(Paragraph(f"• {ponto}", self.styles['BulletList']))
-                    
-                    pontos_fracos = concorrente.get('pontos_fracos', [])
-                    if pontos_fracos:
-                        story.append(Paragraph("Pontos Fracos:", self.styles['CustomNormal']))
-                        for ponto in pontos_fracos:
-                            story.append(Paragraph(f"• {ponto}", self.styles['BulletList']))
-                    
-                    story.append(Spacer(1, 0.1*inch))
-        
-        # Gaps de oportunidade
-        gaps = competition_data.get('gaps_oportunidade', [])
-        if gaps:
-            story.append(Paragraph("Oportunidades Identificadas", self.styles['SectionHeader']))
-            for gap in gaps:
-                story.append(Paragraph(f"• {gap}", self.styles['BulletList']))
-        
-        return story
-    
-    def _build_marketing_section(self, marketing_data: dict) -> list:
-        """Constrói seção de estratégia de marketing"""
-        story = []
-        
-        story.append(Paragraph("ESTRATÉGIA DE MARKETING", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Palavras-chave primárias
-        primarias = marketing_data.get('palavras_primarias', [])
-        if primarias:
-            story.append(Paragraph("Palavras-Chave Primárias", self.styles['SectionHeader']))
-            story.append(Paragraph(", ".join(primarias), self.styles['CustomNormal']))
-        
-        # Palavras-chave secundárias
-        secundarias = marketing_data.get('palavras_secundarias', [])
-        if secundarias:
-            story.append(Paragraph("Palavras-Chave Secundárias", self.styles['SectionHeader']))
-            story.append(Paragraph(", ".join(secundarias[:15]), self.styles['CustomNormal']))
-        
-        # Long tail
-        long_tail = marketing_data.get('long_tail', [])
-        if long_tail:
-            story.append(Paragraph("Palavras-Chave Long Tail", self.styles['SectionHeader']))
-            story.append(Paragraph(", ".join(long_tail[:10]), self.styles['CustomNormal']))
-        
-        return story
-    
-    def _build_metrics_section(self, metrics_data: dict) -> list:
-        """Constrói seção de métricas"""
-        story = []
-        
-        story.append(Paragraph("MÉTRICAS DE PERFORMANCE", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # KPIs principais
-        kpis = metrics_data.get('kpis_principais', [])
-        if kpis:
-            story.append(Paragraph("KPIs Principais", self.styles['SectionHeader']))
+            elif kind == 'list':
+                for i, item in enumerate(block['items'], 1):
+                    bullet = f"{i}." if block['ordered'] else '•'
+                    story.append(Paragraph(f"{bullet} {escape(item)}", self.styles['BulletList']))
+                story.append(Spacer(1, 0.1*inch))
             
-            for kpi in kpis:
-                if isinstance(kpi, dict):
-                    metrica = kpi.get('metrica', 'N/A')
-                    objetivo = kpi.get('objetivo', 'N/A')
-                    story.append(Paragraph(f"<b>{metrica}:</b> {objetivo}", self.styles['CustomNormal']))
-        
-        # ROI esperado
-        roi = metrics_data.get('roi_esperado', '')
-        if roi:
-            story.append(Paragraph("ROI Esperado", self.styles['SectionHeader']))
-            story.append(Paragraph(roi, self.styles['CustomNormal']))
+            elif kind == 'table':
+                story.append(self._table(block['rows'], block['header']))
+                story.append(Spacer(1, 0.2*inch))
         
         return story
     
-    def _build_projections_section(self, projections_data: dict) -> list:
-        """Constrói seção de projeções"""
-        story = []
-        
-        story.append(Paragraph("PROJEÇÕES E CENÁRIOS", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Tabela de cenários
-        cenarios = ['conservador', 'realista', 'otimista']
-        table_data = [['Cenário', 'Receita Mensal', 'Clientes/Mês', 'Ticket Médio']]
-        
-        for cenario in cenarios:
-            cenario_data = projections_data.get(cenario, {})
-            if cenario_data:
-                table_data.append([
-                    cenario.title(),
-                    cenario_data.get('receita_mensal', 'N/A'),
-                    cenario_data.get('clientes_mes', 'N/A'),
-                    cenario_data.get('ticket_medio', 'N/A')
-                ])
-        
-        if len(table_data) > 1:
-            projections_table = Table(table_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-            projections_table.setStyle(TableStyle([
+    def _table(self, rows: list, header: bool) -> Table:
+        """Tabela com cabeçalho destacado ou coluna de rótulos em negrito"""
+        columns = max(len(row) for row in rows)
+        width = 6*inch / columns if columns > 2 else None
+        table = Table(rows, colWidths=[width] * columns if width else [2*inch, 3*inch][:columns])
+        
+        if header:
+            table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                 ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -649,97 +182,138 @@ class PDFGenerator:
                 ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
                 ('GRID', (0, 0), (-1, -1), 1, colors.black)
             ]))
-            
-            story.append(projections_table)
+        else:
+            table.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+                ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey)
+            ]))
         
-        return story
+        return table
+
+class PDFArtifactCache:
+    """PDFs renderizados uma única vez, endereçados pelo hash da análise limpa + versão do template"""
     
-    def _build_action_plan_section(self, action_data: dict) -> list:
-        """Constrói seção do plano de ação"""
-        story = []
+    # Links adicionados à resposta depois da pré-renderização: não fazem parte do relatório
+    IGNORED_KEYS = ('pdf_url', 'trace_url')
+    
+    def __init__(self):
+        """Inicializa diretório dos artefatos ao lado das análises locais"""
+        from services.local_file_manager import local_file_manager
         
-        story.append(Paragraph("PLANO DE AÇÃO DETALHADO", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
+        self.file_manager = local_file_manager
+        self.base_dir = os.path.join(local_file_manager.base_dir, 'relatorios_pdf')
+        os.makedirs(self.base_dir, exist_ok=True)
         
-        # Fases do plano
-        fases = ['fase_1_preparacao', 'fase_2_lancamento', 'fase_3_crescimento']
+        self.prerender = os.getenv('PDF_PRERENDER', 'true').lower() == 'true'
+        self._locks = {}
+        self._locks_guard = threading.Lock()
         
-        for fase in fases:
-            fase_data = action_data.get(fase, {})
-            if fase_data:
-                fase_nome = fase.replace('_', ' ').title()
-                story.append(Paragraph(fase_nome, self.styles['SectionHeader']))
+        logger.info(f"PDF Artifact Cache inicializado: {self.base_dir}")
+    
+    def prepare(self, analysis_data: dict) -> Tuple[bool, str, Optional[dict], Optional[str]]:
+        """Valida e limpa a análise; retorna (pode_gerar, motivo, dados_limpos, chave)"""
+        from services.analysis_quality_controller import analysis_quality_controller
+        
+        can_generate, reason = analysis_quality_controller.should_generate_pdf(analysis_data)
+        if not can_generate:
+            return False, reason, None, None
+        
+        cleaned_data = analysis_quality_controller.clean_analysis_for_output(analysis_data)
+        return True, reason, cleaned_data, self.artifact_key(cleaned_data)
+    
+    def artifact_key(self, cleaned_data: dict) -> str:
+        """Hash estável do JSON limpo (chaves ordenadas) combinado com a versão do template"""
+        content = {k: v for k, v in cleaned_data.items() if k not in self.IGNORED_KEYS}
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(f"v{PDFGenerator.TEMPLATE_VERSION}:{payload}".encode('utf-8'))
+        return digest.hexdigest()[:32]
+    
+    def path_for(self, key: str) -> Optional[str]:
+        """Caminho do artefato (None para chaves malformadas)"""
+        if len(key) != 32 or any(c not in '0123456789abcdef' for c in key):
+            return None
+        return os.path.join(self.base_dir, f"{key}.pdf")
+    
+    def get(self, key: str) -> Optional[str]:
+        """Caminho do PDF já renderizado, se existir"""
+        path = self.path_for(key)
+        return path if path and os.path.exists(path) else None
+    
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+    
+    def get_or_render(self, cleaned_data: dict, key: str, progress_callback=None) -> str:
+        """Retorna o artefato, renderizando apenas na primeira solicitação"""
+        path = self.path_for(key)
+        if os.path.exists(path):
+            return path
+        
+        # Uma renderização por chave neste processo; entre processos, a troca atômica
+        # do arquivo garante que nenhum leitor veja um PDF parcial
+        try:
+            with self._key_lock(key):
+                if os.path.exists(path):
+                    return path
                 
-                duracao = fase_data.get('duracao', 'N/A')
-                story.append(Paragraph(f"<b>Duração:</b> {duracao}", self.styles['CustomNormal']))
+                logger.info(f"Gerando relatório PDF {key}...")
+                pdf_buffer = pdf_generator.generate_analysis_report(cleaned_data, progress_callback)
                 
-                atividades = fase_data.get('atividades', [])
-                if atividades:
-                    story.append(Paragraph("<b>Atividades:</b>", self.styles['CustomNormal']))
-                    for atividade in atividades:
-                        story.append(Paragraph(f"• {atividade}", self.styles['BulletList']))
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        f.write(pdf_buffer.getbuffer())
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
                 
-                story.append(Spacer(1, 0.1*inch))
+                self.file_manager.catalog.record_files([path])
+        finally:
+            # Falhas de renderização também liberam o lock da chave
+            with self._locks_guard:
+                self._locks.pop(key, None)
         
-        return story
+        return path
     
-    def _build_future_predictions_section(self, predictions_data) -> list:
-        """Constrói seção de predições do futuro"""
-        story = []
-        
-        story.append(Paragraph("PREDIÇÕES DO FUTURO", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
+    def prerender_analysis(self, analysis_data: dict) -> Optional[str]:
+        """Enfileira a renderização ao concluir a análise; retorna a chave do artefato"""
+        from services.pdf_render_queue import pdf_render_queue
         
-        # Tendências atuais
-        if predictions_data.get('tendencias_atuais'):
-            story.append(Paragraph("Tendências Atuais", self.styles['SectionHeader']))
-            
-            tendencias = predictions_data['tendencias_atuais']
-            if tendencias.get('tendencias_relevantes'):
-                for trend_name, trend_data in tendencias['tendencias_relevantes'].items():
-                    story.append(Paragraph(f"<b>{trend_name.title()}:</b>", self.styles['CustomNormal']))
-                    story.append(Paragraph(f"Fase: {trend_data.get('fase_atual', 'N/A')}", self.styles['BulletList']))
-                    story.append(Paragraph(f"Impacto: {trend_data.get('impacto_esperado', 'N/A')}", self.styles['BulletList']))
-                    story.append(Spacer(1, 0.1*inch))
-        
-        # Cenários futuros
-        if predictions_data.get('cenarios_futuros'):
-            story.append(Paragraph("Cenários Futuros", self.styles['SectionHeader']))
-            
-            for scenario_name, scenario_data in predictions_data['cenarios_futuros'].items():
-                story.append(Paragraph(f"<b>{scenario_data.get('nome', scenario_name)}:</b>", self.styles['CustomNormal']))
-                story.append(Paragraph(f"Probabilidade: {scenario_data.get('probabilidade', 'N/A')}", self.styles['BulletList']))
-                story.append(Paragraph(f"Descrição: {scenario_data.get('descricao', 'N/A')}", self.styles['BulletList']))
-                story.append(Spacer(1, 0.1*inch))
-        
-        # Oportunidades emergentes
-        if predictions_data.get('oportunidades_emergentes'):
-            story.append(Paragraph("Oportunidades Emergentes", self.styles['SectionHeader']))
-            
-            for opp in predictions_data['oportunidades_emergentes'][:5]:
-                if isinstance(opp, dict):
-                    story.append(Paragraph(f"<b>{opp.get('nome', 'Oportunidade')}:</b>", self.styles['CustomNormal']))
-                    story.append(Paragraph(f"Potencial: {opp.get('potencial_mercado', 'N/A')}", self.styles['BulletList']))
-                    story.append(Paragraph(f"Timeline: {opp.get('timeline', 'N/A')}", self.styles['BulletList']))
-                    story.append(Spacer(1, 0.1*inch))
-        
-        return story
-    
-    def _build_insights_section(self, insights: list) -> list:
-        """Constrói seção de insights exclusivos"""
-        story = []
+        if not self.prerender:
+            return None
         
-        story.append(Paragraph("INSIGHTS EXCLUSIVOS", self.styles['CustomTitle']))
-        story.append(Spacer(1, 0.3*inch))
+        can_generate, reason, cleaned_data, key = self.prepare(analysis_data)
+        if not can_generate:
+            logger.info(f"PDF não pré-renderizado: {reason}")
+            return None
         
-        for i, insight in enumerate(insights, 1):
-            story.append(Paragraph(f"{i}. {insight}", self.styles['CustomNormal']))
-            story.append(Spacer(1, 0.1*inch))
+        if not self.get(key):
+            pdf_render_queue.submit(cleaned_data, key)
         
-        return story
+        return key
+
+def _send_artifact(path: str, key: str):
+    """Envia o PDF com ETag (chave do conteúdo), If-None-Match e Range"""
+    response = send_file(
+        path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f"analise_mercado_{key[:8]}.pdf",
+        etag=key,
+        conditional=True,
+        max_age=86400
+    )
+    # O conteúdo de uma chave nunca muda
+    response.cache_control.immutable = True
+    return response
 
 # Instância global do gerador
-pdf_generator = PDFGenerator()
+pdf_generator = lazy_service(PDFGenerator, 'pdf_generator')
+pdf_artifact_cache = lazy_service(PDFArtifactCache, 'pdf_artifact_cache')
 
 @pdf_bp.route('/generate_pdf', methods=['POST'])
 def generate_pdf():
@@ -754,10 +328,8 @@ def generate_pdf():
                 'message': 'Envie os dados da análise no corpo da requisição'
             }), 400
         
-        # Valida qualidade antes de gerar PDF
-        from services.analysis_quality_controller import analysis_quality_controller
-        
-        can_generate, reason = analysis_quality_controller.should_generate_pdf(data)
+        # Valida qualidade e limpa dados antes de gerar PDF
+        can_generate, reason, cleaned_data, key = pdf_artifact_cache.prepare(data)
         if not can_generate:
             return jsonify({
                 'error': 'Qualidade insuficiente para PDF',
@@ -765,25 +337,25 @@ def generate_pdf():
                 'recommendation': 'Execute nova análise com APIs configuradas corretamente'
             }), 422
         
-        # Limpa dados antes de gerar PDF
-        cleaned_data = analysis_quality_controller.clean_analysis_for_output(data)
+        path = pdf_artifact_cache.get(key)
         
-        # Gera PDF
-        logger.info("Gerando relatório PDF...")
-        pdf_buffer = pdf_generator.generate_analysis_report(cleaned_data)
-        
-        # Salva arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(pdf_buffer.getvalue())
-            tmp_file_path = tmp_file.name
-        
-        # Retorna arquivo
-        return send_file(
-            tmp_file_path,
-            as_attachment=True,
-            download_name=f"analise_mercado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-            mimetype='application/pdf'
-        )
+        if not path and request.args.get('sync', 'false').lower() == 'true':
+            # Renderização no próprio worker web (clientes legados)
+            path = pdf_artifact_cache.get_or_render(cleaned_data, key)
+        
+        if not path:
+            # ReportLab é CPU-bound: renderiza no pool de processos e devolve o job
+            job = pdf_render_queue.submit(cleaned_data, key)
+            return jsonify({
+                'success': True,
+                **job,
+                'message': 'Renderização do PDF em andamento'
+            }), 202
+        
+        response = _send_artifact(path, key)
+        # Downloads parciais/retomados usam o GET abaixo (Range só vale para GET/HEAD)
+        response.headers['Content-Location'] = f"/api/pdf/{key}"
+        return response
         
     except Exception as e:
         logger.error(f"Erro ao gerar PDF: {str(e)}")
@@ -792,6 +364,115 @@ def generate_pdf():
             'message': str(e)
         }), 500
 
+@pdf_bp.route('/pdf/<key>', methods=['GET'])
+def get_pdf_artifact(key):
+    """Serve um PDF já renderizado (ETag, 304 e Range)"""
+    
+    try:
+        path = pdf_artifact_cache.get(key)
+        
+        if not path:
+            return jsonify({
+                'error': 'PDF não encontrado',
+                'message': 'Gere o relatório via POST /api/generate_pdf'
+            }), 404
+        
+        return _send_artifact(path, key)
+        
+    except Exception as e:
+        logger.error(f"Erro ao servir PDF {key}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao servir PDF',
+            'message': str(e)
+        }), 500
+
+@pdf_bp.route('/pdf/jobs/<job_id>', methods=['GET'])
+def get_pdf_job(job_id):
+    """Status e progresso de uma renderização"""
+    
+    try:
+        job = pdf_render_queue.get_job(job_id)
+        
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': 'Renderização não encontrada'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            **job,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter renderização {job_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter renderização',
+            'message': str(e)
+        }), 500
+
+@pdf_bp.route('/pdf/batch', methods=['POST'])
+def generate_pdf_batch():
+    """Enfileira PDFs de várias análises salvas"""
+    
+    try:
+        data = request.get_json() or {}
+        analysis_ids = data.get('analysis_ids') or []
+        
+        if not isinstance(analysis_ids, list) or not analysis_ids:
+            return jsonify({
+                'error': 'IDs não fornecidos',
+                'message': 'Envie analysis_ids como lista no corpo da requisição'
+            }), 400
+        
+        if len(analysis_ids) > pdf_render_queue.max_batch:
+            return jsonify({
+                'error': 'Lote muito grande',
+                'message': f"Máximo de {pdf_render_queue.max_batch} análises por lote"
+            }), 413
+        
+        batch = pdf_render_queue.submit_batch(analysis_ids)
+        
+        return jsonify({
+            'success': True,
+            **batch,
+            'status_url': f"/api/pdf/batch/{batch['batch_id']}"
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar lote de PDFs: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao enfileirar lote de PDFs',
+            'message': str(e)
+        }), 500
+
+@pdf_bp.route('/pdf/batch/<batch_id>', methods=['GET'])
+def get_pdf_batch(batch_id):
+    """Status agregado de um lote de PDFs"""
+    
+    try:
+        batch = pdf_render_queue.get_batch(batch_id)
+        
+        if not batch:
+            return jsonify({
+                'success': False,
+                'error': 'Lote não encontrado'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            **batch,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter lote {batch_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter lote',
+            'message': str(e)
+        }), 500
+
 @pdf_bp.route('/pdf_preview', methods=['POST'])
 def pdf_preview():
     """Gera preview do PDF (metadados)"""
@@ -10,31 +10,30 @@ import logging
 import time
 import json
 from datetime import datetime
-from flask import Blueprint, request, jsonify, session
-from flask_socketio import SocketIO, emit, join_room, leave_room
-import threading
-from queue import Queue
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from services.progress_store import progress_store
 
 logger = logging.getLogger(__name__)
 
 # Cria blueprint
 progress_bp = Blueprint('progress', __name__)
 
-# Sistema de progresso global
-progress_sessions = {}
-progress_queues = {}
+# Configuração do stream SSE
+SSE_POLL_INTERVAL = float(os.getenv('PROGRESS_SSE_POLL_INTERVAL', 1))
+SSE_KEEPALIVE_SECONDS = float(os.getenv('PROGRESS_SSE_KEEPALIVE', 15))
+SSE_MAX_DURATION = float(os.getenv('PROGRESS_SSE_MAX_DURATION', 1800))
+# Espera por uma sessão ainda não criada (stream aberto antes do envio da análise)
+SSE_SESSION_GRACE = float(os.getenv('PROGRESS_SSE_SESSION_GRACE', 10))
 
 class ProgressTracker:
     """Rastreador de progresso em tempo real"""
     
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, state: dict = None):
         self.session_id = session_id
-        self.current_step = 0
         self.total_steps = 13
-        self.start_time = time.time()
         self.steps = [
             "🔍 Coletando dados do formulário",
-            "📊 Processando anexos inteligentes", 
+            "📊 Processando anexos inteligentes",
             "🌐 Realizando pesquisa profunda massiva",
             "🧠 Analisando com múltiplas IAs",
             "👤 Criando avatar arqueológico completo",
@@ -47,11 +46,33 @@ class ProgressTracker:
             "🔮 Predizendo futuro do mercado",
             "✨ Consolidando insights exclusivos"
         ]
-        self.detailed_logs = []
         
-        # Registra sessão global
-        progress_sessions[session_id] = self
-        progress_queues[session_id] = Queue()
+        # Registra sessão no store compartilhado (ou reaproveita a existente)
+        if state is None:
+            state = progress_store.create_session(session_id, self.total_steps)
+        
+        self.current_step = state['current_step']
+        self.start_time = state['start_time']
+    
+    @classmethod
+    def load(cls, session_id: str):
+        """Carrega tracker de uma sessão existente, de qualquer worker"""
+        state = progress_store.get_session(session_id)
+        return cls(session_id, state) if state else None
+    
+    @property
+    def detailed_logs(self):
+        """Logs detalhados persistidos no store"""
+        return [
+            {
+                "step": event['step'],
+                "message": event['message'],
+                "details": event['details'],
+                "timestamp": event['payload'].get('timestamp'),
+                "elapsed": event['payload'].get('elapsed_time')
+            }
+            for event in progress_store.get_events(self.session_id)
+        ]
     
     def update_progress(self, step: int, message: str, details: str = None):
         """Atualiza progresso da análise"""
@@ -79,22 +100,14 @@ class ProgressTracker:
             "timestamp": datetime.now().isoformat()
         }
         
-        # Log detalhado
-        log_entry = {
-            "step": step,
-            "message": message,
-            "details": details,
-            "timestamp": datetime.now().isoformat(),
-            "elapsed": elapsed
-        }
-        self.detailed_logs.append(log_entry)
-        
-        # Adiciona à queue para polling
-        if self.session_id in progress_queues:
-            try:
-                progress_queues[self.session_id].put(progress_data)
-            except:
-                pass
+        # Publica no store para polling e SSE em qualquer worker
+        try:
+            progress_data["event_id"] = progress_store.append_event(
+                self.session_id, step, message, details, progress_data,
+                is_complete=step >= self.total_steps
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao registrar progresso: {e}")
         
         logger.info(f"Progress {self.session_id}: Step {step}/{self.total_steps} - {message}")
         
@@ -102,17 +115,8 @@ class ProgressTracker:
     
     def complete(self):
         """Marca análise como completa"""
+        # A sessão expira pelo TTL de sessões concluídas, sem thread de limpeza
         self.update_progress(self.total_steps, "🎉 Análise concluída! Preparando resultados...")
-        
-        # Remove da sessão após 5 minutos
-        def cleanup():
-            time.sleep(300)  # 5 minutos
-            if self.session_id in progress_sessions:
-                del progress_sessions[self.session_id]
-            if self.session_id in progress_queues:
-                del progress_queues[self.session_id]
-        
-        threading.Thread(target=cleanup, daemon=True).start()
     
     def get_current_status(self):
         """Retorna status atual"""
@@ -136,11 +140,18 @@ class ProgressTracker:
             "is_complete": self.current_step >= self.total_steps
         }
 
+def _session_not_found(session_id: str):
+    return jsonify({
+        'error': 'Sessão não encontrada',
+        'session_id': session_id
+    }), 404
+
 @progress_bp.route('/start_tracking', methods=['POST'])
+@progress_bp.route('/progress/start_tracking', methods=['POST'])
 def start_tracking():
     """Inicia rastreamento de progresso"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         session_id = data.get('session_id')
         
         if not session_id:
@@ -156,9 +167,10 @@ def start_tracking():
             'success': True,
             'session_id': session_id,
             'message': 'Rastreamento iniciado',
-            'status': tracker.get_current_status()
+            'status': tracker.get_current_status(),
+            'stream_url': f"/api/progress/stream/{session_id}"
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao iniciar rastreamento: {str(e)}")
         return jsonify({
@@ -167,23 +179,20 @@ def start_tracking():
         }), 500
 
 @progress_bp.route('/get_progress/<session_id>', methods=['GET'])
+@progress_bp.route('/progress/status/<session_id>', methods=['GET'])
 def get_progress(session_id):
     """Obtém progresso atual da análise"""
     try:
-        if session_id not in progress_sessions:
-            return jsonify({
-                'error': 'Sessão não encontrada',
-                'session_id': session_id
-            }), 404
+        tracker = ProgressTracker.load(session_id)
         
-        tracker = progress_sessions[session_id]
-        status = tracker.get_current_status()
+        if not tracker:
+            return _session_not_found(session_id)
         
         return jsonify({
             'success': True,
-            'progress': status
+            'progress': tracker.get_current_status()
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao obter progresso: {str(e)}")
         return jsonify({
@@ -193,30 +202,22 @@ def get_progress(session_id):
 
 @progress_bp.route('/poll_updates/<session_id>', methods=['GET'])
 def poll_updates(session_id):
-    """Polling para atualizações de progresso"""
+    """Polling para atualizações de progresso (alternativa ao stream SSE)"""
     try:
-        if session_id not in progress_queues:
-            return jsonify({
-                'error': 'Sessão não encontrada'
-            }), 404
+        if not progress_store.get_session(session_id):
+            return _session_not_found(session_id)
         
-        queue = progress_queues[session_id]
-        updates = []
-        
-        # Coleta todas as atualizações disponíveis
-        while not queue.empty():
-            try:
-                update = queue.get_nowait()
-                updates.append(update)
-            except:
-                break
+        since = request.args.get('since', 0, type=int)
+        events = progress_store.get_events(session_id, after_id=since)
+        updates = [dict(event['payload'], event_id=event['id']) for event in events]
         
         return jsonify({
             'success': True,
             'updates': updates,
-            'has_updates': len(updates) > 0
+            'has_updates': len(updates) > 0,
+            'last_event_id': events[-1]['id'] if events else since
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro no polling: {str(e)}")
         return jsonify({
@@ -224,29 +225,84 @@ def poll_updates(session_id):
             'message': str(e)
         }), 500
 
+@progress_bp.route('/progress/stream/<session_id>', methods=['GET'])
+def stream_progress(session_id):
+    """Stream SSE com as atualizações de progresso da sessão"""
+    
+    # EventSource reenvia Last-Event-ID ao reconectar
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('since') or 0
+    try:
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        last_id = 0
+    
+    def generate(last_id: int):
+        started = time.time()
+        last_sent = started
+        
+        # Orienta o navegador sobre o intervalo de reconexão
+        yield "retry: 3000\n\n"
+        
+        while time.time() - started < SSE_MAX_DURATION:
+            session_state = progress_store.get_session(session_id)
+            events = progress_store.get_events(session_id, after_id=last_id)
+            
+            for event in events:
+                last_id = event['id']
+                data = json.dumps(dict(event['payload'], event_id=last_id), ensure_ascii=False)
+                yield f"id: {last_id}\nevent: progress\ndata: {data}\n\n"
+                last_sent = time.time()
+            
+            if not session_state:
+                if time.time() - started < SSE_SESSION_GRACE:
+                    time.sleep(SSE_POLL_INTERVAL)
+                    continue
+                yield f"event: expired\ndata: {json.dumps({'session_id': session_id})}\n\n"
+                return
+            
+            if session_state['is_complete'] and not events:
+                yield f"event: complete\ndata: {json.dumps({'session_id': session_id})}\n\n"
+                return
+            
+            # Comentário SSE mantém a conexão aberta em proxies
+            if time.time() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.time()
+            
+            time.sleep(SSE_POLL_INTERVAL)
+    
+    return Response(
+        stream_with_context(generate(last_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @progress_bp.route('/update_progress', methods=['POST'])
+@progress_bp.route('/progress/update', methods=['POST'])
 def update_progress():
     """Atualiza progresso (usado internamente)"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         session_id = data.get('session_id')
-        step = data.get('step')
+        step = data.get('step', data.get('step_index', 0))
         message = data.get('message')
         details = data.get('details')
         
-        if session_id not in progress_sessions:
-            return jsonify({
-                'error': 'Sessão não encontrada'
-            }), 404
+        tracker = ProgressTracker.load(session_id)
+        
+        if not tracker:
+            return _session_not_found(session_id)
         
-        tracker = progress_sessions[session_id]
         progress_data = tracker.update_progress(step, message, details)
         
         return jsonify({
             'success': True,
             'progress': progress_data
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao atualizar progresso: {str(e)}")
         return jsonify({
@@ -255,18 +311,18 @@ def update_progress():
         }), 500
 
 @progress_bp.route('/complete_analysis', methods=['POST'])
+@progress_bp.route('/progress/complete', methods=['POST'])
 def complete_analysis():
     """Marca análise como completa"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         session_id = data.get('session_id')
         
-        if session_id not in progress_sessions:
-            return jsonify({
-                'error': 'Sessão não encontrada'
-            }), 404
+        tracker = ProgressTracker.load(session_id)
+        
+        if not tracker:
+            return _session_not_found(session_id)
         
-        tracker = progress_sessions[session_id]
         tracker.complete()
         
         return jsonify({
@@ -274,7 +330,7 @@ def complete_analysis():
             'message': 'Análise marcada como completa',
             'final_status': tracker.get_current_status()
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao completar análise: {str(e)}")
         return jsonify({
@@ -286,21 +342,21 @@ def complete_analysis():
 def get_detailed_logs(session_id):
     """Obtém logs detalhados da análise"""
     try:
-        if session_id not in progress_sessions:
-            return jsonify({
-                'error': 'Sessão não encontrada'
-            }), 404
+        tracker = ProgressTracker.load(session_id)
+        
+        if not tracker:
+            return _session_not_found(session_id)
         
-        tracker = progress_sessions[session_id]
+        logs = tracker.detailed_logs
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'logs': tracker.detailed_logs,
-            'total_logs': len(tracker.detailed_logs),
+            'logs': logs,
+            'total_logs': len(logs),
             'analysis_duration': time.time() - tracker.start_time
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao obter logs: {str(e)}")
         return jsonify({
@@ -315,14 +371,14 @@ def get_active_sessions():
         active = []
         current_time = time.time()
         
-        for session_id, tracker in progress_sessions.items():
+        for state in progress_store.list_sessions():
             active.append({
-                'session_id': session_id,
-                'current_step': tracker.current_step,
-                'total_steps': tracker.total_steps,
-                'elapsed_time': current_time - tracker.start_time,
-                'is_complete': tracker.current_step >= tracker.total_steps,
-                'last_message': tracker.steps[min(tracker.current_step, len(tracker.steps) - 1)]
+                'session_id': state['session_id'],
+                'current_step': state['current_step'],
+                'total_steps': state['total_steps'],
+                'elapsed_time': current_time - state['start_time'],
+                'is_complete': bool(state['is_complete']),
+                'last_message': state['last_message']
             })
         
         return jsonify({
@@ -330,7 +386,7 @@ def get_active_sessions():
             'active_sessions': active,
             'total_active': len(active)
         })
-        
+    
     except Exception as e:
         logger.error(f"Erro ao listar sessões: {str(e)}")
         return jsonify({
@@ -341,169 +397,15 @@ def get_active_sessions():
 # Função helper para usar em outros módulos
 def get_progress_tracker(session_id: str) -> ProgressTracker:
     """Obtém tracker de progresso para uma sessão"""
-    if session_id not in progress_sessions:
-        return ProgressTracker(session_id)
-    return progress_sessions[session_id]
+    return ProgressTracker.load(session_id) or ProgressTracker(session_id)
 
 def update_analysis_progress(session_id: str, step: int, message: str, details: str = None):
     """Função helper para atualizar progresso de qualquer lugar"""
-    if session_id in progress_sessions:
-        tracker = progress_sessions[session_id]
+    tracker = ProgressTracker.load(session_id)
+    if tracker:
         return tracker.update_progress(step, message, details)
     return None
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-ARQV30 Enhanced v2.0 - Rotas de Progresso
-Tracking de progresso das análises
-"""
-
-import logging
-from flask import Blueprint, request, jsonify, session
-from datetime import datetime
-import uuid
-
-logger = logging.getLogger(__name__)
 
-progress_bp = Blueprint('progress', __name__)
-
-# Armazenamento em memória para progresso (em produção usaria Redis/Database)
-progress_data = {}
-
-@progress_bp.route('/progress/start_tracking', methods=['POST'])
-def start_tracking():
-    """Inicia tracking de progresso"""
-    try:
-        data = request.get_json() or {}
-        
-        # Gerar ID de sessão se não existir
-        session_id = session.get('session_id')
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            session['session_id'] = session_id
-        
-        # Inicializar progresso
-        progress_data[session_id] = {
-            'status': 'iniciado',
-            'progress': 0,
-            'message': 'Preparando análise...',
-            'started_at': datetime.now().isoformat(),
-            'steps': [
-                {'name': 'Validação de dados', 'status': 'pending'},
-                {'name': 'Análise de mercado', 'status': 'pending'},
-                {'name': 'Geração de insights', 'status': 'pending'},
-                {'name': 'Criação de estratégias', 'status': 'pending'},
-                {'name': 'Finalização', 'status': 'pending'}
-            ]
-        }
-        
-        logger.info(f"Tracking iniciado para sessão: {session_id}")
-        
-        return jsonify({
-            'success': True,
-            'session_id': session_id,
-            'message': 'Tracking iniciado'
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao iniciar tracking: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-
-@progress_bp.route('/progress/update', methods=['POST'])
-def update_progress():
-    """Atualiza progresso"""
-    try:
-        data = request.get_json()
-        session_id = data.get('session_id') or session.get('session_id')
-        
-        if not session_id or session_id not in progress_data:
-            return jsonify({
-                'success': False,
-                'error': 'Sessão não encontrada'
-            }), 404
-        
-        # Atualizar progresso
-        progress_data[session_id].update({
-            'progress': data.get('progress', 0),
-            'message': data.get('message', ''),
-            'updated_at': datetime.now().isoformat()
-        })
-        
-        # Atualizar step se fornecido
-        step_index = data.get('step_index')
-        if step_index is not None and 0 <= step_index < len(progress_data[session_id]['steps']):
-            progress_data[session_id]['steps'][step_index]['status'] = data.get('step_status', 'completed')
-        
-        return jsonify({
-            'success': True,
-            'message': 'Progresso atualizado'
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao atualizar progresso: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-
-@progress_bp.route('/progress/status/<session_id>', methods=['GET'])
-def get_progress(session_id):
-    """Obtém status do progresso"""
-    try:
-        if session_id not in progress_data:
-            return jsonify({
-                'success': False,
-                'error': 'Sessão não encontrada'
-            }), 404
-        
-        return jsonify({
-            'success': True,
-            'data': progress_data[session_id]
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao obter progresso: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
-
-@progress_bp.route('/progress/complete', methods=['POST'])
-def complete_progress():
-    """Completa progresso"""
-    try:
-        data = request.get_json()
-        session_id = data.get('session_id') or session.get('session_id')
-        
-        if not session_id or session_id not in progress_data:
-            return jsonify({
-                'success': False,
-                'error': 'Sessão não encontrada'
-            }), 404
-        
-        # Completar progresso
-        progress_data[session_id].update({
-            'status': 'concluido',
-            'progress': 100,
-            'message': 'Análise concluída com sucesso!',
-            'completed_at': datetime.now().isoformat()
-        })
-        
-        # Marcar todos os steps como concluídos
-        for step in progress_data[session_id]['steps']:
-            step['status'] = 'completed'
-        
-        return jsonify({
-            'success': True,
-            'message': 'Progresso concluído'
-        })
-        
-    except Exception as e:
-        logger.error(f"Erro ao completar progresso: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+def clear_progress(session_id: str):
+    """Remove progresso de uma sessão (ex.: após erro crítico)"""
+    progress_store.delete_session(session_id)
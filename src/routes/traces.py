@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Rotas de Traces
+Consulta dos spans de cada análise, exportação Chrome trace-event e ranking das etapas lentas
+"""
+
+import json
+import logging
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response
+from services.trace_store import trace_store
+
+logger = logging.getLogger(__name__)
+
+# Cria blueprint
+traces_bp = Blueprint('traces', __name__)
+
+@traces_bp.route('/traces', methods=['GET'])
+def list_traces():
+    """Lista execuções rastreadas mais recentes"""
+    
+    try:
+        limit = min(int(request.args.get('limit', 20)), 200)
+        runs = trace_store.list_runs(limit)
+        
+        return jsonify({
+            'success': True,
+            'traces': runs,
+            'count': len(runs),
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro ao listar traces: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao listar traces',
+            'message': str(e)
+        }), 500
+
+@traces_bp.route('/traces/summary', methods=['GET'])
+def get_traces_summary():
+    """Ranking das etapas mais lentas nas execuções recentes"""
+    
+    try:
+        runs = min(int(request.args.get('runs', 20)), 200)
+        limit = min(int(request.args.get('limit', 25)), 200)
+        sort = request.args.get('sort', 'total')
+        
+        summary = trace_store.stage_summary(runs=runs, sort=sort, limit=limit)
+        
+        return jsonify({
+            'success': True,
+            **summary,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro ao resumir traces: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao resumir traces',
+            'message': str(e)
+        }), 500
+
+@traces_bp.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """Retorna a execução e seus spans"""
+    
+    try:
+        run = trace_store.get_run(trace_id)
+        
+        if not run:
+            return jsonify({
+                'success': False,
+                'error': 'Trace não encontrado'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            **run,
+            'spans': trace_store.get_spans(trace_id),
+            'chrome_trace_url': f"/api/traces/{trace_id}/chrome"
+        })
+    
+    except Exception as e:
+        logger.error(f"Erro ao obter trace {trace_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter trace',
+            'message': str(e)
+        }), 500
+
+@traces_bp.route('/traces/<trace_id>/chrome', methods=['GET'])
+def export_chrome_trace(trace_id):
+    """Exporta o trace no formato Chrome trace-event (abrir em chrome://tracing ou ui.perfetto.dev)"""
+    
+    try:
+        trace = trace_store.export_chrome_trace(trace_id)
+        
+        if not trace:
+            return jsonify({
+                'success': False,
+                'error': 'Trace não encontrado'
+            }), 404
+        
+        return Response(
+            json.dumps(trace, ensure_ascii=False, default=str),
+            mimetype='application/json',
+            headers={'Content-Disposition': f'attachment; filename=trace_{trace_id}.json'}
+        )
+    
+    except Exception as e:
+        logger.error(f"Erro ao exportar trace {trace_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao exportar trace',
+            'message': str(e)
+        }), 500
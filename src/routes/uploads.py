@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Rotas de Upload em Partes
+Upload retomável de anexos grandes: init / put chunk / complete
+"""
+
+import re
+import time
+import logging
+import mimetypes
+from flask import Blueprint, request, jsonify
+from services.attachment_service import attachment_service
+from services.chunked_upload import chunked_upload_manager, UploadError
+
+logger = logging.getLogger(__name__)
+
+# Cria blueprint
+uploads_bp = Blueprint('uploads', __name__)
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+def _upload_error(e: UploadError):
+    return jsonify({
+        **e.details,
+        'success': False,
+        'error': str(e)
+    }), e.status
+
+def _chunk_offset() -> int:
+    """Offset da parte: ?offset=N ou cabeçalho Content-Range (bytes início-fim/total)"""
+    if 'offset' in request.args:
+        return int(request.args['offset'])
+    
+    content_range = request.headers.get('Content-Range')
+    if content_range:
+        match = CONTENT_RANGE_PATTERN.fullmatch(content_range.strip())
+        if not match:
+            raise UploadError('Content-Range inválido')
+        return int(match.group(1))
+    
+    raise UploadError('Informe offset ou Content-Range')
+
+@uploads_bp.route('/uploads', methods=['POST'])
+def init_upload():
+    """Abre um upload em partes; retorna upload_id e chunk_size sugerido"""
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        filename = (data.get('filename') or '').strip()
+        if not filename:
+            return jsonify({
+                'success': False,
+                'error': 'Nome de arquivo vazio'
+            }), 400
+        
+        try:
+            total_size = int(data.get('size', 0))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'Tamanho inválido'
+            }), 400
+        
+        mime_type = data.get('mime_type') or mimetypes.guess_type(filename)[0]
+        if mime_type not in attachment_service.supported_types:
+            return jsonify({
+                'success': False,
+                'error': f'Tipo de arquivo não suportado: {mime_type}'
+            }), 415
+        
+        status = chunked_upload_manager.init(
+            session_id=data.get('session_id') or f"session_{int(time.time())}",
+            filename=filename,
+            mime_type=mime_type,
+            total_size=total_size,
+            sha256=data.get('sha256')
+        )
+        
+        return jsonify({'success': True, **status}), 201
+    
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Erro ao iniciar upload: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao iniciar upload',
+            'message': str(e)
+        }), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['PUT'])
+def put_chunk(upload_id):
+    """Recebe uma parte (corpo binário) gravada direto no arquivo do upload"""
+    
+    try:
+        status = chunked_upload_manager.put_chunk(
+            upload_id,
+            _chunk_offset(),
+            request.stream,
+            request.headers.get('X-Chunk-SHA256')
+        )
+        
+        return jsonify({'success': True, **status})
+    
+    except UploadError as e:
+        return _upload_error(e)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Offset inválido',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Erro ao receber parte do upload {upload_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao receber parte do upload',
+            'message': str(e)
+        }), 500
+
+@uploads_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Finaliza o upload (idempotente); a extração roda em background"""
+    
+    try:
+        status = chunked_upload_manager.complete(upload_id)
+        return jsonify({'success': True, **status}), 202 if status['status'] == 'processing' else 200
+    
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Erro ao finalizar upload {upload_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao finalizar upload',
+            'message': str(e)
+        }), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Estado do upload: bytes recebidos (para retomar) e resultado da extração"""
+    
+    try:
+        status = chunked_upload_manager.get_status(upload_id)
+        
+        if request.args.get('include_content', 'false').lower() == 'true' and status['status'] == 'completed':
+            status['result']['full_content'] = attachment_service.get_attachment_content(
+                status['content_hash'], status['mime_type']
+            )
+        
+        return jsonify({'success': True, **status})
+    
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Erro ao consultar upload {upload_id}: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao consultar upload',
+            'message': str(e)
+        }), 500
@@ -10,6 +10,7 @@ import uuid
 from datetime import datetime
 from flask import Blueprint, request, jsonify, session
 from database import db_manager
+from utils.json_stream import iter_json, stream_response
 
 logger = logging.getLogger(__name__)
 
@@ -272,11 +273,12 @@ def export_user_data():
             }
         }
         
-        return jsonify({
+        # Serializado seção a seção em streaming (gzip quando aceito pelo cliente)
+        return stream_response(iter_json({
             'message': 'Dados exportados com sucesso',
             'export_data': user_data,
             'download_url': None  # Em produção seria um link para download
-        })
+        }))
         
     except Exception as e:
         logger.error(f"Erro na exportação: {str(e)}")
@@ -55,8 +55,15 @@ from routes.monitoring import monitoring_bp
 from routes.user import user_bp
 from routes.progress import progress_bp
 from routes.files import files_bp
+from routes.jobs import jobs_bp
+from routes.traces import traces_bp
+from routes.uploads import uploads_bp
 from services.production_search_manager import production_search_manager
 from services.production_content_extractor import production_content_extractor
+from utils.lazy import services_status
+from utils import metrics
+from utils.serialization import FastJSONProvider
+import job_worker
 
 def create_app():
     """Cria e configura a aplicação Flask"""
@@ -65,12 +72,21 @@ def create_app():
     # Força encoding UTF-8
     app.config['JSON_AS_ASCII'] = False
 
+    # Serializador plugável (orjson quando instalado) para todas as respostas jsonify
+    app.json = FastJSONProvider(app)
+
     # Configurações básicas
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-    app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
+    app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_DIR') or os.path.join(os.path.dirname(__file__), 'uploads')
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000  # 1 year cache for static files
 
+    # Atrás de proxy reverso: remote_addr passa a ser o IP real do cliente (X-Forwarded-For)
+    proxy_hops = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    if proxy_hops:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+
     # Cria diretório de uploads se não existir
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -111,6 +127,19 @@ def create_app():
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(progress_bp, url_prefix='/api')
     app.register_blueprint(files_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    app.register_blueprint(traces_bp, url_prefix='/api')
+    app.register_blueprint(uploads_bp, url_prefix='/api')
+
+    # Latência por rota e requisições em andamento
+    metrics.init_app(app)
+
+    # Métricas Prometheus agregadas de todos os processos
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Exposição das métricas no formato texto do Prometheus"""
+        payload, content_type = metrics.render_metrics()
+        return app.response_class(payload, mimetype=None, content_type=content_type)
 
     # Service Worker route
     @app.route('/sw.js')
@@ -168,7 +197,8 @@ def create_app():
                     },
                     'content_extraction': {'available': True},
                     'cache': {'enabled': os.getenv('CACHE_ENABLED', 'true').lower() == 'true'},
-                    'database': {'available': bool(os.getenv('SUPABASE_URL'))}
+                    'database': {'available': bool(os.getenv('SUPABASE_URL'))},
+                    'initialized': services_status()
                 },
                 'environment': {
                     'python_version': sys.version,
@@ -276,6 +306,7 @@ def cleanup_on_exit():
     try:
         production_search_manager.cache.cleanup_expired()
         production_content_extractor.clear_cache()
+        job_worker.stop_embedded()
     except Exception as e:
         logger.error(f"Erro na limpeza final: {e}")
 def main():
@@ -287,6 +318,9 @@ def main():
 
         app = create_app()
 
+        # Pool de processos que executa as análises enfileiradas
+        job_worker.start_embedded()
+
         # Configurações do servidor
         host = os.getenv('HOST', '0.0.0.0')
         port = int(os.getenv('PORT', 5000))
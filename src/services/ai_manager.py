@@ -9,21 +9,20 @@ import os
 import logging
 import time
 import json
+import threading
 from typing import Dict, List, Optional, Any
 import requests
+from utils.lazy import lazy_service, lazy_import, module_available
+from utils.tracing import traced, set_span_attributes, wrap_context
+from utils.metrics import AI_PROVIDER_DURATION, AI_PROVIDER_ERRORS
+from utils.deadline import DeadlineExceeded, call_timeout, check_deadline
 
-# Imports condicionais para os clientes de IA
-try:
-    import google.generativeai as genai
-    HAS_GEMINI = True
-except ImportError:
-    HAS_GEMINI = False
+# SDKs de IA são importados apenas quando o provedor é inicializado
+HAS_GEMINI = module_available('google.generativeai')
+genai = lazy_import('google.generativeai')
 
-try:
-    import openai
-    HAS_OPENAI = True
-except ImportError:
-    HAS_OPENAI = False
+HAS_OPENAI = module_available('openai')
+openai = lazy_import('openai')
 
 try:
     from services.groq_client import groq_client
@@ -36,8 +35,13 @@ logger = logging.getLogger(__name__)
 class AIManager:
     """Gerenciador de IAs com sistema de fallback automático"""
 
+    # Clientes HTTP não são herdados: o processo filho recria o serviço sob demanda
+    reset_after_fork = True
+
     def __init__(self):
         """Inicializa o gerenciador de IAs"""
+        # Protege contadores e disponibilidade dos provedores entre threads
+        self._lock = threading.RLock()
         self.providers = {
             'gemini': {
                 'client': None,
@@ -108,7 +112,10 @@ class AIManager:
             try:
                 openai_key = os.getenv('OPENAI_API_KEY')
                 if openai_key:
-                    self.providers["openai"]["client"] = openai.OpenAI(api_key=openai_key)
+                    # OPENAI_BASE_URL permite gateways compatíveis (e o stub do benchmark)
+                    self.providers["openai"]["client"] = openai.OpenAI(
+                        api_key=openai_key, base_url=os.getenv('OPENAI_BASE_URL') or None
+                    )
                     self.providers["openai"]["available"] = True
                     logger.info("✅ OpenAI (gpt-3.5-turbo) inicializado com sucesso")
             except Exception as e:
@@ -142,49 +149,53 @@ class AIManager:
 
     def get_best_provider(self) -> Optional[str]:
         """Retorna o melhor provedor disponível com base na prioridade e contagem de erros."""
-        current_time = time.time()
+        with self._lock:
+            current_time = time.time()
         
-        # Primeiro, tenta reabilitar provedores que podem ter se recuperado
-        for name, provider in self.providers.items():
-            if (not provider['available'] and 
-                provider.get('last_success') and 
-                current_time - provider['last_success'] > 300):  # 5 minutos
-                logger.info(f"🔄 Tentando reabilitar provedor {name} após cooldown")
-                provider['error_count'] = 0
-                provider['consecutive_failures'] = 0
-                if name == 'gemini' and HAS_GEMINI:
-                    provider['available'] = True
-                elif name == 'groq' and HAS_GROQ_CLIENT:
-                    provider['available'] = True
-                elif name == 'openai' and HAS_OPENAI:
-                    provider['available'] = True
-                elif name == 'huggingface':
-                    provider['available'] = True
+            # Primeiro, tenta reabilitar provedores que podem ter se recuperado
+            for name, provider in self.providers.items():
+                if (not provider['available'] and 
+                    provider.get('last_success') and 
+                    current_time - provider['last_success'] > 300):  # 5 minutos
+                    logger.info(f"🔄 Tentando reabilitar provedor {name} após cooldown")
+                    provider['error_count'] = 0
+                    provider['consecutive_failures'] = 0
+                    if name == 'gemini' and HAS_GEMINI:
+                        provider['available'] = True
+                    elif name == 'groq' and HAS_GROQ_CLIENT:
+                        provider['available'] = True
+                    elif name == 'openai' and HAS_OPENAI:
+                        provider['available'] = True
+                    elif name == 'huggingface':
+                        provider['available'] = True
         
-        available_providers = [
-            (name, provider) for name, provider in self.providers.items() 
-            if provider['available'] and provider['consecutive_failures'] < provider.get('max_errors', 2)
-        ]
+            available_providers = [
+                (name, provider) for name, provider in self.providers.items() 
+                if provider['available'] and provider['consecutive_failures'] < provider.get('max_errors', 2)
+            ]
 
-        if not available_providers:
-            logger.warning("🔄 Nenhum provedor saudável disponível. Resetando contadores.")
-            for provider in self.providers.values():
-                provider['error_count'] = 0
-                provider['consecutive_failures'] = 0
-            available_providers = [(name, p) for name, p in self.providers.items() if p['available']]
+            if not available_providers:
+                logger.warning("🔄 Nenhum provedor saudável disponível. Resetando contadores.")
+                for provider in self.providers.values():
+                    provider['error_count'] = 0
+                    provider['consecutive_failures'] = 0
+                available_providers = [(name, p) for name, p in self.providers.items() if p['available']]
 
-        if available_providers:
-            # Ordena por prioridade e falhas consecutivas
-            available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
-            return available_providers[0][0]
+            if available_providers:
+                # Ordena por prioridade e falhas consecutivas
+                available_providers.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
+                return available_providers[0][0]
 
-        return None
+            return None
 
     def generate_analysis(self, prompt: str, max_tokens: int = 8192, provider: Optional[str] = None) -> Optional[str]:
         """Gera análise usando um provedor específico ou o melhor disponível com fallback."""
         
         start_time = time.time()
         
+        # Orçamento da análise esgotado: o chamador usa o fallback básico da etapa
+        check_deadline('ai')
+        
         # Se um provedor específico for solicitado
         if provider:
             if self.providers.get(provider) and self.providers[provider]['available']:
@@ -196,6 +207,8 @@ class AIManager:
                         return result
                     else:
                         raise Exception("Resposta vazia")
+                except DeadlineExceeded:
+                    raise
                 except Exception as e:
                     logger.error(f"❌ Provedor solicitado {provider.upper()} falhou: {e}")
                     self._record_failure(provider, str(e))
@@ -216,6 +229,9 @@ class AIManager:
                 return result
             else:
                 raise Exception("Resposta vazia do provedor")
+        except DeadlineExceeded:
+            # Falta de orçamento não é falha do provedor
+            raise
         except Exception as e:
             logger.error(f"❌ Erro no provedor {provider_name}: {e}")
             self._record_failure(provider_name, str(e))
@@ -237,7 +253,7 @@ class AIManager:
                 preferred_provider = prompt_data.get('provider')
                 
                 future = executor.submit(
-                    self.generate_analysis, 
+                    wrap_context(self.generate_analysis), 
                     prompt_text, 
                     max_tokens, 
                     preferred_provider
@@ -245,7 +261,7 @@ class AIManager:
                 future_to_prompt[future] = prompt_id
             
             # Coleta resultados
-            for future in as_completed(future_to_prompt, timeout=600):
+            for future in as_completed(future_to_prompt, timeout=call_timeout(600)):
                 prompt_id = future_to_prompt[future]
                 try:
                     result = future.result()
@@ -265,40 +281,58 @@ class AIManager:
     
     def _record_success(self, provider_name: str):
         """Registra sucesso do provedor"""
-        if provider_name in self.providers:
-            self.providers[provider_name]['consecutive_failures'] = 0
-            self.providers[provider_name]['last_success'] = time.time()
-            logger.info(f"✅ Sucesso registrado para {provider_name}")
+        with self._lock:
+            if provider_name in self.providers:
+                self.providers[provider_name]['consecutive_failures'] = 0
+                self.providers[provider_name]['last_success'] = time.time()
+                logger.info(f"✅ Sucesso registrado para {provider_name}")
     
     def _record_failure(self, provider_name: str, error_msg: str):
         """Registra falha do provedor"""
-        if provider_name in self.providers:
-            self.providers[provider_name]['error_count'] += 1
-            self.providers[provider_name]['consecutive_failures'] += 1
+        with self._lock:
+            if provider_name in self.providers:
+                self.providers[provider_name]['error_count'] += 1
+                self.providers[provider_name]['consecutive_failures'] += 1
             
-            # Desabilita temporariamente se muitas falhas consecutivas
-            if self.providers[provider_name]['consecutive_failures'] >= self.providers[provider_name]['max_errors']:
-                logger.warning(f"⚠️ Desabilitando {provider_name} temporariamente após {self.providers[provider_name]['consecutive_failures']} falhas consecutivas")
-                self.providers[provider_name]['available'] = False
+                # Desabilita temporariamente se muitas falhas consecutivas
+                if self.providers[provider_name]['consecutive_failures'] >= self.providers[provider_name]['max_errors']:
+                    logger.warning(f"⚠️ Desabilitando {provider_name} temporariamente após {self.providers[provider_name]['consecutive_failures']} falhas consecutivas")
+                    self.providers[provider_name]['available'] = False
             
-            logger.error(f"❌ Falha registrada para {provider_name}: {error_msg}")
+                logger.error(f"❌ Falha registrada para {provider_name}: {error_msg}")
 
+    @traced('ai_manager._call_provider', category='ai')
     def _call_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
         """Chama a função de geração do provedor especificado."""
-        if provider_name == 'gemini':
-            return self._generate_with_gemini(prompt, max_tokens)
-        elif provider_name == 'groq':
-            return self._generate_with_groq(prompt, max_tokens)
-        elif provider_name == 'openai':
-            return self._generate_with_openai(prompt, max_tokens)
-        elif provider_name == 'huggingface':
-            return self._generate_with_huggingface(prompt, max_tokens)
-        return None
+        set_span_attributes(provider=provider_name, prompt_chars=len(prompt), max_tokens=max_tokens)
+        
+        generators = {
+            'gemini': self._generate_with_gemini,
+            'groq': self._generate_with_groq,
+            'openai': self._generate_with_openai,
+            'huggingface': self._generate_with_huggingface
+        }
+        generator = generators.get(provider_name)
+        if not generator:
+            return None
+        
+        started = time.time()
+        outcome = 'error'
+        try:
+            result = generator(prompt, max_tokens)
+            outcome = 'success' if result else 'empty'
+            return result
+        finally:
+            AI_PROVIDER_DURATION.labels(provider_name, outcome).observe(time.time() - started)
+            if outcome != 'success':
+                AI_PROVIDER_ERRORS.labels(provider_name).inc()
 
     def _generate_with_gemini(self, prompt: str, max_tokens: int) -> Optional[str]:
         """Gera conteúdo usando Gemini."""
         client = self.providers['gemini']['client']
         config = {"temperature": 0.7, "max_output_tokens": min(max_tokens, 8192)}
+        # google-generativeai 0.3.2 não aceita timeout por chamada: apenas respeita o orçamento
+        check_deadline('gemini')
         safety = [
             {"category": c, "threshold": "BLOCK_NONE"} 
             for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]
@@ -312,7 +346,7 @@ class AIManager:
     def _generate_with_groq(self, prompt: str, max_tokens: int) -> Optional[str]:
         """Gera conteúdo usando Groq."""
         client = self.providers['groq']['client']
-        content = client.generate(prompt, max_tokens=min(max_tokens, 8192))
+        content = client.generate(prompt, max_tokens=min(max_tokens, 8192), timeout=call_timeout(120))
         if content:
             logger.info(f"✅ Groq gerou {len(content)} caracteres")
             return content
@@ -328,7 +362,8 @@ class AIManager:
                 {"role": "user", "content": prompt}
             ],
             max_tokens=min(max_tokens, 4096),
-            temperature=0.7
+            temperature=0.7,
+            timeout=call_timeout(120)
         )
         content = response.choices[0].message.content
         if content:
@@ -340,15 +375,16 @@ class AIManager:
         """Gera conteúdo usando HuggingFace com rotação de modelos."""
         config = self.providers['huggingface']
         for _ in range(len(config['models'])):
-            model_index = config['current_model_index']
-            model = config['models'][model_index]
-            config['current_model_index'] = (model_index + 1) % len(config['models']) # Rotaciona para a próxima vez
+            with self._lock:
+                model_index = config['current_model_index']
+                model = config['models'][model_index]
+                config['current_model_index'] = (model_index + 1) % len(config['models']) # Rotaciona para a próxima vez
             
             try:
                 url = f"{config['client']['base_url']}{model}"
                 headers = {"Authorization": f"Bearer {config['client']['api_key']}"}
                 payload = {"inputs": prompt, "parameters": {"max_new_tokens": min(max_tokens, 1024)}}
-                response = requests.post(url, headers=headers, json=payload, timeout=60)
+                response = requests.post(url, headers=headers, json=payload, timeout=call_timeout(60))
                 
                 if response.status_code == 200:
                     res_json = response.json()
@@ -362,6 +398,8 @@ class AIManager:
                 else:
                     logger.warning(f"⚠️ Erro {response.status_code} no modelo {model}")
                     continue
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 logger.warning(f"⚠️ Erro no modelo {model}: {e}")
                 continue
@@ -369,31 +407,34 @@ class AIManager:
 
     def reset_provider_errors(self, provider_name: str = None):
         """Reset contadores de erro dos provedores"""
-        if provider_name:
-            if provider_name in self.providers:
-                self.providers[provider_name]['error_count'] = 0
-                self.providers[provider_name]['consecutive_failures'] = 0
-                self.providers[provider_name]['available'] = True
-                logger.info(f"🔄 Reset erros do provedor: {provider_name}")
-        else:
-            for provider in self.providers.values():
-                provider['error_count'] = 0
-                provider['consecutive_failures'] = 0
-                if provider.get('client'):  # Só reabilita se tem cliente configurado
-                    provider['available'] = True
-            logger.info("🔄 Reset erros de todos os provedores")
+        with self._lock:
+            if provider_name:
+                if provider_name in self.providers:
+                    self.providers[provider_name]['error_count'] = 0
+                    self.providers[provider_name]['consecutive_failures'] = 0
+                    self.providers[provider_name]['available'] = True
+                    logger.info(f"🔄 Reset erros do provedor: {provider_name}")
+            else:
+                for provider in self.providers.values():
+                    provider['error_count'] = 0
+                    provider['consecutive_failures'] = 0
+                    if provider.get('client'):  # Só reabilita se tem cliente configurado
+                        provider['available'] = True
+                logger.info("🔄 Reset erros de todos os provedores")
 
     def _try_fallback(self, prompt: str, max_tokens: int, exclude: List[str]) -> Optional[str]:
         """Tenta usar o próximo provedor disponível como fallback."""
         logger.info(f"🔄 Acionando fallback, excluindo: {', '.join(exclude)}")
+        check_deadline('ai_fallback')
         
         # Ordena provedores por prioridade, excluindo os que já falharam
-        available_providers = [
-            (name, provider) for name, provider in self.providers.items()
-            if (provider['available'] and 
-                name not in exclude and 
-                provider['consecutive_failures'] < provider.get('max_errors', 2))
-        ]
+        with self._lock:
+            available_providers = [
+                (name, provider) for name, provider in self.providers.items()
+                if (provider['available'] and 
+                    name not in exclude and 
+                    provider['consecutive_failures'] < provider.get('max_errors', 2))
+            ]
         
         if not available_providers:
             logger.critical("❌ Todos os provedores de fallback falharam.")
@@ -412,6 +453,8 @@ class AIManager:
                 return result
             else:
                 raise Exception("Resposta vazia do fallback")
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"❌ Fallback para {next_provider} também falhou: {e}")
             self._record_failure(next_provider, str(e))
@@ -419,20 +462,21 @@ class AIManager:
     
     def get_provider_status(self) -> Dict[str, Any]:
         """Retorna status detalhado dos provedores"""
-        status = {}
+        with self._lock:
+            status = {}
         
-        for name, provider in self.providers.items():
-            status[name] = {
-                'available': provider['available'],
-                'priority': provider['priority'],
-                'error_count': provider['error_count'],
-                'consecutive_failures': provider['consecutive_failures'],
-                'last_success': provider.get('last_success'),
-                'max_errors': provider['max_errors'],
-                'model': provider.get('model', 'N/A')
-            }
+            for name, provider in self.providers.items():
+                status[name] = {
+                    'available': provider['available'],
+                    'priority': provider['priority'],
+                    'error_count': provider['error_count'],
+                    'consecutive_failures': provider['consecutive_failures'],
+                    'last_success': provider.get('last_success'),
+                    'max_errors': provider['max_errors'],
+                    'model': provider.get('model', 'N/A')
+                }
         
-        return status
+            return status
 
 # Instância global
-ai_manager = AIManager()
+ai_manager = lazy_service(AIManager, 'ai_manager')
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Analysis Job Queue
+Fila durável (SQLite) de análises executadas fora dos workers web
+"""
+
+import os
+import time
+import uuid
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+from utils.serialization import dump_file, dumps, loads
+
+logger = logging.getLogger(__name__)
+
+class TenantQueueFullError(Exception):
+    """Tenant atingiu o limite de jobs na fila"""
+    pass
+
+class AnalysisJobQueue:
+    """Fila de jobs de análise com limites de concorrência por tenant"""
+    
+    def __init__(self):
+        """Inicializa tabela de jobs e diretório de resultados"""
+        self.db = database_fallback
+        self.results_dir = os.path.normpath(os.path.join(os.path.dirname(self.db.db_path), 'job_results'))
+        self.tenant_max_running = int(os.getenv('JOB_TENANT_MAX_CONCURRENCY', 2))
+        self.tenant_max_queued = int(os.getenv('JOB_TENANT_MAX_QUEUED', 10))
+        
+        os.makedirs(self.results_dir, exist_ok=True)
+        self._ensure_table()
+        logger.info("✅ Analysis Job Queue inicializada")
+    
+    def _ensure_table(self):
+        """Cria tabela de jobs se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id TEXT PRIMARY KEY,
+                    tenant_id TEXT NOT NULL,
+                    session_id TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    payload TEXT NOT NULL,
+                    request_meta TEXT,
+                    result_path TEXT,
+                    http_status INTEGER,
+                    error TEXT,
+                    cancel_requested INTEGER DEFAULT 0,
+                    worker_id TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    heartbeat_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_jobs_tenant ON analysis_jobs (tenant_id, status)')
+    
+    def _to_public(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte linha do banco em representação pública do job"""
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+        
+        return {
+            'job_id': row['id'],
+            'tenant_id': row['tenant_id'],
+            'session_id': row['session_id'],
+            'status': row['status'],
+            'cancel_requested': bool(row['cancel_requested']),
+            'http_status': row['http_status'],
+            'error': row['error'],
+            'created_at': iso(row['created_at']),
+            'started_at': iso(row['started_at']),
+            'finished_at': iso(row['finished_at']),
+            'elapsed_seconds': round(
+                (row['finished_at'] or time.time()) - row['started_at'], 1
+            ) if row['started_at'] else None,
+            'has_result': bool(row['result_path'])
+        }
+    
+    # ------------------------------------------------------------------
+    # API usada pelos workers web
+    # ------------------------------------------------------------------
+    
+    def submit(
+        self,
+        payload: Dict[str, Any],
+        tenant_id: str,
+        request_meta: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Enfileira análise e retorna o job criado"""
+        job_id = f"job_{uuid.uuid4().hex}"
+        
+        with self.db._connection() as conn:
+            queued = conn.execute('''
+                SELECT COUNT(*) FROM analysis_jobs
+                WHERE tenant_id = ? AND status = 'queued'
+            ''', (tenant_id,)).fetchone()[0]
+            
+            if queued >= self.tenant_max_queued:
+                raise TenantQueueFullError(
+                    f"Limite de {self.tenant_max_queued} análises na fila atingido"
+                )
+            
+            conn.execute('''
+                INSERT INTO analysis_jobs (
+                    id, tenant_id, session_id, status, payload, request_meta, created_at
+                ) VALUES (?, ?, ?, 'queued', ?, ?, ?)
+            ''', (
+                job_id,
+                tenant_id,
+                payload.get('session_id'),
+                dumps(payload),
+                dumps(request_meta or {}),
+                time.time()
+            ))
+        
+        logger.info(f"📥 Job {job_id} enfileirado (tenant {tenant_id})")
+        return self.get_job(job_id)
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna status do job"""
+        with self.db._connection() as conn:
+            row = conn.execute('SELECT * FROM analysis_jobs WHERE id = ?', (job_id,)).fetchone()
+        
+        if not row:
+            return None
+        
+        job = self._to_public(dict(row))
+        
+        if job['status'] == 'queued':
+            job['queue_position'] = self._queue_position(row['created_at'])
+        
+        return job
+    
+    def _queue_position(self, created_at: float) -> int:
+        with self.db._connection() as conn:
+            return conn.execute('''
+                SELECT COUNT(*) FROM analysis_jobs
+                WHERE status = 'queued' AND created_at < ?
+            ''', (created_at,)).fetchone()[0] + 1
+    
+    def get_result_path(self, job_id: str) -> Optional[str]:
+        """Caminho do JSON de resultado, se existir"""
+        with self.db._connection() as conn:
+            row = conn.execute(
+                'SELECT result_path FROM analysis_jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        
+        if row and row['result_path'] and os.path.exists(row['result_path']):
+            return row['result_path']
+        return None
+    
+    def list_jobs(self, tenant_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Lista jobs mais recentes"""
+        query = 'SELECT * FROM analysis_jobs'
+        params: List[Any] = []
+        
+        if tenant_id:
+            query += ' WHERE tenant_id = ?'
+            params.append(tenant_id)
+        
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        params.append(limit)
+        
+        with self.db._connection() as conn:
+            return [self._to_public(dict(row)) for row in conn.execute(query, params)]
+    
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancela job na fila ou sinaliza cancelamento de job em execução"""
+        now = time.time()
+        
+        with self.db._connection() as conn:
+            conn.execute('''
+                UPDATE analysis_jobs
+                SET status = 'cancelled', cancel_requested = 1, finished_at = ?
+                WHERE id = ? AND status = 'queued'
+            ''', (now, job_id))
+            conn.execute('''
+                UPDATE analysis_jobs SET cancel_requested = 1
+                WHERE id = ? AND status = 'running'
+            ''', (job_id,))
+        
+        job = self.get_job(job_id)
+        if job:
+            logger.info(f"🛑 Cancelamento solicitado para job {job_id} ({job['status']})")
+        return job
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de jobs por status"""
+        with self.db._connection() as conn:
+            counts = {
+                row['status']: row['total']
+                for row in conn.execute(
+                    'SELECT status, COUNT(*) AS total FROM analysis_jobs GROUP BY status'
+                )
+            }
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'completed': counts.get('completed', 0),
+            'failed': counts.get('failed', 0),
+            'cancelled': counts.get('cancelled', 0)
+        }
+    
+    # ------------------------------------------------------------------
+    # API usada pelo pool de workers de jobs
+    # ------------------------------------------------------------------
+    
+    def claim_next(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Reserva o próximo job respeitando o limite de concorrência por tenant"""
+        now = time.time()
+        conn = self.db._get_connection()
+        
+        try:
+            # BEGIN IMMEDIATE serializa a reserva entre processos do pool
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('''
+                SELECT j.* FROM analysis_jobs j
+                WHERE j.status = 'queued'
+                  AND (
+                      SELECT COUNT(*) FROM analysis_jobs r
+                      WHERE r.tenant_id = j.tenant_id AND r.status = 'running'
+                  ) < ?
+                ORDER BY j.created_at
+                LIMIT 1
+            ''', (self.tenant_max_running,)).fetchone()
+            
+            if row:
+                conn.execute('''
+                    UPDATE analysis_jobs
+                    SET status = 'running', worker_id = ?, started_at = ?, heartbeat_at = ?
+                    WHERE id = ?
+                ''', (worker_id, now, now, row['id']))
+            
+            conn.commit()
+        
+        except Exception:
+            conn.rollback()
+            raise
+        
+        if not row:
+            return None
+        
+        job = dict(row)
+        job['payload'] = loads(job['payload'])
+        job['request_meta'] = loads(job['request_meta'] or '{}')
+        return job
+    
+    def heartbeat(self, job_ids: List[str]):
+        """Atualiza sinal de vida dos jobs em execução"""
+        if not job_ids:
+            return
+        now = time.time()
+        with self.db._connection() as conn:
+            conn.executemany(
+                'UPDATE analysis_jobs SET heartbeat_at = ? WHERE id = ?',
+                [(now, job_id) for job_id in job_ids]
+            )
+    
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """Retorna quais dos jobs informados tiveram cancelamento solicitado"""
+        if not job_ids:
+            return []
+        placeholders = ', '.join('?' for _ in job_ids)
+        with self.db._connection() as conn:
+            return [
+                row['id'] for row in conn.execute(
+                    f'SELECT id FROM analysis_jobs WHERE cancel_requested = 1 AND id IN ({placeholders})',
+                    job_ids
+                )
+            ]
+    
+    def complete(self, job_id: str, result: Dict[str, Any], http_status: int = 200):
+        """Grava resultado em disco e finaliza o job"""
+        result_path = os.path.join(self.results_dir, f"{job_id}.json")
+        
+        dump_file(result, result_path, pretty=False)
+        
+        status = 'completed' if http_status < 400 else 'failed'
+        error = None if status == 'completed' else result.get('message') or result.get('error')
+        
+        with self.db._connection() as conn:
+            conn.execute('''
+                UPDATE analysis_jobs
+                SET status = ?, result_path = ?, http_status = ?, error = ?, finished_at = ?
+                WHERE id = ? AND status = 'running'
+            ''', (status, result_path, http_status, error, time.time(), job_id))
+        
+        logger.info(f"✅ Job {job_id} finalizado: {status} ({http_status})")
+    
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        """Finaliza job sem resultado (falha, cancelamento ou timeout)"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                UPDATE analysis_jobs
+                SET status = ?, error = ?, finished_at = ?
+                WHERE id = ? AND status NOT IN ('completed', 'failed', 'cancelled')
+            ''', (status, error, time.time(), job_id))
+        
+        logger.info(f"🏁 Job {job_id} finalizado: {status} {error or ''}")
+    
+    def fail_orphaned(self, stale_seconds: float) -> int:
+        """Marca como falhos jobs cujo worker parou de enviar heartbeat"""
+        cutoff = time.time() - stale_seconds
+        with self.db._connection() as conn:
+            cursor = conn.execute('''
+                UPDATE analysis_jobs
+                SET status = 'failed', error = 'Worker interrompido durante a execução', finished_at = ?
+                WHERE status = 'running' AND heartbeat_at < ?
+            ''', (time.time(), cutoff))
+            count = cursor.rowcount
+        
+        if count:
+            logger.warning(f"⚠️ {count} jobs órfãos marcados como falhos")
+        return count
+
+# Instância global
+analysis_job_queue = lazy_service(AnalysisJobQueue, 'analysis_job_queue')
@@ -10,6 +10,7 @@ import json
 import time
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -459,4 +460,4 @@ class AnalysisQualityController:
         return mapping.get(component)
 
 # Instância global
-analysis_quality_controller = AnalysisQualityController()
+analysis_quality_controller = lazy_service(AnalysisQualityController, 'analysis_quality_controller')
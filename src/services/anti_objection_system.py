@@ -12,6 +12,7 @@ import json
 from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -820,4 +821,4 @@ RETORNE APENAS JSON VÁLIDO:
         }
 
 # Instância global
-anti_objection_system = AntiObjectionSystem()
\ No newline at end of file
+anti_objection_system = lazy_service(AntiObjectionSystem, 'anti_objection_system')
\ No newline at end of file
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Attachment Cache
+Conteúdo extraído e classificado de anexos, endereçado pelo SHA-256 do arquivo
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+from utils.metrics import CACHE_REQUESTS
+from utils.serialization import dump_file, load_file
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Fração de max_bytes mantida após uma limpeza (folga evita varrer o diretório a cada put)
+PRUNE_TARGET_RATIO = 0.9
+
+def save_and_hash(stream: BinaryIO, path: str) -> Tuple[str, int]:
+    """Grava o upload em disco calculando o SHA-256 na mesma passada"""
+    digest = hashlib.sha256()
+    size = 0
+    
+    with open(path, 'wb') as f:
+        while True:
+            block = stream.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            f.write(block)
+            size += len(block)
+    
+    return digest.hexdigest(), size
+
+class AttachmentContentCache:
+    """Store em disco limitado por tamanho (LRU por mtime) + referências de sessão no SQLite
+
+    O total em bytes fica no SQLite compartilhado e é atualizado na mesma transação de cada gravação,
+    então o limite vale para todos os workers juntos. Remoções feitas fora do cache só são percebidas
+    na próxima varredura, que recalcula o total a partir do disco.
+    """
+    
+    def __init__(self):
+        """Inicializa diretório do cache e tabela de referências por sessão"""
+        self.db = database_fallback
+        self.cache_dir = os.path.join(os.getenv('UPLOAD_DIR') or os.path.join(os.path.dirname(__file__), '..', 'uploads'), 'cache')
+        self.max_bytes = int(float(os.getenv('ATTACHMENT_CACHE_MAX_MB', 200)) * 1024 * 1024)
+        self.prune_target = int(self.max_bytes * PRUNE_TARGET_RATIO)
+        self._prune_lock = threading.Lock()
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._ensure_table()
+        
+        logger.info(f"✅ Attachment Cache inicializado ({self.max_bytes // (1024 * 1024)}MB)")
+    
+    def _ensure_table(self):
+        """Cria tabela de anexos por sessão se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS session_attachments (
+                    session_id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    filename TEXT,
+                    mime_type TEXT,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, content_hash)
+                )
+            ''')
+            # total_bytes NULL: ainda não medido, a próxima gravação dispara a varredura
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS attachment_cache_usage (
+                    cache_dir TEXT PRIMARY KEY,
+                    total_bytes INTEGER
+                )
+            ''')
+    
+    def _path_for(self, content_hash: str) -> Optional[str]:
+        if len(content_hash) != 64 or any(c not in '0123456789abcdef' for c in content_hash):
+            return None
+        return os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}.json")
+    
+    # ------------------------------------------------------------------
+    # Conteúdo
+    # ------------------------------------------------------------------
+    
+    def get(self, content_hash: str, signature: str) -> Optional[Dict[str, Any]]:
+        """Entrada do cache se existir e tiver sido gerada com a mesma configuração de extração"""
+        path = self._path_for(content_hash)
+        entry = None
+        
+        if path and os.path.exists(path):
+            try:
+                entry = load_file(path)
+                if entry.get('signature') != signature:
+                    entry = None
+                else:
+                    # Marca uso recente para a política LRU
+                    os.utime(path, None)
+            except Exception as e:
+                logger.warning(f"⚠️ Entrada de cache de anexo ilegível {content_hash[:12]}: {e}")
+                entry = None
+        
+        CACHE_REQUESTS.labels('attachment', 'hit' if entry else 'miss').inc()
+        return entry
+    
+    def put(self, content_hash: str, entry: Dict[str, Any]):
+        """Grava a entrada de forma atômica e aplica o limite de tamanho"""
+        path = self._path_for(content_hash)
+        if not path:
+            return
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            dump_file(entry, tmp_path)
+            new_size = os.path.getsize(tmp_path)
+            
+            with self.db._connection() as conn:
+                # BEGIN IMMEDIATE serializa substituição do arquivo e contador entre workers
+                conn.execute('BEGIN IMMEDIATE')
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                os.replace(tmp_path, path)
+                total = self._add_usage(conn, new_size - old_size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        if total is None or total > self.max_bytes:
+            self._prune()
+    
+    def _add_usage(self, conn, delta: int) -> Optional[int]:
+        """Soma delta ao total compartilhado; None quando o total ainda não foi medido"""
+        conn.execute(
+            'INSERT OR IGNORE INTO attachment_cache_usage (cache_dir, total_bytes) VALUES (?, NULL)',
+            (self.cache_dir,)
+        )
+        conn.execute(
+            'UPDATE attachment_cache_usage SET total_bytes = total_bytes + ? WHERE cache_dir = ?',
+            (delta, self.cache_dir)
+        )
+        return conn.execute(
+            'SELECT total_bytes FROM attachment_cache_usage WHERE cache_dir = ?', (self.cache_dir,)
+        ).fetchone()[0]
+    
+    def _prune(self):
+        """Varre o diretório e remove as entradas menos usadas até prune_target"""
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        
+        try:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.cache_dir):
+                for filename in files:
+                    if not filename.endswith('.json'):
+                        continue
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            
+            if total <= self.max_bytes:
+                self._set_total(total)
+                return
+            
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.prune_target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    continue
+            
+            self._set_total(total)
+            logger.info(f"🧹 Cache de anexos: {removed} entradas removidas (LRU)")
+        finally:
+            self._prune_lock.release()
+    
+    def _set_total(self, total: int):
+        # A varredura corrige o total compartilhado a partir do disco
+        with self.db._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO attachment_cache_usage (cache_dir, total_bytes) VALUES (?, ?)',
+                (self.cache_dir, total)
+            )
+    
+    # ------------------------------------------------------------------
+    # Referências de sessão
+    # ------------------------------------------------------------------
+    
+    def add_reference(self, session_id: str, content_hash: str, filename: str, mime_type: str):
+        """Associa o conteúdo à sessão (sem copiar o texto)"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO session_attachments (session_id, content_hash, filename, mime_type, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (session_id, content_hash, filename, mime_type, time.time()))
+    
+    def list_references(self, session_id: str) -> List[Dict[str, Any]]:
+        with self.db._connection() as conn:
+            rows = conn.execute('''
+                SELECT content_hash, filename, mime_type, created_at
+                FROM session_attachments WHERE session_id = ? ORDER BY created_at
+            ''', (session_id,)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def remove_references(self, session_id: str) -> int:
+        with self.db._connection() as conn:
+            return conn.execute(
+                'DELETE FROM session_attachments WHERE session_id = ?', (session_id,)
+            ).rowcount
+    
+    def get_stats(self) -> Dict[str, Any]:
+        files = 0
+        size = 0
+        for root, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith('.json'):
+                    files += 1
+                    size += os.path.getsize(os.path.join(root, filename))
+        return {
+            'entries': files,
+            'size_mb': round(size / (1024 * 1024), 2),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 2)
+        }
+
+# Instância global
+attachment_cache = lazy_service(AttachmentContentCache, 'attachment_cache')
@@ -9,24 +9,38 @@ import os
 import logging
 import mimetypes
 import re
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from werkzeug.datastructures import FileStorage
-import PyPDF2
-import pandas as pd
-from docx import Document
 import json
 from datetime import datetime
+from utils.lazy import lazy_service, lazy_import
+from services.attachment_cache import attachment_cache, save_and_hash
+
+# Leitores de documentos são importados apenas quando um anexo é processado
+PyPDF2 = lazy_import('PyPDF2')
+pd = lazy_import('pandas')
+docx = lazy_import('docx')
+openpyxl = lazy_import('openpyxl')
 
 logger = logging.getLogger(__name__)
 
 class AttachmentService:
     """Serviço para processamento inteligente de anexos"""
 
+    # Incrementar quando extração/classificação mudar: invalida o conteúdo em cache
+    EXTRACTOR_VERSION = '1'
+
     def __init__(self):
         """Inicializa serviço de anexos"""
-        self.upload_folder = os.path.join(os.path.dirname(__file__), '..', 'uploads')
+        self.upload_folder = os.getenv('UPLOAD_DIR') or os.path.join(os.path.dirname(__file__), '..', 'uploads')
         os.makedirs(self.upload_folder, exist_ok=True)
 
+        # Orçamento da extração: páginas de PDF e caracteres totais por anexo
+        self.max_pages = int(os.getenv('ATTACHMENT_MAX_PAGES', 300))
+        self.max_chars = int(os.getenv('ATTACHMENT_MAX_CHARS', 2_000_000))
+        self.csv_chunk_rows = int(os.getenv('ATTACHMENT_CSV_CHUNK_ROWS', 5000))
+        self.read_block_size = 64 * 1024
+
         # Tipos de arquivo suportados
         self.supported_types = {
             'application/pdf': 'pdf',
@@ -84,150 +98,242 @@ class AttachmentService:
                     'error': f'Tipo de arquivo não suportado: {mime_type}'
                 }
 
-            # Salva arquivo temporariamente
-            file_path = self._save_temp_file(file, session_id)
-            if not file_path:
+            # Salva arquivo temporariamente (SHA-256 calculado durante a gravação)
+            saved = self._save_temp_file(file, session_id)
+            if not saved:
                 return {
                     'success': False,
                     'error': 'Erro ao salvar arquivo'
                 }
+            file_path, content_hash, upload_size = saved
+
+            try:
+                return self.process_saved_file(file_path, file.filename, mime_type, session_id, content_hash, upload_size)
+            finally:
+                # Remove arquivo temporário
+                self._cleanup_temp_file(file_path)
 
-            # Extrai conteúdo
-            content = self._extract_content(file_path, mime_type)
-            if not content:
+        except Exception as e:
+            logger.error(f"Erro ao processar anexo: {str(e)}")
+            return {
+                'success': False,
+                'error': f'Erro interno: {str(e)}'
+            }
+
+    def process_saved_file(
+        self,
+        file_path: str,
+        filename: str,
+        mime_type: str,
+        session_id: str,
+        content_hash: str,
+        upload_size: int
+    ) -> Dict[str, Any]:
+        """Processa um arquivo já gravado em disco (upload simples ou em partes); não remove o arquivo"""
+
+        # Mesmo arquivo já processado (em qualquer sessão): reaproveita o conteúdo
+        signature = self._extraction_signature(mime_type)
+        entry = attachment_cache.get(content_hash, signature)
+        cached = entry is not None
+
+        if cached:
+            logger.info(f"♻️ Anexo reaproveitado do cache: {filename} ({content_hash[:12]})")
+        else:
+            entry = self._process_file(file_path, mime_type, signature, upload_size)
+            if not entry:
                 return {
                     'success': False,
                     'error': 'Erro ao extrair conteúdo'
                 }
+            attachment_cache.put(content_hash, entry)
+
+        # A sessão guarda apenas a referência ao conteúdo
+        attachment_cache.add_reference(session_id, content_hash, filename, mime_type)
+
+        processed_content = entry['processed_content']
+
+        return {
+            'success': True,
+            'message': 'Anexo processado com sucesso',
+            'session_id': session_id,
+            'filename': filename,
+            'content_hash': content_hash,
+            'cached': cached,
+            'content_type': entry['content_type'],
+            'content_preview': processed_content[:500] + '...' if len(processed_content) > 500 else processed_content,
+            'full_content': processed_content,
+            'metadata': {
+                'file_size': entry['content_length'],
+                'upload_size': entry['upload_size'],
+                'mime_type': mime_type,
+                'truncated': entry['truncated'],
+                'processed_at': entry['processed_at']
+            }
+        }
 
-            # Classifica conteúdo
-            content_type = self._classify_content(content)
-
-            # Processa conteúdo específico
-            processed_content = self._process_specific_content(content, content_type)
+    def _process_file(self, file_path: str, mime_type: str, signature: str, upload_size: int) -> Optional[Dict[str, Any]]:
+        """Extrai, classifica e processa o arquivo; retorna a entrada a ser cacheada"""
 
-            # Remove arquivo temporário
-            self._cleanup_temp_file(file_path)
+        # Extrai conteúdo (em streaming, limitado pelo orçamento de páginas/caracteres)
+        content, truncated = self._extract_content(file_path, mime_type)
+        if not content:
+            return None
 
-            return {
-                'success': True,
-                'message': 'Anexo processado com sucesso',
-                'session_id': session_id,
-                'filename': file.filename,
-                'content_type': content_type,
-                'content_preview': processed_content[:500] + '...' if len(processed_content) > 500 else processed_content,
-                'full_content': processed_content,
-                'metadata': {
-                    'file_size': len(content),
-                    'mime_type': mime_type,
-                    'processed_at': datetime.now().isoformat()
-                }
-            }
+        # Classifica conteúdo
+        content_type = self._classify_content(content)
+
+        # Processa conteúdo específico
+        processed_content = self._process_specific_content(content, content_type)
+
+        return {
+            'signature': signature,
+            'content_type': content_type,
+            'processed_content': processed_content,
+            'content_length': len(content),
+            'upload_size': upload_size,
+            'truncated': truncated,
+            'mime_type': mime_type,
+            'processed_at': datetime.now().isoformat()
+        }
 
-        except Exception as e:
-            logger.error(f"Erro ao processar anexo: {str(e)}")
-            return {
-                'success': False,
-                'error': f'Erro interno: {str(e)}'
-            }
+    def _extraction_signature(self, mime_type: str) -> str:
+        """Configuração que determina o conteúdo extraído (tipo + orçamento + versão)"""
+        return f"{self.EXTRACTOR_VERSION}:{mime_type}:{self.max_pages}:{self.max_chars}"
 
-    def _save_temp_file(self, file: FileStorage, session_id: str) -> Optional[str]:
-        """Salva arquivo temporariamente"""
+    def _save_temp_file(self, file: FileStorage, session_id: str) -> Optional[Tuple[str, str, int]]:
+        """Salva arquivo temporariamente; retorna (caminho, sha256, tamanho)"""
         try:
             # Gera nome único
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"{session_id}_{timestamp}_{file.filename}"
             file_path = os.path.join(self.upload_folder, filename)
 
-            # Salva arquivo
-            file.save(file_path)
+            # Salva arquivo em blocos, calculando o hash na mesma passada
+            content_hash, size = save_and_hash(file.stream, file_path)
 
-            return file_path
+            return file_path, content_hash, size
 
         except Exception as e:
             logger.error(f"Erro ao salvar arquivo: {str(e)}")
             return None
 
-    def _extract_content(self, file_path: str, mime_type: str) -> Optional[str]:
-        """Extrai conteúdo do arquivo baseado no tipo"""
+    def _extract_content(self, file_path: str, mime_type: str) -> Tuple[Optional[str], bool]:
+        """Extrai conteúdo do arquivo baseado no tipo; retorna (texto, truncado pelo orçamento)"""
         try:
             file_type = self.supported_types.get(mime_type)
 
             if file_type == 'pdf':
-                return self._extract_pdf_content(file_path)
+                chunks = self._iter_pdf_content(file_path)
             elif file_type in ['docx', 'doc']:
-                return self._extract_docx_content(file_path)
-            elif file_type in ['xlsx', 'xls']:
-                return self._extract_excel_content(file_path)
+                chunks = self._iter_docx_content(file_path)
+            elif file_type == 'xlsx':
+                chunks = self._iter_xlsx_content(file_path)
+            elif file_type == 'xls':
+                chunks = self._iter_xls_content(file_path)
             elif file_type == 'csv':
-                return self._extract_csv_content(file_path)
+                return self._collect_with_fallback_encoding(self._iter_csv_content, file_path)
             elif file_type == 'txt':
-                return self._extract_text_content(file_path)
+                return self._collect_with_fallback_encoding(self._iter_text_content, file_path)
             elif file_type == 'json':
-                return self._extract_json_content(file_path)
+                chunks = self._iter_json_content(file_path)
             else:
-                return None
-
-        except Exception as e:
-            logger.error(f"Erro ao extrair conteúdo: {str(e)}")
-            return None
+                return None, False
 
-    def _extract_pdf_content(self, file_path: str) -> Optional[str]:
-        """Extrai texto de arquivo PDF"""
-        try:
-            content = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
+            content, truncated = self._collect(chunks)
 
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
+            # Planilhas quase vazias não trazem contexto útil
+            if file_type in ['xlsx', 'xls'] and content and len(content) < 100:
+                logger.warning(f"⚠️ Conteúdo Excel muito curto: {len(content)} caracteres")
+                return None, False
 
-            return content.strip()
+            return content, truncated
 
         except Exception as e:
-            logger.error(f"Erro ao extrair PDF: {str(e)}")
-            return None
+            logger.error(f"Erro ao extrair conteúdo: {str(e)}")
+            return None, False
 
-    def _extract_docx_content(self, file_path: str) -> Optional[str]:
-        """Extrai texto de arquivo DOCX"""
+    def _collect(self, chunks: Iterator[str]) -> Tuple[Optional[str], bool]:
+        """Junta os pedaços até o limite de caracteres; interrompe a leitura ao atingi-lo"""
+        parts = []
+        total = 0
+        truncated = False
+
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+
+                remaining = self.max_chars - total
+                if len(chunk) >= remaining:
+                    parts.append(chunk[:remaining])
+                    truncated = True
+                    break
+
+                parts.append(chunk)
+                total += len(chunk)
+        finally:
+            # Fecha arquivos/planilhas abertos pelo gerador
+            chunks.close()
+
+        if truncated:
+            logger.warning(f"⚠️ Anexo truncado em {self.max_chars} caracteres")
+
+        content = ''.join(parts).strip()
+        return content or None, truncated
+
+    def _collect_with_fallback_encoding(self, iterator, file_path: str) -> Tuple[Optional[str], bool]:
+        """Lê em UTF-8 e, se o arquivo não for UTF-8, recomeça em latin-1"""
         try:
-            doc = Document(file_path)
-            content = ""
+            return self._collect(iterator(file_path, 'utf-8'))
+        except UnicodeDecodeError:
+            return self._collect(iterator(file_path, 'latin-1'))
 
-            for paragraph in doc.paragraphs:
-                content += paragraph.text + "\n"
+    def _iter_pdf_content(self, file_path: str) -> Iterator[str]:
+        """Texto do PDF página a página, até max_pages"""
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            total_pages = len(pdf_reader.pages)
 
-            return content.strip()
+            if total_pages > self.max_pages:
+                logger.warning(f"⚠️ PDF com {total_pages} páginas: lendo apenas as {self.max_pages} primeiras")
 
-        except Exception as e:
-            logger.error(f"Erro ao extrair DOCX: {str(e)}")
-            return None
+            for page_num in range(min(total_pages, self.max_pages)):
+                try:
+                    yield (pdf_reader.pages[page_num].extract_text() or '') + "\n"
+                except Exception as e:
+                    logger.warning(f"⚠️ Página {page_num + 1} do PDF ignorada: {str(e)}")
 
-    def _extract_excel_content(self, file_path: str) -> Optional[str]:
-        """Extrai dados de arquivo Excel"""
-        try:
-            import pandas as pd
+    def _iter_docx_content(self, file_path: str) -> Iterator[str]:
+        """Texto do DOCX parágrafo a parágrafo"""
+        doc = docx.Document(file_path)
 
-            # Lê todas as planilhas
-            excel_file = pd.ExcelFile(file_path)
-            content = ""
+        for paragraph in doc.paragraphs:
+            yield paragraph.text + "\n"
 
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                content += f"PLANILHA: {sheet_name}\n"
-                content += df.to_string(index=False) + "\n\n"
+    def _iter_xlsx_content(self, file_path: str) -> Iterator[str]:
+        """Planilhas abertas uma única vez em modo somente leitura, linha a linha"""
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
 
-            # Valida qualidade do conteúdo extraído
-            if len(content.strip()) < 100:
-                logger.warning(f"⚠️ Conteúdo Excel muito curto: {len(content)} caracteres")
-                return None
+        try:
+            for sheet in workbook.worksheets:
+                yield f"PLANILHA: {sheet.title}\n"
 
-            return content.strip()
+                for row in sheet.iter_rows(values_only=True):
+                    values = ['' if value is None else str(value) for value in row]
+                    if any(values):
+                        yield '\t'.join(values) + "\n"
 
-        except Exception as e:
-            logger.error(f"Erro ao extrair Excel: {str(e)}")
-            return None
+                yield "\n"
+        finally:
+            workbook.close()
+
+    def _iter_xls_content(self, file_path: str) -> Iterator[str]:
+        """Formato .xls (sem suporte no openpyxl): arquivo aberto uma vez e reaproveitado por planilha"""
+        with pd.ExcelFile(file_path) as excel_file:
+            for sheet_name in excel_file.sheet_names:
+                df = excel_file.parse(sheet_name)
+                yield f"PLANILHA: {sheet_name}\n"
+                yield df.to_string(index=False) + "\n\n"
 
     def _validate_content_quality(self, content: str, filename: str) -> bool:
         """Valida qualidade do conteúdo extraído"""
@@ -250,52 +356,41 @@ class AttachmentService:
         logger.info(f"✅ Conteúdo validado para {filename}: {len(content)} caracteres, {word_count} palavras")
         return True
 
-    def _extract_csv_content(self, file_path: str) -> Optional[str]:
-        """Extrai dados de arquivo CSV"""
-        try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-            return df.to_string(index=False)
+    def _iter_csv_content(self, file_path: str, encoding: str = 'utf-8') -> Iterator[str]:
+        """CSV lido em blocos de linhas"""
+        reader = pd.read_csv(file_path, encoding=encoding, chunksize=self.csv_chunk_rows)
 
-        except UnicodeDecodeError:
-            # Tenta com encoding latin-1
-            try:
-                df = pd.read_csv(file_path, encoding='latin-1')
-                return df.to_string(index=False)
-            except Exception as e:
-                logger.error(f"Erro ao extrair CSV: {str(e)}")
-                return None
-        except Exception as e:
-            logger.error(f"Erro ao extrair CSV: {str(e)}")
-            return None
+        try:
+            for i, chunk in enumerate(reader):
+                yield chunk.to_string(index=False, header=(i == 0)) + "\n"
+        finally:
+            reader.close()
+
+    def _iter_text_content(self, file_path: str, encoding: str = 'utf-8') -> Iterator[str]:
+        """Arquivo texto lido em blocos"""
+        with open(file_path, 'r', encoding=encoding) as file:
+            while True:
+                block = file.read(self.read_block_size)
+                if not block:
+                    break
+                yield block
 
     def _extract_text_content(self, file_path: str) -> Optional[str]:
         """Extrai conteúdo de arquivo texto"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            content, _ = self._collect_with_fallback_encoding(self._iter_text_content, file_path)
+            return content
 
-        except UnicodeDecodeError:
-            # Tenta com encoding latin-1
-            try:
-                with open(file_path, 'r', encoding='latin-1') as file:
-                    return file.read()
-            except Exception as e:
-                logger.error(f"Erro ao extrair texto: {str(e)}")
-                return None
         except Exception as e:
             logger.error(f"Erro ao extrair texto: {str(e)}")
             return None
 
-    def _extract_json_content(self, file_path: str) -> Optional[str]:
-        """Extrai conteúdo de arquivo JSON"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                return json.dumps(data, indent=2, ensure_ascii=False)
+    def _iter_json_content(self, file_path: str) -> Iterator[str]:
+        """JSON reformatado (o arquivo já é limitado por MAX_CONTENT_LENGTH)"""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
 
-        except Exception as e:
-            logger.error(f"Erro ao extrair JSON: {str(e)}")
-            return None
+        yield json.dumps(data, indent=2, ensure_ascii=False)
 
     def _classify_content(self, content: str) -> str:
         """Classifica o tipo de conteúdo baseado em palavras-chave"""
@@ -421,10 +516,24 @@ class AttachmentService:
             logger.error(f"Erro ao remover arquivo temporário: {str(e)}")
 
     def get_session_attachments(self, session_id: str) -> List[Dict[str, Any]]:
-        """Retorna anexos de uma sessão específica"""
-        # Esta função seria implementada com um sistema de cache/banco
-        # Por enquanto retorna lista vazia
-        return []
+        """Retorna anexos de uma sessão específica (referências ao conteúdo em cache)"""
+        attachments = []
+
+        for reference in attachment_cache.list_references(session_id):
+            entry = attachment_cache.get(reference['content_hash'], self._extraction_signature(reference['mime_type']))
+            attachments.append({
+                **reference,
+                'available': entry is not None,
+                'content_type': entry['content_type'] if entry else None,
+                'content_preview': entry['processed_content'][:500] if entry else None
+            })
+
+        return attachments
+
+    def get_attachment_content(self, content_hash: str, mime_type: str) -> Optional[str]:
+        """Conteúdo processado de um anexo pelo hash do arquivo"""
+        entry = attachment_cache.get(content_hash, self._extraction_signature(mime_type))
+        return entry['processed_content'] if entry else None
 
     def process_text_file(self, file_path: str) -> Optional[str]:
         """Processa arquivo de texto simples"""
@@ -439,6 +548,9 @@ class AttachmentService:
                     file_path = os.path.join(self.upload_folder, filename)
                     os.remove(file_path)
 
+            # O conteúdo em cache continua disponível para outras sessões
+            attachment_cache.remove_references(session_id)
+
             return True
 
         except Exception as e:
@@ -446,4 +558,4 @@ class AttachmentService:
             return False
 
 # Instância global do serviço
-attachment_service = AttachmentService()
\ No newline at end of file
+attachment_service = lazy_service(AttachmentService, 'attachment_service')
\ No newline at end of file
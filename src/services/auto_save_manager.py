@@ -6,16 +6,22 @@ Sistema de salvamento automático e imediato de todos os resultados
 """
 
 import os
-import json
 import time
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
 import uuid
+import contextvars
 from pathlib import Path
+from utils.lazy import lazy_service
+from utils.tracing import traced
+from utils.serialization import PRETTY_ON_DISK, dumps_bytes, dumps_with, dump_file, load_file
 
 logger = logging.getLogger(__name__)
 
+# Sessão corrente por requisição/thread (ou greenlet com gevent)
+_current_session: contextvars.ContextVar = contextvars.ContextVar('auto_save_session', default=None)
+
 class AutoSaveManager:
     """Gerenciador de salvamento automático ultra-robusto"""
     
@@ -41,15 +47,24 @@ class AutoSaveManager:
         for subdir in self.subdirs.values():
             subdir.mkdir(exist_ok=True)
         
-        self.session_id = None
-        self.analysis_id = None
-        
         logger.info(f"✅ Auto Save Manager inicializado: {self.base_dir}")
     
+    @property
+    def session_id(self) -> Optional[str]:
+        return (_current_session.get() or (None, None))[0]
+    
+    @property
+    def analysis_id(self) -> Optional[str]:
+        return (_current_session.get() or (None, None))[1]
+    
     def iniciar_sessao(self, session_id: str = None) -> str:
         """Inicia nova sessão de salvamento"""
-        self.session_id = session_id or f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-        self.analysis_id = f"analysis_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        current = (
+            session_id or f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}",
+            f"analysis_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        )
+        # Threads auxiliares recebem a sessão via utils.tracing.wrap_context
+        _current_session.set(current)
         
         # Cria diretório da sessão
         session_dir = self.base_dir / self.session_id
@@ -66,6 +81,7 @@ class AutoSaveManager:
         logger.info(f"🚀 Sessão iniciada: {self.session_id}")
         return self.session_id
     
+    @traced('salvar_etapa', category='storage')
     def salvar_etapa(
         self, 
         nome_etapa: str, 
@@ -95,29 +111,32 @@ class AutoSaveManager:
         filepath = save_dir / filename
         
         try:
+            # Dados codificados uma única vez: o tamanho vem dos bytes, não de str(dados)
+            dados_bytes = dumps_bytes(dados, PRETTY_ON_DISK)
+            
             # Prepara dados para salvamento
             save_data = {
                 "etapa": nome_etapa,
                 "status": status,
-                "dados": dados,
                 "timestamp": timestamp,
                 "timestamp_iso": datetime.fromtimestamp(timestamp).isoformat(),
                 "session_id": self.session_id,
                 "analysis_id": self.analysis_id,
                 "categoria": categoria,
-                "tamanho_dados": len(str(dados)) if dados else 0
+                "tamanho_dados": len(dados_bytes) if dados else 0
             }
+            encoded = dumps_with(save_data, "dados", dados_bytes, PRETTY_ON_DISK)
             
             # Salva arquivo JSON
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(save_data, f, ensure_ascii=False, indent=2, default=str)
+            with open(filepath, "wb") as f:
+                f.write(encoded)
             
             # Log de sucesso
             logger.info(f"💾 Etapa '{nome_etapa}' salva: {filepath}")
             
             # Salva também um backup compactado se dados grandes
-            if len(str(dados)) > 50000:  # > 50KB
-                self._salvar_backup_compactado(filepath, save_data)
+            if len(dados_bytes) > 50000:  # > 50KB
+                self._salvar_backup_compactado(filepath, encoded)
             
             return str(filepath)
             
@@ -179,8 +198,7 @@ class AutoSaveManager:
                 # Busca arquivos que começam com o nome da etapa
                 for filepath in session_dir.glob(f"{nome_etapa}_*.json"):
                     try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            data = json.load(f)
+                        data = load_file(filepath)
                         
                         if data.get("status") == "sucesso":
                             logger.info(f"📂 Etapa '{nome_etapa}' recuperada: {filepath}")
@@ -206,8 +224,7 @@ class AutoSaveManager:
             if session_dir.exists():
                 for filepath in session_dir.glob("*.json"):
                     try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            data = json.load(f)
+                        data = load_file(filepath)
                         
                         etapa = data.get("etapa", "unknown")
                         if etapa not in etapas_encontradas:
@@ -252,8 +269,7 @@ class AutoSaveManager:
             arquivo_mais_recente = max(arquivos, key=lambda x: x["timestamp"])
             
             try:
-                with open(arquivo_mais_recente["arquivo"], "r", encoding="utf-8") as f:
-                    dados_etapa = json.load(f)
+                dados_etapa = load_file(arquivo_mais_recente["arquivo"])
                 
                 relatorio_consolidado["etapas_processadas"][etapa_nome] = dados_etapa
                 
@@ -274,20 +290,19 @@ class AutoSaveManager:
         timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
         relatorio_path = self.subdirs["analise_completa"] / f"CONSOLIDADO_{session_id}_{timestamp_str}.json"
         
-        with open(relatorio_path, "w", encoding="utf-8") as f:
-            json.dump(relatorio_consolidado, f, ensure_ascii=False, indent=2, default=str)
+        dump_file(relatorio_consolidado, relatorio_path)
         
         logger.info(f"📋 Relatório consolidado salvo: {relatorio_path}")
         return str(relatorio_path)
     
-    def _salvar_backup_compactado(self, filepath: Path, data: Dict[str, Any]):
-        """Salva backup compactado para dados grandes"""
+    def _salvar_backup_compactado(self, filepath: Path, encoded: bytes):
+        """Salva backup compactado para dados grandes (reaproveita o JSON já codificado)"""
         try:
             import gzip
             
             backup_path = filepath.with_suffix('.json.gz')
-            with gzip.open(backup_path, 'wt', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            with gzip.open(backup_path, 'wb') as f:
+                f.write(encoded)
             
             logger.info(f"🗜️ Backup compactado salvo: {backup_path}")
             
@@ -323,7 +338,7 @@ class AutoSaveManager:
             logger.error(f"❌ Erro na limpeza de sessões antigas: {e}")
 
 # Instância global
-auto_save_manager = AutoSaveManager()
+auto_save_manager = lazy_service(AutoSaveManager, 'auto_save_manager')
 
 # Função de conveniência
 def salvar_etapa(nome_etapa: str, dados: Any, status: str = "sucesso", categoria: str = "geral") -> str:
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Chunked Upload
+Upload retomável em partes (init / put chunk / complete) gravado direto em disco
+"""
+
+import os
+import glob
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Optional
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+from utils.serialization import dumps, loads
+from utils.tracing import wrap_context
+
+logger = logging.getLogger(__name__)
+
+WRITE_BLOCK_SIZE = 256 * 1024
+
+class UploadError(Exception):
+    """Requisição de upload inválida (status HTTP sugerido em .status)"""
+    
+    def __init__(self, message: str, status: int = 400, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.status = status
+        self.details = details or {}
+
+class ChunkedUploadManager:
+    """Estado dos uploads no SQLite, partes anexadas em sequência a um arquivo .part"""
+    
+    def __init__(self):
+        """Inicializa diretório das partes, tabela de uploads e limites"""
+        self.db = database_fallback
+        self.upload_dir = os.path.join(os.getenv('UPLOAD_DIR') or os.path.join(os.path.dirname(__file__), '..', 'uploads'), 'chunks')
+        self.max_size = int(float(os.getenv('UPLOAD_MAX_SIZE_MB', 200)) * 1024 * 1024)
+        self.chunk_size = int(float(os.getenv('UPLOAD_CHUNK_SIZE_MB', 4)) * 1024 * 1024)
+        self.expiry = float(os.getenv('UPLOAD_EXPIRY_HOURS', 24)) * 3600
+        self.workers = int(os.getenv('UPLOAD_PROCESS_WORKERS', 2))
+        self.processing_timeout = float(os.getenv('UPLOAD_PROCESSING_TIMEOUT_SECONDS', 1800))
+        
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._ensure_table()
+        
+        logger.info(f"✅ Chunked Upload inicializado (partes de {self.chunk_size // (1024 * 1024)}MB)")
+    
+    def _ensure_table(self):
+        """Cria tabela de uploads se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS chunked_uploads (
+                    id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    mime_type TEXT NOT NULL,
+                    total_size INTEGER NOT NULL,
+                    received_bytes INTEGER NOT NULL DEFAULT 0,
+                    expected_sha256 TEXT,
+                    content_hash TEXT,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+    
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{upload_id}.part")
+    
+    def _staging_path(self, upload_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{upload_id}.{uuid.uuid4().hex}.chunk")
+    
+    def _to_public(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'upload_id': row['id'],
+            'session_id': row['session_id'],
+            'filename': row['filename'],
+            'mime_type': row['mime_type'],
+            'status': row['status'],
+            'total_size': row['total_size'],
+            'received_bytes': row['received_bytes'],
+            'chunk_size': self.chunk_size,
+            'progress': round(row['received_bytes'] / row['total_size'] * 100, 1) if row['total_size'] else 100.0,
+            'content_hash': row['content_hash'],
+            'result': loads(row['result']) if row['result'] else None,
+            'error': row['error']
+        }
+    
+    def _get_row(self, upload_id: str) -> Dict[str, Any]:
+        with self.db._connection() as conn:
+            row = conn.execute('SELECT * FROM chunked_uploads WHERE id = ?', (upload_id,)).fetchone()
+        if not row:
+            raise UploadError('Upload não encontrado', 404)
+        return dict(row)
+    
+    def _update(self, upload_id: str, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self.db._connection() as conn:
+            conn.execute(
+                f'UPDATE chunked_uploads SET {assignments} WHERE id = ?',
+                (*fields.values(), upload_id)
+            )
+    
+    # ------------------------------------------------------------------
+    # Protocolo
+    # ------------------------------------------------------------------
+    
+    def init(self, session_id: str, filename: str, mime_type: str, total_size: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Abre um upload; o cliente envia as partes em sequência a partir de received_bytes"""
+        if total_size <= 0 or total_size > self.max_size:
+            raise UploadError(f'Tamanho inválido: máximo de {self.max_size // (1024 * 1024)}MB', 413)
+        
+        self.cleanup_expired()
+        self.recover_stale()
+        
+        upload_id = uuid.uuid4().hex
+        now = time.time()
+        
+        open(self._part_path(upload_id), 'wb').close()
+        
+        with self.db._connection() as conn:
+            conn.execute('''
+                INSERT INTO chunked_uploads (
+                    id, session_id, filename, mime_type, total_size,
+                    expected_sha256, status, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, 'uploading', ?, ?)
+            ''', (upload_id, session_id, filename, mime_type, total_size, (sha256 or '').lower() or None, now, now))
+        
+        logger.info(f"📤 Upload {upload_id[:12]} iniciado: {filename} ({total_size} bytes)")
+        return self.get_status(upload_id)
+    
+    def put_chunk(self, upload_id: str, offset: int, stream: BinaryIO, chunk_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Recebe a parte em arquivo temporário e a anexa com compare-and-set do offset; conflito retorna 409"""
+        row = self._get_row(upload_id)
+        
+        if row['status'] != 'uploading':
+            raise UploadError(f"Upload não aceita partes (status: {row['status']})", 409, self._to_public(row))
+        
+        if offset != row['received_bytes']:
+            # Retomada: o cliente reenvia a partir de received_bytes
+            raise UploadError('Offset fora de sequência', 409, self._to_public(row))
+        
+        staging_path = self._staging_path(upload_id)
+        digest = hashlib.sha256()
+        written = 0
+        
+        try:
+            with open(staging_path, 'wb') as f:
+                while True:
+                    block = stream.read(WRITE_BLOCK_SIZE)
+                    if not block:
+                        break
+                    written += len(block)
+                    if offset + written > row['total_size']:
+                        raise UploadError('Parte excede o tamanho declarado', 413)
+                    digest.update(block)
+                    f.write(block)
+            
+            if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                raise UploadError('Checksum da parte não confere', 422)
+            
+            received = offset + written
+            
+            with self.db._connection() as conn:
+                # BEGIN IMMEDIATE serializa a gravação entre requisições concorrentes do mesmo upload
+                conn.execute('BEGIN IMMEDIATE')
+                claimed = conn.execute('''
+                    UPDATE chunked_uploads SET received_bytes = ?, updated_at = ?
+                    WHERE id = ? AND received_bytes = ? AND status = 'uploading'
+                ''', (received, time.time(), upload_id, offset)).rowcount
+                
+                if not claimed:
+                    # Outra requisição gravou este offset primeiro: o arquivo .part não é tocado
+                    current = conn.execute('SELECT * FROM chunked_uploads WHERE id = ?', (upload_id,)).fetchone()
+                    raise UploadError('Offset fora de sequência', 409, self._to_public(dict(current)) if current else {})
+                
+                # Anexa ainda com o lock do banco; se falhar, o rollback mantém received_bytes = offset
+                with open(staging_path, 'rb') as src, open(self._part_path(upload_id), 'r+b') as dst:
+                    dst.seek(offset)
+                    shutil.copyfileobj(src, dst, WRITE_BLOCK_SIZE)
+                    dst.truncate(received)
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+        
+        if received == row['total_size']:
+            return self.complete(upload_id)
+        
+        return self.get_status(upload_id)
+    
+    def complete(self, upload_id: str) -> Dict[str, Any]:
+        """Confere tamanho e checksum e agenda a extração em background (idempotente)"""
+        row = self._get_row(upload_id)
+        
+        if row['status'] != 'uploading':
+            return self._to_public(row)
+        
+        if row['received_bytes'] != row['total_size']:
+            raise UploadError('Upload incompleto', 409, self._to_public(row))
+        
+        # Transição atômica: apenas uma requisição agenda o processamento
+        with self.db._connection() as conn:
+            claimed = conn.execute('''
+                UPDATE chunked_uploads SET status = 'verifying', updated_at = ?
+                WHERE id = ? AND status = 'uploading'
+            ''', (time.time(), upload_id)).rowcount
+        if not claimed:
+            return self.get_status(upload_id)
+        
+        content_hash = self._file_sha256(self._part_path(upload_id))
+        
+        if row['expected_sha256'] and content_hash != row['expected_sha256']:
+            self._update(upload_id, status='failed', content_hash=content_hash, error='Checksum do arquivo não confere')
+            os.remove(self._part_path(upload_id))
+            raise UploadError('Checksum do arquivo não confere', 422, {'content_hash': content_hash})
+        
+        self._update(upload_id, status='processing', content_hash=content_hash)
+        self._get_executor().submit(wrap_context(self._process), upload_id)
+        
+        logger.info(f"✅ Upload {upload_id[:12]} concluído ({content_hash[:12]}): extração agendada")
+        return self.get_status(upload_id)
+    
+    def get_status(self, upload_id: str) -> Dict[str, Any]:
+        return self._to_public(self._get_row(upload_id))
+    
+    # ------------------------------------------------------------------
+    # Processamento
+    # ------------------------------------------------------------------
+    
+    def _file_sha256(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Pool criado sob demanda em cada processo (threads não sobrevivem ao fork)"""
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='upload')
+                self._executor_pid = os.getpid()
+            return self._executor
+    
+    def _process(self, upload_id: str):
+        """Extrai o conteúdo do arquivo completo pelo mesmo caminho dos uploads simples"""
+        from services.attachment_service import attachment_service
+        
+        row = self._get_row(upload_id)
+        path = self._part_path(upload_id)
+        
+        try:
+            result = attachment_service.process_saved_file(
+                path, row['filename'], row['mime_type'], row['session_id'], row['content_hash'], row['total_size']
+            )
+            
+            # Conteúdo completo fica no cache de anexos; o status guarda apenas o resumo
+            result.pop('full_content', None)
+            status = 'completed' if result.get('success') else 'failed'
+            self._update(upload_id, status=status, result=dumps(result), error=result.get('error'))
+            
+            logger.info(f"📎 Upload {upload_id[:12]} processado: {status}")
+        
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar upload {upload_id[:12]}: {e}")
+            self._update(upload_id, status='failed', error=str(e))
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def recover_stale(self) -> int:
+        """Retoma uploads presos em verificação/processamento (worker reiniciado no meio da extração)"""
+        now = time.time()
+        
+        with self.db._connection() as conn:
+            # BEGIN IMMEDIATE + updated_at renovado: apenas um processo retoma cada upload
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('''
+                SELECT id, status FROM chunked_uploads
+                WHERE status IN ('verifying', 'processing') AND updated_at < ?
+            ''', (now - self.processing_timeout,)).fetchall()
+            conn.executemany(
+                'UPDATE chunked_uploads SET updated_at = ? WHERE id = ?',
+                [(now, row['id']) for row in rows]
+            )
+        
+        for row in rows:
+            upload_id = row['id']
+            
+            if not os.path.exists(self._part_path(upload_id)):
+                self._update(upload_id, status='failed', error='Arquivo do upload não encontrado')
+                continue
+            
+            if row['status'] == 'processing':
+                self._get_executor().submit(wrap_context(self._process), upload_id)
+                continue
+            
+            # Verificação interrompida: volta para 'uploading' e confere de novo
+            self._update(upload_id, status='uploading')
+            try:
+                self.complete(upload_id)
+            except UploadError as e:
+                logger.warning(f"⚠️ Upload {upload_id[:12]} não pôde ser retomado: {e}")
+        
+        if rows:
+            logger.warning(f"♻️ {len(rows)} uploads parados em processamento retomados")
+        return len(rows)
+    
+    def cleanup_expired(self) -> int:
+        """Remove uploads abandonados (partes em disco e registros)"""
+        cutoff = time.time() - self.expiry
+        
+        with self.db._connection() as conn:
+            rows = conn.execute(
+                'SELECT id FROM chunked_uploads WHERE updated_at < ?', (cutoff,)
+            ).fetchall()
+            conn.execute('DELETE FROM chunked_uploads WHERE updated_at < ?', (cutoff,))
+        
+        for row in rows:
+            # Parte principal e temporários de requisições interrompidas
+            for path in [self._part_path(row['id']), *glob.glob(os.path.join(self.upload_dir, f"{row['id']}.*.chunk"))]:
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        if rows:
+            logger.info(f"🧹 {len(rows)} uploads expirados removidos")
+        return len(rows)
+
+# Instância global
+chunked_upload_manager = lazy_service(ChunkedUploadManager, 'chunked_upload_manager')
@@ -11,6 +11,7 @@ import json
 from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -851,4 +852,4 @@ RETORNE APENAS JSON VÁLIDO:
         }
 
 # Instância global
-complete_anti_objection_system = CompleteAntiObjectionSystem()
\ No newline at end of file
+complete_anti_objection_system = lazy_service(CompleteAntiObjectionSystem, 'complete_anti_objection_system')
\ No newline at end of file
@@ -11,6 +11,7 @@ import json
 from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -612,4 +613,4 @@ RETORNE APENAS JSON VÁLIDO:
         }
 
 # Instância global
-complete_drivers_architect = CompleteDriversArchitect()
\ No newline at end of file
+complete_drivers_architect = lazy_service(CompleteDriversArchitect, 'complete_drivers_architect')
\ No newline at end of file
@@ -11,6 +11,7 @@ import json
 from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -760,4 +761,4 @@ RETORNE APENAS JSON VÁLIDO:
         }
 
 # Instância global
-complete_pre_pitch_architect = CompletePrePitchArchitect()
\ No newline at end of file
+complete_pre_pitch_architect = lazy_service(CompletePrePitchArchitect, 'complete_pre_pitch_architect')
\ No newline at end of file
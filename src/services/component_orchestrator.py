@@ -10,6 +10,7 @@ import time
 import json
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -289,4 +290,4 @@ class ComponentOrchestrator:
         logger.info("🔄 Orquestrador resetado")
 
 # Instância global
-component_orchestrator = ComponentOrchestrator()
\ No newline at end of file
+component_orchestrator = lazy_service(ComponentOrchestrator, 'component_orchestrator')
\ No newline at end of file
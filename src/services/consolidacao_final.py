@@ -13,6 +13,8 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from services.report_document import report_document_builder, CONSOLIDATION_SECTIONS
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -455,13 +457,16 @@ class ConsolidacaoFinal:
         return arquivos
     
     def _gerar_multiplos_formatos(self, relatorio: Dict[str, Any], session_id: str) -> Dict[str, str]:
-        """Gera relatório em múltiplos formatos"""
+        """Gera relatório em múltiplos formatos a partir de um único documento por seção"""
         
         formatos_gerados = {}
         
+        # Modelo intermediário construído uma vez; seções inalteradas (ex.: já usadas pelo PDF) vêm do cache
+        document = report_document_builder.build(relatorio, CONSOLIDATION_SECTIONS, title='Relatório de Análise Ultra-Detalhada')
+        
         for formato, gerador in self.template_engines.items():
             try:
-                conteudo = gerador(relatorio, session_id)
+                conteudo = gerador(relatorio, session_id, document)
                 if conteudo:
                     # Salva arquivo do formato
                     arquivo_path = self._salvar_formato(conteudo, formato, session_id)
@@ -473,7 +478,7 @@ class ConsolidacaoFinal:
         
         return formatos_gerados
     
-    def _generate_markdown_report(self, relatorio: Dict[str, Any], session_id: str) -> str:
+    def _generate_markdown_report(self, relatorio: Dict[str, Any], session_id: str, document: Dict[str, Any]) -> str:
         """Gera relatório em Markdown"""
         
         md_content = f"""# Relatório de Análise Ultra-Detalhada
@@ -483,46 +488,13 @@ class ConsolidacaoFinal:
 **Data:** {relatorio.get('timestamp', 'N/A')}  
 **Tipo:** {relatorio.get('tipo', 'N/A')}  
 
-### 📊 Resumo Executivo
+---
 
 """
         
-        if 'resumo_executivo' in relatorio:
-            resumo = relatorio['resumo_executivo']
-            md_content += f"**Segmento:** {resumo.get('segmento_analisado', 'N/A')}  \n"
-            md_content += f"**Produto/Serviço:** {resumo.get('produto_servico', 'N/A')}  \n"
-            md_content += f"**Qualidade:** {resumo.get('qualidade_analise', 0):.1f}%  \n"
-            md_content += f"**Componentes:** {resumo.get('componentes_gerados', 0)}  \n\n"
-        
-        # Adiciona seções principais
-        if 'drivers_mentais_customizados' in relatorio:
-            md_content += "### 🧠 Drivers Mentais Customizados\n\n"
-            drivers = relatorio['drivers_mentais_customizados']
-            if isinstance(drivers, dict) and 'drivers_customizados' in drivers:
-                for i, driver in enumerate(drivers['drivers_customizados'], 1):
-                    md_content += f"#### Driver {i}: {driver.get('nome', 'N/A')}\n"
-                    md_content += f"**Gatilho:** {driver.get('gatilho_central', 'N/A')}  \n"
-                    md_content += f"**História:** {driver.get('roteiro_ativacao', {}).get('historia_analogia', 'N/A')}  \n\n"
-        
-        if 'insights_exclusivos' in relatorio:
-            md_content += "### 💡 Insights Exclusivos\n\n"
-            insights = relatorio['insights_exclusivos']
-            if isinstance(insights, list):
-                for i, insight in enumerate(insights, 1):
-                    md_content += f"{i}. {insight}\n"
-            md_content += "\n"
-        
-        # Adiciona diagnóstico
-        if 'diagnostico_final' in relatorio:
-            diagnostico = relatorio['diagnostico_final']
-            md_content += "### 🎯 Diagnóstico Final\n\n"
-            md_content += f"**Status:** {diagnostico.get('status_geral', 'N/A')}  \n"
-            md_content += f"**Avaliação:** {diagnostico.get('avaliacao', 'N/A')}  \n"
-            md_content += f"**Recomendação:** {diagnostico.get('recomendacao', 'N/A')}  \n\n"
-        
-        return md_content
+        return md_content + report_document_builder.render_markdown(document)
     
-    def _generate_html_report(self, relatorio: Dict[str, Any], session_id: str) -> str:
+    def _generate_html_report(self, relatorio: Dict[str, Any], session_id: str, document: Dict[str, Any]) -> str:
         """Gera relatório em HTML"""
         
         html_content = f"""<!DOCTYPE html>
@@ -537,9 +509,9 @@ class ConsolidacaoFinal:
         h1 {{ color: #2c3e50; border-bottom: 3px solid #3498db; padding-bottom: 10px; }}
         h2 {{ color: #34495e; margin-top: 30px; }}
         .metric {{ background: #ecf0f1; padding: 15px; margin: 10px 0; border-radius: 5px; }}
-        .insight {{ background: #e8f5e8; padding: 10px; margin: 5px 0; border-left: 4px solid #27ae60; }}
-        .warning {{ background: #fdf2e9; padding: 10px; margin: 5px 0; border-left: 4px solid #f39c12; }}
-        .error {{ background: #fadbd8; padding: 10px; margin: 5px 0; border-left: 4px solid #e74c3c; }}
+        table {{ border-collapse: collapse; margin: 10px 0; }}
+        th, td {{ border: 1px solid #bdc3c7; padding: 6px 10px; text-align: left; }}
+        th {{ background: #ecf0f1; }}
     </style>
 </head>
 <body>
@@ -550,25 +522,7 @@ class ConsolidacaoFinal:
         <p><strong>Tipo:</strong> {relatorio.get('tipo', 'N/A')}</p>
 """
         
-        # Adiciona conteúdo baseado nos dados disponíveis
-        if 'resumo_executivo' in relatorio:
-            resumo = relatorio['resumo_executivo']
-            html_content += f"""
-        <h2>📋 Resumo Executivo</h2>
-        <div class="metric">
-            <strong>Segmento:</strong> {resumo.get('segmento_analisado', 'N/A')}<br>
-            <strong>Produto/Serviço:</strong> {resumo.get('produto_servico', 'N/A')}<br>
-            <strong>Qualidade:</strong> {resumo.get('qualidade_analise', 0):.1f}%<br>
-            <strong>Componentes:</strong> {resumo.get('componentes_gerados', 0)}
-        </div>
-"""
-        
-        if 'insights_exclusivos' in relatorio:
-            html_content += "<h2>💡 Insights Exclusivos</h2>"
-            insights = relatorio['insights_exclusivos']
-            if isinstance(insights, list):
-                for insight in insights:
-                    html_content += f'<div class="insight">{insight}</div>'
+        html_content += report_document_builder.render_html(document)
         
         html_content += """
     </div>
@@ -577,10 +531,15 @@ class ConsolidacaoFinal:
         
         return html_content
     
-    def _generate_json_report(self, relatorio: Dict[str, Any], session_id: str) -> str:
-        """Gera relatório em JSON"""
+    def _generate_json_report(self, relatorio: Dict[str, Any], session_id: str, document: Dict[str, Any]) -> str:
+        """Gera relatório em JSON (documento por seção; o relatório bruto fica em relatorio_final_consolidado)"""
         try:
-            return json.dumps(relatorio, ensure_ascii=False, indent=2)
+            return report_document_builder.render_json(
+                document,
+                session_id=session_id,
+                timestamp=relatorio.get('timestamp'),
+                tipo=relatorio.get('tipo')
+            )
         except Exception as e:
             logger.error(f"❌ Erro ao gerar JSON: {e}")
             return json.dumps({
@@ -589,8 +548,8 @@ class ConsolidacaoFinal:
                 'timestamp': datetime.now().isoformat()
             }, ensure_ascii=False, indent=2)
     
-    def _generate_minimal_report(self, relatorio: Dict[str, Any], session_id: str) -> str:
-        """Gera relatório mínimo em texto"""
+    def _generate_minimal_report(self, relatorio: Dict[str, Any], session_id: str, document: Dict[str, Any]) -> str:
+        """Gera relatório mínimo em texto (apenas status; não usa as seções do documento)"""
         
         content = f"""RELATÓRIO MÍNIMO - ARQV30 Enhanced v2.0
 ========================================
@@ -699,4 +658,4 @@ GARANTIA:
             }
 
 # Instância global
-consolidacao_final = ConsolidacaoFinal()
\ No newline at end of file
+consolidacao_final = lazy_service(ConsolidacaoFinal, 'consolidacao_final')
\ No newline at end of file
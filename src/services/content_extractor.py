@@ -13,6 +13,7 @@ from typing import Optional, Dict, Any
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import re
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -383,4 +384,4 @@ class ContentExtractor:
             return []
 
 # Instância global
-content_extractor = ContentExtractor()
+content_extractor = lazy_service(ContentExtractor, 'content_extractor')
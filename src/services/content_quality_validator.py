@@ -9,6 +9,7 @@ import logging
 import re
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -430,4 +431,4 @@ class ContentQualityValidator:
         return '\n'.join(report)
 
 # Instância global
-content_quality_validator = ContentQualityValidator()
\ No newline at end of file
+content_quality_validator = lazy_service(ContentQualityValidator, 'content_quality_validator')
\ No newline at end of file
@@ -8,26 +8,86 @@ Sistema de fallback para banco de dados quando PostgreSQL não está disponível
 import os
 import logging
 import sqlite3
-import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+from utils.pagination import SUMMARY_FIELDS, decode_cursor, parse_fields
+from utils.lazy import lazy_service
+from utils.serialization import dumps
 
 logger = logging.getLogger(__name__)
 
+# Tempo máximo (ms) que uma conexão espera por um lock antes de falhar
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 30000))
+
+# Colunas que podem ser projetadas nas consultas de análises
+ANALYSIS_COLUMNS = [
+    'id', 'segmento', 'produto', 'publico', 'preco', 'objetivo_receita',
+    'orcamento_marketing', 'prazo_lancamento', 'concorrentes', 'dados_adicionais',
+    'query_text', 'status', 'comprehensive_analysis', 'local_files_path',
+    'created_at', 'updated_at'
+]
+
 class DatabaseFallback:
     """Sistema de fallback usando SQLite quando PostgreSQL não está disponível"""
     
     def __init__(self):
         """Inicializa fallback com SQLite"""
-        self.db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'arqv30.db')
+        self.db_path = os.getenv('SQLITE_DB_PATH') or os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'arqv30.db')
+        self._local = threading.local()
         self.ensure_database_exists()
         logger.info(f"✅ Database Fallback inicializado: {self.db_path}")
     
+    def _get_connection(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual (uma por thread e por processo)"""
+        conn = getattr(self._local, 'conn', None)
+        
+        # Conexões herdadas via fork não podem ser reutilizadas pelo filho
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            return conn
+        
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """Fornece a conexão da thread com commit/rollback automáticos"""
+        conn = self._get_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def close_connection(self):
+        """Fecha a conexão da thread atual, se existir"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            try:
+                conn.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao fechar conexão SQLite: {e}")
+        self._local.conn = None
+        self._local.pid = None
+    
     def ensure_database_exists(self):
         """Garante que o banco SQLite existe"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS analyses (
                     id TEXT PRIMARY KEY,
@@ -63,13 +123,17 @@ class DatabaseFallback:
                 )
             ''')
             
-            conn.commit()
+            # O índice composto cobre as consultas por created_at; remove o antigo de coluna única
+            conn.execute('DROP INDEX IF EXISTS idx_analyses_created_at')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_created_at_id ON analyses (created_at DESC, id DESC)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_segmento ON analyses (segmento)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_updated_at ON analyses (updated_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_files_analysis_id ON analysis_files (analysis_id)')
     
     def test_connection(self) -> bool:
         """Testa conexão com SQLite"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('SELECT 1')
+            self._get_connection().execute('SELECT 1')
             return True
         except Exception as e:
             logger.error(f"❌ Erro na conexão SQLite: {e}")
@@ -80,7 +144,7 @@ class DatabaseFallback:
         try:
             analysis_id = f"analysis_{int(datetime.now().timestamp())}_{os.urandom(4).hex()}"
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 conn.execute('''
                     INSERT INTO analyses (
                         id, segmento, produto, publico, preco, objetivo_receita,
@@ -101,13 +165,11 @@ class DatabaseFallback:
                     analysis_data.get('dados_adicionais', ''),
                     analysis_data.get('query', ''),
                     analysis_data.get('status', 'completed'),
-                    json.dumps(analysis_data, ensure_ascii=False),
+                    dumps(analysis_data),
                     analysis_data.get('local_files_path'),
                     datetime.now().isoformat(),
                     datetime.now().isoformat()
                 ))
-                
-                conn.commit()
             
             logger.info(f"✅ Análise criada no SQLite: {analysis_id}")
             return {'id': analysis_id, **analysis_data}
@@ -116,12 +178,15 @@ class DatabaseFallback:
             logger.error(f"❌ Erro ao criar análise no SQLite: {e}")
             return None
     
-    def get_analysis(self, analysis_id: str) -> Optional[Dict[str, Any]]:
-        """Busca análise por ID"""
+    def get_analysis(self, analysis_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Busca análise por ID, opcionalmente apenas com os campos informados"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute('SELECT * FROM analyses WHERE id = ?', (analysis_id,))
+            columns = parse_fields(fields, ANALYSIS_COLUMNS) or ['*']
+            
+            with self._connection() as conn:
+                cursor = conn.execute(
+                    f'SELECT {", ".join(columns)} FROM analyses WHERE id = ?', (analysis_id,)
+                )
                 row = cursor.fetchone()
                 
                 if row:
@@ -132,24 +197,54 @@ class DatabaseFallback:
             logger.error(f"❌ Erro ao buscar análise {analysis_id}: {e}")
             return None
     
-    def list_analyses(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Lista análises com paginação"""
+    def list_analyses(
+        self, 
+        limit: int = 50, 
+        offset: int = 0, 
+        cursor: Optional[str] = None, 
+        fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Lista análises com paginação por cursor (created_at, id) ou offset"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute('''
-                    SELECT id, segmento, produto, status, created_at, updated_at, local_files_path
-                    FROM analyses 
-                    ORDER BY created_at DESC 
-                    LIMIT ? OFFSET ?
-                ''', (limit, offset))
-                
-                return [dict(row) for row in cursor.fetchall()]
+            columns = parse_fields(fields, ANALYSIS_COLUMNS) or SUMMARY_FIELDS
+            position = decode_cursor(cursor)
+            
+            query = f'SELECT {", ".join(columns)} FROM analyses'
+            params: List[Any] = []
+            
+            if position:
+                # Paginação por chave: usa o índice e não percorre linhas já vistas
+                query += ' WHERE (created_at < ? OR (created_at = ? AND id < ?))'
+                params.extend([position[0], position[0], position[1]])
+            
+            query += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+            params.append(limit)
+            
+            if offset and not position:
+                query += ' OFFSET ?'
+                params.append(offset)
+            
+            with self._connection() as conn:
+                return [dict(row) for row in conn.execute(query, params).fetchall()]
                 
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"❌ Erro ao listar análises: {e}")
             return []
     
+    def get_listing_version(self) -> Optional[Dict[str, Any]]:
+        """Versão da listagem (total e último updated_at) sem carregar as linhas"""
+        try:
+            with self._connection() as conn:
+                total, last_updated = conn.execute(
+                    'SELECT COUNT(*), MAX(updated_at) FROM analyses'
+                ).fetchone()
+            return {'count': total, 'updated_at': last_updated}
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter versão da listagem: {e}")
+            return None
+    
     def update_analysis(self, analysis_id: str, update_data: Dict[str, Any]) -> bool:
         """Atualiza análise existente"""
         try:
@@ -160,14 +255,12 @@ class DatabaseFallback:
             placeholders = ', '.join([f'{field} = ?' for field in fields])
             values = list(update_data.values()) + [analysis_id]
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 conn.execute(f'''
                     UPDATE analyses 
                     SET {placeholders}
                     WHERE id = ?
                 ''', values)
-                
-                conn.commit()
             
             logger.info(f"✅ Análise {analysis_id} atualizada no SQLite")
             return True
@@ -179,10 +272,9 @@ class DatabaseFallback:
     def delete_analysis(self, analysis_id: str) -> bool:
         """Remove análise do banco"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 conn.execute('DELETE FROM analysis_files WHERE analysis_id = ?', (analysis_id,))
                 conn.execute('DELETE FROM analyses WHERE id = ?', (analysis_id,))
-                conn.commit()
             
             logger.info(f"✅ Análise {analysis_id} removida do SQLite")
             return True
@@ -191,42 +283,90 @@ class DatabaseFallback:
             logger.error(f"❌ Erro ao remover análise {analysis_id}: {e}")
             return False
     
+    def _insert_analysis_files(
+        self,
+        conn: sqlite3.Connection,
+        analysis_id: str,
+        files: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Insere registros de arquivos com uma única instrução preparada"""
+        now = datetime.now().isoformat()
+        rows = []
+        saved = []
+        
+        for file_data in files:
+            file_id = f"file_{int(datetime.now().timestamp())}_{os.urandom(4).hex()}"
+            rows.append((
+                file_id,
+                analysis_id,
+                file_data.get('file_type'),
+                file_data.get('file_name'),
+                file_data.get('file_path'),
+                file_data.get('file_size', 0),
+                file_data.get('content_preview', ''),
+                now
+            ))
+            saved.append({'id': file_id, **file_data})
+        
+        conn.executemany('''
+            INSERT INTO analysis_files (
+                id, analysis_id, file_type, file_name, file_path,
+                file_size, content_preview, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        
+        return saved
+    
     def save_analysis_file(self, analysis_id: str, file_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Salva informações de arquivo de análise"""
         try:
-            file_id = f"file_{int(datetime.now().timestamp())}_{os.urandom(4).hex()}"
-            
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    INSERT INTO analysis_files (
-                        id, analysis_id, file_type, file_name, file_path,
-                        file_size, content_preview, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    file_id,
-                    analysis_id,
-                    file_data.get('file_type'),
-                    file_data.get('file_name'),
-                    file_data.get('file_path'),
-                    file_data.get('file_size', 0),
-                    file_data.get('content_preview', ''),
-                    datetime.now().isoformat()
-                ))
-                
-                conn.commit()
+            with self._connection() as conn:
+                saved = self._insert_analysis_files(conn, analysis_id, [file_data])
             
             logger.info(f"✅ Arquivo de análise salvo no SQLite: {file_data.get('file_name')}")
-            return {'id': file_id, **file_data}
+            return saved[0]
             
         except Exception as e:
             logger.error(f"❌ Erro ao salvar arquivo de análise: {e}")
             return None
     
+    def save_analysis_files(self, analysis_id: str, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Salva vários registros de arquivos em uma única transação"""
+        results = []
+        
+        try:
+            with self._connection() as conn:
+                saved = self._insert_analysis_files(conn, analysis_id, files)
+            results = [
+                {'file_name': row.get('file_name'), 'status': 'saved', 'id': row['id']}
+                for row in saved
+            ]
+            
+        except Exception as batch_error:
+            # Transação revertida: tenta linha a linha para isolar as falhas
+            logger.warning(f"⚠️ Inserção em lote falhou, tentando por arquivo: {batch_error}")
+            for file_data in files:
+                try:
+                    with self._connection() as conn:
+                        row = self._insert_analysis_files(conn, analysis_id, [file_data])[0]
+                    results.append({'file_name': file_data.get('file_name'), 'status': 'saved', 'id': row['id']})
+                except Exception as e:
+                    results.append({'file_name': file_data.get('file_name'), 'status': 'failed', 'error': str(e)})
+        
+        saved_count = len([r for r in results if r['status'] == 'saved'])
+        logger.info(f"✅ {saved_count}/{len(files)} arquivos de análise salvos no SQLite")
+        
+        return {
+            'success': saved_count == len(files),
+            'saved_count': saved_count,
+            'failed_count': len(files) - saved_count,
+            'results': results
+        }
+    
     def get_analysis_files(self, analysis_id: str) -> List[Dict[str, Any]]:
         """Busca arquivos de uma análise"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connection() as conn:
                 cursor = conn.execute('''
                     SELECT * FROM analysis_files 
                     WHERE analysis_id = ? 
@@ -242,7 +382,7 @@ class DatabaseFallback:
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do banco"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 # Total de análises
                 cursor = conn.execute('SELECT COUNT(*) FROM analyses')
                 total_analyses = cursor.fetchone()[0]
@@ -278,4 +418,4 @@ class DatabaseFallback:
             }
 
 # Instância global de fallback
-database_fallback = DatabaseFallback()
\ No newline at end of file
+database_fallback = lazy_service(DatabaseFallback, 'database_fallback')
\ No newline at end of file
@@ -15,6 +15,7 @@ import json
 from datetime import datetime
 from bs4 import BeautifulSoup
 import re
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -678,4 +679,4 @@ IMPORTANTE: Esta é uma análise básica de emergência. Para dados REAIS comple
 """
 
 # Instância global do serviço REAL
-deep_search_service = DeepSearchService()
\ No newline at end of file
+deep_search_service = lazy_service(DeepSearchService, 'deep_search_service')
\ No newline at end of file
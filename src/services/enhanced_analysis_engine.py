@@ -17,6 +17,7 @@ from services.content_extractor import content_extractor
 from services.ultra_detailed_analysis_engine import ultra_detailed_analysis_engine
 from services.mental_drivers_architect import mental_drivers_architect
 from services.future_prediction_engine import future_prediction_engine
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -986,4 +987,4 @@ CRÍTICO: Use APENAS dados REAIS da pesquisa fornecida. NUNCA invente ou simule
         return backup_analysis
 
 # Instância global do motor
-enhanced_analysis_engine = EnhancedAnalysisEngine()
+enhanced_analysis_engine = lazy_service(EnhancedAnalysisEngine, 'enhanced_analysis_engine')
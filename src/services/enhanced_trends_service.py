@@ -13,12 +13,16 @@ import random
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import json
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
 class EnhancedTrendsService:
     """Serviço aprimorado de tendências com múltiplas fontes"""
     
+    # Clientes HTTP não são herdados: o processo filho recria o serviço sob demanda
+    reset_after_fork = True
+    
     def __init__(self):
         """Inicializa o serviço de tendências"""
         self.session = requests.Session()
@@ -432,4 +436,4 @@ class EnhancedTrendsService:
             logger.info("🔄 Reset erros de todas as fontes de tendências")
 
 # Instância global
-enhanced_trends_service = EnhancedTrendsService()
\ No newline at end of file
+enhanced_trends_service = lazy_service(EnhancedTrendsService, 'enhanced_trends_service')
\ No newline at end of file
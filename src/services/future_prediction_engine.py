@@ -10,6 +10,7 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import json
 import re
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -1011,4 +1012,4 @@ class FuturePredictionEngine:
         }
 
 # Instância global
-future_prediction_engine = FuturePredictionEngine()
\ No newline at end of file
+future_prediction_engine = lazy_service(FuturePredictionEngine, 'future_prediction_engine')
\ No newline at end of file
@@ -8,18 +8,20 @@ import os
 import logging
 import time
 from typing import Optional
+from utils.lazy import lazy_service, lazy_import, module_available
 
-try:
-    from groq import Groq
-    HAS_GROQ = True
-except ImportError:
-    HAS_GROQ = False
+# SDK importado apenas quando o cliente é criado
+HAS_GROQ = module_available('groq')
+groq = lazy_import('groq')
 
 logger = logging.getLogger(__name__)
 
 class GroqClient:
     """Cliente para gerar texto usando a API da Groq."""
 
+    # Clientes HTTP não são herdados: o processo filho recria o serviço sob demanda
+    reset_after_fork = True
+
     def __init__(self):
         """Inicializa o cliente Groq."""
         self.api_key = os.getenv('GROQ_API_KEY')
@@ -28,7 +30,7 @@ class GroqClient:
         
         if self.api_key and HAS_GROQ:
             try:
-                self.client = Groq(api_key=self.api_key)
+                self.client = groq.Groq(api_key=self.api_key)
                 self.available = True
                 logger.info("✅ Cliente Groq (llama3-70b-8192) inicializado com sucesso.")
             except Exception as e:
@@ -42,13 +44,14 @@ class GroqClient:
         """Verifica se o cliente está configurado e pronto para uso."""
         return self.available and self.client is not None
 
-    def generate(self, prompt: str, max_tokens: int = 8192) -> Optional[str]:
+    def generate(self, prompt: str, max_tokens: int = 8192, timeout: Optional[float] = None) -> Optional[str]:
         """
         Gera texto usando um modelo da Groq.
 
         Args:
             prompt (str): O prompt para a geração de texto.
             max_tokens (int): O número máximo de tokens a serem gerados.
+            timeout (Optional[float]): Timeout da requisição em segundos (padrão do cliente se None).
 
         Returns:
             Optional[str]: O texto gerado ou None em caso de falha.
@@ -69,6 +72,8 @@ class GroqClient:
                 model="llama3-70b-8192",
                 max_tokens=max_tokens,
                 temperature=0.4, # Temperatura um pouco mais baixa para consistência
+                # None desabilitaria o timeout no SDK: só repassa quando informado
+                **({'timeout': timeout} if timeout is not None else {})
             )
             response_text = chat_completion.choices[0].message.content
             processing_time = time.time() - start_time
@@ -79,4 +84,4 @@ class GroqClient:
             raise
 
 # Instância singleton
-groq_client = GroqClient()
+groq_client = lazy_service(GroqClient, 'groq_client')
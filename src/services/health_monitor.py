@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Health Monitor
+Self-test periódico em background; probes de readiness leem apenas o último resultado
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """Agenda o self-test (extração, IA, busca, banco) e guarda o resultado compartilhado"""
+    
+    def __init__(self):
+        """Inicializa tabela de resultados e configurações do agendador"""
+        self.db = database_fallback
+        self.interval = float(os.getenv('HEALTH_SELFTEST_INTERVAL', 300))
+        self.initial_delay = float(os.getenv('HEALTH_SELFTEST_INITIAL_DELAY', 5))
+        self.test_url = os.getenv('HEALTH_SELFTEST_URL', 'https://g1.globo.com/')
+        
+        self._thread = None
+        self._thread_pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        
+        self._ensure_table()
+        logger.info(f"✅ Health Monitor inicializado (self-test a cada {self.interval:.0f}s)")
+    
+    def _ensure_table(self):
+        """Cria tabela do self-test se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS health_selftest (
+                    name TEXT PRIMARY KEY,
+                    status TEXT,
+                    report TEXT,
+                    duration REAL,
+                    finished_at REAL,
+                    next_run_at REAL NOT NULL DEFAULT 0,
+                    claimed_by TEXT
+                )
+            ''')
+            conn.execute('''
+                INSERT OR IGNORE INTO health_selftest (name, next_run_at) VALUES ('self_test', 0)
+            ''')
+    
+    # ------------------------------------------------------------------
+    # Leitura (usada pela probe de readiness)
+    # ------------------------------------------------------------------
+    
+    def readiness(self) -> Dict[str, Any]:
+        """Último resultado do self-test, sem executar nenhuma verificação"""
+        self.ensure_scheduler()
+        
+        with self.db._connection() as conn:
+            row = conn.execute("SELECT * FROM health_selftest WHERE name = 'self_test'").fetchone()
+        
+        if not row or not row['finished_at']:
+            return {
+                'status': 'pending',
+                'message': 'Self-test ainda não executado',
+                'interval_seconds': self.interval
+            }
+        
+        age = time.time() - row['finished_at']
+        status = row['status']
+        
+        # Agendador parado em todos os processos: o resultado não representa mais o sistema
+        stale = age > self.interval * 3
+        if stale and status == 'healthy':
+            status = 'degraded'
+        
+        return {
+            'status': status,
+            'stale': stale,
+            'last_run_at': datetime.fromtimestamp(row['finished_at']).isoformat(),
+            'age_seconds': round(age, 1),
+            'duration_seconds': round(row['duration'] or 0, 2),
+            'interval_seconds': self.interval,
+            'checks': json.loads(row['report'] or '{}')
+        }
+    
+    # ------------------------------------------------------------------
+    # Agendador
+    # ------------------------------------------------------------------
+    
+    def _is_running(self) -> bool:
+        return (
+            self._thread is not None
+            and self._thread_pid == os.getpid()
+            and self._thread.is_alive()
+        )
+    
+    def ensure_scheduler(self):
+        """Inicia o agendador neste processo (threads não sobrevivem ao fork)"""
+        if self.interval <= 0 or self._is_running():
+            return
+        
+        with self._lock:
+            if self._is_running():
+                return
+            
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='health-selftest', daemon=True
+            )
+            self._thread_pid = os.getpid()
+            self._thread.start()
+            logger.info(f"🩺 Agendador do self-test iniciado (pid {self._thread_pid})")
+    
+    def stop_scheduler(self):
+        self._stop.set()
+    
+    def _run(self):
+        """Laço do agendador: todos os workers disputam a vez, só um executa por intervalo"""
+        self._stop.wait(self.initial_delay)
+        
+        while not self._stop.is_set():
+            try:
+                if self._claim():
+                    self.run_self_test()
+            except Exception as e:
+                logger.error(f"❌ Erro no agendador do self-test: {e}")
+            
+            self._stop.wait(min(self.interval, 30))
+    
+    def _claim(self) -> bool:
+        """Reserva a próxima execução para este processo"""
+        now = time.time()
+        worker = f"{os.getpid()}:{threading.get_ident()}"
+        
+        conn = self.db._get_connection()
+        try:
+            # BEGIN IMMEDIATE serializa a reserva entre workers do gunicorn
+            conn.execute('BEGIN IMMEDIATE')
+            claimed = conn.execute('''
+                UPDATE health_selftest
+                SET claimed_by = ?, next_run_at = ?
+                WHERE name = 'self_test' AND next_run_at <= ?
+            ''', (worker, now + self.interval, now)).rowcount
+            conn.execute('COMMIT')
+            return claimed > 0
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    
+    # ------------------------------------------------------------------
+    # Self-test
+    # ------------------------------------------------------------------
+    
+    def run_self_test(self) -> Dict[str, Any]:
+        """Executa as verificações caras e grava o resultado para as probes"""
+        started = time.time()
+        checks = {}
+        
+        checks['database'] = self._check(self._check_database)
+        checks['ai_providers'] = self._check(self._check_ai_providers)
+        checks['search_providers'] = self._check(self._check_search_providers)
+        checks['extraction'] = self._check(self._check_extraction)
+        
+        status = 'healthy'
+        if not checks['database']['ok'] or not checks['ai_providers']['ok'] or checks['extraction'].get('extractors_available') == 0:
+            status = 'critical'
+        elif not checks['extraction']['ok'] or not checks['search_providers']['ok']:
+            status = 'degraded'
+        
+        duration = time.time() - started
+        
+        with self.db._connection() as conn:
+            conn.execute('''
+                UPDATE health_selftest
+                SET status = ?, report = ?, duration = ?, finished_at = ?
+                WHERE name = 'self_test'
+            ''', (status, json.dumps(checks, ensure_ascii=False, default=str), duration, time.time()))
+        
+        log = logger.info if status == 'healthy' else logger.warning
+        log(f"🩺 Self-test concluído: {status} em {duration:.1f}s")
+        return {'status': status, 'checks': checks, 'duration': duration}
+    
+    def _check(self, func) -> Dict[str, Any]:
+        started = time.time()
+        try:
+            result = func()
+        except Exception as e:
+            result = {'ok': False, 'error': str(e)}
+        result['duration_seconds'] = round(time.time() - started, 2)
+        return result
+    
+    def _check_database(self) -> Dict[str, Any]:
+        with self.db._connection() as conn:
+            conn.execute('SELECT 1').fetchone()
+        return {'ok': True}
+    
+    def _check_ai_providers(self) -> Dict[str, Any]:
+        from services.ai_manager import ai_manager
+        status = ai_manager.get_provider_status()
+        available = sum(1 for provider in status.values() if provider.get('available', False))
+        return {'ok': available > 0, 'available': available, 'providers': status}
+    
+    def _check_search_providers(self) -> Dict[str, Any]:
+        from services.production_search_manager import production_search_manager
+        status = production_search_manager.get_provider_status()
+        enabled = sum(1 for provider in status.values() if provider.get('enabled', False))
+        return {'ok': enabled > 0, 'enabled': enabled}
+    
+    def _check_extraction(self) -> Dict[str, Any]:
+        from services.robust_content_extractor import robust_content_extractor
+        stats = robust_content_extractor.get_extractor_stats()
+        available = sum(1 for name, data in stats.items() if name != 'global' and data.get('available', False))
+        
+        if not self.test_url:
+            return {'ok': available >= 2, 'extractors_available': available, 'test_url': None}
+        
+        content = robust_content_extractor.extract_content(self.test_url)
+        return {
+            'ok': available >= 2 and content is not None and len(content) > 100,
+            'extractors_available': available,
+            'test_url': self.test_url,
+            'content_length': len(content) if content else 0
+        }
+
+# Instância global
+health_monitor = lazy_service(HealthMonitor, 'health_monitor')
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Local File Catalog
+Catálogo SQLite dos arquivos locais com contadores incrementais de armazenamento
+"""
+
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Any
+
+from services.database_fallback import database_fallback
+
+logger = logging.getLogger(__name__)
+
+class LocalFileCatalog:
+    """Mantém índice por idade e contadores por seção dos arquivos de análises"""
+    
+    def __init__(self, base_dir: str):
+        """Inicializa catálogo e faz a varredura inicial apenas uma vez"""
+        self.base_dir = self._normalize(base_dir)
+        self.db = database_fallback
+        self._ensure_tables()
+        
+        if not self.is_bootstrapped():
+            self.rebuild()
+    
+    def _normalize(self, path: str) -> str:
+        return os.path.normpath(os.path.abspath(path))
+    
+    def _section_of(self, path: str) -> str:
+        return os.path.basename(os.path.dirname(path))
+    
+    def _ensure_tables(self):
+        """Cria tabelas do catálogo se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS local_file_catalog (
+                    path TEXT PRIMARY KEY,
+                    section TEXT NOT NULL,
+                    analysis_key TEXT,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_local_file_catalog_mtime ON local_file_catalog (mtime)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_local_file_catalog_analysis ON local_file_catalog (analysis_key)')
+            
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS local_storage_counters (
+                    section TEXT PRIMARY KEY,
+                    files INTEGER NOT NULL DEFAULT 0,
+                    bytes INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS local_catalog_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+    
+    def is_bootstrapped(self) -> bool:
+        """Indica se a varredura inicial já foi feita"""
+        with self.db._connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM local_catalog_meta WHERE key = 'bootstrapped_at'"
+            ).fetchone()
+        return row is not None
+    
+    def _apply(self, conn, path: str, size: Optional[int], mtime: Optional[float] = None):
+        """Insere, atualiza (size informado) ou remove (size None) um arquivo e ajusta contadores"""
+        section = self._section_of(path)
+        previous = conn.execute(
+            'SELECT section, size FROM local_file_catalog WHERE path = ?', (path,)
+        ).fetchone()
+        
+        if previous:
+            conn.execute('''
+                UPDATE local_storage_counters
+                SET files = files - 1, bytes = bytes - ?
+                WHERE section = ?
+            ''', (previous['size'], previous['section']))
+            conn.execute('DELETE FROM local_file_catalog WHERE path = ?', (path,))
+        
+        if size is None:
+            return
+        
+        conn.execute('''
+            INSERT INTO local_file_catalog (path, section, analysis_key, size, mtime)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (path, section, os.path.basename(path)[:8], size, mtime or time.time()))
+        conn.execute('''
+            INSERT INTO local_storage_counters (section, files, bytes) VALUES (?, 1, ?)
+            ON CONFLICT(section) DO UPDATE SET files = files + 1, bytes = bytes + excluded.bytes
+        ''', (section, size))
+    
+    def record_files(self, paths: List[str]):
+        """Registra arquivos gravados (ou regravados) no diretório de análises"""
+        try:
+            with self.db._connection() as conn:
+                for path in paths:
+                    path = self._normalize(path)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    self._apply(conn, path, stat.st_size, stat.st_mtime)
+        except Exception as e:
+            logger.error(f"❌ Erro ao registrar arquivos no catálogo: {e}")
+    
+    def remove_files(self, paths: List[str]):
+        """Remove arquivos apagados do catálogo e dos contadores"""
+        try:
+            with self.db._connection() as conn:
+                for path in paths:
+                    self._apply(conn, self._normalize(path), None)
+        except Exception as e:
+            logger.error(f"❌ Erro ao remover arquivos do catálogo: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores persistidos, sem percorrer o disco"""
+        with self.db._connection() as conn:
+            sections = {
+                row['section']: {'files': row['files'], 'size_bytes': row['bytes']}
+                for row in conn.execute('SELECT section, files, bytes FROM local_storage_counters')
+            }
+            oldest = conn.execute('SELECT MIN(mtime) FROM local_file_catalog').fetchone()[0]
+        
+        return {
+            'total_files': sum(s['files'] for s in sections.values()),
+            'total_size_bytes': sum(s['size_bytes'] for s in sections.values()),
+            'sections': sections,
+            'oldest_mtime': oldest
+        }
+    
+    def files_older_than(self, cutoff_timestamp: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lista arquivos mais antigos que o corte, do mais antigo ao mais novo"""
+        query = '''
+            SELECT path, section, size, mtime FROM local_file_catalog
+            WHERE mtime < ?
+            ORDER BY mtime ASC
+        '''
+        params: List[Any] = [cutoff_timestamp]
+        
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        with self.db._connection() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+    
+    def files_for_analysis(self, analysis_id: str) -> List[Dict[str, Any]]:
+        """Arquivos de uma análise pelo índice analysis_key, do mais antigo ao mais novo"""
+        with self.db._connection() as conn:
+            return [dict(row) for row in conn.execute('''
+                SELECT path, section, size, mtime FROM local_file_catalog
+                WHERE analysis_key = ?
+                ORDER BY mtime ASC
+            ''', (analysis_id[:8],))]
+    
+    def rebuild(self) -> Dict[str, Any]:
+        """Reconstrói catálogo e contadores com uma varredura completa do disco"""
+        logger.info(f"🔄 Reconstruindo catálogo de arquivos locais: {self.base_dir}")
+        
+        entries = []
+        for root, dirs, files in os.walk(self.base_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, self._section_of(path), file[:8], stat.st_size, stat.st_mtime))
+        
+        with self.db._connection() as conn:
+            conn.execute('DELETE FROM local_file_catalog')
+            conn.execute('DELETE FROM local_storage_counters')
+            conn.executemany('''
+                INSERT INTO local_file_catalog (path, section, analysis_key, size, mtime)
+                VALUES (?, ?, ?, ?, ?)
+            ''', entries)
+            conn.execute('''
+                INSERT INTO local_storage_counters (section, files, bytes)
+                SELECT section, COUNT(*), SUM(size) FROM local_file_catalog GROUP BY section
+            ''')
+            conn.execute('''
+                INSERT OR REPLACE INTO local_catalog_meta (key, value) VALUES ('bootstrapped_at', ?)
+            ''', (str(time.time()),))
+        
+        logger.info(f"✅ Catálogo reconstruído: {len(entries)} arquivos")
+        return self.get_stats()
@@ -7,21 +7,42 @@ Gerenciador de arquivos locais para análises ultra-detalhadas
 
 import os
 import logging
-import json
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import uuid
+from services.local_file_catalog import LocalFileCatalog
+from utils.serialization import dump_file, load_file
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
 class LocalFileManager:
     """Gerenciador de arquivos locais para análises"""
     
+    # Seções gravadas em arquivo próprio: diretório -> chave na análise completa
+    SECTION_SOURCES = {
+        'avatars': 'avatar_ultra_detalhado',
+        'drivers_mentais': 'drivers_mentais_customizados',
+        'provas_visuais': 'provas_visuais_sugeridas',
+        'anti_objecao': 'sistema_anti_objecao',
+        'pre_pitch': 'pre_pitch_invisivel',
+        'predicoes_futuro': 'predicoes_futuro_completas',
+        'posicionamento': 'escopo_posicionamento',
+        'concorrencia': 'analise_concorrencia_detalhada',
+        'palavras_chave': 'estrategia_palavras_chave',
+        'metricas': 'metricas_performance_detalhadas',
+        'funil_vendas': 'funil_vendas_detalhado',
+        'plano_acao': 'plano_acao_detalhado',
+        'insights': 'insights_exclusivos',
+        'pesquisa_web': 'pesquisa_web_massiva'
+    }
+    
     def __init__(self):
         """Inicializa o gerenciador de arquivos locais"""
-        self.base_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'analyses_data')
+        self.base_dir = os.getenv('LOCAL_FILES_DIR') or os.path.join(os.path.dirname(__file__), '..', '..', 'analyses_data')
         self._ensure_directory_structure()
+        self.catalog = LocalFileCatalog(self.base_dir)
         
         logger.info(f"Local File Manager inicializado: {self.base_dir}")
     
@@ -54,20 +75,8 @@ class LocalFileManager:
             
             # Salva cada seção em arquivo separado
             sections_to_save = {
-                'avatars': analysis_data.get('avatar_ultra_detalhado'),
-                'drivers_mentais': analysis_data.get('drivers_mentais_customizados'),
-                'provas_visuais': analysis_data.get('provas_visuais_sugeridas'),
-                'anti_objecao': analysis_data.get('sistema_anti_objecao'),
-                'pre_pitch': analysis_data.get('pre_pitch_invisivel'),
-                'predicoes_futuro': analysis_data.get('predicoes_futuro_completas'),
-                'posicionamento': analysis_data.get('escopo_posicionamento'),
-                'concorrencia': analysis_data.get('analise_concorrencia_detalhada'),
-                'palavras_chave': analysis_data.get('estrategia_palavras_chave'),
-                'metricas': analysis_data.get('metricas_performance_detalhadas'),
-                'funil_vendas': analysis_data.get('funil_vendas_detalhado'),
-                'plano_acao': analysis_data.get('plano_acao_detalhado'),
-                'insights': analysis_data.get('insights_exclusivos'),
-                'pesquisa_web': analysis_data.get('pesquisa_web_massiva')
+                section_name: analysis_data.get(key)
+                for section_name, key in self.SECTION_SOURCES.items()
             }
             
             # Salva cada seção
@@ -104,6 +113,9 @@ class LocalFileManager:
                     'size': os.path.getsize(metadata_file_path)
                 })
             
+            # Atualiza contadores de armazenamento incrementalmente
+            self.catalog.record_files([f['path'] for f in saved_files])
+            
             logger.info(f"✅ Análise salva localmente: {len(saved_files)} arquivos")
             
             return {
@@ -135,8 +147,7 @@ class LocalFileManager:
             filename = f"{analysis_id[:8]}_{timestamp}_{section_name}.json"
             file_path = os.path.join(self.base_dir, section_name, filename)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(section_data, f, ensure_ascii=False, indent=2)
+            dump_file(section_data, file_path)
             
             return file_path
             
@@ -156,8 +167,7 @@ class LocalFileManager:
             filename = f"{analysis_id[:8]}_{timestamp}_completa.json"
             file_path = os.path.join(self.base_dir, 'completas', filename)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(analysis_data, f, ensure_ascii=False, indent=2)
+            dump_file(analysis_data, file_path)
             
             return file_path
             
@@ -195,8 +205,7 @@ class LocalFileManager:
             filename = f"{analysis_id[:8]}_{timestamp}_metadata.json"
             file_path = os.path.join(self.base_dir, 'metadata', filename)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            dump_file(metadata, file_path)
             
             return file_path
             
@@ -218,8 +227,7 @@ class LocalFileManager:
                 if filename.endswith('_metadata.json'):
                     file_path = os.path.join(metadata_dir, filename)
                     try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
+                        metadata = load_file(file_path)
                         
                         analyses.append({
                             'analysis_id': metadata.get('analysis_id'),
@@ -245,6 +253,16 @@ class LocalFileManager:
             logger.error(f"❌ Erro ao listar análises locais: {str(e)}")
             return []
     
+    def get_listing_version(self) -> Optional[str]:
+        """Versão da listagem local: o mtime do diretório de metadados muda a cada análise salva ou removida"""
+        
+        metadata_dir = os.path.join(self.base_dir, 'metadata')
+        try:
+            stat = os.stat(metadata_dir)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns:x}"
+    
     def get_analysis_directory(self, analysis_id: str) -> Optional[str]:
         """Obtém diretório de uma análise específica"""
         
@@ -256,23 +274,41 @@ class LocalFileManager:
         
         return None
     
+    def get_complete_analysis_path(self, analysis_id: str) -> Optional[str]:
+        """Arquivo JSON mais recente da análise completa (já serializado em disco)"""
+        
+        complete_dir = os.path.join(self.base_dir, 'completas')
+        if not os.path.isdir(complete_dir):
+            return None
+        
+        # Nome contém o timestamp após o ID: o maior é o mais recente
+        matches = [
+            filename for filename in os.listdir(complete_dir)
+            if filename.startswith(analysis_id[:8]) and filename.endswith('_completa.json')
+        ]
+        return os.path.join(complete_dir, max(matches)) if matches else None
+    
     def delete_local_analysis(self, analysis_id: str) -> bool:
-        """Remove análise local por ID"""
+        """Remove análise local por ID (arquivos localizados pelo catálogo)"""
         
         try:
             deleted_files = 0
-            
-            # Busca e remove todos os arquivos relacionados
-            for root, dirs, files in os.walk(self.base_dir):
-                for file in files:
-                    if analysis_id[:8] in file:
-                        file_path = os.path.join(root, file)
-                        try:
-                            os.remove(file_path)
-                            deleted_files += 1
-                            logger.info(f"🗑️ Arquivo removido: {file}")
-                        except Exception as e:
-                            logger.error(f"❌ Erro ao remover {file}: {str(e)}")
+            deleted_paths = []
+            
+            for entry in self.catalog.files_for_analysis(analysis_id):
+                file_path = entry['path']
+                try:
+                    os.remove(file_path)
+                    deleted_files += 1
+                    logger.info(f"🗑️ Arquivo removido: {os.path.basename(file_path)}")
+                except FileNotFoundError:
+                    pass  # Já removido: apenas sincroniza o catálogo
+                except Exception as e:
+                    logger.error(f"❌ Erro ao remover {os.path.basename(file_path)}: {str(e)}")
+                    continue
+                deleted_paths.append(file_path)
+            
+            self.catalog.remove_files(deleted_paths)
             
             if deleted_files > 0:
                 logger.info(f"✅ Análise {analysis_id} removida: {deleted_files} arquivos")
@@ -286,89 +322,99 @@ class LocalFileManager:
             return False
     
     def get_analysis_files(self, analysis_id: str) -> List[Dict[str, Any]]:
-        """Obtém lista de arquivos de uma análise"""
+        """Obtém lista de arquivos de uma análise (pelo catálogo, sem percorrer diretórios)"""
         
         try:
-            files = []
-            
-            for root, dirs, filenames in os.walk(self.base_dir):
-                for filename in filenames:
-                    if analysis_id[:8] in filename:
-                        file_path = os.path.join(root, filename)
-                        
-                        # Determina tipo baseado no diretório
-                        section_type = os.path.basename(root)
-                        
-                        files.append({
-                            'name': filename,
-                            'path': file_path,
-                            'type': section_type,
-                            'size': os.path.getsize(file_path),
-                            'modified': datetime.fromtimestamp(
-                                os.path.getmtime(file_path)
-                            ).isoformat()
-                        })
-            
-            return files
+            return [
+                {
+                    'name': os.path.basename(entry['path']),
+                    'path': entry['path'],
+                    'type': entry['section'],
+                    'size': entry['size'],
+                    'modified': datetime.fromtimestamp(entry['mtime']).isoformat()
+                }
+                for entry in self.catalog.files_for_analysis(analysis_id)
+            ]
             
         except Exception as e:
             logger.error(f"❌ Erro ao obter arquivos da análise {analysis_id}: {str(e)}")
             return []
     
+    def get_section_files(self, analysis_id: str) -> Dict[str, Dict[str, Any]]:
+        """Arquivo mais recente de cada seção da análise (seção -> path, size, mtime)"""
+        
+        sections = {}
+        for entry in self.catalog.files_for_analysis(analysis_id):
+            if entry['section'] in self.SECTION_SOURCES:
+                sections[entry['section']] = entry
+        
+        return sections
+    
+    def get_section_files_from_records(self, records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Arquivos de seção a partir dos registros analysis_files do banco (mais recentes primeiro)"""
+        
+        sections = {}
+        for record in records:
+            section, path = record.get('file_type'), record.get('file_path')
+            if section not in self.SECTION_SOURCES or section in sections or not path:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            sections[section] = {'path': path, 'section': section, 'size': stat.st_size, 'mtime': stat.st_mtime}
+        
+        return sections
+    
+    def resolve_section_name(self, name: str) -> Optional[str]:
+        """Aceita o diretório da seção ('pesquisa_web') ou a chave na análise ('pesquisa_web_massiva')"""
+        
+        if name in self.SECTION_SOURCES:
+            return name
+        
+        for section_name, key in self.SECTION_SOURCES.items():
+            if key == name:
+                return section_name
+        
+        return None
+    
+    @staticmethod
+    def file_etag(size: int, mtime: float) -> str:
+        """ETag de um arquivo de seção (gravado uma vez: tamanho + mtime em ms o identificam)"""
+        return f"{size:x}-{int(mtime * 1000):x}"
+    
     def load_analysis_section(self, analysis_id: str, section_name: str) -> Optional[Dict[str, Any]]:
         """Carrega uma seção específica da análise"""
         
         try:
-            section_dir = os.path.join(self.base_dir, section_name)
+            entry = self.get_section_files(analysis_id).get(self.resolve_section_name(section_name))
             
-            if not os.path.exists(section_dir):
+            if not entry:
                 return None
             
-            # Busca arquivo da seção
-            for filename in os.listdir(section_dir):
-                if analysis_id[:8] in filename and filename.endswith('.json'):
-                    file_path = os.path.join(section_dir, filename)
-                    
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-            
-            return None
+            return load_file(entry['path'])
             
         except Exception as e:
             logger.error(f"❌ Erro ao carregar seção {section_name} da análise {analysis_id}: {str(e)}")
             return None
     
     def get_storage_stats(self) -> Dict[str, Any]:
-        """Obtém estatísticas de armazenamento"""
+        """Obtém estatísticas de armazenamento a partir dos contadores do catálogo"""
         
         try:
+            catalog_stats = self.catalog.get_stats()
+            
             stats = {
                 'base_directory': self.base_dir,
-                'total_files': 0,
-                'total_size_bytes': 0,
-                'sections': {}
+                'total_files': catalog_stats['total_files'],
+                'total_size_bytes': catalog_stats['total_size_bytes'],
+                'sections': catalog_stats['sections'],
+                'oldest_file_mtime': (
+                    datetime.fromtimestamp(catalog_stats['oldest_mtime']).isoformat()
+                    if catalog_stats['oldest_mtime'] else None
+                )
             }
             
-            for root, dirs, files in os.walk(self.base_dir):
-                section_name = os.path.basename(root)
-                
-                if section_name not in stats['sections']:
-                    stats['sections'][section_name] = {
-                        'files': 0,
-                        'size_bytes': 0
-                    }
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_size = os.path.getsize(file_path)
-                        stats['total_files'] += 1
-                        stats['total_size_bytes'] += file_size
-                        stats['sections'][section_name]['files'] += 1
-                        stats['sections'][section_name]['size_bytes'] += file_size
-                    except:
-                        continue
-            
             # Converte bytes para MB
             stats['total_size_mb'] = round(stats['total_size_bytes'] / (1024 * 1024), 2)
             
@@ -380,6 +426,30 @@ class LocalFileManager:
         except Exception as e:
             logger.error(f"❌ Erro ao obter estatísticas: {str(e)}")
             return {}
+    
+    def cleanup_old_files(self, cutoff_timestamp: float, dry_run: bool = True) -> List[Dict[str, Any]]:
+        """Remove (ou apenas lista) arquivos anteriores ao corte; retorna só os efetivamente removidos"""
+        
+        candidates = self.catalog.files_older_than(cutoff_timestamp)
+        if dry_run:
+            return candidates
+        
+        removed = []
+        for entry in candidates:
+            try:
+                os.remove(entry['path'])
+                logger.info(f"🗑️ Arquivo removido: {os.path.basename(entry['path'])}")
+            except FileNotFoundError:
+                pass  # Já removido: apenas sincroniza o catálogo
+            except Exception as e:
+                logger.error(f"Erro ao remover arquivo {entry['path']}: {str(e)}")
+                continue
+            removed.append(entry)
+        
+        if removed:
+            self.catalog.remove_files([entry['path'] for entry in removed])
+        
+        return removed
 
 # Instância global
-local_file_manager = LocalFileManager()
\ No newline at end of file
+local_file_manager = lazy_service(LocalFileManager, 'local_file_manager')
\ No newline at end of file
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - PDF Render Queue
+Fila durável (SQLite) de renderizações de PDF executadas pelo pool de processos de jobs
+"""
+
+import os
+import time
+import uuid
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+from utils.serialization import dump_file, load_file
+
+logger = logging.getLogger(__name__)
+
+class PDFRenderQueue:
+    """Fila de renderização de PDFs com deduplicação por artefato e progresso"""
+    
+    def __init__(self):
+        """Inicializa tabela de renderizações e diretório dos payloads"""
+        self.db = database_fallback
+        self.payload_dir = os.path.normpath(os.path.join(os.path.dirname(self.db.db_path), 'pdf_jobs'))
+        self.max_batch = int(os.getenv('PDF_BATCH_MAX', 100))
+        self.progress_interval = float(os.getenv('PDF_PROGRESS_INTERVAL', 1))
+        
+        os.makedirs(self.payload_dir, exist_ok=True)
+        self._ensure_table()
+        logger.info("✅ PDF Render Queue inicializada")
+    
+    def _ensure_table(self):
+        """Cria tabela de renderizações se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pdf_render_jobs (
+                    id TEXT PRIMARY KEY,
+                    batch_id TEXT,
+                    analysis_id TEXT,
+                    artifact_key TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    payload_path TEXT,
+                    progress REAL DEFAULT 0,
+                    pages INTEGER DEFAULT 0,
+                    error TEXT,
+                    worker_id TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    heartbeat_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pdf_render_jobs_status ON pdf_render_jobs (status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pdf_render_jobs_key ON pdf_render_jobs (artifact_key, status)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pdf_render_jobs_batch ON pdf_render_jobs (batch_id)')
+            
+            # Uma renderização pendente por artefato (jobs de lote só conhecem a chave no worker).
+            # Pendências duplicadas de versões anteriores impediriam a criação do índice.
+            conn.execute('''
+                UPDATE pdf_render_jobs SET status = 'failed', error = 'Renderização duplicada', finished_at = ?
+                WHERE batch_id IS NULL AND status IN ('queued', 'running') AND EXISTS (
+                    SELECT 1 FROM pdf_render_jobs other
+                    WHERE other.artifact_key = pdf_render_jobs.artifact_key
+                      AND other.batch_id IS NULL AND other.status IN ('queued', 'running')
+                      AND other.rowid < pdf_render_jobs.rowid
+                )
+            ''', (time.time(),))
+            conn.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_pdf_render_jobs_pending_key
+                ON pdf_render_jobs (artifact_key)
+                WHERE batch_id IS NULL AND status IN ('queued', 'running')
+            ''')
+    
+    def _to_public(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte linha do banco em representação pública da renderização"""
+        def iso(ts):
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+        
+        completed = row['status'] == 'completed'
+        return {
+            'job_id': row['id'],
+            'batch_id': row['batch_id'],
+            'analysis_id': row['analysis_id'],
+            'artifact_key': row['artifact_key'],
+            'status': row['status'],
+            'progress': 100.0 if completed else round((row['progress'] or 0) * 100, 1),
+            'pages': row['pages'] or 0,
+            'error': row['error'],
+            'created_at': iso(row['created_at']),
+            'started_at': iso(row['started_at']),
+            'finished_at': iso(row['finished_at']),
+            'status_url': f"/api/pdf/jobs/{row['id']}",
+            'pdf_url': f"/api/pdf/{row['artifact_key']}" if completed else None
+        }
+    
+    # ------------------------------------------------------------------
+    # API usada pelos workers web
+    # ------------------------------------------------------------------
+    
+    def _pending_for_key(self, conn, artifact_key: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute('''
+            SELECT * FROM pdf_render_jobs
+            WHERE artifact_key = ? AND batch_id IS NULL AND status IN ('queued', 'running')
+        ''', (artifact_key,)).fetchone()
+        return dict(row) if row else None
+    
+    def submit(self, cleaned_data: Dict[str, Any], artifact_key: str) -> Dict[str, Any]:
+        """Enfileira a renderização de uma análise já limpa (reaproveita job pendente da mesma chave)"""
+        with self.db._connection() as conn:
+            pending = self._pending_for_key(conn, artifact_key)
+        
+        if pending:
+            return self._to_public(pending)
+        
+        job_id = f"pdf_{uuid.uuid4().hex}"
+        payload_path = os.path.join(self.payload_dir, f"{job_id}.json")
+        
+        dump_file(cleaned_data, payload_path, pretty=False)
+        
+        # O índice único parcial resolve envios simultâneos da mesma chave: o perdedor
+        # não insere e lê, na mesma transação, o job do vencedor
+        with self.db._connection() as conn:
+            inserted = conn.execute('''
+                INSERT INTO pdf_render_jobs (id, artifact_key, status, payload_path, created_at)
+                VALUES (?, ?, 'queued', ?, ?)
+                ON CONFLICT DO NOTHING
+            ''', (job_id, artifact_key, payload_path, time.time())).rowcount
+            pending = None if inserted else self._pending_for_key(conn, artifact_key)
+        
+        if pending:
+            os.remove(payload_path)
+            return self._to_public(pending)
+        
+        logger.info(f"📥 Renderização {job_id} enfileirada (PDF {artifact_key})")
+        return self.get_job(job_id)
+    
+    def submit_batch(self, analysis_ids: List[str]) -> Dict[str, Any]:
+        """Enfileira renderizações de análises salvas; o worker carrega e limpa cada uma"""
+        batch_id = f"pdfbatch_{uuid.uuid4().hex}"
+        now = time.time()
+        unique_ids = list(dict.fromkeys(str(analysis_id) for analysis_id in analysis_ids))[:self.max_batch]
+        
+        with self.db._connection() as conn:
+            conn.executemany('''
+                INSERT INTO pdf_render_jobs (id, batch_id, analysis_id, status, created_at)
+                VALUES (?, ?, ?, 'queued', ?)
+            ''', [
+                (f"pdf_{uuid.uuid4().hex}", batch_id, analysis_id, now + index * 1e-6)
+                for index, analysis_id in enumerate(unique_ids)
+            ])
+        
+        logger.info(f"📥 Lote {batch_id} enfileirado: {len(unique_ids)} PDFs")
+        return self.get_batch(batch_id)
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna status da renderização"""
+        with self.db._connection() as conn:
+            row = conn.execute('SELECT * FROM pdf_render_jobs WHERE id = ?', (job_id,)).fetchone()
+        
+        if not row:
+            return None
+        
+        job = self._to_public(dict(row))
+        
+        if job['status'] == 'queued':
+            with self.db._connection() as conn:
+                job['queue_position'] = conn.execute('''
+                    SELECT COUNT(*) FROM pdf_render_jobs
+                    WHERE status = 'queued' AND created_at < ?
+                ''', (row['created_at'],)).fetchone()[0] + 1
+        
+        return job
+    
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna as renderizações do lote e contadores por status"""
+        with self.db._connection() as conn:
+            jobs = [
+                self._to_public(dict(row)) for row in conn.execute(
+                    'SELECT * FROM pdf_render_jobs WHERE batch_id = ? ORDER BY created_at', (batch_id,)
+                )
+            ]
+        
+        if not jobs:
+            return None
+        
+        counts: Dict[str, int] = {}
+        for job in jobs:
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        
+        return {
+            'batch_id': batch_id,
+            'total': len(jobs),
+            'counts': counts,
+            'done': all(job['status'] in ('completed', 'failed') for job in jobs),
+            'jobs': jobs
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de renderizações por status"""
+        with self.db._connection() as conn:
+            counts = {
+                row['status']: row['total']
+                for row in conn.execute(
+                    'SELECT status, COUNT(*) AS total FROM pdf_render_jobs GROUP BY status'
+                )
+            }
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'completed': counts.get('completed', 0),
+            'failed': counts.get('failed', 0)
+        }
+    
+    # ------------------------------------------------------------------
+    # API usada pelo pool de workers de jobs
+    # ------------------------------------------------------------------
+    
+    def claim_next(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Reserva a próxima renderização da fila"""
+        now = time.time()
+        conn = self.db._get_connection()
+        
+        try:
+            # BEGIN IMMEDIATE serializa a reserva entre processos do pool
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('''
+                SELECT * FROM pdf_render_jobs
+                WHERE status = 'queued'
+                ORDER BY created_at
+                LIMIT 1
+            ''').fetchone()
+            
+            if row:
+                conn.execute('''
+                    UPDATE pdf_render_jobs
+                    SET status = 'running', worker_id = ?, started_at = ?, heartbeat_at = ?
+                    WHERE id = ?
+                ''', (worker_id, now, now, row['id']))
+            
+            conn.commit()
+        
+        except Exception:
+            conn.rollback()
+            raise
+        
+        return dict(row) if row else None
+    
+    def load_payload(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Carrega a análise limpa gravada no envio"""
+        return load_file(job['payload_path'])
+    
+    def set_artifact_key(self, job_id: str, artifact_key: str):
+        """Registra a chave calculada pelo worker (jobs de lote)"""
+        with self.db._connection() as conn:
+            conn.execute('UPDATE pdf_render_jobs SET artifact_key = ? WHERE id = ?', (artifact_key, job_id))
+    
+    def progress_reporter(self, job_id: str) -> Callable[[str, Any], None]:
+        """Callback de progresso do ReportLab (setProgressCallBack) com gravação espaçada"""
+        state = {'total': 0, 'done': 0, 'pages': 0, 'written_at': 0.0}
+        
+        def report(kind: str, value: Any):
+            if kind == 'SIZE_EST':
+                state['total'] = value or 0
+            elif kind == 'PROGRESS':
+                state['done'] = value or 0
+            elif kind == 'PAGE':
+                state['pages'] = value or 0
+            else:
+                return
+            
+            now = time.time()
+            if now - state['written_at'] < self.progress_interval:
+                return
+            state['written_at'] = now
+            
+            progress = min(state['done'] / state['total'], 0.99) if state['total'] else 0
+            with self.db._connection() as conn:
+                conn.execute('''
+                    UPDATE pdf_render_jobs SET progress = ?, pages = ?, heartbeat_at = ?
+                    WHERE id = ?
+                ''', (progress, state['pages'], now, job_id))
+        
+        return report
+    
+    def heartbeat(self, job_ids: List[str]):
+        """Atualiza sinal de vida das renderizações em execução"""
+        if not job_ids:
+            return
+        now = time.time()
+        with self.db._connection() as conn:
+            conn.executemany(
+                'UPDATE pdf_render_jobs SET heartbeat_at = ? WHERE id = ?',
+                [(now, job_id) for job_id in job_ids]
+            )
+    
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """Renderizações não são canceláveis (interface compartilhada com a fila de análises)"""
+        return []
+    
+    def complete(self, job_id: str, artifact_key: str):
+        """Finaliza a renderização e remove o payload"""
+        self._finalize(job_id, 'completed', None, artifact_key)
+        logger.info(f"✅ Renderização {job_id} concluída (PDF {artifact_key})")
+    
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        """Finaliza renderização sem artefato (falha ou timeout)"""
+        self._finalize(job_id, status, error)
+        logger.info(f"🏁 Renderização {job_id} finalizada: {status} {error or ''}")
+    
+    def _finalize(self, job_id: str, status: str, error: Optional[str], artifact_key: Optional[str] = None):
+        with self.db._connection() as conn:
+            row = conn.execute('SELECT payload_path FROM pdf_render_jobs WHERE id = ?', (job_id,)).fetchone()
+            conn.execute('''
+                UPDATE pdf_render_jobs
+                SET status = ?, error = ?, artifact_key = COALESCE(?, artifact_key),
+                    finished_at = ?, payload_path = NULL
+                WHERE id = ? AND status NOT IN ('completed', 'failed')
+            ''', (status, error, artifact_key, time.time(), job_id))
+        
+        if row and row['payload_path'] and os.path.exists(row['payload_path']):
+            os.remove(row['payload_path'])
+    
+    def fail_orphaned(self, stale_seconds: float) -> int:
+        """Marca como falhas renderizações cujo worker parou de enviar heartbeat"""
+        cutoff = time.time() - stale_seconds
+        with self.db._connection() as conn:
+            orphaned = [
+                row['id'] for row in conn.execute(
+                    "SELECT id FROM pdf_render_jobs WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)
+                )
+            ]
+        
+        for job_id in orphaned:
+            self.finish(job_id, 'failed', 'Worker interrompido durante a renderização')
+        
+        if orphaned:
+            logger.warning(f"⚠️ {len(orphaned)} renderizações órfãs marcadas como falhas")
+        return len(orphaned)
+
+# Instância global
+pdf_render_queue = lazy_service(PDFRenderQueue, 'pdf_render_queue')
@@ -12,6 +12,7 @@ import json
 from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -720,4 +721,4 @@ RETORNE APENAS JSON VÁLIDO:
         }
 
 # Instância global
-pre_pitch_architect = PrePitchArchitect()
\ No newline at end of file
+pre_pitch_architect = lazy_service(PrePitchArchitect, 'pre_pitch_architect')
\ No newline at end of file
@@ -10,6 +10,7 @@ from typing import Dict, List, Optional, Any
 import os
 import logging
 from .robust_content_extractor import robust_content_extractor
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -57,4 +58,4 @@ class ProductionContentExtractor:
 
 
 # Instância global para compatibilidade
-production_content_extractor = ProductionContentExtractor()
+production_content_extractor = lazy_service(ProductionContentExtractor, 'production_content_extractor')
@@ -8,12 +8,17 @@ Gerenciador de busca para produção com múltiplos provedores e fallbacks
 import os
 import logging
 import time
+import threading
 import requests
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
 import random
+from utils.lazy import lazy_service
+from utils.tracing import traced, set_span_attributes
+from utils.metrics import SEARCH_PROVIDER_DURATION, SEARCH_PROVIDER_ERRORS, CACHE_REQUESTS
+from utils.deadline import DeadlineExceeded, call_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -45,14 +50,14 @@ class ProductionSearchManager:
                 'priority': 3,
                 'error_count': 0,
                 'max_errors': 5,
-                'base_url': 'https://www.bing.com/search'
+                'base_url': os.getenv('BING_SEARCH_URL', 'https://www.bing.com/search')
             },
             'duckduckgo': {
                 'enabled': True,  # Sempre disponível via scraping
                 'priority': 4,
                 'error_count': 0,
                 'max_errors': 5,
-                'base_url': 'https://html.duckduckgo.com/html/'
+                'base_url': os.getenv('DUCKDUCKGO_SEARCH_URL', 'https://html.duckduckgo.com/html/')
             }
         }
         
@@ -67,26 +72,38 @@ class ProductionSearchManager:
         
         self.cache = {}
         self.cache_ttl = 3600  # 1 hora
+        self.cache_max_entries = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 500))
+        
+        # Cache e contadores são compartilhados entre threads do worker
+        self._lock = threading.Lock()
         
         enabled_count = sum(1 for p in self.providers.values() if p['enabled'])
         logger.info(f"Production Search Manager inicializado com {enabled_count} provedores")
     
+    @traced('search_with_fallback', category='search')
     def search_with_fallback(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """Realiza busca com sistema de fallback automático"""
         
+        set_span_attributes(query=query, max_results=max_results)
+        
         # Verifica cache primeiro
         cache_key = f"{query}_{max_results}"
-        if cache_key in self.cache:
-            cache_data = self.cache[cache_key]
-            if time.time() - cache_data['timestamp'] < self.cache_ttl:
-                logger.info(f"🔄 Resultado do cache para: {query}")
-                return cache_data['results']
+        with self._lock:
+            cache_data = self.cache.get(cache_key)
+        if cache_data and time.time() - cache_data['timestamp'] < self.cache_ttl:
+            logger.info(f"🔄 Resultado do cache para: {query}")
+            set_span_attributes(cache_hit=True)
+            CACHE_REQUESTS.labels('search', 'hit').inc()
+            return cache_data['results']
+        
+        CACHE_REQUESTS.labels('search', 'miss').inc()
         
         # Busca com fallback
         for provider_name in self._get_provider_order():
             if not self._is_provider_available(provider_name):
                 continue
             
+            started = time.time()
             try:
                 logger.info(f"🔍 Buscando com {provider_name}: {query}")
                 
@@ -101,27 +118,51 @@ class ProductionSearchManager:
                 else:
                     continue
                 
+                SEARCH_PROVIDER_DURATION.labels(provider_name, 'success' if results else 'empty').observe(time.time() - started)
+                
                 if results:
                     # Cache resultado
-                    self.cache[cache_key] = {
+                    self._cache_store(cache_key, {
                         'results': results,
                         'timestamp': time.time(),
                         'provider': provider_name
-                    }
+                    })
                     
                     logger.info(f"✅ {provider_name}: {len(results)} resultados")
+                    set_span_attributes(provider=provider_name, results=len(results))
                     return results
                 else:
                     logger.warning(f"⚠️ {provider_name}: 0 resultados")
                     
+            except DeadlineExceeded:
+                # Orçamento da análise esgotado: não penaliza o provedor nem tenta os demais
+                logger.warning(f"⏰ Orçamento esgotado antes da busca em {provider_name}")
+                break
             except Exception as e:
                 logger.error(f"❌ Erro em {provider_name}: {str(e)}")
+                SEARCH_PROVIDER_DURATION.labels(provider_name, 'error').observe(time.time() - started)
+                SEARCH_PROVIDER_ERRORS.labels(provider_name).inc()
                 self._record_provider_error(provider_name)
                 continue
         
         logger.error("❌ Todos os provedores de busca falharam")
         return []
     
+    def _cache_store(self, cache_key: str, entry: Dict[str, Any]):
+        """Grava no cache, descartando expirados e os mais antigos acima do limite"""
+        with self._lock:
+            self.cache[cache_key] = entry
+            
+            if len(self.cache) > self.cache_max_entries:
+                now = time.time()
+                for key in [k for k, v in self.cache.items() if now - v['timestamp'] >= self.cache_ttl]:
+                    del self.cache[key]
+                
+                overflow = len(self.cache) - self.cache_max_entries
+                if overflow > 0:
+                    for key in sorted(self.cache, key=lambda k: self.cache[k]['timestamp'])[:overflow]:
+                        del self.cache[key]
+    
     def _get_provider_order(self) -> List[str]:
         """Retorna provedores ordenados por prioridade"""
         available_providers = [
@@ -142,11 +183,12 @@ class ProductionSearchManager:
     
     def _record_provider_error(self, provider_name: str):
         """Registra erro do provedor"""
-        if provider_name in self.providers:
-            self.providers[provider_name]['error_count'] += 1
+        with self._lock:
+            if provider_name in self.providers:
+                self.providers[provider_name]['error_count'] += 1
             
-            if self.providers[provider_name]['error_count'] >= self.providers[provider_name]['max_errors']:
-                logger.warning(f"⚠️ Provedor {provider_name} desabilitado temporariamente")
+                if self.providers[provider_name]['error_count'] >= self.providers[provider_name]['max_errors']:
+                    logger.warning(f"⚠️ Provedor {provider_name} desabilitado temporariamente")
     
     def _search_google(self, query: str, max_results: int) -> List[Dict[str, Any]]:
         """Busca usando Google Custom Search API"""
@@ -166,7 +208,7 @@ class ProductionSearchManager:
             provider['base_url'],
             params=params,
             headers=self.headers,
-            timeout=15
+            timeout=call_timeout(15)
         )
         
         if response.status_code == 200:
@@ -206,7 +248,7 @@ class ProductionSearchManager:
             provider['base_url'],
             json=payload,
             headers=headers,
-            timeout=15
+            timeout=call_timeout(15)
         )
         
         if response.status_code == 200:
@@ -234,7 +276,7 @@ class ProductionSearchManager:
             response = requests.get(
                 search_url, 
                 headers=self.headers, 
-                timeout=10,  # CORREÇÃO: Timeout menor
+                timeout=call_timeout(10),  # CORREÇÃO: Timeout menor
                 verify=False  # CORREÇÃO: Desabilita SSL
             )
         except requests.exceptions.SSLError:
@@ -286,7 +328,7 @@ class ProductionSearchManager:
             response = requests.get(
                 search_url, 
                 headers=self.headers, 
-                timeout=10,  # CORREÇÃO: Timeout menor
+                timeout=call_timeout(10),  # CORREÇÃO: Timeout menor
                 verify=False
             )
         except Exception as e:
@@ -363,7 +405,8 @@ class ProductionSearchManager:
     
     def clear_cache(self):
         """Limpa cache de busca"""
-        self.cache = {}
+        with self._lock:
+            self.cache.clear()
         logger.info("🧹 Cache de busca limpo")
     
     def test_provider(self, provider_name: str) -> bool:
@@ -392,4 +435,4 @@ class ProductionSearchManager:
             return False
 
 # Instância global
-production_search_manager = ProductionSearchManager()
\ No newline at end of file
+production_search_manager = lazy_service(ProductionSearchManager, 'production_search_manager')
\ No newline at end of file
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Progress Store
+Armazenamento compartilhado (SQLite WAL) do progresso das análises entre processos
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Dict, List, Optional, Any
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class ProgressStore:
+    """Sessões e eventos de progresso visíveis a todos os workers, com expiração por TTL"""
+    
+    def __init__(self):
+        """Inicializa tabelas e configuração de expiração"""
+        self.db = database_fallback
+        self.ttl_seconds = float(os.getenv('PROGRESS_TTL_SECONDS', 3600))
+        self.completed_ttl_seconds = float(os.getenv('PROGRESS_COMPLETED_TTL_SECONDS', 300))
+        self.purge_interval = float(os.getenv('PROGRESS_PURGE_INTERVAL', 60))
+        self._last_purge = 0.0
+        
+        self._ensure_tables()
+        logger.info("✅ Progress Store inicializado")
+    
+    def _ensure_tables(self):
+        """Cria tabelas de progresso se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS progress_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    current_step INTEGER NOT NULL DEFAULT 0,
+                    total_steps INTEGER NOT NULL,
+                    is_complete INTEGER NOT NULL DEFAULT 0,
+                    start_time REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS progress_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    step INTEGER NOT NULL,
+                    message TEXT,
+                    details TEXT,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_progress_events_session ON progress_events (session_id, id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_progress_sessions_expires ON progress_sessions (expires_at)')
+    
+    def create_session(self, session_id: str, total_steps: int) -> Dict[str, Any]:
+        """Cria (ou reinicia) sessão de progresso"""
+        now = time.time()
+        
+        with self.db._connection() as conn:
+            conn.execute('DELETE FROM progress_events WHERE session_id = ?', (session_id,))
+            conn.execute('''
+                INSERT OR REPLACE INTO progress_sessions (
+                    session_id, current_step, total_steps, is_complete, start_time, updated_at, expires_at
+                ) VALUES (?, 0, ?, 0, ?, ?, ?)
+            ''', (session_id, total_steps, now, now, now + self.ttl_seconds))
+        
+        self._maybe_purge()
+        return self.get_session(session_id)
+    
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna sessão ativa (não expirada)"""
+        with self.db._connection() as conn:
+            row = conn.execute('''
+                SELECT * FROM progress_sessions WHERE session_id = ? AND expires_at > ?
+            ''', (session_id, time.time())).fetchone()
+        return dict(row) if row else None
+    
+    def append_event(
+        self,
+        session_id: str,
+        step: int,
+        message: str,
+        details: Optional[str],
+        payload: Dict[str, Any],
+        is_complete: bool = False
+    ) -> int:
+        """Registra evento de progresso e renova o TTL da sessão"""
+        now = time.time()
+        ttl = self.completed_ttl_seconds if is_complete else self.ttl_seconds
+        
+        with self.db._connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO progress_events (session_id, step, message, details, payload, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (session_id, step, message, details, json.dumps(payload, ensure_ascii=False, default=str), now))
+            conn.execute('''
+                UPDATE progress_sessions
+                SET current_step = ?, is_complete = MAX(is_complete, ?), updated_at = ?, expires_at = ?
+                WHERE session_id = ?
+            ''', (step, int(is_complete), now, now + ttl, session_id))
+            event_id = cursor.lastrowid
+        
+        self._maybe_purge()
+        return event_id
+    
+    def get_events(self, session_id: str, after_id: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Eventos da sessão posteriores ao id informado, em ordem"""
+        query = '''
+            SELECT id, step, message, details, payload, created_at FROM progress_events
+            WHERE session_id = ? AND id > ?
+            ORDER BY id
+        '''
+        params: List[Any] = [session_id, after_id]
+        
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        with self.db._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        events = []
+        for row in rows:
+            event = dict(row)
+            event['payload'] = json.loads(event['payload'])
+            events.append(event)
+        return events
+    
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Lista sessões ativas com a última mensagem registrada"""
+        with self.db._connection() as conn:
+            rows = conn.execute('''
+                SELECT s.*, (
+                    SELECT e.message FROM progress_events e
+                    WHERE e.session_id = s.session_id
+                    ORDER BY e.id DESC LIMIT 1
+                ) AS last_message
+                FROM progress_sessions s
+                WHERE s.expires_at > ?
+                ORDER BY s.start_time DESC
+            ''', (time.time(),)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def delete_session(self, session_id: str):
+        """Remove sessão e seus eventos"""
+        with self.db._connection() as conn:
+            conn.execute('DELETE FROM progress_events WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM progress_sessions WHERE session_id = ?', (session_id,))
+    
+    def purge_expired(self) -> int:
+        """Remove sessões expiradas e seus eventos"""
+        now = time.time()
+        
+        with self.db._connection() as conn:
+            conn.execute('''
+                DELETE FROM progress_events WHERE session_id IN (
+                    SELECT session_id FROM progress_sessions WHERE expires_at <= ?
+                )
+            ''', (now,))
+            count = conn.execute(
+                'DELETE FROM progress_sessions WHERE expires_at <= ?', (now,)
+            ).rowcount
+        
+        self._last_purge = now
+        if count:
+            logger.info(f"🧹 {count} sessões de progresso expiradas removidas")
+        return count
+    
+    def _maybe_purge(self):
+        """Expiração preguiçosa, feita nas escritas em vez de threads de limpeza"""
+        if time.time() - self._last_purge < self.purge_interval:
+            return
+        try:
+            self.purge_expired()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao expirar sessões de progresso: {e}")
+
+# Instância global
+progress_store = lazy_service(ProgressStore, 'progress_store')
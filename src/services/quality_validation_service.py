@@ -10,6 +10,7 @@ import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -557,4 +558,4 @@ class QualityValidationService:
         }
 
 # Instância global
-quality_validation_service = QualityValidationService()
\ No newline at end of file
+quality_validation_service = lazy_service(QualityValidationService, 'quality_validation_service')
\ No newline at end of file
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Report Document
+Modelo intermediário por seção compartilhado pelos relatórios Markdown, HTML, JSON e PDF
+"""
+
+import os
+import json
+import html
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from utils.lazy import lazy_service
+from utils.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando a estrutura dos blocos mudar: invalida seções e renderizações memorizadas
+DOCUMENT_VERSION = '2'
+
+# ----------------------------------------------------------------------
+# Blocos
+# ----------------------------------------------------------------------
+# Cada seção é uma lista de blocos (dicts simples, serializáveis em JSON):
+#   heading   {'level': 2|3, 'text'}
+#   paragraph {'text'}
+#   fields    {'items': [[rótulo, valor], ...]}
+#   list      {'items': [...], 'ordered'}
+#   table     {'rows': [[...], ...], 'header'}
+
+def _text(value: Any) -> str:
+    if value is None or value == '':
+        return 'N/A'
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+def _label(key: str) -> str:
+    return key.replace('_', ' ').title()
+
+def heading(text: str, level: int = 2) -> Dict[str, Any]:
+    return {'type': 'heading', 'level': level, 'text': _text(text)}
+
+def paragraph(text: Any) -> Dict[str, Any]:
+    return {'type': 'paragraph', 'text': _text(text)}
+
+def fields(*items) -> Dict[str, Any]:
+    return {'type': 'fields', 'items': [[label, _text(value)] for label, value in items]}
+
+def bullets(items, ordered: bool = False) -> Dict[str, Any]:
+    return {'type': 'list', 'ordered': ordered, 'items': [_text(item) for item in items]}
+
+def table(rows, header: bool = False) -> Dict[str, Any]:
+    return {'type': 'table', 'header': header, 'rows': [[_text(cell) for cell in row] for row in rows]}
+
+# ----------------------------------------------------------------------
+# Construtores de seção (dados da seção -> blocos)
+# ----------------------------------------------------------------------
+
+def _format_date(value: Any) -> str:
+    """Data (AAAA-MM-DD) de um timestamp ou ISO string; nunca o relógio atual, para a capa ser determinística"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).date().isoformat()
+    return str(value)[:10] if value else 'Não informada'
+
+def _build_cover(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    metadata = data.get('metadata') or {}
+    items = [('Segmento', data.get('segmento') or 'Não informado')]
+    if data.get('produto'):
+        items.append(('Produto', data['produto']))
+    
+    blocks = [fields(*items)]
+    blocks.append(table([
+        ['Data de Geração:', _format_date(metadata.get('generated_at') or data.get('created_at'))],
+        ['Versão:', '2.0.0'],
+        ['Modelo IA:', metadata.get('model', 'Gemini Pro')],
+        ['Tempo de Processamento:', metadata.get('processing_time_formatted') or f"{metadata.get('processing_time', 0)} segundos"]
+    ]))
+    blocks.append(paragraph('ARQV30 Enhanced v2.0 - Powered by Artificial Intelligence'))
+    return blocks
+
+def _build_executive_summary(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = [bullets([
+        f"Segmento analisado: {_text(data.get('segmento'))}",
+        f"Produto/Serviço: {_text(data.get('produto'))}",
+        f"Público-alvo: {_text(data.get('publico'))}",
+        f"Preço: R$ {_text(data.get('preco'))}",
+        f"Objetivo de receita: R$ {_text(data.get('objetivo_receita'))}"
+    ])]
+    
+    if data.get('insights'):
+        blocks.append(heading('Principais Insights'))
+        blocks.append(bullets(data['insights'], ordered=True))
+    
+    if data.get('processing_time_formatted'):
+        blocks.append(fields(('Tempo de Processamento', data['processing_time_formatted'])))
+    return blocks
+
+def _build_consolidated_summary(resumo: Dict[str, Any]) -> List[Dict[str, Any]]:
+    qualidade = resumo.get('qualidade_analise', 0)
+    return [fields(
+        ('Segmento', resumo.get('segmento_analisado')),
+        ('Produto/Serviço', resumo.get('produto_servico')),
+        ('Qualidade', f"{qualidade:.1f}%" if isinstance(qualidade, (int, float)) else qualidade),
+        ('Componentes', resumo.get('componentes_gerados', 0))
+    )]
+
+def _build_avatar(avatar: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    
+    demo = avatar.get('perfil_demografico') or {}
+    if isinstance(demo, dict) and demo:
+        blocks.append(heading('Perfil Demográfico'))
+        blocks.append(table([[f"{_label(key)}:", value] for key, value in demo.items()]))
+    
+    psico = avatar.get('perfil_psicografico') or {}
+    if isinstance(psico, dict) and psico:
+        blocks.append(heading('Perfil Psicográfico'))
+        blocks.append(fields(*[(_label(key), value) for key, value in psico.items() if value]))
+    
+    for title, keys in (
+        ('Dores Específicas', ('dores_especificas', 'dores_viscerais')),
+        ('Desejos Profundos', ('desejos_profundos', 'desejos_secretos'))
+    ):
+        items = next((avatar[key] for key in keys if avatar.get(key)), None)
+        if isinstance(items, list):
+            blocks.append(heading(title))
+            blocks.append(bullets(items))
+    
+    return blocks
+
+def _build_drivers(drivers) -> List[Dict[str, Any]]:
+    if isinstance(drivers, dict):
+        drivers = drivers.get('drivers_customizados') or drivers.get('drivers_emocionais_primarios') or []
+    
+    blocks = []
+    for i, driver in enumerate(drivers if isinstance(drivers, list) else [], 1):
+        if not isinstance(driver, dict):
+            continue
+        
+        blocks.append(heading(f"Driver {i}: {driver.get('nome', 'Driver Mental')}"))
+        blocks.append(fields(
+            ('Gatilho Central', driver.get('gatilho_central')),
+            ('Definição', driver.get('definicao_visceral'))
+        ))
+        
+        roteiro = driver.get('roteiro_ativacao')
+        if isinstance(roteiro, dict) and roteiro:
+            blocks.append(heading('Roteiro de Ativação', 3))
+            blocks.append(bullets([
+                f"Pergunta: {_text(roteiro.get('pergunta_abertura'))}",
+                f"História: {_text(roteiro.get('historia_analogia'))}",
+                f"Comando: {_text(roteiro.get('comando_acao'))}"
+            ]))
+        
+        if driver.get('frases_ancoragem'):
+            blocks.append(heading('Frases de Ancoragem', 3))
+            blocks.append(bullets([f"\"{frase}\"" for frase in driver['frases_ancoragem']]))
+    
+    return blocks
+
+def _build_mental_drivers_system(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = _build_drivers(data.get('drivers_emocionais_primarios') or [])
+    if data.get('top_7_essenciais'):
+        blocks.append(heading('Top 7 Drivers Essenciais'))
+        blocks.append(bullets(data['top_7_essenciais'], ordered=True))
+    return blocks
+
+def _build_anti_objection(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    
+    universais = data.get('objecoes_universais') or {}
+    if isinstance(universais, dict) and universais:
+        blocks.append(heading('Objeções Universais'))
+        for tipo, objecao in universais.items():
+            if not isinstance(objecao, dict):
+                continue
+            blocks.append(heading(_label(tipo), 3))
+            items = [('Objeção', objecao.get('objecao'))]
+            if objecao.get('raiz_emocional'):
+                items.append(('Raiz Emocional', objecao['raiz_emocional']))
+            items.append(('Contra-Ataque', objecao.get('contra_ataque')))
+            blocks.append(fields(*items))
+            if objecao.get('scripts'):
+                blocks.append(bullets([f"\"{script}\"" for script in objecao['scripts']]))
+    
+    ocultas = data.get('objecoes_ocultas') or data.get('objecoes_ocultas_criticas') or {}
+    if isinstance(ocultas, dict) and ocultas:
+        blocks.append(heading('Objeções Ocultas'))
+        for tipo, objecao in ocultas.items():
+            if not isinstance(objecao, dict):
+                continue
+            blocks.append(heading(_label(tipo), 3))
+            items = []
+            if objecao.get('objecao_oculta'):
+                items.append(('Objeção Oculta', objecao['objecao_oculta']))
+            items.append(('Perfil Típico', objecao.get('perfil_tipico')))
+            items.append(('Contra-Ataque', objecao.get('contra_ataque')))
+            blocks.append(fields(*items))
+    
+    if data.get('arsenal_emergencia'):
+        blocks.append(heading('Arsenal de Emergência'))
+        blocks.append(bullets([f"\"{frase}\"" for frase in data['arsenal_emergencia']], ordered=True))
+    
+    return blocks
+
+def _build_visual_proofs(provas) -> List[Dict[str, Any]]:
+    if isinstance(provas, dict):
+        provas = provas.get('arsenal_provis') or []
+    
+    blocks = []
+    for i, prova in enumerate(provas if isinstance(provas, list) else [], 1):
+        if not isinstance(prova, dict):
+            continue
+        
+        blocks.append(heading(f"PROVI {i}: {prova.get('nome', 'Prova Visual')}"))
+        items = [('Conceito Alvo', prova.get('conceito_alvo'))]
+        for key, label in (('categoria', 'Categoria'), ('prioridade', 'Prioridade')):
+            if prova.get(key):
+                items.append((label, prova[key]))
+        items.append(('Experimento', prova.get('experimento')))
+        blocks.append(fields(*items))
+        
+        if prova.get('materiais'):
+            blocks.append(heading('Materiais', 3))
+            blocks.append(bullets(prova['materiais']))
+        
+        roteiro = prova.get('roteiro_completo')
+        if isinstance(roteiro, dict) and roteiro:
+            blocks.append(fields(
+                ('Setup', roteiro.get('setup')),
+                ('Execução', roteiro.get('execucao')),
+                ('Clímax', roteiro.get('climax'))
+            ))
+    
+    return blocks
+
+def _build_pre_pitch(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    
+    orquestracao = data.get('orquestracao_emocional') or {}
+    sequencia = orquestracao.get('sequencia_psicologica', []) if isinstance(orquestracao, dict) else []
+    if sequencia:
+        blocks.append(heading('Orquestração Emocional'))
+        for fase in sequencia:
+            if not isinstance(fase, dict):
+                continue
+            blocks.append(heading(_text(fase.get('fase', 'Fase')), 3))
+            items = [('Objetivo', fase.get('objetivo')), ('Tempo', fase.get('tempo') or fase.get('duracao'))]
+            for key, label in (
+                ('intensidade', 'Intensidade'), ('resultado_esperado', 'Resultado Esperado'),
+                ('tecnicas', 'Técnicas'), ('drivers_utilizados', 'Drivers Utilizados')
+            ):
+                if fase.get(key):
+                    items.append((label, fase[key]))
+            blocks.append(fields(*items))
+    
+    roteiro = data.get('roteiro_completo') or {}
+    if isinstance(roteiro, dict) and roteiro:
+        blocks.append(heading('Roteiro Completo'))
+        for secao, secao_data in roteiro.items():
+            if not isinstance(secao_data, dict):
+                continue
+            blocks.append(heading(f"{_label(secao)} ({_text(secao_data.get('tempo'))})", 3))
+            if secao_data.get('objetivo'):
+                blocks.append(fields(('Objetivo', secao_data['objetivo'])))
+            blocks.append(paragraph(secao_data.get('script')))
+    
+    return blocks
+
+def _build_future_predictions(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    
+    tendencias = (data.get('tendencias_atuais') or {}).get('tendencias_relevantes') or {}
+    if isinstance(tendencias, dict) and tendencias:
+        blocks.append(heading('Tendências Atuais'))
+        for nome, tendencia in tendencias.items():
+            blocks.append(heading(_label(nome), 3))
+            blocks.append(fields(
+                ('Fase', tendencia.get('fase_atual')),
+                ('Impacto', tendencia.get('impacto_esperado'))
+            ))
+    
+    cenarios = data.get('cenarios_futuros') or {}
+    if isinstance(cenarios, dict) and cenarios:
+        blocks.append(heading('Cenários Futuros'))
+        for nome, cenario in cenarios.items():
+            blocks.append(heading(_text(cenario.get('nome', nome)), 3))
+            blocks.append(fields(
+                ('Probabilidade', cenario.get('probabilidade')),
+                ('Descrição', cenario.get('descricao'))
+            ))
+    
+    oportunidades = data.get('oportunidades_emergentes') or []
+    if oportunidades:
+        blocks.append(heading('Oportunidades Emergentes'))
+        for oportunidade in oportunidades[:5]:
+            if isinstance(oportunidade, dict):
+                blocks.append(heading(_text(oportunidade.get('nome', 'Oportunidade')), 3))
+                blocks.append(fields(
+                    ('Potencial', oportunidade.get('potencial_mercado')),
+                    ('Timeline', oportunidade.get('timeline'))
+                ))
+    
+    return blocks
+
+def _build_positioning(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    for key, title in (('posicionamento_mercado', 'Posicionamento no Mercado'), ('proposta_valor', 'Proposta de Valor')):
+        if data.get(key):
+            blocks.extend([heading(title), paragraph(data[key])])
+    if data.get('diferenciais_competitivos'):
+        blocks.extend([heading('Diferenciais Competitivos'), bullets(data['diferenciais_competitivos'])])
+    return blocks
+
+def _build_competition(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    
+    diretos = data.get('concorrentes_diretos') or []
+    if diretos:
+        blocks.append(heading('Concorrentes Diretos'))
+        for i, concorrente in enumerate(diretos, 1):
+            if not isinstance(concorrente, dict):
+                continue
+            blocks.append(heading(_text(concorrente.get('nome', f'Concorrente {i}')), 3))
+            for key, label in (('pontos_fortes', 'Pontos Fortes'), ('pontos_fracos', 'Pontos Fracos')):
+                if concorrente.get(key):
+                    blocks.extend([paragraph(f"{label}:"), bullets(concorrente[key])])
+    
+    if data.get('gaps_oportunidade'):
+        blocks.extend([heading('Oportunidades Identificadas'), bullets(data['gaps_oportunidade'])])
+    return blocks
+
+def _build_marketing(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    for key, title, limit in (
+        ('palavras_primarias', 'Palavras-Chave Primárias', None),
+        ('palavras_secundarias', 'Palavras-Chave Secundárias', 15),
+        ('long_tail', 'Palavras-Chave Long Tail', 10)
+    ):
+        if data.get(key):
+            blocks.extend([heading(title), paragraph(', '.join(str(item) for item in data[key][:limit]))])
+    return blocks
+
+def _build_metrics(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    kpis = [kpi for kpi in data.get('kpis_principais') or [] if isinstance(kpi, dict)]
+    if kpis:
+        blocks.extend([heading('KPIs Principais'), fields(*[(_text(kpi.get('metrica')), kpi.get('objetivo')) for kpi in kpis])])
+    if data.get('roi_esperado'):
+        blocks.extend([heading('ROI Esperado'), paragraph(data['roi_esperado'])])
+    return blocks
+
+def _build_projections(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = [['Cenário', 'Receita Mensal', 'Clientes/Mês', 'Ticket Médio']]
+    for cenario in ('conservador', 'realista', 'otimista'):
+        cenario_data = data.get(cenario) or {}
+        if cenario_data:
+            rows.append([
+                cenario.title(),
+                cenario_data.get('receita_mensal'),
+                cenario_data.get('clientes_mes'),
+                cenario_data.get('ticket_medio')
+            ])
+    return [table(rows, header=True)] if len(rows) > 1 else []
+
+def _build_action_plan(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    for fase in ('fase_1_preparacao', 'fase_2_lancamento', 'fase_3_crescimento'):
+        fase_data = data.get(fase) or {}
+        if not fase_data:
+            continue
+        blocks.extend([heading(_label(fase)), fields(('Duração', fase_data.get('duracao')))])
+        if fase_data.get('atividades'):
+            blocks.extend([heading('Atividades', 3), bullets(fase_data['atividades'])])
+    return blocks
+
+def _build_insights(insights) -> List[Dict[str, Any]]:
+    return [bullets(insights if isinstance(insights, list) else [insights], ordered=True)]
+
+def _build_research(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    stats = data.get('estatisticas') or {}
+    total_conteudo = stats.get('total_conteudo', data.get('conteudo_extraido_chars', 0)) or 0
+    rows = [
+        ['Métrica', 'Valor'],
+        ['Total de Queries', stats.get('total_queries', data.get('total_queries', 0))],
+        ['Total de Resultados', stats.get('total_resultados', data.get('total_resultados', 0))],
+        ['Fontes Únicas', stats.get('fontes_unicas', len(data.get('fontes') or []))],
+        ['Conteúdo Extraído', f"{total_conteudo:,} caracteres" if isinstance(total_conteudo, int) else total_conteudo]
+    ]
+    if isinstance(stats.get('qualidade_media'), (int, float)):
+        rows.append(['Qualidade Média', f"{stats['qualidade_media']:.1f}%"])
+    blocks = [heading('Estatísticas da Pesquisa'), table(rows, header=True)]
+    
+    fontes = [fonte for fonte in (data.get('fontes') or [])[:10] if isinstance(fonte, dict)]
+    if fontes:
+        blocks.extend([heading('Principais Fontes'), bullets(
+            [f"{fonte.get('title') or 'Sem título'} - {_text(fonte.get('url'))}" for fonte in fontes], ordered=True
+        )])
+    
+    if data.get('queries_executadas'):
+        blocks.extend([heading('Queries Executadas'), bullets(data['queries_executadas'][:10])])
+    return blocks
+
+def _build_forensic(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = [heading('DNA da Conversão Identificado')]
+    
+    resumo = data.get('resumo_executivo') or {}
+    if resumo:
+        blocks.append(fields(('Veredicto Geral', resumo.get('veredicto_geral'))))
+        if resumo.get('top_3_pontos_fortes'):
+            blocks.extend([heading('Top 3 Pontos Mais Fortes', 3), bullets(resumo['top_3_pontos_fortes'], ordered=True)])
+    
+    dna = data.get('dna_conversao') or {}
+    if dna:
+        blocks.extend([heading('Fórmula Estrutural'), fields(('Fórmula', dna.get('formula_estrutural')))])
+        if dna.get('sequencia_gatilhos'):
+            blocks.extend([heading('Sequência de Gatilhos', 3), bullets(dna['sequencia_gatilhos'], ordered=True)])
+    
+    metricas = data.get('metricas_objetivas') or {}
+    if metricas:
+        blocks.extend([heading('Métricas Objetivas'), fields(
+            ('Duração Total', metricas.get('duracao_total')),
+            ('Densidade Informacional', metricas.get('densidade_informacional')),
+            ('Ratio EU/VOCÊ', metricas.get('ratio_eu_voce')),
+            ('Promessas Totais', metricas.get('promessas_totais')),
+            ('Provas Oferecidas', metricas.get('provas_oferecidas'))
+        )])
+    return blocks
+
+def _build_psychological_reverse(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    
+    perfil = data.get('perfil_psicologico_profundo') or {}
+    if perfil:
+        blocks.extend([heading('Dossiê Psicológico Confidencial'), fields(
+            ('Nome Fictício', perfil.get('nome_ficticio')),
+            ('Idade', perfil.get('idade_aproximada')),
+            ('Ocupação', perfil.get('ocupacao_situacao')),
+            ('Jornada de Dor', perfil.get('jornada_dor'))
+        )])
+    
+    for key, title in (
+        ('feridas_abertas', 'As Feridas Abertas'),
+        ('sonhos_proibidos', 'Os Sonhos Proibidos'),
+        ('demonios_internos', 'Os Demônios Internos')
+    ):
+        if data.get(key):
+            blocks.extend([heading(title), bullets(data[key], ordered=True)])
+    
+    dialeto = data.get('dialeto_alma') or {}
+    if dialeto:
+        blocks.append(heading('O Dialeto da Alma'))
+        for key, title in (('frases_dores', 'Frases Típicas Sobre Dores'), ('frases_desejos', 'Frases Típicas Sobre Desejos')):
+            if dialeto.get(key):
+                blocks.extend([heading(title, 3), bullets([f"\"{frase}\"" for frase in dialeto[key]])])
+    return blocks
+
+def _build_avatar_dashboard(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = []
+    
+    visao = data.get('visao_geral') or {}
+    if visao:
+        blocks.extend([heading('Visão Geral'), fields(('Público Analisado', visao.get('publico_analisado')))])
+        dist = visao.get('distribuicao_faturamento') or {}
+        if dist:
+            blocks.extend([heading('Distribuição por Faturamento', 3), bullets([
+                f"Acima de R$ 5 milhões: {_text(dist.get('acima_5_milhoes'))}",
+                f"Entre R$ 1-5 milhões: {_text(dist.get('entre_1_5_milhoes'))}",
+                f"Abaixo de R$ 1 milhão: {_text(dist.get('abaixo_1_milhao'))}"
+            ])])
+    
+    dores = (data.get('analise_dores') or {}).get('top_10_dores_estruturadas') or []
+    if dores:
+        blocks.extend([heading('Top 10 Dores Estruturadas'), bullets([
+            f"{_text(dor.get('dor'))} (frequência: {_text(dor.get('frequencia'))}, "
+            f"intensidade: {_text(dor.get('intensidade'))}, contexto: {_text(dor.get('contexto'))})"
+            for dor in dores if isinstance(dor, dict)
+        ], ordered=True)])
+    
+    comportamento = data.get('comportamento') or {}
+    if comportamento.get('arquetipos_dominantes'):
+        blocks.extend([heading('Arquétipos Dominantes'), bullets([
+            f"{_label(arquetipo)}: {percentual}" for arquetipo, percentual in comportamento['arquetipos_dominantes'].items()
+        ])])
+    if comportamento.get('medos_paralisantes'):
+        blocks.extend([heading('Medos Paralisantes'), bullets(comportamento['medos_paralisantes'])])
+    return blocks
+
+def _build_diagnostic(diagnostico: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [fields(
+        ('Status', diagnostico.get('status_geral')),
+        ('Avaliação', diagnostico.get('avaliacao')),
+        ('Recomendação', diagnostico.get('recomendacao'))
+    )]
+
+def _build_generic(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, dict):
+        return [fields(*[(_label(key), value) for key, value in data.items()])]
+    if isinstance(data, list):
+        return [bullets(data, ordered=True)]
+    return [paragraph(data)]
+
+# ----------------------------------------------------------------------
+# Registro de seções: chave -> (título, construtor, extrator dos dados da seção)
+# ----------------------------------------------------------------------
+
+def _key(name: str) -> Callable[[Dict[str, Any]], Any]:
+    return lambda analysis: analysis.get(name)
+
+def _project_field(analysis: Dict[str, Any], name: str) -> Any:
+    return analysis.get(name) or (analysis.get('projeto_dados') or {}).get(name)
+
+def _cover_source(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = analysis.get('metadata') or {}
+    return {
+        'segmento': _project_field(analysis, 'segmento'),
+        'produto': _project_field(analysis, 'produto'),
+        'created_at': analysis.get('created_at'),
+        'metadata': {
+            key: metadata.get(key)
+            for key in ('generated_at', 'model', 'processing_time', 'processing_time_formatted')
+            if key in metadata
+        }
+    }
+
+def _summary_source(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    insights = analysis.get('insights_exclusivos')
+    return {
+        **{name: _project_field(analysis, name) for name in ('segmento', 'produto', 'publico', 'preco', 'objetivo_receita')},
+        'insights': insights[:5] if isinstance(insights, list) else [],
+        'processing_time_formatted': (analysis.get('metadata') or {}).get('processing_time_formatted')
+    }
+
+def _drivers_source(analysis: Dict[str, Any]) -> Any:
+    return (
+        analysis.get('drivers_mentais_customizados')
+        or (analysis.get('drivers_mentais_sistema_completo') or {}).get('drivers_customizados')
+    )
+
+SECTIONS: Dict[str, tuple] = {
+    'capa': ('Análise Ultra-Detalhada de Mercado', _build_cover, _cover_source),
+    'sumario_executivo': ('Sumário Executivo', _build_executive_summary, _summary_source),
+    'resumo_executivo': ('Resumo Executivo', _build_consolidated_summary, _key('resumo_executivo')),
+    'analise_forense_devastadora': ('Análise Forense Devastadora', _build_forensic, _key('analise_forense_devastadora')),
+    'analise_forense_completa': ('Análise Forense Completa (12 Camadas)', _build_generic, _key('analise_forense_completa')),
+    'engenharia_reversa_psicologica': ('Engenharia Reversa Psicológica', _build_psychological_reverse, _key('engenharia_reversa_psicologica')),
+    'sistema_drivers_mentais': ('Sistema de Drivers Mentais', _build_mental_drivers_system, _key('sistema_drivers_mentais')),
+    'drivers_mentais_sistema_completo': ('Sistema Completo de Drivers Mentais', _build_generic, _key('drivers_mentais_sistema_completo')),
+    'sistema_anti_objecao_completo': ('Sistema Anti-Objeção Completo', _build_anti_objection, _key('sistema_anti_objecao_completo')),
+    'arsenal_anti_objecao_completo': ('Arsenal Completo Anti-Objeção', _build_generic, _key('arsenal_anti_objecao_completo')),
+    'pre_pitch_invisivel_completo': ('Pré-Pitch Invisível', _build_pre_pitch, _key('pre_pitch_invisivel_completo')),
+    'sistema_pre_pitch_completo': ('Sistema Completo de Pré-Pitch', _build_generic, _key('sistema_pre_pitch_completo')),
+    'sistema_provas_visuais_completo': ('Sistema de Provas Visuais', _build_visual_proofs, _key('sistema_provas_visuais_completo')),
+    'sistema_provis_completo': ('Sistema Completo de PROVIs', _build_generic, _key('sistema_provis_completo')),
+    'dashboard_avatar_completo': ('Dashboard do Avatar', _build_avatar_dashboard, _key('dashboard_avatar_completo')),
+    'avatar_ultra_detalhado': ('Avatar Ultra-Detalhado', _build_avatar, _key('avatar_ultra_detalhado')),
+    'drivers_mentais_customizados': ('Drivers Mentais Customizados', _build_drivers, _drivers_source),
+    'sistema_anti_objecao': ('Sistema Anti-Objeção', _build_anti_objection, _key('sistema_anti_objecao')),
+    'provas_visuais_sugeridas': ('Provas Visuais Instantâneas', _build_visual_proofs, _key('provas_visuais_sugeridas')),
+    'pre_pitch_invisivel': ('Pré-Pitch Invisível', _build_pre_pitch, _key('pre_pitch_invisivel')),
+    'predicoes_futuro_completas': ('Predições do Futuro', _build_future_predictions, _key('predicoes_futuro_completas')),
+    'escopo': ('Escopo e Posicionamento', _build_positioning, _key('escopo')),
+    'analise_concorrencia_detalhada': ('Análise de Concorrência', _build_competition, _key('analise_concorrencia_detalhada')),
+    'estrategia_palavras_chave': ('Estratégia de Marketing', _build_marketing, _key('estrategia_palavras_chave')),
+    'metricas_performance_detalhadas': ('Métricas de Performance', _build_metrics, _key('metricas_performance_detalhadas')),
+    'projecoes_cenarios': ('Projeções e Cenários', _build_projections, _key('projecoes_cenarios')),
+    'plano_acao_detalhado': ('Plano de Ação Detalhado', _build_action_plan, _key('plano_acao_detalhado')),
+    'insights_exclusivos': ('Insights Exclusivos', _build_insights, _key('insights_exclusivos')),
+    'pesquisa_web_massiva': ('Pesquisa Web Massiva', _build_research, _key('pesquisa_web_massiva')),
+    'diagnostico_final': ('Diagnóstico Final', _build_diagnostic, _key('diagnostico_final'))
+}
+
+# Seções (em ordem) de cada relatório
+PDF_SECTIONS = [
+    'capa', 'sumario_executivo', 'avatar_ultra_detalhado', 'drivers_mentais_customizados',
+    'sistema_anti_objecao', 'provas_visuais_sugeridas', 'pre_pitch_invisivel', 'predicoes_futuro_completas',
+    'escopo', 'analise_concorrencia_detalhada', 'estrategia_palavras_chave', 'metricas_performance_detalhadas',
+    'projecoes_cenarios', 'plano_acao_detalhado', 'insights_exclusivos', 'pesquisa_web_massiva'
+]
+
+COMPREHENSIVE_SECTIONS = [
+    'analise_forense_devastadora', 'analise_forense_completa', 'engenharia_reversa_psicologica',
+    'sistema_drivers_mentais', 'drivers_mentais_sistema_completo', 'sistema_anti_objecao_completo',
+    'arsenal_anti_objecao_completo', 'pre_pitch_invisivel_completo', 'sistema_pre_pitch_completo',
+    'sistema_provas_visuais_completo', 'sistema_provis_completo', 'dashboard_avatar_completo',
+    'avatar_ultra_detalhado', 'drivers_mentais_customizados', 'provas_visuais_sugeridas',
+    'sistema_anti_objecao', 'pre_pitch_invisivel', 'predicoes_futuro_completas',
+    'pesquisa_web_massiva', 'insights_exclusivos'
+]
+
+CONSOLIDATION_SECTIONS = [
+    'resumo_executivo', 'pesquisa_web_massiva', 'avatar_ultra_detalhado', 'drivers_mentais_customizados',
+    'provas_visuais_sugeridas', 'sistema_anti_objecao', 'pre_pitch_invisivel', 'predicoes_futuro_completas',
+    'insights_exclusivos', 'diagnostico_final'
+]
+
+class ReportDocumentBuilder:
+    """Constrói o documento por seção e memoriza seções e renderizações pelo hash dos dados"""
+    
+    def __init__(self):
+        """Inicializa caches LRU de seções e de renderizações por formato"""
+        self.max_sections = int(os.getenv('REPORT_SECTION_CACHE_SIZE', 512))
+        self._sections: OrderedDict = OrderedDict()
+        self._rendered: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        
+        logger.info("Report Document Builder inicializado")
+    
+    def _cache_get(self, cache: OrderedDict, key, name: str):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+        CACHE_REQUESTS.labels(name, 'hit' if value is not None else 'miss').inc()
+        return value
+    
+    def _cache_put(self, cache: OrderedDict, key, value, limit: int):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+    
+    def section_hash(self, key: str, source: Any) -> str:
+        """Hash estável dos dados de uma seção (chaves ordenadas) + versão do modelo"""
+        payload = json.dumps(source, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{DOCUMENT_VERSION}:{key}:{payload}".encode('utf-8')).hexdigest()[:24]
+    
+    def build(self, analysis: Dict[str, Any], section_keys: List[str], title: str = '') -> Dict[str, Any]:
+        """Documento com as seções presentes na análise; seções inalteradas vêm do cache"""
+        sections = []
+        
+        for key in section_keys:
+            section_title, builder, extract = SECTIONS[key]
+            source = extract(analysis)
+            if not source:
+                continue
+            
+            digest = self.section_hash(key, source)
+            section = self._cache_get(self._sections, digest, 'report_section')
+            
+            if section is None:
+                try:
+                    blocks = builder(source)
+                except Exception as e:
+                    logger.error(f"Erro ao construir seção {key}: {e}")
+                    blocks = [paragraph(f"Erro ao processar seção: {str(e)}")]
+                
+                section = {'key': key, 'title': section_title, 'hash': digest, 'blocks': blocks}
+                self._cache_put(self._sections, digest, section, self.max_sections)
+            
+            sections.append(section)
+        
+        return {'title': title, 'sections': sections}
+    
+    def render(self, document: Dict[str, Any], fmt: str) -> List[str]:
+        """Fragmentos renderizados por seção ('markdown', 'html' ou 'json'), memorizados por hash"""
+        renderer = SECTION_RENDERERS[fmt]
+        fragments = []
+        
+        for section in document['sections']:
+            cache_key = (fmt, section['hash'])
+            fragment = self._cache_get(self._rendered, cache_key, 'report_render')
+            if fragment is None:
+                fragment = renderer(section)
+                self._cache_put(self._rendered, cache_key, fragment, self.max_sections * len(SECTION_RENDERERS))
+            fragments.append(fragment)
+        
+        return fragments
+    
+    def render_markdown(self, document: Dict[str, Any]) -> str:
+        return ''.join(self.render(document, 'markdown'))
+    
+    def render_html(self, document: Dict[str, Any]) -> str:
+        return ''.join(self.render(document, 'html'))
+    
+    def render_json(self, document: Dict[str, Any], **extra) -> str:
+        """JSON do documento montado a partir dos fragmentos de seção já serializados"""
+        head = json.dumps({'title': document.get('title', ''), **extra}, ensure_ascii=False, default=str)
+        sections = ',\n'.join(self.render(document, 'json'))
+        return f"{head[:-1]}, \"sections\": [\n{sections}\n]}}"
+
+# ----------------------------------------------------------------------
+# Renderizadores de seção
+# ----------------------------------------------------------------------
+
+def _section_markdown(section: Dict[str, Any]) -> str:
+    content = f"## {section['title']}\n\n"
+    
+    for block in section['blocks']:
+        kind = block['type']
+        if kind == 'heading':
+            content += f"{'#' * (block['level'] + 1)} {block['text']}\n\n"
+        elif kind == 'paragraph':
+            content += f"{block['text']}\n\n"
+        elif kind == 'fields':
+            content += ''.join(f"**{label}:** {value}  \n" for label, value in block['items']) + "\n"
+        elif kind == 'list':
+            content += ''.join(
+                f"{f'{i}.' if block['ordered'] else '-'} {item}\n" for i, item in enumerate(block['items'], 1)
+            ) + "\n"
+        elif kind == 'table':
+            rows = block['rows']
+            if block['header']:
+                content += f"| {' | '.join(rows[0])} |\n|{'---|' * len(rows[0])}\n"
+                rows = rows[1:]
+                content += ''.join(f"| {' | '.join(row)} |\n" for row in rows) + "\n"
+            else:
+                content += ''.join(f"**{row[0]}** {' | '.join(row[1:])}  \n" for row in rows) + "\n"
+    
+    return content + "---\n\n"
+
+def _section_html(section: Dict[str, Any]) -> str:
+    esc = html.escape
+    content = f"<h2 id=\"{section['key']}\">{esc(section['title'])}</h2>\n"
+    
+    for block in section['blocks']:
+        kind = block['type']
+        if kind == 'heading':
+            level = block['level'] + 1
+            content += f"<h{level}>{esc(block['text'])}</h{level}>\n"
+        elif kind == 'paragraph':
+            content += f"<p>{esc(block['text'])}</p>\n"
+        elif kind == 'fields':
+            content += '<div class="metric">' + '<br>'.join(
+                f"<strong>{esc(label)}:</strong> {esc(value)}" for label, value in block['items']
+            ) + '</div>\n'
+        elif kind == 'list':
+            tag = 'ol' if block['ordered'] else 'ul'
+            content += f"<{tag}>" + ''.join(f"<li>{esc(item)}</li>" for item in block['items']) + f"</{tag}>\n"
+        elif kind == 'table':
+            rows = block['rows']
+            content += '<table>'
+            if block['header']:
+                content += '<tr>' + ''.join(f"<th>{esc(cell)}</th>" for cell in rows[0]) + '</tr>'
+                rows = rows[1:]
+            content += ''.join('<tr>' + ''.join(f"<td>{esc(cell)}</td>" for cell in row) + '</tr>' for row in rows)
+            content += '</table>\n'
+    
+    return content
+
+def _section_json(section: Dict[str, Any]) -> str:
+    return json.dumps(section, ensure_ascii=False, default=str)
+
+SECTION_RENDERERS = {
+    'markdown': _section_markdown,
+    'html': _section_html,
+    'json': _section_json
+}
+
+# Instância global
+report_document_builder = lazy_service(ReportDocumentBuilder, 'report_document_builder')
@@ -10,6 +10,7 @@ import logging
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 from services.auto_save_manager import auto_save_manager, salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -253,4 +254,4 @@ class ResilientComponentExecutor:
         logger.info("🔄 Executor resiliente resetado")
 
 # Instância global
-resilient_executor = ResilientComponentExecutor()
\ No newline at end of file
+resilient_executor = lazy_service(ResilientComponentExecutor, 'resilient_executor')
\ No newline at end of file
@@ -17,26 +17,20 @@ import re
 import tempfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service, lazy_import, module_available
+from utils.tracing import traced, set_span_attributes, wrap_context
+from utils.metrics import EXTRACTION_DURATION, EXTRACTIONS
+from utils.deadline import DeadlineExceeded, call_timeout, has_budget
 
-# Imports condicionais para não quebrar se não estiver instalado
-try:
-    import trafilatura
-    HAS_TRAFILATURA = True
-except ImportError:
-    HAS_TRAFILATURA = False
+# Extratores pesados só são importados no primeiro uso
+HAS_TRAFILATURA = module_available('trafilatura')
+trafilatura = lazy_import('trafilatura')
 
-try:
-    from readability import Document
-    HAS_READABILITY = True
-except ImportError:
-    HAS_READABILITY = False
+HAS_READABILITY = module_available('readability')
+readability = lazy_import('readability')
 
-try:
-    import newspaper
-    from newspaper import Article
-    HAS_NEWSPAPER = True
-except ImportError:
-    HAS_NEWSPAPER = False
+HAS_NEWSPAPER = module_available('newspaper')
+newspaper = lazy_import('newspaper')
 
 try:
     from bs4 import BeautifulSoup
@@ -44,17 +38,8 @@ try:
 except ImportError:
     HAS_BEAUTIFULSOUP = False
 
-try:
-    import PyPDF2
-    HAS_PYPDF2 = True
-except ImportError:
-    HAS_PYPDF2 = False
-
-try:
-    import pdfplumber
-    HAS_PDFPLUMBER = True
-except ImportError:
-    HAS_PDFPLUMBER = False
+HAS_PYPDF2 = module_available('PyPDF2')
+HAS_PDFPLUMBER = module_available('pdfplumber')
 
 from services.url_resolver import url_resolver
 
@@ -63,6 +48,9 @@ logger = logging.getLogger(__name__)
 class RobustContentExtractor:
     """Extrator de conteúdo multicamadas e robusto com suporte aprimorado a PDF"""
     
+    # Clientes HTTP não são herdados: o processo filho recria o serviço sob demanda
+    reset_after_fork = True
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
@@ -97,14 +85,27 @@ class RobustContentExtractor:
         logger.info("🔧 Robust Content Extractor inicializado")
         logger.info(f"📚 Extratores disponíveis: {self._get_available_extractors()}")
     
+    @traced('extract_content', category='extraction')
     def extract_content(self, url: str) -> Optional[str]:
         """
         Extrai conteúdo usando múltiplos extratores em ordem de prioridade
         Agora com suporte aprimorado a PDF e melhor fallback
         """
+        started = time.time()
+        content = self._extract_content(url)
+        
+        outcome = 'success' if content else 'failure'
+        EXTRACTION_DURATION.labels('total', outcome).observe(time.time() - started)
+        EXTRACTIONS.labels(outcome).inc()
+        return content
+    
+    def _extract_content(self, url: str) -> Optional[str]:
+        """Pipeline de extração: resolução, PDF, HTML, extratores e fallback agressivo"""
         if not url or not url.startswith('http'):
             logger.error(f"❌ URL inválida: {url}")
             return None
+        
+        set_span_attributes(url=url)
             
         try:
             start_time = time.time()
@@ -197,8 +198,10 @@ class RobustContentExtractor:
                     
                     content = extractor_func(html_content, url)
                     extractor_time = time.time() - extractor_start
+                    valid = self._validate_content(content, url)
+                    EXTRACTION_DURATION.labels(extractor_name, 'success' if valid else 'insufficient').observe(extractor_time)
                     
-                    if self._validate_content(content, url):
+                    if valid:
                         self.stats[extractor_name]['success'] += 1
                         self.stats[extractor_name]['total_time'] += extractor_time
                         self.stats['global']['total_successes'] += 1
@@ -220,6 +223,7 @@ class RobustContentExtractor:
                         
                 except Exception as e:
                     self.stats[extractor_name]['failed'] += 1
+                    EXTRACTION_DURATION.labels(extractor_name, 'error').observe(time.time() - extractor_start)
                     logger.error(f"❌ Erro com {extractor_name}: {str(e)}")
                     salvar_erro(f"extrator_{extractor_name}", e, contexto={"url": url})
                     continue
@@ -264,7 +268,7 @@ class RobustContentExtractor:
         
         try:
             # Baixa o PDF
-            response = self.session.get(url, timeout=self.timeout)
+            response = self.session.get(url, timeout=call_timeout(self.timeout))
             response.raise_for_status()
             
             # Salva temporariamente
@@ -453,11 +457,16 @@ class RobustContentExtractor:
         max_retries = 3
         
         for attempt in range(max_retries):
+            # Novas tentativas só enquanto o orçamento da análise comporta uma requisição útil
+            if attempt and not has_budget(5):
+                logger.warning(f"⏰ Orçamento insuficiente para nova tentativa em {url}")
+                return None
+            
             try:
                 # CORREÇÃO: Configurações mais robustas para SSL
                 response = self.session.get(
                     url,
-                    timeout=self.timeout,
+                    timeout=call_timeout(self.timeout),
                     verify=False,  # Desabilita verificação SSL
                     allow_redirects=True
                 )
@@ -478,6 +487,9 @@ class RobustContentExtractor:
                 
                 return html
                 
+            except DeadlineExceeded:
+                logger.warning(f"⏰ Orçamento esgotado antes de baixar {url}")
+                return None
             except requests.exceptions.SSLError as ssl_error:
                 logger.warning(f"⚠️ Erro SSL na tentativa {attempt + 1} para {url}: {ssl_error}")
                 if attempt < max_retries - 1:
@@ -519,7 +531,7 @@ class RobustContentExtractor:
                 favor_precision=False,  # Mudado para False para ser mais inclusivo
                 favor_recall=True,      # Prioriza recuperar mais conteúdo
                 url=url,
-                config=trafilatura.settings.use_config()
+                config=lazy_import('trafilatura.settings').use_config()
             )
             
             if content:
@@ -539,7 +551,7 @@ class RobustContentExtractor:
         
         try:
             # Configurações mais inclusivas
-            doc = Document(html, positive_keywords=['content', 'article', 'post', 'text', 'main'])
+            doc = readability.Document(html, positive_keywords=['content', 'article', 'post', 'text', 'main'])
             content = doc.summary()
             
             if content:
@@ -566,7 +578,7 @@ class RobustContentExtractor:
             return None
         
         try:
-            article = Article(url)
+            article = newspaper.Article(url)
             article.set_html(html)
             article.parse()
             
@@ -857,7 +869,7 @@ class RobustContentExtractor:
         results = {}
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(self.extract_content, url): url for url in urls}
+            future_to_url = {executor.submit(wrap_context(self.extract_content), url): url for url in urls}
             
             for future in as_completed(future_to_url):
                 url = future_to_url[future]
@@ -919,4 +931,4 @@ class RobustContentExtractor:
         logger.info("🧹 Cache de extração limpo")
 
 # Instância global
-robust_content_extractor = RobustContentExtractor()
\ No newline at end of file
+robust_content_extractor = lazy_service(RobustContentExtractor, 'robust_content_extractor')
\ No newline at end of file
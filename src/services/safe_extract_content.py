@@ -11,6 +11,9 @@ from typing import Optional, Dict, Any, Tuple, List  # Added List import
 from services.robust_content_extractor import robust_content_extractor
 from services.content_quality_validator import content_quality_validator
 from services.url_resolver import url_resolver
+from utils.lazy import lazy_service
+from utils.tracing import wrap_context
+from utils.deadline import deadline, DeadlineExceeded
 
 logger = logging.getLogger(__name__)
 
@@ -138,30 +141,15 @@ class SafeContentExtractor:
     
     def _extract_with_timeout(self, url: str) -> Optional[str]:
         """Extrai conteúdo com timeout"""
-        import signal
         
-        def timeout_handler(signum, frame):
-            raise TimeoutError("Extração excedeu tempo limite")
-        
-        # Configura timeout (apenas em sistemas Unix)
+        # Orçamento aninhado ao da análise: os timeouts de rede da extração nunca
+        # ultrapassam max_extraction_time (SIGALRM não funciona fora da thread principal)
         try:
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(self.max_extraction_time)
-            
-            content = robust_content_extractor.extract_content(url)
-            
-            signal.alarm(0)  # Cancela timeout
-            return content
-            
-        except AttributeError:
-            # Sistema Windows - sem timeout por signal
-            return robust_content_extractor.extract_content(url)
-        except TimeoutError:
+            with deadline(self.max_extraction_time, 'extraction'):
+                return robust_content_extractor.extract_content(url)
+        except DeadlineExceeded:
             logger.error(f"⏰ Timeout na extração de {url}")
             return None
-        except Exception as e:
-            signal.alarm(0)  # Cancela timeout em caso de erro
-            raise e
     
     def batch_safe_extract(
         self, 
@@ -177,7 +165,7 @@ class SafeContentExtractor:
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_url = {
-                executor.submit(self.safe_extract_content, url, context): url 
+                executor.submit(wrap_context(self.safe_extract_content), url, context): url 
                 for url in urls
             }
             
@@ -207,7 +195,7 @@ class SafeContentExtractor:
         return robust_content_extractor.get_extractor_stats()
 
 # Instância global
-safe_content_extractor = SafeContentExtractor()
+safe_content_extractor = lazy_service(SafeContentExtractor, 'safe_content_extractor')
 
 # Função de conveniência
 def safe_extract_content(url: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
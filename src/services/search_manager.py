@@ -13,6 +13,7 @@ from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -398,4 +399,4 @@ class SearchManager:
             logger.info("🔄 Reset erros de todos os provedores de busca")
 
 # Instância global
-search_manager = SearchManager()
+search_manager = lazy_service(SearchManager, 'search_manager')
@@ -6,18 +6,41 @@ Cliente configurado para integração com Supabase
 """
 
 import os
+import uuid
 import logging
 import time
 from typing import Dict, List, Optional, Any
-from supabase import create_client, Client
 from datetime import datetime
 import json
+from utils.pagination import SUMMARY_FIELDS, decode_cursor, parse_fields
+from utils.lazy import lazy_service, lazy_import
 
 logger = logging.getLogger(__name__)
 
+# SDK importado apenas quando o cliente é criado
+supabase = lazy_import('supabase')
+
+# Namespace dos IDs determinísticos de analysis_files
+FILE_ID_NAMESPACE = uuid.UUID('6f1c2b1e-8d4a-4f7e-9c3b-2a5d7e9f1b3c')
+
+# Colunas que podem ser projetadas nas consultas de análises
+ANALYSIS_COLUMNS = [
+    'id', 'segmento', 'produto', 'publico', 'preco', 'objetivo_receita',
+    'orcamento_marketing', 'prazo_lancamento', 'concorrentes', 'dados_adicionais',
+    'query', 'status', 'avatar_data', 'positioning_data', 'competition_data',
+    'marketing_data', 'metrics_data', 'funnel_data', 'action_plan_data',
+    'insights_data', 'drivers_mentais_data', 'provas_visuais_data',
+    'anti_objecao_data', 'pre_pitch_data', 'predicoes_futuro_data',
+    'pesquisa_web_data', 'comprehensive_analysis', 'local_files_path',
+    'created_at', 'updated_at'
+]
+
 class SupabaseClient:
     """Cliente Supabase para ARQV30 Enhanced"""
     
+    # Clientes HTTP não são herdados: o processo filho recria o serviço sob demanda
+    reset_after_fork = True
+    
     def __init__(self):
         """Inicializa cliente Supabase"""
         self.supabase_url = os.getenv('SUPABASE_URL')
@@ -30,13 +53,17 @@ class SupabaseClient:
             self.admin_client = None
             return
         
+        self._create_clients()
+    
+    def _create_clients(self):
+        """Cria clientes HTTP do Supabase"""
         try:
             # Cliente principal (anon key)
-            self.client: Client = create_client(self.supabase_url, self.supabase_key)
+            self.client = supabase.create_client(self.supabase_url, self.supabase_key)
             
             # Cliente admin (service role) se disponível
             if self.service_role_key:
-                self.admin_client: Client = create_client(self.supabase_url, self.service_role_key)
+                self.admin_client = supabase.create_client(self.supabase_url, self.service_role_key)
             else:
                 self.admin_client = self.client
             
@@ -79,40 +106,7 @@ class SupabaseClient:
         
         try:
             # Prepara dados para inserção
-            insert_data = {
-                'segmento': analysis_data.get('segmento', ''),
-                'produto': analysis_data.get('produto', ''),
-                'publico': analysis_data.get('publico', ''),
-                'preco': float(analysis_data.get('preco', 0)) if analysis_data.get('preco') else None,
-                'objetivo_receita': float(analysis_data.get('objetivo_receita', 0)) if analysis_data.get('objetivo_receita') else None,
-                'orcamento_marketing': float(analysis_data.get('orcamento_marketing', 0)) if analysis_data.get('orcamento_marketing') else None,
-                'prazo_lancamento': analysis_data.get('prazo_lancamento', ''),
-                'concorrentes': analysis_data.get('concorrentes', ''),
-                'dados_adicionais': analysis_data.get('dados_adicionais', ''),
-                'query': analysis_data.get('query', ''),
-                'status': analysis_data.get('status', 'completed'),
-                'avatar_data': analysis_data.get('avatar_ultra_detalhado'),
-                'positioning_data': analysis_data.get('escopo'),
-                'competition_data': analysis_data.get('analise_concorrencia_detalhada'),
-                'marketing_data': analysis_data.get('estrategia_palavras_chave'),
-                'metrics_data': analysis_data.get('metricas_performance_detalhadas'),
-                'funnel_data': analysis_data.get('funil_vendas_detalhado'),
-                'action_plan_data': analysis_data.get('plano_acao_detalhado'),
-                'insights_data': analysis_data.get('insights_exclusivos'),
-                'drivers_mentais_data': analysis_data.get('drivers_mentais_customizados'),
-                'provas_visuais_data': analysis_data.get('provas_visuais_instantaneas'),
-                'anti_objecao_data': analysis_data.get('sistema_anti_objecao'),
-                'pre_pitch_data': analysis_data.get('pre_pitch_invisivel'),
-                'predicoes_futuro_data': analysis_data.get('predicoes_futuro_completas'),
-                'pesquisa_web_data': analysis_data.get('pesquisa_web_massiva'),
-                'comprehensive_analysis': analysis_data,
-                'local_files_path': analysis_data.get('local_files_path'),
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            # Remove campos None
-            insert_data = {k: v for k, v in insert_data.items() if v is not None}
+            insert_data = self._build_analysis_row(analysis_data)
             
             # Insere no banco com retry
             result = self._insert_with_retry(insert_data)
@@ -135,6 +129,45 @@ class SupabaseClient:
                 logger.error(f"❌ Erro ao criar análise no Supabase: {error_msg}")
             return None
     
+    def _build_analysis_row(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Monta registro da tabela analyses a partir da análise completa"""
+        insert_data = {
+            'segmento': analysis_data.get('segmento', ''),
+            'produto': analysis_data.get('produto', ''),
+            'publico': analysis_data.get('publico', ''),
+            'preco': float(analysis_data.get('preco', 0)) if analysis_data.get('preco') else None,
+            'objetivo_receita': float(analysis_data.get('objetivo_receita', 0)) if analysis_data.get('objetivo_receita') else None,
+            'orcamento_marketing': float(analysis_data.get('orcamento_marketing', 0)) if analysis_data.get('orcamento_marketing') else None,
+            'prazo_lancamento': analysis_data.get('prazo_lancamento', ''),
+            'concorrentes': analysis_data.get('concorrentes', ''),
+            'dados_adicionais': analysis_data.get('dados_adicionais', ''),
+            'query': analysis_data.get('query', ''),
+            'status': analysis_data.get('status', 'completed'),
+            'avatar_data': analysis_data.get('avatar_ultra_detalhado'),
+            'positioning_data': analysis_data.get('escopo'),
+            'competition_data': analysis_data.get('analise_concorrencia_detalhada'),
+            'marketing_data': analysis_data.get('estrategia_palavras_chave'),
+            'metrics_data': analysis_data.get('metricas_performance_detalhadas'),
+            'funnel_data': analysis_data.get('funil_vendas_detalhado'),
+            'action_plan_data': analysis_data.get('plano_acao_detalhado'),
+            'insights_data': analysis_data.get('insights_exclusivos'),
+            'drivers_mentais_data': analysis_data.get('drivers_mentais_customizados'),
+            'provas_visuais_data': analysis_data.get('provas_visuais_instantaneas'),
+            'anti_objecao_data': analysis_data.get('sistema_anti_objecao'),
+            'pre_pitch_data': analysis_data.get('pre_pitch_invisivel'),
+            'predicoes_futuro_data': analysis_data.get('predicoes_futuro_completas'),
+            'pesquisa_web_data': analysis_data.get('pesquisa_web_massiva'),
+            'comprehensive_analysis': analysis_data,
+            'local_files_path': analysis_data.get('local_files_path'),
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+        
+        # Remove campos None
+        insert_data = {k: v for k, v in insert_data.items() if v is not None}
+        
+        return insert_data
+    
     def _validate_api_key(self) -> bool:
         """Valida se a chave de API está funcionando"""
         if not self.client:
@@ -176,13 +209,30 @@ class SupabaseClient:
                 else:
                     raise e
     
-    def get_analysis(self, analysis_id: str) -> Optional[Dict[str, Any]]:
-        """Busca análise por ID"""
+    def upsert_rows(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insere linhas em lote ignorando ids já existentes (operação idempotente)"""
+        if not self.client:
+            raise RuntimeError('Supabase não conectado')
+        
+        if not rows:
+            return []
+        
+        result = self.client.table(table)\
+            .upsert(rows, on_conflict='id', ignore_duplicates=True)\
+            .execute()
+        
+        return result.data or []
+    
+    def get_analysis(self, analysis_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Busca análise por ID, opcionalmente apenas com os campos informados"""
         if not self.client:
             return None
         
         try:
-            result = self.client.table('analyses').select('*').eq('id', analysis_id).execute()
+            columns = parse_fields(fields, ANALYSIS_COLUMNS)
+            select = ', '.join(columns) if columns else '*'
+            
+            result = self.client.table('analyses').select(select).eq('id', analysis_id).execute()
             
             if result.data:
                 return result.data[0]
@@ -193,17 +243,38 @@ class SupabaseClient:
             logger.error(f"❌ Erro ao buscar análise {analysis_id}: {str(e)}")
             return None
     
-    def list_analyses(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Lista análises com paginação"""
+    def list_analyses(
+        self, 
+        limit: int = 50, 
+        offset: int = 0, 
+        cursor: Optional[str] = None, 
+        fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Lista análises com paginação por cursor (created_at, id) ou offset"""
         if not self.client:
             return []
         
+        position = decode_cursor(cursor)
+        
         try:
-            result = self.client.table('analyses')\
-                .select('id, segmento, produto, status, created_at, updated_at, local_files_path')\
+            columns = parse_fields(fields, ANALYSIS_COLUMNS) or SUMMARY_FIELDS
+            
+            query = self.client.table('analyses')\
+                .select(', '.join(columns))\
                 .order('created_at', desc=True)\
-                .range(offset, offset + limit - 1)\
-                .execute()
+                .order('id', desc=True)
+            
+            if position:
+                # Paginação por chave: usa idx_analyses_created_at_id em vez de OFFSET
+                created_at, last_id = position
+                query = query.or_(
+                    f'created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.lt."{last_id}")'
+                ).limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
+            
+            result = query.execute()
             
             return result.data if result.data else []
             
@@ -211,6 +282,28 @@ class SupabaseClient:
             logger.error(f"❌ Erro ao listar análises: {str(e)}")
             return []
     
+    def get_listing_version(self) -> Optional[Dict[str, Any]]:
+        """Versão da listagem (total e último updated_at) sem carregar as linhas"""
+        if not self.client:
+            return None
+        
+        try:
+            # Uma linha só com updated_at (idx_analyses_updated_at) + contagem exata
+            result = self.client.table('analyses')\
+                .select('updated_at', count='exact')\
+                .order('updated_at', desc=True)\
+                .limit(1)\
+                .execute()
+            
+            return {
+                'count': result.count or 0,
+                'updated_at': result.data[0]['updated_at'] if result.data else None
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter versão da listagem: {str(e)}")
+            return None
+    
     def update_analysis(self, analysis_id: str, update_data: Dict[str, Any]) -> bool:
         """Atualiza análise existente"""
         if not self.client:
@@ -253,21 +346,33 @@ class SupabaseClient:
             logger.error(f"❌ Erro ao remover análise {analysis_id}: {str(e)}")
             return False
     
+    def _build_file_row(self, analysis_id: str, file_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Monta registro da tabela analysis_files"""
+        row = {
+            'analysis_id': analysis_id,
+            'file_type': file_data.get('file_type'),
+            'file_name': file_data.get('file_name'),
+            'file_path': file_data.get('file_path'),
+            'file_size': file_data.get('file_size', 0),
+            'content_preview': file_data.get('content_preview', ''),
+            'created_at': datetime.now().isoformat()
+        }
+        
+        # ID determinístico: reenviar o mesmo arquivo (retentativa) não duplica a linha
+        row['id'] = file_data.get('id') or str(uuid.uuid5(
+            FILE_ID_NAMESPACE,
+            f"{analysis_id}:{file_data.get('file_type')}:{file_data.get('file_path') or file_data.get('file_name')}"
+        ))
+        
+        return row
+    
     def save_analysis_file(self, analysis_id: str, file_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Salva informações de arquivo de análise"""
         if not self.client:
             return None
         
         try:
-            insert_data = {
-                'analysis_id': analysis_id,
-                'file_type': file_data.get('file_type'),
-                'file_name': file_data.get('file_name'),
-                'file_path': file_data.get('file_path'),
-                'file_size': file_data.get('file_size', 0),
-                'content_preview': file_data.get('content_preview', ''),
-                'created_at': datetime.now().isoformat()
-            }
+            insert_data = self._build_file_row(analysis_id, file_data)
             
             result = self.client.table('analysis_files').insert(insert_data).execute()
             
@@ -282,6 +387,85 @@ class SupabaseClient:
             logger.error(f"❌ Erro ao salvar arquivo de análise: {str(e)}")
             return None
     
+    def save_analysis_files(
+        self, 
+        analysis_id: str, 
+        files: List[Dict[str, Any]], 
+        max_retries: int = 3
+    ) -> Dict[str, Any]:
+        """Salva vários registros de arquivos em uma única requisição"""
+        results = [
+            {'file_name': file_data.get('file_name'), 'status': 'pending'}
+            for file_data in files
+        ]
+        
+        if not self.client:
+            for row in results:
+                row.update({'status': 'failed', 'error': 'Supabase não conectado'})
+            return self._summarize_file_results(results)
+        
+        pending = list(range(len(files)))
+        
+        for attempt in range(max_retries):
+            if not pending:
+                break
+            
+            rows = [self._build_file_row(analysis_id, files[i]) for i in pending]
+            
+            try:
+                # Lote único e atômico; ids já gravados são ignorados (RLS de analysis_files não permite UPDATE)
+                self.client.table('analysis_files')\
+                    .upsert(rows, on_conflict='id', ignore_duplicates=True)\
+                    .execute()
+                
+                # Linhas ignoradas não voltam na resposta, mas já existem com o mesmo id
+                for index, row in zip(pending, rows):
+                    results[index].update({'status': 'saved', 'id': row['id']})
+                pending = []
+                
+            except Exception as batch_error:
+                error_str = str(batch_error).lower()
+                if 'invalid api key' in error_str or 'unauthorized' in error_str:
+                    for index in pending:
+                        results[index].update({'status': 'failed', 'error': str(batch_error)})
+                    break
+                
+                # Lote rejeitado: grava linha a linha para isolar as linhas com problema;
+                # linhas já gravadas são ignoradas e contam como salvas
+                logger.warning(f"⚠️ Lote de arquivos falhou (tentativa {attempt + 1}), isolando linhas: {batch_error}")
+                still_pending = []
+                for index in pending:
+                    try:
+                        row = self._build_file_row(analysis_id, files[index])
+                        self.client.table('analysis_files')\
+                            .upsert(row, on_conflict='id', ignore_duplicates=True)\
+                            .execute()
+                        results[index].update({'status': 'saved', 'id': row['id']})
+                        continue
+                    except Exception as row_error:
+                        results[index].update({'status': 'failed', 'error': str(row_error)})
+                    still_pending.append(index)
+                pending = still_pending
+            
+            if pending and attempt < max_retries - 1:
+                wait_time = (2 ** attempt) + 1  # Backoff exponencial
+                logger.warning(f"⚠️ {len(pending)} arquivos pendentes, nova tentativa em {wait_time}s")
+                time.sleep(wait_time)
+        
+        summary = self._summarize_file_results(results)
+        logger.info(f"✅ {summary['saved_count']}/{len(files)} arquivos de análise salvos no Supabase")
+        return summary
+    
+    def _summarize_file_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Consolida status por linha de uma inserção em lote"""
+        saved_count = len([r for r in results if r['status'] == 'saved'])
+        return {
+            'success': saved_count == len(results),
+            'saved_count': saved_count,
+            'failed_count': len(results) - saved_count,
+            'results': results
+        }
+    
     def get_analysis_files(self, analysis_id: str) -> List[Dict[str, Any]]:
         """Busca arquivos de uma análise"""
         if not self.client:
@@ -354,4 +538,4 @@ class SupabaseClient:
             }
 
 # Instância global
-supabase_client = SupabaseClient()
\ No newline at end of file
+supabase_client = lazy_service(SupabaseClient, 'supabase_client')
\ No newline at end of file
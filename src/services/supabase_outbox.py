@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Supabase Outbox
+Fila local durável (SQLite) para replicação assíncrona das análises no Supabase
+"""
+
+import os
+import time
+import uuid
+import random
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Any
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+from utils.serialization import dumps, load_file, loads
+
+logger = logging.getLogger(__name__)
+
+class SupabaseOutbox:
+    """Outbox transacional: gravações locais imediatas, replicação em background"""
+    
+    def __init__(self):
+        """Inicializa tabela do outbox e configurações do replicador"""
+        self.db = database_fallback
+        self.batch_size = int(os.getenv('OUTBOX_BATCH_SIZE', 5))
+        self.poll_interval = float(os.getenv('OUTBOX_POLL_INTERVAL', 2))
+        self.base_backoff = float(os.getenv('OUTBOX_BASE_BACKOFF', 2))
+        self.max_backoff = float(os.getenv('OUTBOX_MAX_BACKOFF', 300))
+        self.max_attempts = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 12))
+        self.lease_seconds = float(os.getenv('OUTBOX_LEASE_SECONDS', 120))
+        
+        self._thread = None
+        self._thread_pid = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        
+        self._ensure_table()
+        logger.info("✅ Supabase Outbox inicializado")
+    
+    def _ensure_table(self):
+        """Cria tabela do outbox se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS supabase_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    operation TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    claimed_at REAL,
+                    claimed_by TEXT,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    replicated_at REAL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_supabase_outbox_status
+                ON supabase_outbox (status, next_attempt_at)
+            ''')
+    
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    
+    def enqueue(self, operation: str, idempotency_key: str, payload: Dict[str, Any]) -> bool:
+        """Registra operação no outbox; chaves repetidas são ignoradas"""
+        try:
+            with self.db._connection() as conn:
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO supabase_outbox (
+                        idempotency_key, operation, payload, status, created_at
+                    ) VALUES (?, ?, ?, 'pending', ?)
+                ''', (
+                    idempotency_key,
+                    operation,
+                    dumps(payload),
+                    time.time()
+                ))
+                inserted = cursor.rowcount > 0
+            
+            if inserted:
+                logger.info(f"📥 Outbox: {operation} enfileirado ({idempotency_key})")
+            
+            self.ensure_replicator()
+            self._wake.set()
+            return inserted
+        
+        except Exception as e:
+            logger.error(f"❌ Erro ao enfileirar no outbox: {e}")
+            return False
+    
+    def enqueue_analysis(
+        self,
+        analysis_id: str,
+        analysis_data: Dict[str, Any],
+        local_result: Dict[str, Any]
+    ) -> bool:
+        """Enfileira análise salva localmente para replicação no Supabase"""
+        files = local_result.get('files', [])
+        complete_file = next((f['path'] for f in files if f.get('type') == 'completas'), None)
+        
+        # Diretório comum aos arquivos desta análise quando o resultado local não o informa
+        local_files_path = local_result.get('base_directory')
+        if not local_files_path and files:
+            local_files_path = os.path.commonpath([os.path.dirname(f['path']) for f in files])
+        
+        payload = {
+            'analysis_id': analysis_id,
+            'local_files_path': local_files_path,
+            'created_at': local_result.get('created_at') or analysis_data.get('created_at'),
+            'files': files
+        }
+        
+        # A análise completa já está em disco: o outbox guarda apenas a referência
+        if complete_file:
+            payload['analysis_file'] = complete_file
+        else:
+            payload['analysis_data'] = analysis_data
+        
+        return self.enqueue('create_analysis', analysis_id, payload)
+    
+    def has_key(self, idempotency_key: str) -> bool:
+        """Verifica se a chave já está registrada no outbox"""
+        with self.db._connection() as conn:
+            row = conn.execute(
+                'SELECT 1 FROM supabase_outbox WHERE idempotency_key = ?', (idempotency_key,)
+            ).fetchone()
+        return row is not None
+    
+    def requeue_failed(self) -> int:
+        """Devolve operações que esgotaram tentativas para a fila"""
+        with self.db._connection() as conn:
+            cursor = conn.execute('''
+                UPDATE supabase_outbox
+                SET status = 'pending', attempts = 0, next_attempt_at = 0
+                WHERE status = 'failed'
+            ''')
+            count = cursor.rowcount
+        
+        if count:
+            self.ensure_replicator()
+            self._wake.set()
+        return count
+    
+    # ------------------------------------------------------------------
+    # Leitura / observabilidade
+    # ------------------------------------------------------------------
+    
+    def get_lag(self, error_limit: int = 20) -> Dict[str, Any]:
+        """Retorna o atraso de replicação e contadores por status (somente leitura)"""
+        now = time.time()
+        
+        with self.db._connection() as conn:
+            status_counts = {
+                row['status']: row['total']
+                for row in conn.execute(
+                    'SELECT status, COUNT(*) AS total FROM supabase_outbox GROUP BY status'
+                )
+            }
+            oldest = conn.execute('''
+                SELECT MIN(created_at) FROM supabase_outbox
+                WHERE status IN ('pending', 'in_flight')
+            ''').fetchone()[0]
+            last_replicated = conn.execute(
+                "SELECT MAX(replicated_at) FROM supabase_outbox WHERE status = 'done'"
+            ).fetchone()[0]
+            failures = [
+                dict(row) for row in conn.execute('''
+                    SELECT idempotency_key, operation, status, attempts, last_error, created_at
+                    FROM supabase_outbox
+                    WHERE last_error IS NOT NULL AND status != 'done'
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                ''', (error_limit,))
+            ]
+        
+        pending = status_counts.get('pending', 0) + status_counts.get('in_flight', 0)
+        
+        return {
+            'pending': status_counts.get('pending', 0),
+            'in_flight': status_counts.get('in_flight', 0),
+            'failed': status_counts.get('failed', 0),
+            'replicated': status_counts.get('done', 0),
+            'lag_seconds': round(now - oldest, 1) if oldest else 0,
+            'oldest_pending_at': datetime.fromtimestamp(oldest).isoformat() if oldest else None,
+            'last_replicated_at': datetime.fromtimestamp(last_replicated).isoformat() if last_replicated else None,
+            'sync_needed': pending + status_counts.get('failed', 0) > 0,
+            'recent_errors': failures,
+            'replicator_running': self._is_running()
+        }
+    
+    # ------------------------------------------------------------------
+    # Replicador
+    # ------------------------------------------------------------------
+    
+    def _is_running(self) -> bool:
+        return (
+            self._thread is not None
+            and self._thread_pid == os.getpid()
+            and self._thread.is_alive()
+        )
+    
+    def ensure_replicator(self):
+        """Inicia o replicador neste processo (threads não sobrevivem ao fork)"""
+        if self._is_running():
+            return
+        
+        with self._lock:
+            if self._is_running():
+                return
+            
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='supabase-outbox-replicator', daemon=True
+            )
+            self._thread_pid = os.getpid()
+            self._thread.start()
+            logger.info(f"🔁 Replicador do outbox iniciado (pid {self._thread_pid})")
+    
+    def stop_replicator(self):
+        """Sinaliza parada do replicador"""
+        self._stop.set()
+        self._wake.set()
+    
+    def _run(self):
+        """Laço principal do replicador"""
+        while not self._stop.is_set():
+            try:
+                supabase = self._get_supabase()
+                if not supabase:
+                    self._wait(self.poll_interval * 5)
+                    continue
+                
+                batch = self._claim_batch()
+                if not batch:
+                    self._wait(self.poll_interval)
+                    continue
+                
+                self._push_batch(supabase, batch)
+            
+            except Exception as e:
+                logger.error(f"❌ Erro no replicador do outbox: {e}")
+                self._wait(self.poll_interval)
+    
+    def _wait(self, seconds: float):
+        self._wake.wait(seconds)
+        self._wake.clear()
+    
+    def _get_supabase(self):
+        """Obtém cliente Supabase conectado, se disponível"""
+        try:
+            from services.supabase_client import supabase_client
+        except ImportError:
+            return None
+        return supabase_client if supabase_client.is_connected() else None
+    
+    def _claim_batch(self) -> List[Dict[str, Any]]:
+        """Reserva um lote de operações pendentes para este processo"""
+        now = time.time()
+        worker = f"{os.getpid()}:{threading.get_ident()}"
+        
+        conn = self.db._get_connection()
+        try:
+            # BEGIN IMMEDIATE serializa a reserva entre workers do gunicorn
+            conn.execute('BEGIN IMMEDIATE')
+            rows = [dict(row) for row in conn.execute('''
+                SELECT * FROM supabase_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'in_flight' AND claimed_at < ?)
+                ORDER BY id
+                LIMIT ?
+            ''', (now, now - self.lease_seconds, self.batch_size))]
+            
+            if rows:
+                conn.executemany('''
+                    UPDATE supabase_outbox
+                    SET status = 'in_flight', claimed_at = ?, claimed_by = ?
+                    WHERE id = ?
+                ''', [(now, worker, row['id']) for row in rows])
+            
+            conn.commit()
+            return rows
+        
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def _push_batch(self, supabase, batch: List[Dict[str, Any]]):
+        """Envia um lote ao Supabase; em caso de falha isola entrada por entrada"""
+        prepared = []
+        
+        for entry in batch:
+            try:
+                prepared.append((entry, self._prepare_rows(supabase, entry)))
+            except Exception as e:
+                # Payload inválido ou arquivo removido: não adianta tentar novamente
+                self._mark_failed(entry, f"Payload inválido: {e}", permanent=True)
+        
+        if not prepared:
+            return
+        
+        try:
+            self._send(supabase, [rows for _, rows in prepared])
+            self._mark_done([entry for entry, _ in prepared])
+        
+        except Exception as batch_error:
+            if len(prepared) == 1:
+                self._mark_failed(prepared[0][0], str(batch_error))
+                return
+            
+            logger.warning(f"⚠️ Lote do outbox falhou, enviando individualmente: {batch_error}")
+            for entry, rows in prepared:
+                try:
+                    self._send(supabase, [rows])
+                    self._mark_done([entry])
+                except Exception as e:
+                    self._mark_failed(entry, str(e))
+    
+    def _prepare_rows(self, supabase, entry: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Converte entrada do outbox em linhas das tabelas do Supabase"""
+        if entry['operation'] != 'create_analysis':
+            raise ValueError(f"Operação desconhecida: {entry['operation']}")
+        
+        payload = loads(entry['payload'])
+        analysis_id = payload['analysis_id']
+        
+        if payload.get('analysis_file'):
+            analysis_data = load_file(payload['analysis_file'])
+        else:
+            analysis_data = payload['analysis_data']
+        
+        analysis_data['local_files_path'] = payload.get('local_files_path')
+        
+        # O id local (uuid) é a chave de idempotência e o id remoto
+        analysis_row = supabase._build_analysis_row(analysis_data)
+        analysis_row['id'] = analysis_id
+        
+        # Preserva a data da gravação local, não a do momento da replicação
+        analysis_row['created_at'] = payload.get('created_at') or \
+            datetime.fromtimestamp(entry['created_at']).isoformat()
+        
+        file_rows = []
+        for file_info in payload.get('files', []):
+            file_rows.append(supabase._build_file_row(analysis_id, {
+                'id': self._file_row_id(analysis_id, file_info['name']),
+                'file_type': file_info['type'],
+                'file_name': file_info['name'],
+                'file_path': file_info['path'],
+                'file_size': file_info['size'],
+                'content_preview': f"Arquivo {file_info['type']} da análise"
+            }))
+        
+        return {'analyses': [analysis_row], 'analysis_files': file_rows}
+    
+    def _file_row_id(self, analysis_id: str, file_name: str) -> str:
+        """Gera id determinístico para o registro de arquivo"""
+        try:
+            namespace = uuid.UUID(analysis_id)
+        except ValueError:
+            namespace = uuid.NAMESPACE_OID
+        return str(uuid.uuid5(namespace, file_name))
+    
+    def _send(self, supabase, row_groups: List[Dict[str, List[Dict[str, Any]]]]):
+        """Envia análises e arquivos em uma requisição por tabela"""
+        for table in ('analyses', 'analysis_files'):
+            rows = [row for group in row_groups for row in group[table]]
+            if not rows:
+                continue
+            
+            # Inserções em lote do PostgREST exigem o mesmo conjunto de colunas
+            columns = set().union(*(row.keys() for row in rows))
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+            
+            supabase.upsert_rows(table, rows)
+    
+    def _mark_done(self, entries: List[Dict[str, Any]]):
+        now = time.time()
+        with self.db._connection() as conn:
+            conn.executemany('''
+                UPDATE supabase_outbox
+                SET status = 'done', replicated_at = ?, last_error = NULL,
+                    attempts = attempts + 1, claimed_at = NULL, claimed_by = NULL
+                WHERE id = ?
+            ''', [(now, entry['id']) for entry in entries])
+        
+        logger.info(f"☁️ Outbox: {len(entries)} operações replicadas no Supabase")
+    
+    def _mark_failed(self, entry: Dict[str, Any], error: str, permanent: bool = False):
+        attempts = entry['attempts'] + 1
+        error_lower = error.lower()
+        
+        # Erros de autenticação não se resolvem com novas tentativas imediatas
+        if 'invalid api key' in error_lower or 'unauthorized' in error_lower:
+            attempts = max(attempts, self.max_attempts - 1)
+        
+        give_up = permanent or attempts >= self.max_attempts
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        delay += random.uniform(0, delay * 0.1)
+        
+        with self.db._connection() as conn:
+            conn.execute('''
+                UPDATE supabase_outbox
+                SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?,
+                    claimed_at = NULL, claimed_by = NULL
+                WHERE id = ?
+            ''', (
+                'failed' if give_up else 'pending',
+                attempts,
+                time.time() + delay,
+                error[:1000],
+                entry['id']
+            ))
+        
+        if give_up:
+            logger.error(f"❌ Outbox: {entry['idempotency_key']} falhou definitivamente: {error}")
+        else:
+            logger.warning(f"⚠️ Outbox: {entry['idempotency_key']} nova tentativa em {delay:.0f}s: {error}")
+
+# Instância global
+supabase_outbox = lazy_service(SupabaseOutbox, 'supabase_outbox')
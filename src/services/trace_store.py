@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Trace Store
+Armazenamento (SQLite WAL) dos spans de cada execução e agregação das etapas mais lentas
+"""
+
+import os
+import json
+import time
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Any
+
+from services.database_fallback import database_fallback
+from utils.lazy import lazy_service
+
+logger = logging.getLogger(__name__)
+
+class TraceStore:
+    """Traces por sessão, exportáveis no formato Chrome trace-event"""
+    
+    def __init__(self):
+        """Inicializa tabelas e retenção"""
+        self.db = database_fallback
+        self.max_runs = int(os.getenv('TRACE_MAX_RUNS', 200))
+        
+        self._ensure_tables()
+        logger.info("✅ Trace Store inicializado")
+    
+    def _ensure_tables(self):
+        """Cria tabelas de traces se necessário"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS trace_runs (
+                    trace_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'running',
+                    attributes TEXT,
+                    span_count INTEGER NOT NULL DEFAULT 0,
+                    started_at REAL NOT NULL,
+                    duration REAL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS trace_spans (
+                    span_id TEXT PRIMARY KEY,
+                    trace_id TEXT NOT NULL,
+                    parent_id TEXT,
+                    name TEXT NOT NULL,
+                    category TEXT,
+                    start REAL NOT NULL,
+                    duration REAL NOT NULL,
+                    pid INTEGER,
+                    tid INTEGER,
+                    status TEXT,
+                    attributes TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_trace_spans_trace ON trace_spans (trace_id, start)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_trace_runs_started ON trace_runs (started_at)')
+    
+    def start_run(self, trace_id: str, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """Registra (ou reinicia) a execução, descartando spans de uma tentativa anterior"""
+        with self.db._connection() as conn:
+            conn.execute('DELETE FROM trace_spans WHERE trace_id = ?', (trace_id,))
+            conn.execute('''
+                INSERT OR REPLACE INTO trace_runs (trace_id, name, status, attributes, span_count, started_at)
+                VALUES (?, ?, 'running', ?, 0, ?)
+            ''', (trace_id, name, json.dumps(attributes or {}, ensure_ascii=False, default=str), time.time()))
+    
+    def save_spans(self, trace_id: str, spans: List[Dict[str, Any]]):
+        """Grava um lote de spans finalizados"""
+        rows = [
+            (
+                s['span_id'], trace_id, s.get('parent_id'), s['name'], s.get('category'),
+                s['start'], s['duration'], s.get('pid'), s.get('tid'), s.get('status'),
+                json.dumps(s.get('attributes') or {}, ensure_ascii=False, default=str)
+            )
+            for s in spans
+        ]
+        
+        with self.db._connection() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO trace_spans (
+                    span_id, trace_id, parent_id, name, category, start, duration, pid, tid, status, attributes
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+    
+    def finish_run(self, trace_id: str, duration: float, status: str, span_count: int):
+        """Fecha a execução e aplica a retenção"""
+        with self.db._connection() as conn:
+            conn.execute('''
+                UPDATE trace_runs SET status = ?, duration = ?, span_count = ? WHERE trace_id = ?
+            ''', (status, duration, span_count, trace_id))
+        
+        self.purge_old_runs()
+    
+    def get_run(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self.db._connection() as conn:
+            row = conn.execute('SELECT * FROM trace_runs WHERE trace_id = ?', (trace_id,)).fetchone()
+        
+        if not row:
+            return None
+        run = dict(row)
+        run['attributes'] = json.loads(run['attributes'] or '{}')
+        return run
+    
+    def list_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Execuções mais recentes"""
+        with self.db._connection() as conn:
+            rows = conn.execute(
+                'SELECT * FROM trace_runs ORDER BY started_at DESC LIMIT ?', (limit,)
+            ).fetchall()
+        
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run['attributes'] = json.loads(run['attributes'] or '{}')
+            runs.append(run)
+        return runs
+    
+    def get_spans(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Spans da execução em ordem de início"""
+        with self.db._connection() as conn:
+            rows = conn.execute(
+                'SELECT * FROM trace_spans WHERE trace_id = ? ORDER BY start', (trace_id,)
+            ).fetchall()
+        
+        spans = []
+        for row in rows:
+            span = dict(row)
+            span['attributes'] = json.loads(span['attributes'] or '{}')
+            spans.append(span)
+        return spans
+    
+    def export_chrome_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Converte a execução para o formato trace-event (chrome://tracing, Perfetto)"""
+        run = self.get_run(trace_id)
+        if not run:
+            return None
+        
+        spans = self.get_spans(trace_id)
+        events = []
+        
+        for pid in sorted({s['pid'] for s in spans if s['pid'] is not None}):
+            events.append({
+                'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                'args': {'name': f"arqv30 {run['name']} ({pid})"}
+            })
+        
+        for s in spans:
+            events.append({
+                'name': s['name'],
+                'cat': s['category'] or 'function',
+                'ph': 'X',
+                'ts': int(s['start'] * 1_000_000),
+                'dur': int(s['duration'] * 1_000_000),
+                'pid': s['pid'] or 0,
+                'tid': s['tid'] or 0,
+                'args': {
+                    **s['attributes'],
+                    'status': s['status'],
+                    'span_id': s['span_id'],
+                    'parent_id': s['parent_id']
+                }
+            })
+        
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'trace_id': trace_id,
+                'name': run['name'],
+                'status': run['status'],
+                'duration': run['duration'],
+                **run['attributes']
+            }
+        }
+    
+    def stage_summary(self, runs: int = 20, sort: str = 'total', limit: int = 25) -> Dict[str, Any]:
+        """Ranking das etapas mais lentas nas últimas execuções concluídas
+        
+        self_time desconta o tempo dos spans filhos, mostrando onde o tempo é gasto de fato
+        (ex.: generate_gigantic_analysis é lento porque espera o _call_provider).
+        """
+        with self.db._connection() as conn:
+            trace_ids = [row['trace_id'] for row in conn.execute('''
+                SELECT trace_id FROM trace_runs WHERE status != 'running'
+                ORDER BY started_at DESC LIMIT ?
+            ''', (runs,)).fetchall()]
+            
+            if not trace_ids:
+                return {'runs': 0, 'stages': []}
+            
+            placeholders = ','.join('?' * len(trace_ids))
+            rows = conn.execute(f'''
+                SELECT span_id, trace_id, parent_id, name, duration, status
+                FROM trace_spans WHERE trace_id IN ({placeholders})
+            ''', trace_ids).fetchall()
+        
+        children_time = defaultdict(float)
+        for row in rows:
+            if row['parent_id']:
+                children_time[row['parent_id']] += row['duration']
+        
+        stages: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            stage = stages.setdefault(row['name'], {
+                'name': row['name'], 'durations': [], 'self_time': 0.0, 'errors': 0, 'traces': set()
+            })
+            stage['durations'].append(row['duration'])
+            # Filhos em threads paralelas podem somar mais que o pai
+            stage['self_time'] += max(0.0, row['duration'] - children_time[row['span_id']])
+            stage['errors'] += row['status'] == 'error'
+            stage['traces'].add(row['trace_id'])
+        
+        summary = []
+        for stage in stages.values():
+            durations = sorted(stage['durations'])
+            total = sum(durations)
+            summary.append({
+                'name': stage['name'],
+                'count': len(durations),
+                'runs': len(stage['traces']),
+                'errors': stage['errors'],
+                'total': round(total, 3),
+                'self_time': round(stage['self_time'], 3),
+                'avg': round(total / len(durations), 3),
+                'p95': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+                'max': round(durations[-1], 3)
+            })
+        
+        sort_key = sort if sort in ('total', 'self_time', 'avg', 'p95', 'max', 'count') else 'total'
+        summary.sort(key=lambda s: s[sort_key], reverse=True)
+        
+        return {'runs': len(trace_ids), 'sort': sort_key, 'stages': summary[:limit]}
+    
+    def purge_old_runs(self) -> int:
+        """Mantém apenas as execuções mais recentes (TRACE_MAX_RUNS)"""
+        with self.db._connection() as conn:
+            old = [row['trace_id'] for row in conn.execute('''
+                SELECT trace_id FROM trace_runs ORDER BY started_at DESC LIMIT -1 OFFSET ?
+            ''', (self.max_runs,)).fetchall()]
+            
+            for trace_id in old:
+                conn.execute('DELETE FROM trace_spans WHERE trace_id = ?', (trace_id,))
+                conn.execute('DELETE FROM trace_runs WHERE trace_id = ?', (trace_id,))
+        
+        if old:
+            logger.info(f"🧹 {len(old)} traces antigos removidos")
+        return len(old)
+
+# Instância global
+trace_store = lazy_service(TraceStore, 'trace_store')
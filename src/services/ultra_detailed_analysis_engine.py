@@ -15,6 +15,9 @@ from services.ai_manager import ai_manager
 from services.production_search_manager import production_search_manager
 from services.robust_content_extractor import robust_content_extractor
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
+from utils.tracing import traced
+from utils.deadline import has_budget, remaining_budget
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +26,19 @@ class UltraDetailedAnalysisEngine:
     
     def __init__(self):
         """Inicializa o motor de análise"""
-        self.max_analysis_time = 1800  # 30 minutos
+        self.max_analysis_time = float(os.getenv('ANALYSIS_BUDGET_SECONDS', 1800))  # 30 minutos
+        
+        # Orçamento mínimo (segundos) para tentar cada etapa; abaixo disso usa o fallback básico
+        self.stage_min_budget = {
+            'pesquisa_web': 60,
+            'extracao': 20,
+            'avatar': 45,
+            'drivers': 30,
+            'anti_objecao': 30
+        }
         logger.info("Ultra Detailed Analysis Engine CORRIGIDO inicializado")
     
+    @traced('generate_gigantic_analysis', category='pipeline')
     def generate_gigantic_analysis(
         self, 
         data: Dict[str, Any],
@@ -185,9 +198,13 @@ class UltraDetailedAnalysisEngine:
             # CORREÇÃO 6: Retorna análise mínima garantida
             return self._create_guaranteed_minimum_analysis(data, session_id)
     
+    @traced('execute_corrected_web_research', category='pipeline')
     def _execute_corrected_web_research(self, data: Dict[str, Any], session_id: str) -> Dict[str, Any]:
         """Executa pesquisa web com correções de SSL e timeout"""
         
+        if not self._stage_has_budget('pesquisa_web'):
+            return self._create_basic_research_data(data)
+        
         try:
             query = data.get('query') or f"mercado {data.get('segmento', 'negócios')} Brasil 2024"
             
@@ -208,6 +225,11 @@ class UltraDetailedAnalysisEngine:
                 try:
                     # CORREÇÃO: Pula URLs problemáticas
                     url = result.get('url', '')
+                    
+                    # Mantém o conteúdo já extraído quando o orçamento acaba
+                    if not self._stage_has_budget('extracao'):
+                        break
+                    
                     if self._is_problematic_url(url):
                         logger.info(f"⏭️ Pulando URL problemática: {url}")
                         continue
@@ -246,6 +268,14 @@ class UltraDetailedAnalysisEngine:
             logger.error(f"❌ Erro na pesquisa web corrigida: {e}")
             return self._create_basic_research_data(data)
     
+    def _stage_has_budget(self, stage: str) -> bool:
+        """Verifica se o orçamento restante da análise comporta a etapa"""
+        if has_budget(self.stage_min_budget.get(stage, 0)):
+            return True
+        
+        logger.warning(f"⏰ Orçamento insuficiente para {stage} ({remaining_budget():.0f}s restantes) - usando fallback básico")
+        return False
+    
     def _is_problematic_url(self, url: str) -> bool:
         """Identifica URLs problemáticas para pular"""
         
@@ -261,9 +291,13 @@ class UltraDetailedAnalysisEngine:
         
         return any(pattern in url.lower() for pattern in problematic_patterns)
     
+    @traced('generate_corrected_avatar', category='pipeline')
     def _generate_corrected_avatar(self, data: Dict[str, Any], research_data: Dict[str, Any]) -> Dict[str, Any]:
         """Gera avatar com correções"""
         
+        if not self._stage_has_budget('avatar'):
+            return self._create_basic_avatar(data)
+        
         try:
             segmento = data.get('segmento', 'negócios')
             
@@ -338,9 +372,13 @@ RETORNE APENAS JSON VÁLIDO:
             logger.error(f"❌ Erro na geração do avatar: {e}")
             return self._create_basic_avatar(data)
     
+    @traced('generate_corrected_drivers', category='pipeline')
     def _generate_corrected_drivers(self, data: Dict[str, Any], avatar_data: Dict[str, Any]) -> Dict[str, Any]:
         """Gera drivers mentais com correções"""
         
+        if not self._stage_has_budget('drivers'):
+            return self._create_basic_drivers(data)
+        
         try:
             segmento = data.get('segmento', 'negócios')
             
@@ -385,9 +423,13 @@ RETORNE APENAS JSON VÁLIDO:
             logger.error(f"❌ Erro nos drivers corrigidos: {e}")
             return self._create_basic_drivers(data)
     
+    @traced('generate_corrected_anti_objection', category='pipeline')
     def _generate_corrected_anti_objection(self, data: Dict[str, Any], avatar_data: Dict[str, Any]) -> Dict[str, Any]:
         """Gera sistema anti-objeção com correções"""
         
+        if not self._stage_has_budget('anti_objecao'):
+            return self._create_basic_anti_objection(data)
+        
         try:
             segmento = data.get('segmento', 'negócios')
             
@@ -430,6 +472,7 @@ RETORNE APENAS JSON VÁLIDO:
             logger.error(f"❌ Erro no anti-objeção corrigido: {e}")
             return self._create_basic_anti_objection(data)
     
+    @traced('generate_corrected_insights', category='pipeline')
     def _generate_corrected_insights(self, data: Dict[str, Any], analysis_result: Dict[str, Any]) -> List[str]:
         """Gera insights com correções"""
         
@@ -455,6 +498,7 @@ RETORNE APENAS JSON VÁLIDO:
             logger.error(f"❌ Erro nos insights corrigidos: {e}")
             return self._create_basic_insights(data)
     
+    @traced('add_optional_components', category='pipeline')
     def _add_optional_components(self, analysis_result: Dict[str, Any], data: Dict[str, Any], progress_callback: Optional[callable]):
         """Adiciona componentes opcionais sem falhar o sistema"""
         
@@ -689,4 +733,4 @@ RETORNE APENAS JSON VÁLIDO:
         return guaranteed_analysis
 
 # Instância global
-ultra_detailed_analysis_engine = UltraDetailedAnalysisEngine()
\ No newline at end of file
+ultra_detailed_analysis_engine = lazy_service(UltraDetailedAnalysisEngine, 'ultra_detailed_analysis_engine')
\ No newline at end of file
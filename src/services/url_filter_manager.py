@@ -11,6 +11,8 @@ import logging
 import re
 from typing import List, Set, Dict, Any, Optional
 from urllib.parse import urlparse
+from utils.lazy import lazy_service
+from utils.metrics import URL_FILTER_DECISIONS
 
 logger = logging.getLogger(__name__)
 
@@ -130,6 +132,7 @@ class URLFilterManager:
         self.stats['total_analisadas'] += 1
         
         if not url or not url.startswith('http'):
+            URL_FILTER_DECISIONS.labels('invalida').inc()
             return {
                 'aprovada': False,
                 'motivo': 'URL inválida',
@@ -149,6 +152,7 @@ class URLFilterManager:
             # 1. Verifica domínios bloqueados
             if domain_clean in self.dominios_bloqueados:
                 self.stats['bloqueadas_dominio'] += 1
+                URL_FILTER_DECISIONS.labels('dominio_bloqueado').inc()
                 logger.debug(f"⏭️ URL bloqueada (domínio): {url}")
                 return {
                     'aprovada': False,
@@ -162,6 +166,7 @@ class URLFilterManager:
             for padrao in self.padroes_bloqueados:
                 if re.search(padrao, url_completa):
                     self.stats['bloqueadas_padrao'] += 1
+                    URL_FILTER_DECISIONS.labels('padrao_bloqueado').inc()
                     logger.debug(f"⏭️ URL bloqueada (padrão): {url}")
                     return {
                         'aprovada': False,
@@ -180,6 +185,7 @@ class URLFilterManager:
             
             if len(palavras_encontradas) >= 2:  # 2+ palavras irrelevantes
                 self.stats['bloqueadas_palavra'] += 1
+                URL_FILTER_DECISIONS.labels('conteudo_irrelevante').inc()
                 logger.debug(f"⏭️ URL bloqueada (palavras): {url}")
                 return {
                     'aprovada': False,
@@ -200,6 +206,7 @@ class URLFilterManager:
             else:
                 categoria = 'aprovada'
             
+            URL_FILTER_DECISIONS.labels(categoria).inc()
             logger.debug(f"✅ URL aprovada: {url} (prioridade: {prioridade})")
             
             return {
@@ -333,7 +340,7 @@ class URLFilterManager:
         logger.info("🔄 Estatísticas do filtro resetadas")
 
 # Instância global
-url_filter_manager = URLFilterManager()
+url_filter_manager = lazy_service(URLFilterManager, 'url_filter_manager')
 
 # Função de conveniência
 def filtrar_urls(urls_com_metadata: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
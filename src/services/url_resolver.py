@@ -12,12 +12,17 @@ import requests
 import json
 from urllib.parse import parse_qs, urlparse, unquote
 from typing import Optional
+from utils.lazy import lazy_service
+from utils.deadline import call_timeout
 
 logger = logging.getLogger(__name__)
 
 class URLResolver:
     """Resolvedor robusto de URLs de redirecionamento"""
     
+    # Clientes HTTP não são herdados: o processo filho recria o serviço sob demanda
+    reset_after_fork = True
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
@@ -176,7 +181,7 @@ class URLResolver:
             response = self.session.head(
                 url, 
                 allow_redirects=True, 
-                timeout=self.timeout,
+                timeout=call_timeout(self.timeout),
                 verify=False  # Para evitar problemas de SSL
             )
             
@@ -192,7 +197,7 @@ class URLResolver:
             return url
 
 # Instância global
-url_resolver = URLResolver()
+url_resolver = lazy_service(URLResolver, 'url_resolver')
 
 # Função de conveniência
 def resolve_url(url: str) -> str:
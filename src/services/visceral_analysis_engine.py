@@ -12,6 +12,7 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -1075,4 +1076,4 @@ RETORNE APENAS JSON VÁLIDO:
         }
 
 # Instância global
-visceral_analysis_engine = VisceralAnalysisEngine()
\ No newline at end of file
+visceral_analysis_engine = lazy_service(VisceralAnalysisEngine, 'visceral_analysis_engine')
\ No newline at end of file
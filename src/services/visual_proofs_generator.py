@@ -12,6 +12,7 @@ import json
 from typing import Dict, List, Any, Optional
 from services.ai_manager import ai_manager
 from services.auto_save_manager import salvar_etapa, salvar_erro
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -332,4 +333,4 @@ RETORNE APENAS JSON VÁLIDO:
         ]
 
 # Instância global
-visual_proofs_generator = VisualProofsGenerator()
\ No newline at end of file
+visual_proofs_generator = lazy_service(VisualProofsGenerator, 'visual_proofs_generator')
\ No newline at end of file
@@ -16,6 +16,7 @@ import re
 from datetime import datetime
 from bs4 import BeautifulSoup
 import random
+from utils.lazy import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -821,4 +822,4 @@ class WebSailorAgent:
         }
 
 # Instância global do serviço REAL
-websailor_agent = WebSailorAgent()
\ No newline at end of file
+websailor_agent = lazy_service(WebSailorAgent, 'websailor_agent')
\ No newline at end of file
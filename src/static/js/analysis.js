@@ -1,17 +1,44 @@
 // ARQV30 Enhanced v2.0 - Analysis JavaScript
 // Sistema completo de análise com todos os componentes do documento
 
+// Stored analyses: sections above this size are fetched only on demand
+const LAZY_SECTION_BYTES = 256 * 1024;
+
+// Section key (manifest `key`) -> [containerId, title, icon]
+const SECTION_VIEWS = {
+    avatar_ultra_detalhado: ['avatarResults', 'Avatar Ultra-Detalhado', 'fas fa-user'],
+    drivers_mentais_customizados: ['driversResults', 'Sistema Completo de Drivers Mentais', 'fas fa-brain'],
+    sistema_anti_objecao: ['antiObjectionResults', 'Arsenal Completo Anti-Objeção', 'fas fa-shield-alt'],
+    pre_pitch_invisivel: ['prePitchResults', 'Sistema Completo de Pré-Pitch', 'fas fa-theater-masks'],
+    provas_visuais_sugeridas: ['visualProofsResults', 'Sistema Completo de PROVIs', 'fas fa-eye'],
+    analise_concorrencia_detalhada: ['competitionResults', 'Análise de Concorrência', 'fas fa-chess'],
+    escopo_posicionamento: ['positioningResults', 'Escopo e Posicionamento', 'fas fa-bullseye'],
+    estrategia_palavras_chave: ['keywordsResults', 'Estratégia de Palavras-Chave', 'fas fa-key'],
+    metricas_performance_detalhadas: ['metricsResults', 'Métricas de Performance', 'fas fa-chart-line'],
+    plano_acao_detalhado: ['actionPlanResults', 'Plano de Ação', 'fas fa-tasks'],
+    predicoes_futuro_completas: ['futureResults', 'Predições do Futuro', 'fas fa-crystal-ball'],
+    insights_exclusivos: ['insightsResults', 'Insights Exclusivos', 'fas fa-lightbulb'],
+    pesquisa_web_massiva: ['researchResults', 'Pesquisa Web Massiva', 'fas fa-globe']
+};
+
 class AnalysisManager {
     constructor() {
         this.currentAnalysis = null;
         this.sessionId = null;
         this.progressInterval = null;
+        this.progressStream = null;
         this.init();
     }
 
     init() {
         this.setupEventListeners();
         this.checkSystemStatus();
+
+        // ?analysis=<id> opens a stored analysis section by section
+        const storedId = new URLSearchParams(window.location.search).get('analysis');
+        if (storedId) {
+            this.loadStoredAnalysis(storedId);
+        }
     }
 
     setupEventListeners() {
@@ -63,10 +90,9 @@ class AnalysisManager {
 
             // Show progress
             this.showProgress();
-            this.startProgressTracking();
 
             // Start analysis
-            const response = await fetch('/api/analyze', {
+            let response = await fetch('/api/analyze', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -74,6 +100,12 @@ class AnalysisManager {
                 body: JSON.stringify(formData)
             });
 
+            if (response.status === 202) {
+                const job = await response.json();
+                this.startProgressTracking(job);
+                response = await this.waitForJob(job);
+            }
+
             if (response.ok) {
                 const result = await response.json();
                 this.handleAnalysisSuccess(result);
@@ -88,6 +120,51 @@ class AnalysisManager {
         }
     }
 
+    async waitForJob(job) {
+        // Analysis runs in the background job pool: poll until it finishes
+        this.currentJobId = job.job_id;
+        const statusUrl = job.status_url || `/api/jobs/${job.job_id}`;
+        const resultUrl = job.result_url || `/api/jobs/${job.job_id}/result`;
+
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 3000));
+
+            const statusResponse = await fetch(statusUrl);
+            const status = await statusResponse.json();
+
+            if (!statusResponse.ok) {
+                throw new Error(status.error || status.message || 'Erro ao consultar job');
+            }
+
+            if (!['queued', 'running'].includes(status.status)) {
+                break;
+            }
+        }
+
+        this.currentJobId = null;
+        return fetch(resultUrl);
+    }
+
+    async waitForPdfJob(job) {
+        // PDF is rendered by the background process pool: poll progress, then download
+        while (['queued', 'running'].includes(job.status)) {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+
+            const statusResponse = await fetch(job.status_url);
+            job = await statusResponse.json();
+
+            if (!statusResponse.ok) {
+                throw new Error(job.error || job.message || 'Erro ao consultar renderização');
+            }
+        }
+
+        if (job.status !== 'completed') {
+            throw new Error(job.error || 'Falha ao renderizar PDF');
+        }
+
+        return fetch(job.pdf_url);
+    }
+
     collectFormData() {
         const form = document.getElementById('analysisForm');
         const formData = new FormData(form);
@@ -120,9 +197,41 @@ class AnalysisManager {
             clearInterval(this.progressInterval);
             this.progressInterval = null;
         }
+        this.stopProgressStream();
+    }
+
+    startProgressTracking(job) {
+        // Real progress through Server-Sent Events, opened only once the job (and its session) exists
+        if (window.EventSource && job && job.session_id) {
+            const streamUrl = job.progress_stream_url || `/api/progress/stream/${job.session_id}`;
+            this.progressStream = new EventSource(streamUrl);
+
+            this.progressStream.addEventListener('progress', (event) => {
+                const data = JSON.parse(event.data);
+                this.updateProgress(data.percentage, data.current_message);
+            });
+
+            this.progressStream.addEventListener('complete', () => this.stopProgressStream());
+
+            // Session unknown to the server: keep the UI moving with simulated progress
+            this.progressStream.addEventListener('expired', () => {
+                this.stopProgressStream();
+                this.startSimulatedProgress();
+            });
+            return;
+        }
+
+        this.startSimulatedProgress();
+    }
+
+    stopProgressStream() {
+        if (this.progressStream) {
+            this.progressStream.close();
+            this.progressStream = null;
+        }
     }
 
-    startProgressTracking() {
+    startSimulatedProgress() {
         let step = 0;
         const steps = [
             '🔍 Coletando dados do formulário',
@@ -261,6 +370,91 @@ class AnalysisManager {
         resultsArea.scrollIntoView({ behavior: 'smooth' });
     }
 
+    async loadStoredAnalysis(analysisId) {
+        try {
+            const response = await fetch(`/api/analysis_sections/${analysisId}`);
+            const manifest = await response.json();
+
+            if (!response.ok) {
+                throw new Error(manifest.error || manifest.message || 'Análise não encontrada');
+            }
+
+            document.getElementById('resultsArea').style.display = 'block';
+            this.clearPreviousResults();
+            this.currentAnalysis = { database_id: analysisId };
+
+            // Summary is small: render it right away, sections follow
+            const summaryResponse = await fetch(manifest.summary_url);
+            if (summaryResponse.ok) {
+                const summary = await summaryResponse.json();
+                Object.assign(this.currentAnalysis, summary.analysis);
+                this.displayComponent('metadataResults', 'Metadados da Análise', summary.analysis, 'fas fa-info-circle');
+            }
+
+            const pending = [];
+            manifest.sections.forEach(entry => {
+                if (!SECTION_VIEWS[entry.key]) return;
+
+                if (entry.size > LAZY_SECTION_BYTES) {
+                    this.displaySectionPlaceholder(entry);
+                } else {
+                    pending.push(this.loadSection(entry));
+                }
+            });
+
+            await Promise.all(pending);
+            this.checkPDFEligibility(this.currentAnalysis);
+
+        } catch (error) {
+            console.error('Stored analysis error:', error);
+            this.showError(`Erro ao carregar análise: ${error.message}`);
+        }
+    }
+
+    async loadSection(entry) {
+        const [containerId, title, icon] = SECTION_VIEWS[entry.key];
+
+        try {
+            // The browser revalidates with If-None-Match: unchanged sections come back as 304
+            const response = await fetch(entry.url);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+
+            const data = await response.json();
+            this.currentAnalysis[entry.key] = data;
+            this.displayComponent(containerId, title, data, icon);
+
+        } catch (error) {
+            console.error(`Section ${entry.section} error:`, error);
+            this.displaySectionPlaceholder(entry, 'Falha ao carregar. Tentar novamente');
+        }
+    }
+
+    displaySectionPlaceholder(entry, label) {
+        const [containerId, title, icon] = SECTION_VIEWS[entry.key];
+        const container = document.getElementById(containerId);
+        if (!container) return;
+
+        const sizeKb = Math.round(entry.size / 1024);
+        const section = this.createResultSection(title, null, icon);
+        const content = section.querySelector('.result-section-content');
+        content.innerHTML = '';
+
+        const button = document.createElement('button');
+        button.className = 'btn-secondary';
+        button.textContent = `${label || 'Carregar seção'} (${sizeKb} KB)`;
+        button.addEventListener('click', () => {
+            button.disabled = true;
+            button.textContent = 'Carregando...';
+            this.loadSection(entry);
+        });
+        content.appendChild(button);
+
+        container.innerHTML = '';
+        container.appendChild(section);
+    }
+
     displayComponent(containerId, title, data, icon) {
         const container = document.getElementById(containerId);
         if (!container || !data) return;
@@ -924,13 +1118,24 @@ class AnalysisManager {
         }
 
         try {
-            const response = await fetch('/api/generate_pdf', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(this.currentAnalysis)
-            });
+            // PDF pré-renderizado ao concluir a análise: GET servido do cache (ETag/Range)
+            let response = this.currentAnalysis.pdf_url
+                ? await fetch(this.currentAnalysis.pdf_url)
+                : null;
+
+            if (!response || !response.ok) {
+                response = await fetch('/api/generate_pdf', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify(this.currentAnalysis)
+                });
+            }
+
+            if (response.status === 202) {
+                response = await this.waitForPdfJob(await response.json());
+            }
 
             if (response.ok) {
                 const blob = await response.blob();
@@ -6,6 +6,7 @@ class ARQVApp {
         this.sessionId = null;
         this.currentAnalysis = null;
         this.progressInterval = null;
+        this.progressStream = null;
         this.init();
     }
 
@@ -63,15 +64,15 @@ class ARQVApp {
                 return;
             }
 
-            // Add session ID
+            // Fresh session per run: a reused id would replay the previous run's completion
+            this.generateSessionId();
             formData.session_id = this.sessionId;
 
             // Show progress
             this.showProgress();
-            this.startProgressTracking();
 
             // Start analysis
-            const response = await fetch('/api/analyze', {
+            let response = await fetch('/api/analyze', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -79,7 +80,13 @@ class ARQVApp {
                 body: JSON.stringify(formData)
             });
 
-            const result = await response.json();
+            let result = await response.json();
+
+            if (response.status === 202 && result.job_id) {
+                this.startProgressTracking(result);
+                response = await this.waitForJob(result);
+                result = await response.json();
+            }
 
             if (response.ok) {
                 this.handleAnalysisSuccess(result);
@@ -93,6 +100,51 @@ class ARQVApp {
         }
     }
 
+    async waitForJob(job) {
+        // Analysis runs in the background job pool: poll until it finishes
+        this.currentJobId = job.job_id;
+        const statusUrl = job.status_url || `/api/jobs/${job.job_id}`;
+        const resultUrl = job.result_url || `/api/jobs/${job.job_id}/result`;
+
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 3000));
+
+            const statusResponse = await fetch(statusUrl);
+            const status = await statusResponse.json();
+
+            if (!statusResponse.ok) {
+                throw new Error(status.error || status.message || 'Erro ao consultar job');
+            }
+
+            if (!['queued', 'running'].includes(status.status)) {
+                break;
+            }
+        }
+
+        this.currentJobId = null;
+        return fetch(resultUrl);
+    }
+
+    async waitForPdfJob(job) {
+        // PDF is rendered by the background process pool: poll progress, then download
+        while (['queued', 'running'].includes(job.status)) {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+
+            const statusResponse = await fetch(job.status_url);
+            job = await statusResponse.json();
+
+            if (!statusResponse.ok) {
+                throw new Error(job.error || job.message || 'Erro ao consultar renderização');
+            }
+        }
+
+        if (job.status !== 'completed') {
+            throw new Error(job.error || 'Falha ao renderizar PDF');
+        }
+
+        return fetch(job.pdf_url);
+    }
+
     collectFormData() {
         const form = document.getElementById('analysisForm');
         const formData = new FormData(form);
@@ -130,9 +182,41 @@ class ARQVApp {
             clearInterval(this.progressInterval);
             this.progressInterval = null;
         }
+        this.stopProgressStream();
     }
 
-    startProgressTracking() {
+    startProgressTracking(job) {
+        // Real progress through Server-Sent Events, opened only once the job (and its session) exists
+        if (window.EventSource && job && job.session_id) {
+            const streamUrl = job.progress_stream_url || `/api/progress/stream/${job.session_id}`;
+            this.progressStream = new EventSource(streamUrl);
+
+            this.progressStream.addEventListener('progress', (event) => {
+                const data = JSON.parse(event.data);
+                this.updateProgress(data.percentage, data.current_message);
+            });
+
+            this.progressStream.addEventListener('complete', () => this.stopProgressStream());
+
+            // Session unknown to the server: keep the UI moving with simulated progress
+            this.progressStream.addEventListener('expired', () => {
+                this.stopProgressStream();
+                this.startSimulatedProgress();
+            });
+            return;
+        }
+
+        this.startSimulatedProgress();
+    }
+
+    stopProgressStream() {
+        if (this.progressStream) {
+            this.progressStream.close();
+            this.progressStream = null;
+        }
+    }
+
+    startSimulatedProgress() {
         let step = 0;
         const steps = [
             '🔍 Coletando dados do formulário',
@@ -359,13 +443,24 @@ class ARQVApp {
         }
 
         try {
-            const response = await fetch('/api/generate_pdf', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(this.currentAnalysis)
-            });
+            // PDF pré-renderizado ao concluir a análise: GET servido do cache (ETag/Range)
+            let response = this.currentAnalysis.pdf_url
+                ? await fetch(this.currentAnalysis.pdf_url)
+                : null;
+
+            if (!response || !response.ok) {
+                response = await fetch('/api/generate_pdf', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify(this.currentAnalysis)
+                });
+            }
+
+            if (response.status === 202) {
+                response = await this.waitForPdfJob(await response.json());
+            }
 
             if (response.ok) {
                 const blob = await response.blob();
@@ -4,6 +4,7 @@
 const CACHE_NAME = 'arqv30-enhanced-v2.0';
 const STATIC_CACHE_NAME = 'arqv30-static-v2.0';
 const DYNAMIC_CACHE_NAME = 'arqv30-dynamic-v2.0';
+const STORED_CACHE_NAME = 'arqv30-stored-v2.0';
 
 // Files to cache for offline functionality
 const STATIC_FILES = [
@@ -25,6 +26,16 @@ const API_CACHE_PATTERNS = [
     '/api/stats'
 ];
 
+// Stored analyses and files: the server answers If-None-Match with 304 (ETag)
+const REVALIDATE_PATTERNS = [
+    '/api/list_analyses',
+    '/api/get_analysis/',
+    '/api/get_analysis_summary/',
+    '/api/analysis_sections/',
+    '/api/list_local_analyses',
+    '/api/get_file_content'
+];
+
 // Install event - cache static files
 self.addEventListener('install', (event) => {
     console.log('🔧 Service Worker: Installing...');
@@ -56,6 +67,7 @@ self.addEventListener('activate', (event) => {
                     cacheNames.map((cacheName) => {
                         if (cacheName !== STATIC_CACHE_NAME && 
                             cacheName !== DYNAMIC_CACHE_NAME &&
+                            cacheName !== STORED_CACHE_NAME &&
                             cacheName.startsWith('arqv30-')) {
                             console.log('🗑️ Service Worker: Deleting old cache:', cacheName);
                             return caches.delete(cacheName);
@@ -86,7 +98,10 @@ self.addEventListener('fetch', (event) => {
     }
     
     // Handle different types of requests
-    if (isStaticFile(request.url)) {
+    if (isRevalidatedRequest(request.url)) {
+        // Stored analyses - conditional GET against the cached copy
+        event.respondWith(revalidateWithCache(request));
+    } else if (isStaticFile(request.url)) {
         // Static files - cache first strategy
         event.respondWith(cacheFirst(request));
     } else if (isAPIRequest(request.url)) {
@@ -171,6 +186,51 @@ async function networkOnly(request) {
     }
 }
 
+async function revalidateWithCache(request) {
+    const cache = await caches.open(STORED_CACHE_NAME);
+    const cachedResponse = await cache.match(request);
+    const etag = cachedResponse && cachedResponse.headers.get('ETag');
+    
+    try {
+        const headers = new Headers(request.headers);
+        if (etag) {
+            headers.set('If-None-Match', etag);
+        }
+        
+        // no-store: the 304 must reach this handler instead of the HTTP cache
+        const networkResponse = await fetch(request.url, {
+            headers,
+            credentials: request.credentials,
+            cache: 'no-store'
+        });
+        
+        if (networkResponse.status === 304 && cachedResponse) {
+            return cachedResponse;
+        }
+        
+        if (networkResponse.ok && networkResponse.headers.get('ETag')) {
+            cache.put(request, networkResponse.clone());
+        }
+        
+        return networkResponse;
+    } catch (error) {
+        console.log('🔄 Network failed, serving stored copy for:', request.url);
+        
+        if (cachedResponse) {
+            return cachedResponse;
+        }
+        
+        return new Response(JSON.stringify({
+            error: 'Offline',
+            message: 'Network unavailable and no cached version found'
+        }), {
+            status: 503,
+            statusText: 'Service Unavailable',
+            headers: { 'Content-Type': 'application/json' }
+        });
+    }
+}
+
 async function staleWhileRevalidate(request) {
     const cache = await caches.open(DYNAMIC_CACHE_NAME);
     const cachedResponse = await cache.match(request);
@@ -202,6 +262,10 @@ function isStaticFile(url) {
            url.includes('cdnjs.cloudflare.com');
 }
 
+function isRevalidatedRequest(url) {
+    return REVALIDATE_PATTERNS.some(pattern => url.includes(pattern));
+}
+
 function isAPIRequest(url) {
     return API_CACHE_PATTERNS.some(pattern => url.includes(pattern));
 }
@@ -283,20 +347,23 @@ setInterval(() => {
 
 async function cleanupOldCaches() {
     try {
-        const cache = await caches.open(DYNAMIC_CACHE_NAME);
-        const requests = await cache.keys();
         const now = Date.now();
         const maxAge = 7 * 24 * 60 * 60 * 1000; // 7 days
         
-        for (const request of requests) {
-            const response = await cache.match(request);
-            if (response) {
-                const dateHeader = response.headers.get('date');
-                if (dateHeader) {
-                    const responseDate = new Date(dateHeader).getTime();
-                    if (now - responseDate > maxAge) {
-                        await cache.delete(request);
-                        console.log('🗑️ Removed old cache entry:', request.url);
+        for (const cacheName of [DYNAMIC_CACHE_NAME, STORED_CACHE_NAME]) {
+            const cache = await caches.open(cacheName);
+            const requests = await cache.keys();
+            
+            for (const request of requests) {
+                const response = await cache.match(request);
+                if (response) {
+                    const dateHeader = response.headers.get('date');
+                    if (dateHeader) {
+                        const responseDate = new Date(dateHeader).getTime();
+                        if (now - responseDate > maxAge) {
+                            await cache.delete(request);
+                            console.log('🗑️ Removed old cache entry:', request.url);
+                        }
                     }
                 }
             }
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Deadlines
+Orçamento de tempo por análise propagado por ContextVar até busca, extração e IA
+"""
+
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Menor timeout repassado a uma chamada de rede enquanto ainda há orçamento
+MIN_CALL_TIMEOUT = 1.0
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar('deadline', default=None)
+
+class DeadlineExceeded(Exception):
+    """Orçamento de tempo da análise esgotado"""
+    pass
+
+class Deadline:
+    """Instante limite absoluto; deadlines aninhados nunca ultrapassam o do pai"""
+    
+    def __init__(self, seconds: float, name: str = 'analysis', parent: Optional['Deadline'] = None):
+        self.name = name
+        self.expires_at = time.monotonic() + seconds
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+    
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+    
+    def timeout(self, default: float) -> float:
+        """min(timeout da chamada, orçamento restante); esgotado levanta DeadlineExceeded"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Orçamento '{self.name}' esgotado")
+        return max(min(default, remaining), min(MIN_CALL_TIMEOUT, remaining))
+    
+    def check(self, stage: str = ''):
+        if self.expired:
+            raise DeadlineExceeded(f"Orçamento '{self.name}' esgotado{f' em {stage}' if stage else ''}")
+
+@contextmanager
+def deadline(seconds: Optional[float], name: str = 'analysis'):
+    """Abre um orçamento (aninhado ao corrente, se houver); None não limita"""
+    if seconds is None:
+        yield _current_deadline.get()
+        return
+    
+    current = Deadline(seconds, name, parent=_current_deadline.get())
+    token = _current_deadline.set(current)
+    try:
+        yield current
+    finally:
+        _current_deadline.reset(token)
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+def call_timeout(default: float) -> float:
+    """Timeout para uma chamada de rede respeitando o orçamento corrente"""
+    current = _current_deadline.get()
+    return current.timeout(default) if current else default
+
+def has_budget(seconds: float) -> bool:
+    """Há pelo menos `seconds` de orçamento? (sem deadline ativo: sempre)"""
+    current = _current_deadline.get()
+    return current is None or current.remaining() >= seconds
+
+def remaining_budget() -> Optional[float]:
+    current = _current_deadline.get()
+    return current.remaining() if current else None
+
+def check_deadline(stage: str = ''):
+    current = _current_deadline.get()
+    if current:
+        current.check(stage)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - HTTP Cache
+ETags, Cache-Control e GET condicional (304) para endpoints de leitura
+"""
+
+import hashlib
+from typing import Any
+
+from flask import Response, request
+
+# Políticas de Cache-Control por tipo de endpoint
+CACHE_REVALIDATE = 'private, no-cache'
+CACHE_SHORT = 'private, max-age=30, must-revalidate'
+
+def make_etag(*parts: Any) -> str:
+    """ETag forte a partir dos valores que identificam o conteúdo (hash, mtime, updated_at, parâmetros)"""
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+def is_fresh(etag: str) -> bool:
+    """Cliente já tem esta versão (If-None-Match usa comparação fraca)"""
+    return request.if_none_match.contains_weak(etag)
+
+def not_modified(etag: str, cache_control: str = CACHE_REVALIDATE) -> Response:
+    response = Response(status=304)
+    return with_cache_headers(response, etag, cache_control)
+
+def with_cache_headers(response: Response, etag: str, cache_control: str = CACHE_REVALIDATE) -> Response:
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - JSON Streaming
+Serialização JSON/NDJSON seção a seção com gzip sob demanda para respostas grandes
+"""
+
+import os
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from flask import Response, request, stream_with_context
+
+from utils.serialization import dumps
+
+# Tamanho alvo dos pedaços enviados ao cliente
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 64 * 1024))
+STREAM_GZIP_LEVEL = int(os.getenv('STREAM_GZIP_LEVEL', 6))
+
+class RawJSON(str):
+    """Texto já serializado em JSON (ex.: coluna TEXT do banco): emitido sem decodificar"""
+    pass
+
+def _encode(value: Any) -> str:
+    if isinstance(value, RawJSON):
+        # Quebras de linha só aparecem como espaço entre tokens em JSON válido: seguro para NDJSON
+        return value.replace('\r', ' ').replace('\n', ' ') if value.strip() else 'null'
+    return dumps(value)
+
+def _iter_sections(obj: Any) -> Iterator[str]:
+    """Dicts e listas de topo são serializados item a item; o pico é a maior seção, não o documento"""
+    if isinstance(obj, dict):
+        yield '{'
+        for i, (key, value) in enumerate(obj.items()):
+            yield f"{', ' if i else ''}{dumps(str(key))}: {_encode(value)}"
+        yield '}'
+    elif isinstance(obj, (list, tuple)):
+        yield '['
+        for i, item in enumerate(obj):
+            yield f"{', ' if i else ''}{_encode(item)}"
+        yield ']'
+    else:
+        yield _encode(obj)
+
+def _coalesce(parts: Iterable[str], size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Agrupa fragmentos pequenos em pedaços de ~size bytes"""
+    buffer = []
+    buffered = 0
+    for part in parts:
+        data = part.encode('utf-8') if isinstance(part, str) else part
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+def iter_json(obj: Any) -> Iterator[bytes]:
+    """Documento JSON em pedaços"""
+    return _coalesce(_iter_sections(obj))
+
+def iter_ndjson(records: Iterable[Any]) -> Iterator[bytes]:
+    """Uma linha JSON por registro; registros são consumidos sob demanda"""
+    return _coalesce(f"{''.join(_iter_sections(record))}\n" for record in records)
+
+def iter_file(path: str, size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Arquivo já serializado em disco, lido em pedaços"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                break
+            yield chunk
+
+def gzip_stream(chunks: Iterable[bytes], level: int = STREAM_GZIP_LEVEL) -> Iterator[bytes]:
+    """Compressão gzip incremental (wbits=31 gera cabeçalho gzip)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def accepts_gzip() -> bool:
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+def stream_response(
+    chunks: Iterable[bytes],
+    mimetype: str = 'application/json',
+    status: int = 200,
+    filename: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Resposta em streaming, comprimida com gzip quando o cliente aceita"""
+    response_headers = {'Vary': 'Accept-Encoding', 'X-Accel-Buffering': 'no', **(headers or {})}
+    
+    if filename:
+        response_headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    
+    if STREAM_GZIP_LEVEL > 0 and accepts_gzip():
+        chunks = gzip_stream(chunks)
+        response_headers['Content-Encoding'] = 'gzip'
+    
+    return Response(
+        stream_with_context(chunks),
+        status=status,
+        mimetype=mimetype,
+        headers=response_headers
+    )
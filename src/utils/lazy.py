@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Lazy Loading Utilities
+Singletons e imports adiados: cada processo só paga pelos serviços que usa
+"""
+
+import os
+import time
+import logging
+import importlib
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Todos os serviços preguiçosos criados, para relatório de inicialização
+_registry: List['LazyService'] = []
+
+# Callbacks extras executados no processo filho após fork
+_after_fork_callbacks: List[Callable[[], None]] = []
+_reinitialized_pid: Optional[int] = None
+
+class LazyService:
+    """Proxy que cria a instância do serviço no primeiro acesso a um atributo
+    
+    O estado do proxy fica em slots com nomes privados (_LazyService__*), para
+    não esconder atributos homônimos do serviço (_lock, _name, reset...).
+    Use is_loaded(), load_service() e reset_service() para inspecioná-lo.
+    """
+    
+    __slots__ = ('__factory', '__name', '__instance', '__init_seconds', '__lock')
+    
+    def __init__(self, factory: Callable[[], Any], name: Optional[str] = None):
+        object.__setattr__(self, '_LazyService__factory', factory)
+        object.__setattr__(self, '_LazyService__name', name or getattr(factory, '__name__', repr(factory)))
+        object.__setattr__(self, '_LazyService__instance', None)
+        object.__setattr__(self, '_LazyService__init_seconds', None)
+        object.__setattr__(self, '_LazyService__lock', threading.RLock())
+        _registry.append(self)
+    
+    def __load(self) -> Any:
+        instance = self.__instance
+        if instance is not None:
+            return instance
+        
+        with self.__lock:
+            if self.__instance is None:
+                started = time.perf_counter()
+                instance = self.__factory()
+                object.__setattr__(self, '_LazyService__init_seconds', time.perf_counter() - started)
+                object.__setattr__(self, '_LazyService__instance', instance)
+                logger.debug(f"⚡ Serviço {self.__name} inicializado em {self.__init_seconds * 1000:.1f}ms")
+            return self.__instance
+    
+    def __reset(self):
+        with self.__lock:
+            object.__setattr__(self, '_LazyService__instance', None)
+            object.__setattr__(self, '_LazyService__init_seconds', None)
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__load(), name)
+    
+    def __setattr__(self, name: str, value: Any):
+        setattr(self.__load(), name, value)
+    
+    def __delattr__(self, name: str):
+        delattr(self.__load(), name)
+    
+    def __repr__(self) -> str:
+        state = 'carregado' if self.__instance is not None else 'não carregado'
+        return f"<LazyService {self.__name} ({state})>"
+
+class LazyModule:
+    """Módulo importado apenas no primeiro acesso a um atributo
+    
+    O resultado do import (módulo ou ImportError) é guardado: um pacote instalado
+    mas quebrado falha uma única vez, sem repetir o import a cada acesso.
+    """
+    
+    __slots__ = ('__module_name', '__module', '__error')
+    
+    def __init__(self, module_name: str):
+        object.__setattr__(self, '_LazyModule__module_name', module_name)
+        object.__setattr__(self, '_LazyModule__module', None)
+        object.__setattr__(self, '_LazyModule__error', None)
+    
+    def __load(self):
+        if self.__module is None:
+            if self.__error is not None:
+                raise self.__error
+            try:
+                object.__setattr__(self, '_LazyModule__module', importlib.import_module(self.__module_name))
+            except ImportError as e:
+                object.__setattr__(self, '_LazyModule__error', e)
+                raise
+        return self.__module
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__load(), name)
+    
+    def __repr__(self) -> str:
+        return f"<LazyModule {self.__module_name}>"
+
+def lazy_service(factory: Callable[[], Any], name: Optional[str] = None) -> LazyService:
+    """Cria singleton preguiçoso a partir de uma classe ou fábrica"""
+    return LazyService(factory, name)
+
+def lazy_import(module_name: str) -> LazyModule:
+    """Adia o import de um módulo pesado até o primeiro uso"""
+    return LazyModule(module_name)
+
+def module_available(module_name: str) -> bool:
+    """Verifica se um módulo está instalado sem importá-lo
+    
+    Usa apenas find_spec: confirma que o pacote existe, não que o import funciona
+    (dependência nativa ausente, versão incompatível). Essa falha aparece no
+    primeiro uso do lazy_import correspondente, que a guarda e a repete sem
+    tentar importar de novo; os serviços já tratam erros na inicialização do
+    provedor/extrator.
+    """
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def is_loaded(service: LazyService) -> bool:
+    """O serviço já foi instanciado neste processo"""
+    return service._LazyService__instance is not None
+
+def load_service(service: LazyService) -> Any:
+    """Instancia o serviço (se necessário) e retorna a instância real"""
+    return service._LazyService__load()
+
+def reset_service(service: LazyService):
+    """Descarta a instância; a próxima utilização cria outra"""
+    service._LazyService__reset()
+
+def services_status() -> Dict[str, Dict[str, Any]]:
+    """Estado de carregamento e custo de inicialização de cada serviço"""
+    status = {}
+    for service in _registry:
+        init_seconds = service._LazyService__init_seconds
+        status[service._LazyService__name] = {
+            'loaded': is_loaded(service),
+            'init_ms': round(init_seconds * 1000, 1) if init_seconds is not None else None
+        }
+    return status
+
+def preload_services(names: List[str]) -> Dict[str, float]:
+    """Instancia serviços de dados puros no master para compartilhar páginas após o fork"""
+    loaded = {}
+    registered = {service._LazyService__name: service for service in _registry}
+    
+    for name in names:
+        try:
+            if name not in registered:
+                module = importlib.import_module(f"services.{name}")
+                registered[name] = getattr(module, name)
+            
+            service = registered[name]
+            load_service(service)
+            loaded[name] = round((service._LazyService__init_seconds or 0) * 1000, 1)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao pré-carregar serviço {name}: {e}")
+    
+    return loaded
+
+def register_after_fork(callback: Callable[[], None]):
+    """Registra callback para reinicializar estado que não pode ser herdado"""
+    _after_fork_callbacks.append(callback)
+
+def reinit_after_fork() -> List[str]:
+    """Descarta, no processo filho, os serviços carregados que guardam clientes de rede
+    
+    Serviços com sockets ou pools HTTP declaram reset_after_fork = True e voltam
+    ao estado não inicializado: o filho só recria o cliente se de fato usá-lo.
+    Os demais (tabelas e catálogos em memória) continuam compartilhados via
+    copy-on-write. Executa uma única vez por processo.
+    """
+    global _reinitialized_pid
+    
+    if _reinitialized_pid == os.getpid():
+        return []
+    _reinitialized_pid = os.getpid()
+    
+    reset = []
+    for service in _registry:
+        # Locks herdados podem ter sido copiados adquiridos por outra thread do pai
+        object.__setattr__(service, '_LazyService__lock', threading.RLock())
+        
+        if is_loaded(service) and getattr(type(service._LazyService__instance), 'reset_after_fork', False):
+            reset_service(service)
+            reset.append(service._LazyService__name)
+    
+    for callback in _after_fork_callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"❌ Erro em callback pós-fork: {e}")
+    
+    return reset
+
+if hasattr(os, 'register_at_fork'):
+    # Cobre gunicorn, multiprocessing (pool de jobs) e qualquer outro fork
+    os.register_at_fork(after_in_child=reinit_after_fork)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Prometheus Metrics
+Métricas agregadas entre workers do Gunicorn e processos do pool de jobs (modo multiprocess)
+"""
+
+import os
+import time
+import logging
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+# Modo multiprocess: o prometheus_client lê esta variável no import, então ela é
+# definida por quem inicia o servidor (gunicorn.conf.py), nunca por este módulo.
+# Sem ela, as métricas ficam apenas no registro do próprio processo.
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+try:
+    from prometheus_client import (
+        REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+    )
+    from prometheus_client import multiprocess
+    from prometheus_client.core import GaugeMetricFamily
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+    logger.warning("⚠️ prometheus_client não instalado - /metrics desabilitado")
+
+class _NoopMetric:
+    """Substituto quando prometheus_client não está disponível"""
+    
+    def labels(self, *args, **kwargs):
+        return self
+    
+    def inc(self, amount: float = 1):
+        pass
+    
+    def dec(self, amount: float = 1):
+        pass
+    
+    def set(self, value: float):
+        pass
+    
+    def observe(self, value: float):
+        pass
+
+def _metric(kind: str, name: str, documentation: str, labelnames=(), **kwargs):
+    if not HAS_PROMETHEUS:
+        return _NoopMetric()
+    cls = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}[kind]
+    return cls(name, documentation, labelnames, **kwargs)
+
+# Requisições HTTP e chamadas externas são de ordem de segundos a minutos
+FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+ANALYSIS_BUCKETS = (30, 60, 120, 300, 600, 900, 1200, 1800, 2400)
+
+HTTP_REQUEST_DURATION = _metric(
+    'histogram', 'arqv30_http_request_duration_seconds', 'Latência das requisições HTTP por rota',
+    ('method', 'route', 'status'), buckets=FAST_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = _metric(
+    'gauge', 'arqv30_http_requests_in_flight', 'Requisições HTTP em andamento',
+    multiprocess_mode='livesum'
+)
+
+AI_PROVIDER_DURATION = _metric(
+    'histogram', 'arqv30_ai_provider_call_duration_seconds', 'Latência das chamadas aos provedores de IA',
+    ('provider', 'outcome'), buckets=SLOW_BUCKETS
+)
+AI_PROVIDER_ERRORS = _metric(
+    'counter', 'arqv30_ai_provider_errors_total', 'Falhas de chamadas aos provedores de IA', ('provider',)
+)
+
+SEARCH_PROVIDER_DURATION = _metric(
+    'histogram', 'arqv30_search_provider_call_duration_seconds', 'Latência das buscas por provedor',
+    ('provider', 'outcome'), buckets=SLOW_BUCKETS
+)
+SEARCH_PROVIDER_ERRORS = _metric(
+    'counter', 'arqv30_search_provider_errors_total', 'Falhas de busca por provedor', ('provider',)
+)
+CACHE_REQUESTS = _metric(
+    'counter', 'arqv30_cache_requests_total', 'Consultas a caches em memória (razão de acerto = hit / total)',
+    ('cache', 'result')
+)
+
+EXTRACTION_DURATION = _metric(
+    'histogram', 'arqv30_extraction_duration_seconds', 'Duração da extração de conteúdo por extrator',
+    ('extractor', 'outcome'), buckets=FAST_BUCKETS
+)
+EXTRACTIONS = _metric(
+    'counter', 'arqv30_extractions_total', 'Extrações de conteúdo por resultado final', ('outcome',)
+)
+URL_FILTER_DECISIONS = _metric(
+    'counter', 'arqv30_url_filter_decisions_total', 'Decisões do filtro de URLs', ('decision',)
+)
+
+ANALYSES_IN_FLIGHT = _metric(
+    'gauge', 'arqv30_analyses_in_flight', 'Análises em execução', multiprocess_mode='livesum'
+)
+ANALYSIS_DURATION = _metric(
+    'histogram', 'arqv30_analysis_duration_seconds', 'Duração total das análises',
+    ('status',), buckets=ANALYSIS_BUCKETS
+)
+
+def mark_process_dead(pid: int):
+    """Descarta gauges 'live' de um processo encerrado (worker reciclado ou job finalizado)"""
+    if HAS_PROMETHEUS and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+class _JobQueueCollector:
+    """Tamanho das filas de jobs (análises e PDFs), lido do SQLite no momento da coleta"""
+    
+    def collect(self):
+        from services.analysis_job_queue import analysis_job_queue
+        
+        family = GaugeMetricFamily('arqv30_analysis_jobs', 'Jobs de análise por status', labels=['status'])
+        for status, total in analysis_job_queue.get_stats().items():
+            family.add_metric([status], total)
+        yield family
+        
+        from services.pdf_render_queue import pdf_render_queue
+        
+        family = GaugeMetricFamily('arqv30_pdf_render_jobs', 'Renderizações de PDF por status', labels=['status'])
+        for status, total in pdf_render_queue.get_stats().items():
+            family.add_metric([status], total)
+        yield family
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Agrega os arquivos de todos os processos no formato de exposição texto"""
+    if not HAS_PROMETHEUS:
+        return b'# prometheus_client nao instalado\n', CONTENT_TYPE_LATEST
+    
+    queues = CollectorRegistry()
+    queues.register(_JobQueueCollector())
+    
+    if not MULTIPROC_DIR:
+        return generate_latest(REGISTRY) + generate_latest(queues), CONTENT_TYPE_LATEST
+    
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    registry.register(_JobQueueCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def init_app(app):
+    """Instrumenta latência e concorrência de todas as rotas do Flask"""
+    from flask import request, g
+    
+    @app.before_request
+    def _metrics_start():
+        g._metrics_started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+    
+    @app.after_request
+    def _metrics_observe(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Regra da rota (/api/jobs/<job_id>) em vez do path, para não explodir a cardinalidade
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_DURATION.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        return response
+    
+    @app.teardown_request
+    def _metrics_teardown(exc):
+        # after_request não roda quando a view levanta exceção não tratada
+        if g.pop('_metrics_started', None) is not None:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
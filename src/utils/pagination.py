@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Pagination Utilities
+Cursores opacos para paginação por chave (created_at, id) e projeção de campos
+"""
+
+import base64
+import json
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+
+# Campos leves usados nas listagens e resumos (sem o JSON completo da análise)
+SUMMARY_FIELDS = [
+    'id', 'segmento', 'produto', 'publico', 'status',
+    'created_at', 'updated_at', 'local_files_path'
+]
+
+# Campos completos presentes nos dois bancos (SQLite e Supabase), usados na exportação
+EXPORT_FIELDS = [
+    'id', 'segmento', 'produto', 'publico', 'preco', 'objetivo_receita',
+    'orcamento_marketing', 'prazo_lancamento', 'concorrentes', 'dados_adicionais',
+    'status', 'comprehensive_analysis', 'local_files_path',
+    'created_at', 'updated_at'
+]
+
+def encode_cursor(row: Dict[str, Any]) -> Optional[str]:
+    """Gera cursor opaco a partir da última linha de uma página"""
+    if not row or not row.get('created_at') or not row.get('id'):
+        return None
+
+    raw = json.dumps([str(row['created_at']), str(row['id'])], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Decodifica cursor em (created_at, id); levanta ValueError se inválido"""
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(created_at), str(row_id)
+    except Exception:
+        raise ValueError('Cursor de paginação inválido')
+
+def parse_fields(fields: Optional[Any], allowed: Iterable[str]) -> Optional[List[str]]:
+    """Normaliza projeção de campos, mantendo apenas colunas permitidas"""
+    if not fields:
+        return None
+
+    if isinstance(fields, str):
+        fields = fields.split(',')
+
+    allowed = set(allowed)
+    selected = [f.strip() for f in fields if f and f.strip() in allowed]
+
+    # A chave de paginação precisa estar sempre presente
+    for key in ('id', 'created_at'):
+        if key not in selected:
+            selected.insert(0, key)
+
+    return selected
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Serialization
+Serializador JSON plugável (orjson quando disponível, stdlib como fallback) para disco e respostas
+"""
+
+import os
+import json
+import logging
+from typing import Any, Callable, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    DefaultJSONProvider = object
+
+# JSON_BACKEND=stdlib força o fallback mesmo com orjson instalado
+BACKEND = 'orjson' if HAS_ORJSON and os.getenv('JSON_BACKEND', 'orjson').lower() == 'orjson' else 'stdlib'
+
+# Arquivos em disco são compactos; JSON_PRETTY_ON_DISK=true volta a indentar
+PRETTY_ON_DISK = os.getenv('JSON_PRETTY_ON_DISK', 'false').lower() == 'true'
+
+if HAS_ORJSON:
+    # datetime/dataclass passam pelo default (str), igual ao stdlib: a saída não depende do backend
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+def _default(value: Any) -> str:
+    return str(value)
+
+def _stdlib_dumps(obj: Any, pretty: bool, sort_keys: bool, default: Callable[[Any], Any]) -> bytes:
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, default=default, indent=2, sort_keys=sort_keys)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, default=default, separators=(',', ':'), sort_keys=sort_keys)
+    return text.encode('utf-8')
+
+def dumps_bytes(obj: Any, pretty: bool = False, sort_keys: bool = False, default: Callable[[Any], Any] = _default) -> bytes:
+    """JSON em UTF-8 (compacto por padrão); valores não serializáveis passam por default (str)"""
+    if BACKEND == 'orjson':
+        options = _ORJSON_OPTIONS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=options)
+        except (orjson.JSONEncodeError, TypeError) as e:
+            # Ex.: inteiros acima de 64 bits; o stdlib aceita
+            logger.debug(f"orjson recusou o objeto, usando stdlib: {e}")
+    
+    return _stdlib_dumps(obj, pretty, sort_keys, default)
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    return dumps_bytes(obj, pretty, sort_keys).decode('utf-8')
+
+def dumps_with(obj: dict, key: str, encoded: bytes, pretty: bool = False) -> bytes:
+    """Serializa obj acrescentando `key` com um valor já codificado (evita recodificar payloads grandes)"""
+    head = dumps_bytes(obj, pretty).rstrip()[:-1].rstrip()
+    separator = b',' if obj else b''
+    if pretty:
+        return head + separator + b'\n  ' + dumps_bytes(key) + b': ' + encoded + b'\n}'
+    return head + separator + dumps_bytes(key) + b':' + encoded + b'}'
+
+def loads(data: Union[str, bytes]) -> Any:
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dump_file(obj: Any, path: Union[str, os.PathLike], pretty: bool = None) -> int:
+    """Grava JSON em disco e retorna o tamanho em bytes (pretty=None segue JSON_PRETTY_ON_DISK)"""
+    data = dumps_bytes(obj, PRETTY_ON_DISK if pretty is None else pretty)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def load_file(path: Union[str, os.PathLike]) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask usando o serializador plugável (UTF-8, como JSON_AS_ASCII=False)"""
+    
+    def _default(self, value: Any) -> Any:
+        # Datas, UUID, Decimal e dataclasses como no provider padrão; o resto vira str
+        try:
+            return self.default(value)
+        except TypeError:
+            return str(value)
+    
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return dumps_bytes(
+            obj,
+            pretty=kwargs.get('indent') is not None,
+            sort_keys=kwargs.get('sort_keys', self.sort_keys),
+            default=self._default
+        ).decode('utf-8')
+    
+    def loads(self, s: Union[str, bytes], **kwargs) -> Any:
+        return loads(s)
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Tenant da Requisição
+Identidade usada nos limites da fila de análises e na posse dos jobs
+"""
+
+import os
+
+from flask import request
+
+# Cabeçalho preenchido pelo gateway autenticado (ex.: X-Tenant-ID); vazio = nenhum cabeçalho é confiável
+TRUSTED_TENANT_HEADER = os.getenv('TRUSTED_TENANT_HEADER', '').strip()
+
+def request_tenant() -> str:
+    """Tenant resolvido só com dados que o servidor controla (nunca corpo, query ou cabeçalho livre)
+    
+    Com TRUSTED_TENANT_HEADER, vale o tenant informado pelo gateway; caso contrário, o IP do cliente
+    (remote_addr, corrigido pelo ProxyFix quando PROXY_FIX_X_FOR está configurado).
+    """
+    if TRUSTED_TENANT_HEADER:
+        tenant = request.headers.get(TRUSTED_TENANT_HEADER, '').strip()
+        if tenant:
+            return tenant
+    
+    return request.remote_addr or 'default'
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Request Tracing
+Spans leves (pai/filho, duração) propagados por ContextVar ao longo do pipeline
+"""
+
+import os
+import time
+import uuid
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+
+# Spans acumulados antes de gravar parcialmente (análises longas ficam visíveis durante a execução)
+FLUSH_EVERY = int(os.getenv('TRACE_FLUSH_SPANS', 200))
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('trace', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('trace_span', default=None)
+
+class Trace:
+    """Spans de uma execução (uma sessão de análise), gravados em lote no trace_store"""
+    
+    def __init__(self, trace_id: str, name: str):
+        self.trace_id = trace_id
+        self.name = name
+        self.spans: List[Dict[str, Any]] = []
+        self.span_count = 0
+        self.status = 'ok'
+        self._lock = threading.Lock()
+    
+    def add(self, span: Dict[str, Any]):
+        with self._lock:
+            self.spans.append(span)
+            self.span_count += 1
+            pending = len(self.spans) >= FLUSH_EVERY
+        
+        if pending:
+            self.flush()
+    
+    def flush(self):
+        """Grava spans pendentes; falhas de gravação nunca interrompem a análise"""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        
+        if not spans:
+            return
+        
+        try:
+            from services.trace_store import trace_store
+            trace_store.save_spans(self.trace_id, spans)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar spans do trace {self.trace_id}: {e}")
+
+def _new_span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+@contextmanager
+def start_trace(trace_id: str, name: str = 'analysis', **attributes):
+    """Abre o trace raiz da execução; spans internos passam a ser registrados"""
+    if not TRACING_ENABLED or not trace_id:
+        yield None
+        return
+    
+    trace = Trace(trace_id, name)
+    trace_token = _current_trace.set(trace)
+    
+    try:
+        from services.trace_store import trace_store
+        trace_store.start_run(trace_id, name, attributes)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao registrar trace {trace_id}: {e}")
+    
+    started = time.time()
+    
+    try:
+        with span(name, category='root', **attributes):
+            yield trace
+    except BaseException:
+        trace.status = 'error'
+        raise
+    finally:
+        _current_trace.reset(trace_token)
+        trace.flush()
+        
+        try:
+            from services.trace_store import trace_store
+            trace_store.finish_run(trace_id, time.time() - started, trace.status, trace.span_count)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao finalizar trace {trace_id}: {e}")
+
+@contextmanager
+def span(name: str, category: str = 'function', **attributes):
+    """Mede um trecho como filho do span corrente; sem trace ativo não faz nada"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    
+    parent = _current_span.get()
+    record = {
+        'span_id': _new_span_id(),
+        'parent_id': parent['span_id'] if parent else None,
+        'name': name,
+        'category': category,
+        'start': time.time(),
+        'duration': None,
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+        'status': 'ok',
+        'attributes': dict(attributes)
+    }
+    token = _current_span.set(record)
+    started = time.perf_counter()
+    
+    try:
+        yield record
+    except BaseException as e:
+        record['status'] = 'error'
+        record['attributes']['error'] = str(e)[:300]
+        raise
+    finally:
+        record['duration'] = time.perf_counter() - started
+        _current_span.reset(token)
+        trace.add(record)
+
+def traced(name: Optional[str] = None, category: str = 'function'):
+    """Decorador: executa a função dentro de um span"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name, category):
+                return func(*args, **kwargs)
+        
+        return wrapper
+    return decorator
+
+def set_span_attributes(**attributes):
+    """Acrescenta atributos ao span corrente (ex.: provedor escolhido, tamanho do resultado)"""
+    record = _current_span.get()
+    if record is not None:
+        record['attributes'].update(attributes)
+
+def wrap_context(func: Callable) -> Callable:
+    """Propaga o contexto corrente (trace, span, deadline, sessão de auto-save) para threads de ThreadPoolExecutor"""
+    return functools.partial(contextvars.copy_context().run, func)
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
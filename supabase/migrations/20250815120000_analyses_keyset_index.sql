@@ -0,0 +1,11 @@
+/*
+  # Índice da paginação por chave em analyses
+
+  1. Índices
+    - `idx_analyses_created_at_id` (created_at DESC, id DESC): ordenação e
+      filtro do cursor (created_at, id) da listagem de análises
+    - remove `idx_analyses_created_at`, coberto pelo índice composto
+*/
+
+CREATE INDEX IF NOT EXISTS idx_analyses_created_at_id ON analyses(created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_analyses_created_at;
@@ -0,0 +1,9 @@
+/*
+  # Índice de updated_at em analyses
+
+  1. Índices
+    - `idx_analyses_updated_at` (updated_at DESC): versão da listagem de
+      análises (último updated_at) usada no ETag sem carregar a página
+*/
+
+CREATE INDEX IF NOT EXISTS idx_analyses_updated_at ON analyses(updated_at DESC);
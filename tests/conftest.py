@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Configuração dos Testes
+Banco SQLite temporário e serviços preguiçosos recriados a cada teste
+"""
+
+import os
+import sys
+
+import pytest
+
+# Adiciona o diretório src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils import lazy
+from utils.lazy import is_loaded, load_service, reset_service
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    """Cada teste usa banco e arquivos locais próprios; os singletons são recriados sob demanda"""
+    monkeypatch.setenv('SQLITE_DB_PATH', str(tmp_path / 'arqv30.db'))
+    monkeypatch.setenv('LOCAL_FILES_DIR', str(tmp_path / 'analyses_data'))
+    monkeypatch.setenv('UPLOAD_DIR', str(tmp_path / 'uploads'))
+    
+    for service in lazy._registry:
+        reset_service(service)
+    
+    yield tmp_path
+    
+    for service in lazy._registry:
+        if is_loaded(service) and hasattr(load_service(service), 'stop_replicator'):
+            load_service(service).stop_replicator()
+        reset_service(service)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes do Cache de Anexos
+Limite de tamanho aplicado pelo total estimado, sem varrer o diretório a cada gravação
+"""
+
+import hashlib
+import os
+
+import pytest
+
+from services import attachment_cache as attachment_cache_module
+
+def _hash(index: int) -> str:
+    return hashlib.sha256(str(index).encode('utf-8')).hexdigest()
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    from services.attachment_cache import attachment_cache
+    
+    monkeypatch.setattr(attachment_cache, 'cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(attachment_cache, 'max_bytes', 4096)
+    monkeypatch.setattr(attachment_cache, 'prune_target', 3000)
+    return attachment_cache
+
+@pytest.fixture
+def walks(monkeypatch):
+    calls = []
+    real_walk = os.walk
+    
+    def counting_walk(*args, **kwargs):
+        calls.append(args)
+        return real_walk(*args, **kwargs)
+    
+    monkeypatch.setattr(attachment_cache_module.os, 'walk', counting_walk)
+    return calls
+
+def test_put_scans_only_when_over_limit(cache, walks):
+    for index in range(40):
+        cache.put(_hash(index), {'signature': 'v1', 'content': 'x' * 200})
+    
+    stats = cache.get_stats()
+    
+    # Uma varredura inicial + poucas limpezas; get_stats faz a última
+    assert len(walks) < 10
+    assert stats['size_mb'] * 1024 * 1024 <= 4096
+    assert cache.get(_hash(39), 'v1')['content'] == 'x' * 200
+
+def test_overwrite_does_not_inflate_total(cache, walks):
+    cache.put(_hash(0), {'signature': 'v1', 'content': 'x' * 200})
+    scans = len(walks)
+    
+    for _ in range(50):
+        cache.put(_hash(0), {'signature': 'v1', 'content': 'x' * 200})
+    
+    assert len(walks) == scans
+
+def test_limit_is_shared_between_processes(cache, walks):
+    from services.attachment_cache import AttachmentContentCache
+    
+    # Segunda instância no mesmo diretório e banco, como outro worker do gunicorn
+    other = AttachmentContentCache()
+    other.cache_dir = cache.cache_dir
+    other.max_bytes = cache.max_bytes
+    other.prune_target = cache.prune_target
+    
+    for index in range(40):
+        (cache if index % 2 else other).put(_hash(index), {'signature': 'v1', 'content': 'x' * 200})
+        size = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in attachment_cache_module.os.walk(cache.cache_dir)
+            for name in names
+        )
+        assert size <= cache.max_bytes + 300
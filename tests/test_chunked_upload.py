@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes do Upload em Partes
+Offsets, conflitos entre requisições concorrentes e retomada de uploads parados
+"""
+
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from flask import Flask
+
+from services.chunked_upload import UploadError
+
+class FakeExecutor:
+    """Registra as extrações agendadas sem processar o arquivo"""
+    
+    def __init__(self):
+        self.submitted = []
+    
+    def submit(self, func, *args):
+        self.submitted.append(args)
+
+class RacingStream(io.BytesIO):
+    """Corpo que, ao ser lido, deixa outra requisição gravar o mesmo offset primeiro"""
+    
+    def __init__(self, data: bytes, on_first_read):
+        super().__init__(data)
+        self.on_first_read = on_first_read
+    
+    def read(self, size=-1):
+        if self.on_first_read:
+            callback, self.on_first_read = self.on_first_read, None
+            callback()
+        return super().read(size)
+
+@pytest.fixture
+def executor():
+    return FakeExecutor()
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch, executor):
+    from services.chunked_upload import chunked_upload_manager
+    
+    upload_dir = tmp_path / 'chunks'
+    upload_dir.mkdir()
+    monkeypatch.setattr(chunked_upload_manager, 'upload_dir', str(upload_dir))
+    monkeypatch.setattr(chunked_upload_manager, '_get_executor', lambda: executor)
+    return chunked_upload_manager
+
+def _init(manager, data: bytes):
+    return manager.init('session_test', 'dados.txt', 'text/plain', len(data), hashlib.sha256(data).hexdigest())
+
+def test_sequential_chunks_complete_upload(manager, executor):
+    data = b'a' * 10 + b'b' * 10
+    upload_id = _init(manager, data)['upload_id']
+    
+    assert manager.put_chunk(upload_id, 0, io.BytesIO(data[:10]))['received_bytes'] == 10
+    status = manager.put_chunk(upload_id, 10, io.BytesIO(data[10:]))
+    
+    assert status['status'] == 'processing'
+    assert executor.submitted == [(upload_id,)]
+    with open(manager._part_path(upload_id), 'rb') as f:
+        assert f.read() == data
+
+def test_out_of_sequence_offset_returns_409(manager):
+    upload_id = _init(manager, b'x' * 20)['upload_id']
+    manager.put_chunk(upload_id, 0, io.BytesIO(b'x' * 10))
+    
+    with pytest.raises(UploadError) as error:
+        manager.put_chunk(upload_id, 0, io.BytesIO(b'x' * 10))
+    
+    assert error.value.status == 409
+    assert error.value.details['received_bytes'] == 10
+
+def test_concurrent_chunk_at_same_offset_loses_without_corrupting(manager):
+    upload_id = _init(manager, b'a' * 10 + b'b' * 10)['upload_id']
+    
+    def winner():
+        manager.put_chunk(upload_id, 0, io.BytesIO(b'a' * 10))
+    
+    with pytest.raises(UploadError) as error:
+        manager.put_chunk(upload_id, 0, RacingStream(b'z' * 10, winner))
+    
+    assert error.value.status == 409
+    assert error.value.details['received_bytes'] == 10
+    with open(manager._part_path(upload_id), 'rb') as f:
+        assert f.read() == b'a' * 10
+    assert not [name for name in os.listdir(manager.upload_dir) if name.endswith('.chunk')]
+
+def test_chunk_checksum_mismatch_keeps_offset(manager):
+    upload_id = _init(manager, b'x' * 20)['upload_id']
+    
+    with pytest.raises(UploadError) as error:
+        manager.put_chunk(upload_id, 0, io.BytesIO(b'x' * 10), chunk_sha256='0' * 64)
+    
+    assert error.value.status == 422
+    assert manager.get_status(upload_id)['received_bytes'] == 0
+    assert os.path.getsize(manager._part_path(upload_id)) == 0
+
+def test_recover_stale_resubmits_or_fails(manager, executor):
+    data = b'x' * 10
+    resumed = _init(manager, data)['upload_id']
+    lost = _init(manager, data)['upload_id']
+    
+    stale = time.time() - manager.processing_timeout - 60
+    for upload_id in (resumed, lost):
+        manager._update(upload_id, status='processing', received_bytes=len(data))
+        with manager.db._connection() as conn:
+            conn.execute('UPDATE chunked_uploads SET updated_at = ? WHERE id = ?', (stale, upload_id))
+    os.remove(manager._part_path(lost))
+    
+    assert manager.recover_stale() == 2
+    assert executor.submitted == [(resumed,)]
+    assert manager.get_status(lost)['status'] == 'failed'
+    assert manager.recover_stale() == 0
+
+def test_init_with_invalid_size_returns_400():
+    from routes.uploads import uploads_bp
+    
+    app = Flask(__name__)
+    app.register_blueprint(uploads_bp, url_prefix='/api')
+    
+    response = app.test_client().post('/api/uploads', json={'filename': 'dados.txt', 'size': 'abc'})
+    
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Tamanho inválido'
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes da Exportação em Lote
+NDJSON paginado com os campos comuns aos dois bancos e validação do limite
+"""
+
+import json
+
+import pytest
+from flask import Flask
+
+@pytest.fixture
+def client():
+    from routes.files import files_bp
+    
+    app = Flask(__name__)
+    app.register_blueprint(files_bp, url_prefix='/api')
+    return app.test_client()
+
+@pytest.fixture
+def db_manager():
+    from database import db_manager
+    return db_manager
+
+def test_invalid_limit_returns_400(client):
+    response = client.get('/api/export_analyses?limit=abc')
+    
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Limite inválido'
+
+def test_export_streams_full_records(client, db_manager):
+    for produto in ('Curso', 'Mentoria', 'Ebook'):
+        db_manager.create_analysis({
+            'segmento': 'Educação',
+            'produto': produto,
+            'comprehensive_analysis': {'produto': produto}
+        })
+    
+    response = client.get('/api/export_analyses?limit=2')
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+    
+    assert response.status_code == 200
+    assert len(records) == 2
+    assert all(record['comprehensive_analysis']['produto'] == record['produto'] for record in records)
+    assert 'query_text' not in records[0]
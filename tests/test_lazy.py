@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes de Lazy Loading
+Proxy transparente para os atributos do serviço e cache do resultado do import
+"""
+
+import threading
+
+import pytest
+
+from utils.lazy import LazyModule, is_loaded, lazy_service, load_service, reset_service, services_status
+
+class Service:
+    def __init__(self):
+        self._lock = 'lock do serviço'
+        self._name = 'nome do serviço'
+        self._instance = 'instância interna'
+        self.resets = 0
+    
+    def reset(self):
+        self.resets += 1
+        return 'reset do serviço'
+
+def test_proxy_does_not_shadow_service_attributes():
+    service = lazy_service(Service, 'servico_teste')
+    assert not is_loaded(service)
+    
+    assert service._lock == 'lock do serviço'
+    assert service._name == 'nome do serviço'
+    assert service._instance == 'instância interna'
+    assert service.reset() == 'reset do serviço'
+    assert service.resets == 1
+    assert is_loaded(service)
+    assert isinstance(service._LazyService__lock, type(threading.RLock()))
+
+def test_reset_service_creates_new_instance():
+    service = lazy_service(Service, 'servico_reset')
+    first = load_service(service)
+    
+    reset_service(service)
+    assert not is_loaded(service)
+    assert load_service(service) is not first
+    assert services_status()['servico_reset']['loaded']
+
+def test_lazy_module_caches_import_error(monkeypatch):
+    import importlib
+    
+    calls = []
+    def failing_import(name):
+        calls.append(name)
+        raise ImportError(f'{name} quebrado')
+    
+    monkeypatch.setattr(importlib, 'import_module', failing_import)
+    module = LazyModule('pacote_quebrado')
+    
+    for _ in range(2):
+        with pytest.raises(ImportError):
+            module.attr
+    assert calls == ['pacote_quebrado']
+
+class NetworkService:
+    reset_after_fork = True
+
+def test_fork_hook_resets_network_services(monkeypatch):
+    from utils import lazy
+    
+    network = lazy_service(NetworkService, 'servico_rede')
+    data = lazy_service(Service, 'servico_dados')
+    inherited_network = load_service(network)
+    inherited_data = load_service(data)
+    
+    monkeypatch.setattr(lazy, '_reinitialized_pid', None)
+    reset = lazy.reinit_after_fork()
+    
+    assert 'servico_rede' in reset
+    assert not is_loaded(network)
+    assert load_service(data) is inherited_data
+    assert load_service(network) is not inherited_network
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes do GET Condicional da Listagem
+ETag pela versão do banco (total e último updated_at), 304 sem carregar a página
+"""
+
+import pytest
+from flask import Flask
+
+@pytest.fixture
+def db_manager():
+    from database import db_manager
+    return db_manager
+
+@pytest.fixture
+def client():
+    from routes.analysis import analysis_bp
+    
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp, url_prefix='/api')
+    return app.test_client()
+
+def _create(db_manager, produto: str) -> str:
+    return db_manager.create_analysis({'segmento': 'Educação', 'produto': produto})['id']
+
+def test_unchanged_listing_returns_304_without_page_query(client, db_manager, monkeypatch):
+    _create(db_manager, 'Curso')
+    
+    first = client.get('/api/list_analyses?limit=10')
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    
+    def fail_list(*args, **kwargs):
+        raise AssertionError('página não deveria ser consultada')
+    
+    monkeypatch.setattr(db_manager, 'list_analyses', fail_list)
+    second = client.get('/api/list_analyses?limit=10', headers={'If-None-Match': first.headers['ETag']})
+    
+    assert second.status_code == 304
+    assert second.headers['ETag'] == first.headers['ETag']
+
+def test_insert_and_update_change_the_etag(client, db_manager):
+    analysis_id = _create(db_manager, 'Curso')
+    etag = client.get('/api/list_analyses').headers['ETag']
+    
+    _create(db_manager, 'Mentoria')
+    after_insert = client.get('/api/list_analyses', headers={'If-None-Match': etag})
+    assert after_insert.status_code == 200
+    assert after_insert.get_json()['count'] == 2
+    
+    db_manager.update_analysis(analysis_id, {'produto': 'Curso avançado'})
+    after_update = client.get('/api/list_analyses', headers={'If-None-Match': after_insert.headers['ETag']})
+    assert after_update.status_code == 200
+
+def test_etag_depends_on_page_parameters(client, db_manager):
+    _create(db_manager, 'Curso')
+    etag = client.get('/api/list_analyses?fields=id,produto').headers['ETag']
+    
+    response = client.get('/api/list_analyses?fields=id,status', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 200
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes do Gerenciador de Arquivos Locais
+Remoção pelo catálogo e relatório apenas dos arquivos efetivamente removidos
+"""
+
+import os
+import time
+
+import pytest
+
+@pytest.fixture
+def local_file_manager():
+    from services.local_file_manager import local_file_manager
+    return local_file_manager
+
+def _save(manager, produto: str) -> dict:
+    result = manager.save_analysis_locally({
+        'segmento': 'Educação',
+        'produto': produto,
+        'insights_exclusivos': ['Insight']
+    })
+    assert result['success']
+    return result
+
+def test_cleanup_reports_only_removed_files(local_file_manager, monkeypatch):
+    result = _save(local_file_manager, 'Curso')
+    paths = [f['path'] for f in result['files']]
+    locked = paths[0]
+    real_remove = os.remove
+    
+    def remove(path):
+        if path == locked:
+            raise PermissionError('arquivo em uso')
+        real_remove(path)
+    
+    monkeypatch.setattr(os, 'remove', remove)
+    removed = local_file_manager.cleanup_old_files(time.time() + 60, dry_run=False)
+    
+    assert sorted(entry['path'] for entry in removed) == sorted(paths[1:])
+    assert os.path.exists(locked)
+    assert [entry['path'] for entry in local_file_manager.catalog.files_older_than(time.time() + 60)] == [locked]
+
+def test_delete_local_analysis_uses_catalog(local_file_manager, monkeypatch):
+    kept = _save(local_file_manager, 'Mentoria')
+    deleted = _save(local_file_manager, 'Curso')
+    
+    def no_walk(*args, **kwargs):
+        raise AssertionError('diretório não deveria ser percorrido')
+    
+    monkeypatch.setattr(os, 'walk', no_walk)
+    
+    assert local_file_manager.delete_local_analysis(deleted['analysis_id'])
+    assert not any(os.path.exists(f['path']) for f in deleted['files'])
+    assert all(os.path.exists(f['path']) for f in kept['files'])
+    assert local_file_manager.get_analysis_files(deleted['analysis_id']) == []
+    assert not local_file_manager.delete_local_analysis(deleted['analysis_id'])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes da Fila de Renderização de PDF
+Lote de análises salvas renderizado pelo worker e deduplicação por artefato
+"""
+
+import os
+import threading
+
+import pytest
+
+from job_worker import _execute_pdf_job
+
+ANALYSIS = {
+    'segmento': 'Educação',
+    'produto': 'Curso online de finanças',
+    'publico': 'Jovens profissionais',
+    'insights_exclusivos': [
+        'Mercado de educação financeira cresce com a digitalização dos bancos',
+        'Público jovem prefere conteúdo curto e aplicável no dia a dia',
+        'Comunidades pagas aumentam a retenção em cursos de longa duração'
+    ]
+}
+
+# Singletons preguiçosos são obtidos nas fixtures: no nível do módulo, a coleta do
+# pytest os inspecionaria e criaria as instâncias antes do banco temporário
+
+@pytest.fixture
+def pdf_render_queue():
+    from services.pdf_render_queue import pdf_render_queue
+    return pdf_render_queue
+
+@pytest.fixture
+def pdf_artifact_cache(tmp_path, monkeypatch):
+    from routes.pdf_generator import pdf_artifact_cache
+    
+    path = tmp_path / 'relatorios_pdf'
+    path.mkdir()
+    monkeypatch.setattr(pdf_artifact_cache, 'base_dir', str(path))
+    return pdf_artifact_cache
+
+def test_batch_job_renders_saved_analysis(pdf_render_queue, pdf_artifact_cache):
+    from services.database_fallback import database_fallback
+    
+    analysis = database_fallback.create_analysis(dict(ANALYSIS))
+    batch = pdf_render_queue.submit_batch([analysis['id']])
+    
+    job = pdf_render_queue.claim_next('teste')
+    assert job['analysis_id'] == analysis['id']
+    
+    _execute_pdf_job(job)
+    
+    result = pdf_render_queue.get_job(job['id'])
+    assert result['status'] == 'completed', result['error']
+    assert os.path.exists(pdf_artifact_cache.get(result['artifact_key']))
+    assert pdf_render_queue.get_batch(batch['batch_id'])['done']
+
+def test_batch_job_fails_for_unknown_analysis(pdf_render_queue, pdf_artifact_cache):
+    pdf_render_queue.submit_batch(['analysis_inexistente'])
+    
+    job = pdf_render_queue.claim_next('teste')
+    _execute_pdf_job(job)
+    
+    result = pdf_render_queue.get_job(job['id'])
+    assert result['status'] == 'failed'
+    assert result['error'] == 'Análise não encontrada'
+    assert os.listdir(pdf_artifact_cache.base_dir) == []
+
+def test_concurrent_submits_share_one_job(pdf_render_queue):
+    key = 'a' * 32
+    results = []
+    
+    def submit():
+        results.append(pdf_render_queue.submit({'segmento': 'Varejo'}, key)['job_id'])
+    
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(set(results)) == 1
+    assert pdf_render_queue.get_stats()['queued'] == 1
+    assert len(os.listdir(pdf_render_queue.payload_dir)) == 1
+    
+    # Concluído o job, a mesma chave pode ser enfileirada de novo
+    pdf_render_queue.complete(results[0], key)
+    assert pdf_render_queue.submit({'segmento': 'Varejo'}, key)['job_id'] != results[0]
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes do Stream de Progresso
+Stream aberto antes do envio da análise aguarda a sessão em vez de expirar
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from routes import progress
+
+@pytest.fixture
+def client(monkeypatch):
+    from routes.analysis import analysis_bp
+    
+    monkeypatch.setattr(progress, 'SSE_POLL_INTERVAL', 0.05)
+    monkeypatch.setattr(progress, 'SSE_SESSION_GRACE', 5)
+    monkeypatch.setattr(progress, 'SSE_MAX_DURATION', 10)
+    
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp, url_prefix='/api')
+    app.register_blueprint(progress.progress_bp, url_prefix='/api')
+    return app.test_client()
+
+def test_stream_opened_before_submit_receives_progress(client):
+    session_id = 'session_stream_antes'
+    submitted = []
+    
+    def submit_then_finish():
+        time.sleep(0.2)
+        response = client.post('/api/analyze', json={'segmento': 'Educação', 'session_id': session_id})
+        submitted.append(response.get_json())
+        
+        time.sleep(0.2)
+        progress.ProgressTracker.load(session_id).complete()
+    
+    worker = threading.Thread(target=submit_then_finish)
+    worker.start()
+    body = client.get(f'/api/progress/stream/{session_id}').get_data(as_text=True)
+    worker.join()
+    
+    assert submitted[0]['progress_stream_url'] == f'/api/progress/stream/{session_id}'
+    assert 'event: expired' not in body
+    assert 'event: progress' in body
+    assert body.rstrip().splitlines()[-2] == 'event: complete'
+
+def test_unknown_session_expires_after_grace(client, monkeypatch):
+    monkeypatch.setattr(progress, 'SSE_SESSION_GRACE', 0.2)
+    
+    started = time.time()
+    body = client.get('/api/progress/stream/session_inexistente').get_data(as_text=True)
+    
+    assert 'event: expired' in body
+    assert time.time() - started >= 0.2
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes do Supabase Outbox
+Gravação local direta (fallback) e replicação via outbox (Supabase)
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from database import DatabaseManager
+from services.supabase_client import SupabaseClient
+from services.supabase_outbox import SupabaseOutbox
+from utils.serialization import dump_file
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.rows = []
+    
+    def upsert(self, rows, **kwargs):
+        self.rows = rows
+        return self
+    
+    def execute(self):
+        if self.client.fail:
+            raise RuntimeError('Supabase indisponível')
+        
+        stored = self.client.tables.setdefault(self.name, {})
+        for row in self.rows:
+            stored.setdefault(row['id'], row)
+        return type('Result', (), {'data': self.rows})()
+
+class FakePostgrest:
+    """Cliente PostgREST mínimo: upsert por id em tabelas em memória"""
+    
+    def __init__(self):
+        self.tables = {}
+        self.fail = False
+    
+    def table(self, name):
+        return FakeTable(self, name)
+
+class FakeLocalFiles:
+    """Salva apenas a análise completa, como o LocalFileManager faz com 'completas'"""
+    
+    def __init__(self, base_dir):
+        self.base_dir = str(base_dir)
+    
+    def save_analysis_locally(self, analysis_data):
+        analysis_id = f"{len(os.listdir(self.base_dir)):08d}-0000-4000-8000-000000000000"
+        path = os.path.join(self.base_dir, f"{analysis_id[:8]}_completa.json")
+        dump_file(analysis_data, path)
+        
+        return {
+            'success': True,
+            'analysis_id': analysis_id,
+            'base_directory': self.base_dir,
+            'files': [{'type': 'completas', 'name': os.path.basename(path), 'path': path, 'size': os.path.getsize(path)}]
+        }
+
+@pytest.fixture
+def local_files(tmp_path):
+    base_dir = tmp_path / 'analyses_data'
+    base_dir.mkdir()
+    return FakeLocalFiles(base_dir)
+
+@pytest.fixture
+def supabase():
+    client = SupabaseClient()
+    client.client = FakePostgrest()
+    return client
+
+def make_manager(local_files, backend=None, outbox=None):
+    manager = DatabaseManager()
+    manager.local_files = local_files
+    if backend is not None:
+        manager.supabase = backend
+        manager.use_fallback = False
+        manager.outbox = outbox
+    return manager
+
+def test_fallback_mode_writes_sqlite_directly(local_files):
+    manager = make_manager(local_files)
+    assert manager.use_fallback
+    
+    result = manager.create_analysis({'segmento': 'Educação', 'produto': 'Curso'})
+    
+    assert 'replication_status' not in result
+    stored = manager.get_analysis(result['id'])
+    assert stored['segmento'] == 'Educação'
+    assert stored['local_files_path'] == local_files.base_dir
+    assert [f['file_type'] for f in manager.get_analysis_files(result['id'])] == ['completas']
+
+def test_supabase_mode_replicates_through_outbox(local_files, supabase):
+    outbox = SupabaseOutbox()
+    manager = make_manager(local_files, supabase, outbox)
+    
+    result = manager.create_analysis({'segmento': 'Saúde', 'produto': 'App'})
+    assert result['replication_status'] == 'pending'
+    assert outbox.get_lag()['pending'] == 1
+    
+    batch = outbox._claim_batch()
+    created_at = batch[0]['created_at']
+    outbox._push_batch(supabase, batch)
+    
+    analyses = supabase.client.tables['analyses']
+    row = analyses[result['id']]
+    assert row['segmento'] == 'Saúde'
+    assert row['local_files_path'] == local_files.base_dir
+    assert row['created_at'] == datetime.fromtimestamp(created_at).isoformat()
+    assert len(supabase.client.tables['analysis_files']) == 1
+    
+    lag = outbox.get_lag()
+    assert lag['pending'] == 0 and lag['replicated'] == 1
+
+def test_replication_retry_is_idempotent(local_files, supabase):
+    outbox = SupabaseOutbox()
+    manager = make_manager(local_files, supabase, outbox)
+    result = manager.create_analysis({'segmento': 'Varejo'})
+    
+    supabase.client.fail = True
+    outbox._push_batch(supabase, outbox._claim_batch())
+    assert outbox.get_lag()['pending'] == 1
+    
+    # Nova tentativa imediata, ignorando o backoff
+    with outbox.db._connection() as conn:
+        conn.execute('UPDATE supabase_outbox SET next_attempt_at = 0')
+    
+    supabase.client.fail = False
+    outbox._push_batch(supabase, outbox._claim_batch())
+    outbox._push_batch(supabase, outbox._claim_batch())
+    
+    assert list(supabase.client.tables['analyses']) == [result['id']]
+    assert len(supabase.client.tables['analysis_files']) == 1
+
+def test_backfill_keeps_original_created_at(tmp_path, supabase):
+    outbox = SupabaseOutbox()
+    (tmp_path / 'completas').mkdir()
+    path = str(tmp_path / 'completas' / 'antiga_completa.json')
+    dump_file({'segmento': 'Serviços'}, path)
+    
+    analysis_id = '11111111-0000-4000-8000-000000000000'
+    outbox.enqueue_analysis(analysis_id, {}, {
+        'files': [{'type': 'completas', 'name': 'antiga_completa.json', 'path': path, 'size': 10}],
+        'created_at': '2025-01-02T03:04:05'
+    })
+    outbox._push_batch(supabase, outbox._claim_batch())
+    
+    row = supabase.client.tables['analyses'][analysis_id]
+    assert row['created_at'] == '2025-01-02T03:04:05'
+    assert row['local_files_path'] == str(tmp_path / 'completas')
+
+def test_get_lag_does_not_start_replicator():
+    outbox = SupabaseOutbox()
+    
+    assert outbox.get_lag()['replicator_running'] is False
+    assert not outbox._is_running()
+
+def test_backup_is_rejected_in_fallback_mode():
+    from flask import Flask
+    from database import db_manager
+    from routes.files import files_bp
+    from services.supabase_outbox import supabase_outbox
+    
+    assert db_manager.use_fallback
+    db_manager.create_analysis({'segmento': 'Educação', 'produto': 'Curso'})
+    
+    app = Flask(__name__)
+    app.register_blueprint(files_bp, url_prefix='/api')
+    response = app.test_client().post('/api/backup_to_supabase', json={})
+    
+    assert response.status_code == 409
+    assert supabase_outbox.get_lag()['pending'] == 0
+    assert not supabase_outbox._is_running()
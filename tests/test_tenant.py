@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Testes do Tenant da Requisição
+Envio e consulta de jobs resolvem o mesmo tenant, sem aceitar valores do cliente
+"""
+
+import pytest
+from flask import Flask
+
+from utils import tenant
+
+@pytest.fixture
+def client():
+    from routes.analysis import analysis_bp
+    from routes.jobs import jobs_bp
+    
+    app = Flask(__name__)
+    app.register_blueprint(analysis_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    return app.test_client()
+
+def _submit(client, **kwargs):
+    response = client.post('/api/analyze', json={'segmento': 'Educação', 'tenant_id': 'escolhido'}, **kwargs)
+    assert response.status_code == 202
+    return response.get_json()
+
+def test_client_supplied_tenant_is_ignored(client):
+    job = _submit(client, headers={'X-Tenant-ID': 'outro'})
+    
+    assert job['tenant_id'] == '127.0.0.1'
+    assert client.get(f"/api/jobs/{job['job_id']}").status_code == 200
+    assert client.get(f"/api/jobs/{job['job_id']}?tenant_id=escolhido").status_code == 200
+
+def test_other_client_cannot_see_job(client):
+    job = _submit(client)
+    
+    response = client.get(f"/api/jobs/{job['job_id']}", environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    
+    assert response.status_code == 404
+
+def test_trusted_header_identifies_tenant(client, monkeypatch):
+    monkeypatch.setattr(tenant, 'TRUSTED_TENANT_HEADER', 'X-Tenant-ID')
+    
+    job = _submit(client, headers={'X-Tenant-ID': 'empresa-a'})
+    
+    assert job['tenant_id'] == 'empresa-a'
+    assert client.get(f"/api/jobs/{job['job_id']}", headers={'X-Tenant-ID': 'empresa-a'}).status_code == 200
+    assert client.get(f"/api/jobs/{job['job_id']}", headers={'X-Tenant-ID': 'empresa-b'}).status_code == 404